@@ -53,14 +53,17 @@ def _ensure_first_admin():
     Create ONE admin from ADMIN_EMAIL / ADMIN_PASSWORD **only if none exists**.
     Does NOT reset the password on later boots.
     """
-    from .models import User
+    from .models import User, normalize_email
     email = os.getenv("ADMIN_EMAIL")
     password = os.getenv("ADMIN_PASSWORD")
     if not email or not password:
         current_app.logger.info("[ADMIN SEED] ADMIN_EMAIL/ADMIN_PASSWORD not set; skipping seed.")
         return
 
-    existing = User.query.filter_by(email=email, role="admin").first()
+    existing = User.query.filter(
+        User.email_normalized == normalize_email(email),
+        User.role == "admin",
+    ).first()
     if existing:
         current_app.logger.info("[ADMIN SEED] Admin already exists; not modifying.")
         return
@@ -102,12 +105,82 @@ def create_app():
     app.config['SECRET_KEY'] = cfg.SECRET_KEY
     app.config['SQLALCHEMY_DATABASE_URI'] = cfg.SQLALCHEMY_DATABASE_URI
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = cfg.SQLALCHEMY_TRACK_MODIFICATIONS
+
+    # Connection pool / timeouts / read replica (see app/utils/db_routing.py)
+    app.config["WEB_CONCURRENCY"] = cfg.WEB_CONCURRENCY
+    app.config["GUNICORN_THREADS"] = cfg.GUNICORN_THREADS
+    app.config["DB_POOL_EXTRA"] = cfg.DB_POOL_EXTRA
+    app.config["DB_MAX_CONNECTIONS"] = cfg.DB_MAX_CONNECTIONS
+    app.config["DB_POOL_TIMEOUT"] = cfg.DB_POOL_TIMEOUT
+    app.config["DB_POOL_RECYCLE"] = cfg.DB_POOL_RECYCLE
+    app.config["DB_POOL_PRE_PING"] = cfg.DB_POOL_PRE_PING
+    app.config["DB_STATEMENT_TIMEOUT_MS"] = cfg.DB_STATEMENT_TIMEOUT_MS
+    app.config["DB_CLI_STATEMENT_TIMEOUT_MS"] = cfg.DB_CLI_STATEMENT_TIMEOUT_MS
+    app.config["REPORT_STATEMENT_TIMEOUT_MS"] = cfg.REPORT_STATEMENT_TIMEOUT_MS
+    app.config["DATABASE_REPLICA_URL"] = cfg.DATABASE_REPLICA_URL
+    app.config["REPLICA_RETRY_SECONDS"] = cfg.REPLICA_RETRY_SECONDS
     # Invoice/attachment uploads (single source of truth)
     app.config["INVOICE_UPLOAD_FOLDER"] = cfg.INVOICE_UPLOAD_FOLDER
     app.config["PACKAGE_ATTACHMENT_FOLDER"] = cfg.PACKAGE_ATTACHMENT_FOLDER
+    app.config["PDF_CACHE_FOLDER"] = cfg.PDF_CACHE_FOLDER
+    app.config["PDF_CACHE_MAX_MB"] = cfg.PDF_CACHE_MAX_MB
+    app.config["JINJA_CACHE_FOLDER"] = cfg.JINJA_CACHE_FOLDER
+    app.config["PDF_WORKERS"] = cfg.PDF_WORKERS
+    app.config["PDF_RENDER_TIMEOUT_SECONDS"] = cfg.PDF_RENDER_TIMEOUT_SECONDS
+
+    # Delivery distance lookups (see app/utils/distance_cache.py)
+    app.config["DISTANCE_LOOKUP_MODE"] = cfg.DISTANCE_LOOKUP_MODE
+    app.config["DISTANCE_CACHE_TTL_DAYS"] = cfg.DISTANCE_CACHE_TTL_DAYS
+    app.config["GOOGLE_MAPS_TIMEOUT_SECONDS"] = cfg.GOOGLE_MAPS_TIMEOUT_SECONDS
+    app.config["DISTANCE_BREAKER_THRESHOLD"] = cfg.DISTANCE_BREAKER_THRESHOLD
+    app.config["DISTANCE_BREAKER_COOLDOWN_SECONDS"] = cfg.DISTANCE_BREAKER_COOLDOWN_SECONDS
+
+    # Query counts / Server-Timing / slow-request log (see app/utils/query_stats.py)
+    app.config["PERF_INSTRUMENTATION"] = cfg.PERF_INSTRUMENTATION
+    app.config["PERF_SERVER_TIMING"] = cfg.PERF_SERVER_TIMING
+    app.config["PERF_SLOW_REQUEST_MS"] = cfg.PERF_SLOW_REQUEST_MS
+    app.config["PERF_SLOW_QUERY_COUNT"] = cfg.PERF_SLOW_QUERY_COUNT
+    app.config["PERF_QUERY_BUDGET"] = cfg.PERF_QUERY_BUDGET
+    app.config["PERF_ENFORCE_QUERY_BUDGET"] = cfg.PERF_ENFORCE_QUERY_BUDGET
+
+    # Scheduled jobs (see app/utils/jobs.py)
+    app.config["JOBS_TIMEZONE"] = cfg.JOBS_TIMEZONE
+    app.config["JOBS_POLL_SECONDS"] = cfg.JOBS_POLL_SECONDS
+    app.config["JOBS_BATCH_SIZE"] = cfg.JOBS_BATCH_SIZE
+    app.config["JOBS_LEASE_SECONDS"] = cfg.JOBS_LEASE_SECONDS
+    app.config["JOBS_MAX_RUN_SECONDS"] = cfg.JOBS_MAX_RUN_SECONDS
+    app.config["JOB_RUNS_KEEP_DAYS"] = cfg.JOB_RUNS_KEEP_DAYS
+    app.config["PREALERT_SWEEP_LOOKBACK_DAYS"] = cfg.PREALERT_SWEEP_LOOKBACK_DAYS
+
+    # Rate calculator caching (see app/utils/estimate_cache.py)
+    app.config["PRICING_MEMO_SIZE"] = cfg.PRICING_MEMO_SIZE
+    app.config["PRICING_SNAPSHOT_TTL_SECONDS"] = cfg.PRICING_SNAPSHOT_TTL_SECONDS
+    app.config["PUBLIC_RATES_MAX_AGE"] = cfg.PUBLIC_RATES_MAX_AGE
+    app.config["CALCULATOR_LOG_BATCH_SIZE"] = cfg.CALCULATOR_LOG_BATCH_SIZE
+    app.config["CALCULATOR_LOG_FLUSH_SECONDS"] = cfg.CALCULATOR_LOG_FLUSH_SECONDS
+
+    # Rate limiting (see app/utils/ratelimit_storage.py)
+    app.config["RATELIMIT_STORAGE_URI"] = cfg.RATELIMIT_STORAGE_URI
+    app.config["RATELIMIT_SWALLOW_ERRORS"] = cfg.RATELIMIT_SWALLOW_ERRORS
+    app.config["RATELIMIT_IN_MEMORY_FALLBACK_ENABLED"] = cfg.RATELIMIT_IN_MEMORY_FALLBACK_ENABLED
+
+    # Finance daily facts (see app/utils/finance_facts.py)
+    app.config["FINANCE_FACTS_VERIFY_DAYS"] = cfg.FINANCE_FACTS_VERIFY_DAYS
+
+    # Audit log writer and retention (see app/utils/audit.py)
+    app.config["AUDIT_BUFFERED"] = cfg.AUDIT_BUFFERED
+    app.config["AUDIT_BATCH_SIZE"] = cfg.AUDIT_BATCH_SIZE
+    app.config["AUDIT_FLUSH_SECONDS"] = cfg.AUDIT_FLUSH_SECONDS
+    app.config["AUDIT_DURABLE_MODULES"] = cfg.AUDIT_DURABLE_MODULES
+    app.config["AUDIT_PARTITION_MONTHS_AHEAD"] = cfg.AUDIT_PARTITION_MONTHS_AHEAD
+    app.config["AUDIT_ARCHIVE_AFTER_DAYS"] = cfg.AUDIT_ARCHIVE_AFTER_DAYS
+
+    # Cold storage (see app/utils/cold_storage.py)
+    app.config["COLD_STORAGE_AFTER_DAYS"] = cfg.COLD_STORAGE_AFTER_DAYS
+    app.config["COLD_STORAGE_THROTTLE_SECONDS"] = cfg.COLD_STORAGE_THROTTLE_SECONDS
 
     # ✅ ENSURE UPLOAD FOLDERS EXIST AT RUNTIME (Render disk + local)
-    for key in ("INVOICE_UPLOAD_FOLDER", "PACKAGE_ATTACHMENT_FOLDER"):
+    for key in ("INVOICE_UPLOAD_FOLDER", "PACKAGE_ATTACHMENT_FOLDER", "PDF_CACHE_FOLDER"):
         p = app.config.get(key)
         if not p:
             app.logger.warning(f"{key} not set")
@@ -117,6 +190,15 @@ def create_app():
         except Exception as e:
             app.logger.warning(f"Could not create {key} folder ({p}): {e}")
 
+    # Compiled templates: a worker loads the bytecode instead of re-parsing
+    try:
+        from jinja2 import FileSystemBytecodeCache
+
+        Path(cfg.JINJA_CACHE_FOLDER).mkdir(parents=True, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cfg.JINJA_CACHE_FOLDER)
+    except Exception as e:
+        app.logger.warning(f"Jinja bytecode cache disabled ({cfg.JINJA_CACHE_FOLDER}): {e}")
+
     # ------------------------------------------------------
     # ✅ CLOUDINARY CONFIG + INIT (PUT IT HERE)
     # ------------------------------------------------------
@@ -162,10 +244,14 @@ def create_app():
         )
 
     # Extensions
+    from app.utils.db_routing import engine_options, init_db_routing
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"], app.config)
     db.init_app(app)
+    init_db_routing(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     csrf.init_app(app)
+    from app.utils import ratelimit_storage  # noqa: F401  (registers the db:// storage)
     limiter.init_app(app)
     try:
         mail.init_app(app)
@@ -186,6 +272,19 @@ def create_app():
         }
     })
     
+    from app.utils.query_stats import init_query_stats
+    init_query_stats(app)
+
+    from app.utils.jobs import init_jobs
+    init_jobs(app)
+
+    # registers the flush listeners that keep finance_daily_facts current
+    from app.utils.finance_facts import init_finance_facts
+    init_finance_facts(app)
+    from app.utils import receivables  # noqa: F401  (keeps receivables_snapshot current)
+    from app.utils import pos_ledger  # noqa: F401  (keeps pos_shift_ledgers current)
+    from app.utils import audit  # noqa: F401  (buffered audit_logs writer)
+
     @app.teardown_request
     def teardown_request(exc):
         if exc:
@@ -305,8 +404,8 @@ def create_app():
         from flask_login import current_user
         try:
             if current_user.is_authenticated:
-                from .models import Notification
-                count = Notification.query.filter_by(user_id=current_user.id, is_read=False).count()
+                from app.utils.notifications import unread_notification_count
+                count = unread_notification_count(current_user)
             else:
                 count = 0
         except Exception:
@@ -346,8 +445,8 @@ def create_app():
         - counts claims in submitted state
         """
         try:
-            from app.models import Claim
-            submitted_count = Claim.query.filter(Claim.status == "submitted").count()
+            from app.utils.claims import claim_status_counts
+            submitted_count = claim_status_counts()["submitted"]
         except Exception:
             submitted_count = 0
 
@@ -548,6 +647,30 @@ def create_app():
         except Exception as e:
             return jsonify({"ok": False, "error": str(e)}), 500
 
+    from app.routes.admin_auth_routes import admin_required
+
+    @app.route("/__perf", methods=["GET", "POST"])
+    @admin_required
+    def __perf():
+        from flask import request as _request
+        from app.utils.query_stats import top_endpoints, recent_slow_requests, reset_query_stats
+
+        order_by = _request.args.get("sort", "db_ms")
+        if order_by not in ("db_ms", "queries", "total_ms", "avg_db_ms", "avg_queries", "requests"):
+            order_by = "db_ms"
+
+        if _request.method == "POST":
+            reset_query_stats()
+            return redirect(url_for("__perf"))
+
+        return render_template(
+            "admin/perf.html",
+            endpoints=top_endpoints(limit=50, order_by=order_by),
+            slow_requests=recent_slow_requests(),
+            order_by=order_by,
+            pid=os.getpid(),
+        )
+
     @app.route("/register")
     def public_register():
         for ep in ("auth.register", "register", "auth.signup"):
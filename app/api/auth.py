@@ -26,7 +26,7 @@ def api_login():
     if not email or not password_plain:
         return jsonify({"ok": False, "error": "Email and password are required."}), 400
 
-    user = User.query.filter_by(email=email).first()
+    user = User.find_by_email(email)
     if not user or not user.password:
         return jsonify({"ok": False, "error": "Invalid email or password."}), 401
 
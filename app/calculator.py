@@ -3,7 +3,9 @@ from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from flask_wtf.csrf import validate_csrf, CSRFError
 
-from app.calculator_data import calculate_charges, CATEGORIES
+from app.calculator_data import CATEGORIES
+from app.utils.calculator_log import log_calculation
+from app.utils.estimate_cache import estimate_charges
 
 calculator_bp = Blueprint("calculator", __name__, url_prefix="/calculator")
 
@@ -18,10 +20,6 @@ def calculator_ajax():
     Returns:
       calculate_charges() result dict
     """
-    # Lazy import to prevent circular import
-    from app.models import CalculatorLog
-    from app.extensions import db
-
     data = request.get_json(silent=True) or {}
     if not data:
         return jsonify({"error": "No input data provided"}), 400
@@ -61,25 +59,19 @@ def calculator_ajax():
         return jsonify({"error": errors}), 400
 
     try:
-        result = calculate_charges(category, invoice_usd, weight)
+        result = estimate_charges(category, invoice_usd, weight)
 
-        # Optional log (safe)
+        # Optional log (safe) - buffered, written in batches
         try:
-            calc_log = CalculatorLog(
+            log_calculation(
                 user_id=current_user.id,
                 category=category,
-                value_usd=invoice_usd,
-                duty_amount=float(result.get("duty") or 0),
-                scf_amount=float(result.get("scf") or 0),
-                envl_amount=float(result.get("envl") or 0),
-                caf_amount=float(result.get("caf") or 0),
-                gct_amount=float(result.get("gct") or 0),
-                total_amount=float(result.get("grand_total") or 0),
+                invoice_usd=invoice_usd,
+                weight=weight,
+                result=result,
             )
-            db.session.add(calc_log)
-            db.session.commit()
         except Exception:
-            db.session.rollback()
+            pass
 
         return jsonify(result), 200
 
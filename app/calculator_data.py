@@ -84,13 +84,16 @@ def _round_weight(w_raw: float, method: str = "round_up") -> float:
     return float(int(math.ceil(w_raw)))
 
 
-def get_freight(weight, *, settings=None) -> float:
+def get_freight(weight, *, settings=None, brackets=None) -> float:
     """
     Returns FREIGHT ONLY (JMD). Handling is calculated separately in calculate_charges().
     Uses:
       - Settings special below 1lb rates
       - AdminRate brackets for >= 1lb (and <= 100lb)
       - Settings per_lb_above_100_jmd for > 100lb (if configured)
+
+    brackets: optional [(max_weight, rate), ...] sorted by max_weight,
+    used instead of querying AdminRate (see app/utils/estimate_cache.py).
     """
     from app.models import AdminRate, Settings
 
@@ -127,6 +130,17 @@ def get_freight(weight, *, settings=None) -> float:
 
     # ---- Use AdminRate table (rate_brackets) ----
     w_int = int(w_rounded)
+
+    if brackets is not None:
+        for max_weight, rate in brackets:
+            if max_weight >= w_int:
+                return float(rate or 0)
+        if brackets:
+            max_weight, rate = brackets[-1]
+            extra = w_int - int(max_weight or 0)
+            return float(rate or 0) + max(extra, 0) * 500.0
+        return 0.0
+
     bracket = (
         AdminRate.query
         .filter(AdminRate.max_weight >= w_int)
@@ -145,7 +159,7 @@ def get_freight(weight, *, settings=None) -> float:
     return 0.0
 
 
-def calculate_charges(category, invoice_usd, weight, *, settings=None):
+def calculate_charges(category, invoice_usd, weight, *, settings=None, brackets=None):
     """
     Calculate customs and freight charges for a shipment.
     - Item value is USD.
@@ -216,7 +230,7 @@ def calculate_charges(category, invoice_usd, weight, *, settings=None):
     # ---------- FREIGHT ----------
     # Freight is calculated FIRST because customs will now use CIF:
     # customs_base = base_jmd + freight
-    freight = _to_float(get_freight(weight_raw, settings=settings), 0.0)
+    freight = _to_float(get_freight(weight_raw, settings=settings, brackets=brackets), 0.0)
 
     # CIF / customs base
     customs_base = base_jmd + freight
@@ -34,6 +34,28 @@ else:
 INVOICE_UPLOAD_FOLDER = str(UPLOADS_BASE_FOLDER / "invoices")
 PACKAGE_ATTACHMENT_FOLDER = str(UPLOADS_BASE_FOLDER / "package_attachments")
 
+# =======================
+# Rendered PDF cache (content-addressed, LRU-pruned)
+# =======================
+if IS_RENDER:
+    PDF_CACHE_FOLDER = str(RENDER_DISK_PATH / "pdf_cache")
+else:
+    PDF_CACHE_FOLDER = str(BASE_DIR / "instance" / "pdf_cache")
+
+PDF_CACHE_MAX_MB = int(os.environ.get("PDF_CACHE_MAX_MB", "512"))
+
+# =======================
+# Compiled Jinja templates (shared by every worker, survives deploys)
+# =======================
+if IS_RENDER:
+    JINJA_CACHE_FOLDER = str(RENDER_DISK_PATH / "jinja_cache")
+else:
+    JINJA_CACHE_FOLDER = str(BASE_DIR / "instance" / "jinja_cache")
+
+# WeasyPrint worker processes per web process (0 = render inline)
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", "2"))
+PDF_RENDER_TIMEOUT_SECONDS = int(os.environ.get("PDF_RENDER_TIMEOUT_SECONDS", "120"))
+
 # =======================
 # URLs
 # =======================
@@ -48,17 +70,114 @@ CLOUDINARY_CLOUD_NAME = os.environ.get("CLOUDINARY_CLOUD_NAME")
 CLOUDINARY_API_KEY = os.environ.get("CLOUDINARY_API_KEY")
 CLOUDINARY_API_SECRET = os.environ.get("CLOUDINARY_API_SECRET")
 
+# =======================
+# Delivery distance lookups
+# =======================
+# "google" = Distance Matrix with cache + offline fallback
+# "offline" = never call Google (local dev / tests)
+DISTANCE_LOOKUP_MODE = os.environ.get("DISTANCE_LOOKUP_MODE", "google").strip().lower()
+DISTANCE_CACHE_TTL_DAYS = int(os.environ.get("DISTANCE_CACHE_TTL_DAYS", "30"))
+GOOGLE_MAPS_TIMEOUT_SECONDS = float(os.environ.get("GOOGLE_MAPS_TIMEOUT_SECONDS", "5"))
+DISTANCE_BREAKER_THRESHOLD = int(os.environ.get("DISTANCE_BREAKER_THRESHOLD", "3"))
+DISTANCE_BREAKER_COOLDOWN_SECONDS = int(os.environ.get("DISTANCE_BREAKER_COOLDOWN_SECONDS", "120"))
+
+# =======================
+# Request/query instrumentation (see app/utils/query_stats.py)
+# =======================
+def _env_flag(name, default):
+    return os.environ.get(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+PERF_INSTRUMENTATION = _env_flag("PERF_INSTRUMENTATION", "1")
+# Server-Timing on every response (query count / DB time); off by default
+# on Render so anonymous visitors don't see it. Admins always get it.
+PERF_SERVER_TIMING = _env_flag("PERF_SERVER_TIMING", "0" if IS_RENDER else "1")
+PERF_SLOW_REQUEST_MS = int(os.environ.get("PERF_SLOW_REQUEST_MS", "1000"))
+PERF_SLOW_QUERY_COUNT = int(os.environ.get("PERF_SLOW_QUERY_COUNT", "50"))
+# 0 = no global budget; views can still set one with @query_budget(n)
+PERF_QUERY_BUDGET = int(os.environ.get("PERF_QUERY_BUDGET", "0"))
+# raise QueryBudgetExceeded instead of logging (test runs)
+PERF_ENFORCE_QUERY_BUDGET = _env_flag("PERF_ENFORCE_QUERY_BUDGET", "0")
+
+# =======================
+# Scheduled jobs (app/utils/jobs.py, run by the Procfile worker)
+# =======================
+JOBS_TIMEZONE = os.environ.get("JOBS_TIMEZONE", "America/Jamaica")
+JOBS_POLL_SECONDS = int(os.environ.get("JOBS_POLL_SECONDS", "30"))
+JOBS_BATCH_SIZE = int(os.environ.get("JOBS_BATCH_SIZE", "200"))
+# a lease not renewed for this long is considered abandoned
+JOBS_LEASE_SECONDS = int(os.environ.get("JOBS_LEASE_SECONDS", "600"))
+JOBS_MAX_RUN_SECONDS = int(os.environ.get("JOBS_MAX_RUN_SECONDS", "300"))
+JOB_RUNS_KEEP_DAYS = int(os.environ.get("JOB_RUNS_KEEP_DAYS", "30"))
+# nightly pre-alert sweep only re-checks packages created this recently
+PREALERT_SWEEP_LOOKBACK_DAYS = int(os.environ.get("PREALERT_SWEEP_LOOKBACK_DAYS", "30"))
+
+# =======================
+# Rate calculator caching (see app/utils/estimate_cache.py)
+# =======================
+# memoized estimates kept per worker
+PRICING_MEMO_SIZE = int(os.environ.get("PRICING_MEMO_SIZE", "4096"))
+# Settings/rate brackets are re-read at most this often per worker
+# (commits in the same worker invalidate immediately)
+PRICING_SNAPSHOT_TTL_SECONDS = int(os.environ.get("PRICING_SNAPSHOT_TTL_SECONDS", "60"))
+PUBLIC_RATES_MAX_AGE = int(os.environ.get("PUBLIC_RATES_MAX_AGE", "300"))
+# calculator logs are inserted in batches of this size, or this often
+CALCULATOR_LOG_BATCH_SIZE = int(os.environ.get("CALCULATOR_LOG_BATCH_SIZE", "50"))
+CALCULATOR_LOG_FLUSH_SECONDS = int(os.environ.get("CALCULATOR_LOG_FLUSH_SECONDS", "30"))
+
+# =======================
+# Rate limiting (see app/utils/ratelimit_storage.py)
+# =======================
+# db:// = counters in the app database, shared by every gunicorn worker;
+# memory:// = per-worker counters (the old behaviour)
+RATELIMIT_STORAGE_URI = os.environ.get("RATELIMIT_STORAGE_URI", "db://")
+# a storage outage must not lock everyone out of login
+RATELIMIT_SWALLOW_ERRORS = _env_flag("RATELIMIT_SWALLOW_ERRORS", "1")
+RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = _env_flag("RATELIMIT_IN_MEMORY_FALLBACK_ENABLED", "1")
+
+# =======================
+# Finance daily facts (see app/utils/finance_facts.py)
+# =======================
+# the nightly finance_facts_verify job re-checks (and repairs) this many days
+FINANCE_FACTS_VERIFY_DAYS = int(os.environ.get("FINANCE_FACTS_VERIFY_DAYS", "35"))
+
+# =======================
+# Audit log (see app/utils/audit.py)
+# =======================
+# non-financial audit rows are inserted off the request by a buffered writer
+AUDIT_BUFFERED = _env_flag("AUDIT_BUFFERED", "1")
+AUDIT_BATCH_SIZE = int(os.environ.get("AUDIT_BATCH_SIZE", "100"))
+AUDIT_FLUSH_SECONDS = int(os.environ.get("AUDIT_FLUSH_SECONDS", "5"))
+# these modules are still written in the request's own transaction
+AUDIT_DURABLE_MODULES = os.environ.get("AUDIT_DURABLE_MODULES", "Finance,POS,Wallet")
+# Postgres: monthly partitions created this far ahead
+AUDIT_PARTITION_MONTHS_AHEAD = int(os.environ.get("AUDIT_PARTITION_MONTHS_AHEAD", "3"))
+# SQLite: rows older than this move to audit_logs_archive
+AUDIT_ARCHIVE_AFTER_DAYS = int(os.environ.get("AUDIT_ARCHIVE_AFTER_DAYS", "180"))
+
+# =======================
+# Cold storage (see app/utils/cold_storage.py)
+# =======================
+# finished rows (read notifications, scans of archived shipments) older
+# than this move to *_archive tables; packages and messages are not archived
+COLD_STORAGE_AFTER_DAYS = int(os.environ.get("COLD_STORAGE_AFTER_DAYS", "365"))
+# pause between archive batches so the job never saturates the database
+COLD_STORAGE_THROTTLE_SECONDS = float(os.environ.get("COLD_STORAGE_THROTTLE_SECONDS", "0.2"))
+
 # =======================
 # DATABASE CONFIG
 # =======================
-DATABASE_URL = os.environ.get("DATABASE_URL")
+def _database_url(name):
+    url = os.environ.get(name)
+    if url:
+        if url.startswith("postgres://"):
+            url = url.replace("postgres://", "postgresql+psycopg://", 1)
+        if url.startswith("postgresql://") and "+psycopg" not in url:
+            url = url.replace("postgresql://", "postgresql+psycopg://", 1)
+    return url
 
-if DATABASE_URL:
-    if DATABASE_URL.startswith("postgres://"):
-        DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+psycopg://", 1)
-    if DATABASE_URL.startswith("postgresql://") and "+psycopg" not in DATABASE_URL:
-        DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://", 1)
+DATABASE_URL = _database_url("DATABASE_URL")
 
+if DATABASE_URL:
     SQLALCHEMY_DATABASE_URI = DATABASE_URL
 elif IS_RENDER:
     raise RuntimeError("DATABASE_URL is not set on Render.")
@@ -68,6 +187,29 @@ else:
 
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+# =======================
+# Connection pool / timeouts / read replica (see app/utils/db_routing.py)
+# =======================
+# gunicorn workers / threads (gunicorn.conf.py); the pool is sized from them
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "2"))
+GUNICORN_THREADS = int(os.environ.get("GUNICORN_THREADS", "4"))
+# overflow for each worker's background threads (audit writer, calculator log)
+DB_POOL_EXTRA = int(os.environ.get("DB_POOL_EXTRA", "2"))
+# the database plan's connection limit, shared by all processes (0 = no cap)
+DB_MAX_CONNECTIONS = int(os.environ.get("DB_MAX_CONNECTIONS", "0"))
+DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_flag("DB_POOL_PRE_PING", "1")
+# Postgres statement_timeout for web requests (0 = none);
+# @statement_timeout / @report_view override it per route
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", "30000"))
+# ... and for everything outside a request: CLI commands, the jobs worker
+DB_CLI_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_CLI_STATEMENT_TIMEOUT_MS", "0"))
+REPORT_STATEMENT_TIMEOUT_MS = int(os.environ.get("REPORT_STATEMENT_TIMEOUT_MS", "120000"))
+# optional; report views read from here, falling back to the primary
+DATABASE_REPLICA_URL = _database_url("DATABASE_REPLICA_URL")
+REPLICA_RETRY_SECONDS = int(os.environ.get("REPLICA_RETRY_SECONDS", "30"))
+
 # =======================
 # Security
 # =======================
@@ -17,8 +17,9 @@ def get_client_ip():
     )
 
 
+# storage comes from RATELIMIT_STORAGE_URI (db:// by default, shared by
+# all workers - see app/utils/ratelimit_storage.py)
 limiter = Limiter(
     key_func=get_client_ip,
     default_limits=[],
-    storage_uri="memory://",
 )
\ No newline at end of file
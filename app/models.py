@@ -9,6 +9,7 @@ from app.extensions import db
 import re
 from decimal import Decimal
 from sqlalchemy import select
+from sqlalchemy.orm import validates
 
 def normalize_tracking(s: str) -> str:
     """
@@ -24,6 +25,46 @@ def normalize_tracking(s: str) -> str:
     return s.upper()
 
 
+def normalize_merchant_tracking(value) -> str:
+    """
+    Letters and digits only, uppercased, for Shop For Me matching.
+
+    Examples:
+    1Z 123-ABC -> 1Z123ABC
+    1z123abc   -> 1Z123ABC
+    """
+    return "".join(
+        character
+        for character in str(value or "").upper()
+        if character.isalnum()
+    )
+
+
+def normalize_email(value) -> str:
+    """
+    Email as stored in users.email_normalized and compared at login:
+    trimmed and lowercased.
+    """
+    return str(value or "").strip().lower()
+
+
+# Trailing characters indexed for suffix matching of truncated or
+# prefixed carrier numbers (app/utils/unassigned_matching.py).
+TRACKING_SUFFIX_LENGTH = 8
+
+
+def tracking_suffix(value) -> str:
+    """
+    Last TRACKING_SUFFIX_LENGTH characters of
+    normalize_merchant_tracking(value) (the whole key if shorter).
+
+    Examples:
+    420331999400111899223344556677 -> 44556677
+    9400 1118 9922 3344 5566 77    -> 44556677
+    """
+    return normalize_merchant_tracking(value)[-TRACKING_SUFFIX_LENGTH:]
+
+
 # -------------------------------
 # User and Wallet Models
 # -------------------------------
@@ -32,6 +73,10 @@ class User(db.Model, UserMixin):
 
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String, nullable=False, unique=True, index=True)
+    # normalize_email(email), kept in sync below. All email lookups
+    # (login, password reset, imports) go through this unique index.
+    # NULL only for legacy duplicates reported by the migration.
+    email_normalized = db.Column(db.String(255), nullable=True, unique=True, index=True)
     password = db.Column(db.LargeBinary, nullable=False)
 
     role = db.Column(db.String(50), nullable=False, default='customer')
@@ -114,6 +159,19 @@ class User(db.Model, UserMixin):
     def __repr__(self):
         return f"<User {self.email}>"
 
+    @validates("email")
+    def _sync_email_normalized(self, key, value):
+        self.email_normalized = normalize_email(value) or None
+        return value
+
+    @classmethod
+    def find_by_email(cls, email):
+        """The user with this email (any case/whitespace), via the unique index."""
+        email = normalize_email(email)
+        if not email:
+            return None
+        return cls.query.filter(cls.email_normalized == email).first()
+
     @staticmethod
     def generate_referral_code(length: int = 8) -> str:
         """
@@ -169,6 +227,10 @@ class SubscriptionPlan(db.Model):
 
 class Subscription(db.Model):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        # expiry / reminder jobs scan by status + end_date
+        db.Index("ix_subscriptions_status_end_date", "status", "end_date"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -449,8 +511,24 @@ class WalletTransaction(db.Model):
 # -------------------------------
 # Invoice & Package Models
 # -------------------------------
+# statuses that still expect payment; OPEN_INVOICE_WHERE matches the
+# partial index so the receivables refresh can use it
+OPEN_INVOICE_STATUSES = ("pending", "issued", "unpaid", "partial")
+OPEN_INVOICE_WHERE = "lower(status) IN ('pending', 'issued', 'unpaid', 'partial')"
+
+
 class Invoice(db.Model):
     __tablename__ = 'invoices'
+    __table_args__ = (
+        # open invoices only (see app/utils/receivables.py)
+        db.Index(
+            "ix_invoices_open",
+            "user_id",
+            "id",
+            postgresql_where=db.text(OPEN_INVOICE_WHERE),
+            sqlite_where=db.text(OPEN_INVOICE_WHERE),
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
@@ -505,6 +583,11 @@ class Invoice(db.Model):
 
 class Package(db.Model):
     __tablename__ = 'packages'
+    __table_args__ = (
+        # unassigned-package matching (app/utils/unassigned_matching.py)
+        db.Index("ix_packages_user_tracking_suffix", "user_id", "tracking_suffix"),
+        db.Index("ix_packages_user_awb_norm", "user_id", "awb_norm"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -515,6 +598,11 @@ class Package(db.Model):
     tracking_number = db.Column(db.String, index=True)
     shipper = db.Column(db.String(255))
 
+    # tracking_suffix(tracking_number) / normalize_merchant_tracking(house_awb),
+    # kept in sync below
+    tracking_suffix = db.Column(db.String(16), nullable=True)
+    awb_norm = db.Column(db.String(64), nullable=True)
+
     epc = db.Column(db.Integer, default=0, nullable=False)
 
     # Customer/user
@@ -747,6 +835,16 @@ class Package(db.Model):
             kwargs["tracking_number"] = normalize_tracking(tn)
         super().__init__(*args, **kwargs)
 
+    @validates("tracking_number")
+    def _sync_tracking_suffix(self, key, value):
+        self.tracking_suffix = tracking_suffix(value) or None
+        return value
+
+    @validates("house_awb")
+    def _sync_awb_norm(self, key, value):
+        self.awb_norm = normalize_merchant_tracking(value)[:64] or None
+        return value
+
 
 
 class PackageAttachment(db.Model):
@@ -994,8 +1092,32 @@ class ShipmentScanLog(db.Model):
     scanned_by = db.relationship("User")
 
 
+class ShipmentScanLogArchive(db.Model):
+    """
+    Cold copy of shipment_scan_logs rows for long-archived shipments,
+    moved by app/utils/cold_storage.py. No foreign keys: archived rows
+    must never block deleting the shipment, package or user.
+    """
+    __tablename__ = "shipment_scan_logs_archive"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+    shipment_id = db.Column(db.Integer, nullable=False, index=True)
+    package_id = db.Column(db.Integer, nullable=True, index=True)
+
+    scanned_value = db.Column(db.String(255), nullable=False)
+    scan_result = db.Column(db.String(30), nullable=False)
+    scanned_by_id = db.Column(db.Integer, nullable=True)
+    scanned_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    notes = db.Column(db.String(255), nullable=True)
+
+
 class Claim(db.Model):
     __tablename__ = "claims"
+    __table_args__ = (
+        db.Index("ix_claims_tracking_suffix_status", "tracking_suffix", "status"),
+        db.Index("ix_claims_house_awb_norm_status", "house_awb_norm", "status"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     case_id = db.Column(db.String(30), unique=True, index=True)
@@ -1006,7 +1128,11 @@ class Claim(db.Model):
 
     # identifiers (customer enters)
     house_awb = db.Column(db.String(64), nullable=False, index=True)
+    # normalize_merchant_tracking(house_awb), kept in sync below
+    house_awb_norm = db.Column(db.String(64), nullable=True)
     tracking_number = db.Column(db.String(128), nullable=True, index=True)
+    # tracking_suffix(tracking_number), kept in sync below
+    tracking_suffix = db.Column(db.String(16), nullable=True)
 
     # money
     item_value_jmd = db.Column(db.Numeric(12, 2), nullable=False)
@@ -1061,6 +1187,16 @@ class Claim(db.Model):
     reviewed_by = db.relationship("User", foreign_keys=[reviewed_by_admin_id], lazy="joined")
     package = db.relationship("Package", foreign_keys=[package_id], lazy="joined")
 
+    @validates("tracking_number")
+    def _sync_tracking_suffix(self, key, value):
+        self.tracking_suffix = tracking_suffix(value) or None
+        return value
+
+    @validates("house_awb")
+    def _sync_house_awb_norm(self, key, value):
+        self.house_awb_norm = normalize_merchant_tracking(value)[:64] or None
+        return value
+
 
 class ClaimAuditLog(db.Model):
     __tablename__ = "claim_audit_logs"
@@ -1082,6 +1218,9 @@ class ClaimAuditLog(db.Model):
 
 class PackageSearchCase(db.Model):
     __tablename__ = "package_search_cases"
+    __table_args__ = (
+        db.Index("ix_package_search_cases_tracking_suffix_status", "tracking_suffix", "status"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     case_id = db.Column(db.String(30), unique=True, index=True)
@@ -1090,6 +1229,8 @@ class PackageSearchCase(db.Model):
 
     # customer will have this from merchant/seller
     tracking_number = db.Column(db.String(128), nullable=False, index=True)
+    # tracking_suffix(tracking_number), kept in sync below
+    tracking_suffix = db.Column(db.String(16), nullable=True)
 
     # if you require the customer to enter it, keep required
     delivered_date = db.Column(db.Date, nullable=False)
@@ -1118,8 +1259,17 @@ class PackageSearchCase(db.Model):
     user = db.relationship("User", foreign_keys=[user_id], lazy="joined")
     updated_by_admin = db.relationship("User", foreign_keys=[updated_by_admin_id], lazy="joined")
 
+    @validates("tracking_number")
+    def _sync_tracking_suffix(self, key, value):
+        self.tracking_suffix = tracking_suffix(value) or None
+        return value
+
 class Prealert(db.Model):
     __tablename__ = 'prealerts'
+    __table_args__ = (
+        # package <-> prealert reconciliation (app/utils/prealert_reconcile.py)
+        db.Index("ix_prealerts_customer_tracking_norm", "customer_id", "tracking_norm"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
@@ -1127,6 +1277,8 @@ class Prealert(db.Model):
     vendor_name = db.Column(db.String)
     courier_name = db.Column(db.String)
     tracking_number = db.Column(db.String, index=True)
+    # normalize_tracking(tracking_number), kept in sync below
+    tracking_norm = db.Column(db.String(255), nullable=True)
     package_contents = db.Column(db.String)
 
     purchase_date = db.Column(db.Date)  # FIXED from string → date object
@@ -1180,6 +1332,43 @@ class Prealert(db.Model):
             kwargs["tracking_number"] = normalize_tracking(tn)
         super().__init__(*args, **kwargs)
 
+    @validates("tracking_number")
+    def _sync_tracking_norm(self, key, value):
+        self.tracking_norm = normalize_tracking(value) or None
+        return value
+
+
+class PrealertReconciliation(db.Model):
+    """
+    Report of one reconcile_packages() pass: which packages matched a
+    pre-alert, what was applied, and what could not be linked.
+    """
+    __tablename__ = "prealert_reconciliations"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # shipment | upload | package | sweep
+    scope = db.Column(db.String(20), nullable=False, index=True)
+    scope_ref = db.Column(db.String(100), nullable=True)
+    actor_admin_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+
+    packages_seen = db.Column(db.Integer, nullable=False, default=0)
+    matched = db.Column(db.Integer, nullable=False, default=0)
+    linked = db.Column(db.Integer, nullable=False, default=0)
+    values_applied = db.Column(db.Integer, nullable=False, default=0)
+    attachments_created = db.Column(db.Integer, nullable=False, default=0)
+    shop_links = db.Column(db.Integer, nullable=False, default=0)
+    conflicts = db.Column(db.Integer, nullable=False, default=0)
+    unmatched = db.Column(db.Integer, nullable=False, default=0)
+
+    # {"conflicts": [...], "unmatched_package_ids": [...]} (capped)
+    details = db.Column(db.JSON, nullable=True)
+
+    duration_ms = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
+
+    actor_admin = db.relationship("User", foreign_keys=[actor_admin_id])
+
 pickup_packages = db.Table(
     "pickup_packages",
     db.Column(
@@ -1231,6 +1420,15 @@ class PrealertAttachment(db.Model):
 
 class PurchaseRequest(db.Model):
     __tablename__ = "purchase_requests"
+    __table_args__ = (
+        # package linking looks up purchased requests by customer + tracking
+        db.Index(
+            "ix_purchase_requests_user_tracking_norm_status",
+            "user_id",
+            "merchant_tracking_norm",
+            "status",
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -1269,6 +1467,8 @@ class PurchaseRequest(db.Model):
 
     order_number = db.Column(db.String(120))
     merchant_tracking_number = db.Column(db.String(255))
+    # normalize_merchant_tracking(merchant_tracking_number), kept in sync below
+    merchant_tracking_norm = db.Column(db.String(255), nullable=True)
 
     notes = db.Column(db.Text)
 
@@ -1327,6 +1527,11 @@ class PurchaseRequest(db.Model):
         foreign_keys=[purchased_by_admin_id]
     )
 
+    @validates("merchant_tracking_number")
+    def _sync_merchant_tracking_norm(self, key, value):
+        self.merchant_tracking_norm = normalize_merchant_tracking(value) or None
+        return value
+
 class PurchaseRequestItem(db.Model):
     __tablename__ = "purchase_request_items"
 
@@ -1579,6 +1784,51 @@ class ScheduledDelivery(db.Model):
         passive_deletes=True
     )
 
+
+class DistanceCacheEntry(db.Model):
+    """
+    Persisted driving distances keyed by normalized origin/destination.
+
+    Rows past expires_at are refreshed from Google, but are still used
+    as calibration points by the offline distance model.
+    """
+    __tablename__ = "distance_cache"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    origin_norm = db.Column(db.String(255), nullable=False)
+    destination_norm = db.Column(db.String(255), nullable=False)
+
+    # normalized delivery parish the lookup was made for
+    parish = db.Column(db.String(100), nullable=True, index=True)
+
+    distance_km = db.Column(db.Float, nullable=False)
+    duration_text = db.Column(db.String(50), nullable=True)
+
+    # google | offline
+    source = db.Column(db.String(20), nullable=False, default="google", index=True)
+
+    hit_count = db.Column(db.Integer, nullable=False, default=0)
+
+    fetched_at = db.Column(
+        db.DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc)
+    )
+    expires_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            "origin_norm",
+            "destination_norm",
+            name="uq_distance_cache_route"
+        ),
+    )
+
+    def __repr__(self):
+        return f"<DistanceCacheEntry {self.origin_norm} -> {self.destination_norm} {self.distance_km}km>"
+
+
 class AuthorizedPickup(db.Model):
     __tablename__ = 'authorized_pickups'
 
@@ -1597,6 +1847,10 @@ class AuthorizedPickup(db.Model):
 # -------------------------------
 class Notification(db.Model):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # unread counts (migration 9b6e4d1f0a23)
+        db.Index("ix_notifications_user_unread", "user_id", "is_read"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -1629,6 +1883,97 @@ class Notification(db.Model):
 
 
 
+class NotificationArchive(db.Model):
+    """
+    Read personal notifications past COLD_STORAGE_AFTER_DAYS, moved by
+    app/utils/cold_storage.py. notification_feed() reads through to it.
+    """
+    __tablename__ = "notifications_archive"
+    __table_args__ = (
+        db.Index("ix_notifications_archive_user_created", "user_id", "created_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+    user_id = db.Column(db.Integer, nullable=False)
+    subject = db.Column(db.String(120), nullable=False)
+    message = db.Column(db.String(255), nullable=False)
+    is_read = db.Column(db.Boolean, nullable=False, default=True)
+    is_broadcast = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+
+class BroadcastNotification(db.Model):
+    """
+    A notification sent to a whole audience, stored once.
+    Per-user read state: NotificationWatermark + BroadcastReceipt.
+    """
+    __tablename__ = "broadcast_notifications"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    subject = db.Column(db.String(120), nullable=False, default="Notification")
+    message = db.Column(db.String(255), nullable=False)
+
+    # role that sees it (customers only today)
+    audience = db.Column(db.String(50), nullable=False, default="customer", index=True)
+
+    created_by_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    # audience size when it was sent ("Delivered to N customers")
+    recipient_count = db.Column(db.Integer, nullable=False, default=0)
+
+    created_at = db.Column(
+        db.DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        index=True
+    )
+
+    created_by = db.relationship("User", foreign_keys=[created_by_id])
+
+
+class BroadcastReceipt(db.Model):
+    """
+    A user read one broadcast above their watermark.
+    Created lazily; folded into the watermark once contiguous.
+    """
+    __tablename__ = "broadcast_receipts"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    broadcast_id = db.Column(
+        db.Integer,
+        db.ForeignKey("broadcast_notifications.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    read_at = db.Column(
+        db.DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc)
+    )
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "broadcast_id", name="uq_broadcast_receipt_user_broadcast"),
+    )
+
+
+class NotificationWatermark(db.Model):
+    """
+    Per-user high-water mark: every broadcast with id <= last_read_broadcast_id
+    counts as read.
+    """
+    __tablename__ = "notification_watermarks"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    last_read_broadcast_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(
+        db.DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
+    )
+
+
 class Message(db.Model):
     __tablename__ = "messages"
 
@@ -1681,6 +2026,75 @@ class MessageAttachment(db.Model):
         backref=db.backref("attachments", lazy="select", cascade="all, delete-orphan")
     )
 
+class MessageParticipantState(db.Model):
+    """
+    One row per (message, participant): the recipient's "inbox" copy and
+    the sender's "sent" copy, each with its own read/archived/deleted
+    flags. Kept in sync with Message by app/utils/messages.py so mailbox
+    pages and unread counts are index range scans on this table.
+    """
+    __tablename__ = "message_participant_state"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    message_id = db.Column(
+        db.Integer,
+        db.ForeignKey("messages.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    counterparty_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    thread_key = db.Column(db.String(64), nullable=True)
+
+    folder = db.Column(db.String(10), nullable=False)  # inbox | sent
+    is_read = db.Column(db.Boolean, default=False, nullable=False)
+    archived = db.Column(db.Boolean, default=False, nullable=False)
+    deleted = db.Column(db.Boolean, default=False, nullable=False)
+
+    # copy of messages.created_at so listings never touch the messages table
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("message_id", "user_id", "folder", name="uq_message_state_message_user_folder"),
+        db.Index("ix_message_state_user_folder_created", "user_id", "folder", "deleted", "archived", "created_at"),
+        db.Index("ix_message_state_user_created", "user_id", "deleted", "archived", "created_at"),
+        db.Index("ix_message_state_user_unread", "user_id", "folder", "is_read", "deleted"),
+    )
+
+    message = db.relationship(
+        "Message",
+        backref=db.backref("participant_states", lazy="dynamic", passive_deletes=True)
+    )
+    user = db.relationship("User", foreign_keys=[user_id])
+    counterparty = db.relationship("User", foreign_keys=[counterparty_id])
+
+
+class MessageThread(db.Model):
+    """
+    Summary row per conversation (keyed by Message.thread_key).
+    """
+    __tablename__ = "message_threads"
+
+    id = db.Column(db.Integer, primary_key=True)
+    thread_key = db.Column(db.String(64), nullable=False, unique=True)
+
+    user_low_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True, index=True)
+    user_high_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True, index=True)
+
+    subject = db.Column(db.String(255), nullable=True)
+    last_message_id = db.Column(
+        db.Integer,
+        db.ForeignKey("messages.id", ondelete="SET NULL"),
+        nullable=True
+    )
+    last_sender_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    last_message_at = db.Column(db.DateTime(timezone=True), nullable=True, index=True)
+    message_count = db.Column(db.Integer, default=0, nullable=False)
+
+    last_message = db.relationship("Message", foreign_keys=[last_message_id])
+
+
 class Discount(db.Model):
     __tablename__ = "discounts"
     id = db.Column(db.Integer, primary_key=True)
@@ -1876,6 +2290,36 @@ class POSCloseout(db.Model):
     closed_by = db.relationship("User", foreign_keys=[closed_by_admin_id], lazy="joined")
 
 
+class POSShiftLedger(db.Model):
+    """
+    Running POS totals for one Jamaica business date, appended to by
+    every completed POS payment (see app/utils/pos_ledger.py).
+
+    revision goes up on every append so a closeout can tell whether
+    the totals changed since the cashier loaded the page.
+    """
+    __tablename__ = "pos_shift_ledgers"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    business_date = db.Column(db.Date, nullable=False, unique=True, index=True)
+
+    cash = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    card = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    transfer = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    wallet = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    other = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+    gross_total = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    discount = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    total = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+    payment_count = db.Column(db.Integer, nullable=False, default=0)
+    revision = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+
 class CalculatorLog(db.Model):
     __tablename__ = 'calculator_logs'
 
@@ -2277,8 +2721,170 @@ class PayrollItem(db.Model):
     other_deductions = db.Column(db.Numeric(12, 2), default=0)
     pay_advance = db.Column(db.Numeric(12, 2), default=0)
 
+
+class FinanceDailyFact(db.Model):
+    """
+    Pre-aggregated finance totals per Jamaica business day
+    (see app/utils/finance_facts.py).
+
+    metric: income | package_refund | delivery_refund | expense |
+            payroll | invoiced | discount
+    method: payment tender for income/refunds, category for expenses,
+            pay frequency for payroll, "" otherwise
+    """
+    __tablename__ = "finance_daily_facts"
+    __table_args__ = (
+        db.UniqueConstraint("business_date", "metric", "method", name="uq_finance_daily_facts_key"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    business_date = db.Column(db.Date, nullable=False, index=True)
+    metric = db.Column(db.String(30), nullable=False)
+    method = db.Column(db.String(120), nullable=False, default="")
+
+    amount = db.Column(db.Float, nullable=False, default=0.0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ReceivableSnapshot(db.Model):
+    """
+    One row per open invoice with something still owed, rebuilt from
+    invoices + completed payments (see app/utils/receivables.py).
+
+    amount_due   the invoice's open balance column (amount_due, else
+                 grand_total, else amount)
+    balance_due  billed total minus completed payments, never below 0
+    """
+    __tablename__ = "receivables_snapshot"
+
+    invoice_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+
+    status = db.Column(db.String(20), nullable=False)
+    issued_at = db.Column(db.DateTime, nullable=True)
+    issued_on = db.Column(db.Date, nullable=True, index=True)
+
+    billed = db.Column(db.Float, nullable=False, default=0.0)
+    paid = db.Column(db.Float, nullable=False, default=0.0)
+    amount_due = db.Column(db.Float, nullable=False, default=0.0)
+    balance_due = db.Column(db.Float, nullable=False, default=0.0)
+
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class PayslipDelivery(db.Model):
+    """
+    One row per payroll item in a batch payslip run.
+
+    status: pending -> rendered -> sent
+            (failed / skipped are terminal until the run is resumed;
+             sent rows are never re-sent)
+    """
+    __tablename__ = "payslip_deliveries"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    payroll_run_id = db.Column(db.Integer, db.ForeignKey("payroll_runs.id"), nullable=False, index=True)
+    payroll_item_id = db.Column(db.Integer, db.ForeignKey("payroll_items.id"), nullable=False, unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+
+    email = db.Column(db.String(255), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="pending", index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+
+    pdf_path = db.Column(db.String(500), nullable=True)
+    rendered_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    sent_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(
+        db.DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
+    )
+
+    payroll_run = db.relationship("PayrollRun", backref=db.backref("payslip_deliveries", lazy="dynamic"))
+    payroll_item = db.relationship("PayrollItem")
+    user = db.relationship("User")
+
+
+class JobLease(db.Model):
+    """
+    One row per scheduled job (see app/utils/jobs.py).
+
+    A runner owns the job while locked_until is in the future; the row
+    is claimed with a conditional UPDATE so only one process across all
+    workers/dynos runs a job at a time.
+    """
+    __tablename__ = "job_leases"
+
+    name = db.Column(db.String(100), primary_key=True)
+
+    owner = db.Column(db.String(120), nullable=True)
+    locked_until = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    next_run_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    last_started_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    last_finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    last_status = db.Column(db.String(20), nullable=True)
+
+
+class JobRun(db.Model):
+    """
+    History of scheduled job executions.
+
+    status: running -> ok | failed
+    """
+    __tablename__ = "job_runs"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    job_name = db.Column(db.String(100), nullable=False, index=True)
+    owner = db.Column(db.String(120), nullable=True)
+
+    status = db.Column(db.String(20), nullable=False, default="running", index=True)
+    rows_affected = db.Column(db.Integer, nullable=False, default=0)
+    batches = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+
+    started_at = db.Column(db.DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    duration_ms = db.Column(db.Integer, nullable=True)
+
+
+class RateLimitCounter(db.Model):
+    """
+    Fixed-window Flask-Limiter counters shared by every worker
+    (see app/utils/ratelimit_storage.py).
+
+    expires_at is epoch seconds, which is what the limiter works in.
+    """
+    __tablename__ = "rate_limit_counters"
+
+    key = db.Column(db.String(255), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    expires_at = db.Column(db.Float, nullable=False, index=True)
+
+
 class AuditLog(db.Model):
+    """
+    Admin/system audit trail. Rows for non-financial modules are written
+    by the buffered writer in app/utils/audit.py, not the request's
+    transaction.
+
+    On Postgres the table is range-partitioned by month on created_at
+    (primary key (id, created_at)); on SQLite old rows move to
+    audit_logs_archive instead.
+    """
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # keyset pages (id DESC) per module / entity / admin
+        db.Index("ix_audit_logs_module_id", "module", "id"),
+        db.Index("ix_audit_logs_entity", "entity_type", "entity_id", "id"),
+        db.Index("ix_audit_logs_admin_id_id", "admin_id", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -2325,4 +2931,56 @@ class AuditLog(db.Model):
     )
 
     def __repr__(self):
-        return f"<AuditLog {self.module}:{self.action}>"
\ No newline at end of file
+        return f"<AuditLog {self.module}:{self.action}>"
+
+
+class AuditLogArchive(db.Model):
+    """
+    Audit rows moved out of audit_logs by the audit_maintenance job
+    (SQLite; Postgres keeps them in monthly partitions). Same columns and
+    ids; readers in app/utils/audit.py fall through to it.
+    """
+    __tablename__ = "audit_logs_archive"
+    __table_args__ = (
+        db.Index("ix_audit_logs_archive_module_id", "module", "id"),
+        db.Index("ix_audit_logs_archive_entity", "entity_type", "entity_id", "id"),
+        db.Index("ix_audit_logs_archive_admin_id_id", "admin_id", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+    module = db.Column(db.String(50), nullable=False)
+    action = db.Column(db.String(100), nullable=False)
+    reason = db.Column(db.String(100), nullable=True)
+    entity_type = db.Column(db.String(50), nullable=True)
+    entity_id = db.Column(db.Integer, nullable=True)
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True, index=True)
+    admin_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+
+    description = db.Column(db.Text, nullable=True)
+
+    old_value = db.Column(db.Text, nullable=True)
+    new_value = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    user = db.relationship("User", foreign_keys=[user_id])
+    admin = db.relationship("User", foreign_keys=[admin_id])
+
+    def __repr__(self):
+        return f"<AuditLogArchive {self.module}:{self.action}>"
+
+
+class ArchiveCheckpoint(db.Model):
+    """
+    Progress of one cold-storage policy (app/utils/cold_storage.py):
+    the last live id it looked at, so an interrupted run resumes there.
+    """
+    __tablename__ = "archive_checkpoints"
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    moved_total = db.Column(db.BigInteger, nullable=False, default=0)
+    passes = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=True)
\ No newline at end of file
@@ -7,32 +7,27 @@ from flask import (
 import os
 import uuid
 import json
-import pandas as pd
 from datetime import datetime, timedelta, timezone, date
 import bcrypt
 import re
 import io
 import csv
-import xlsxwriter
 import math
 
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
 from werkzeug.utils import secure_filename
 from sqlalchemy import func, or_, and_, select, case
 from sqlalchemy.exc import IntegrityError
 from urllib.parse import urlparse, urljoin
-from weasyprint import HTML
 from flask_login import current_user, login_required
 
 from app.forms import UploadUsersForm, ConfirmUploadForm
 from app.extensions import db
 from app.routes.admin_auth_routes import admin_required
 from app.calculator_data import CATEGORIES
+from app.utils.db_routing import report_view
+from app.utils.audit import audit_page
 from app.utils.time import to_jamaica
-from app.utils.messages import make_thread_key
+from app.utils.messages import delete_mailbox_rows_for_user, make_thread_key
 from app.utils.subscription_utils import (
     get_subscription_summary,
     release_subscription_usage,
@@ -50,8 +45,8 @@ from app.utils.email_utils import (
 )
 from app.utils.sorting_codes import (
     SORT_CODE_LABELS,
+    bulk_apply_customer_default_sort_codes,
     normalize_sort_code,
-    set_package_sort_code,
 )
 from app.utils.customer_balances import (
     calculate_customer_balance_summary,
@@ -62,9 +57,9 @@ from app.models import (
     User, Wallet, Invoice, Payment, Package, Prealert, AuthorizedPickup, 
     Message as DBMessage,  # ✅ alias it like customer_routes.py
     Settings, PackageAttachment, ScheduledDelivery, 
-    Claim, ClaimAuditLog, WalletTransaction, AuditLog
+    Claim, ClaimAuditLog, WalletTransaction, AuditLog, NotificationArchive
 )
-from app.models import generate_claim_case_id
+from app.models import generate_claim_case_id, normalize_email
 from app.models import SubscriptionPlan, Subscription, SubscriptionUsage, SubscriptionMember
 
 accounts_bp = Blueprint('accounts_profiles', __name__)
@@ -501,7 +496,7 @@ def add_user():
         flash("All fields are required.", "danger")
         return redirect(url_for('accounts_profiles.manage_users'))
 
-    exists = User.query.filter(or_(User.email == email, User.trn == trn)).first()
+    exists = User.query.filter(or_(User.email_normalized == normalize_email(email), User.trn == trn)).first()
     if exists:
         flash("Email or TRN already exists.", "danger")
         return redirect(url_for('accounts_profiles.manage_users'))
@@ -541,6 +536,8 @@ def add_user():
 @accounts_bp.route('/upload-users', methods=['POST'])
 @admin_required
 def upload_users():
+    import pandas as pd
+
     form = UploadUsersForm()
     if not form.validate_on_submit():
         flash("Please upload a valid Excel (.xlsx) file.", "danger")
@@ -608,7 +605,7 @@ def upload_users():
         if not any([full_name, email, trn, mobile, password, iso_date]):
             continue
 
-        exist = User.query.filter(or_(User.email == email, User.trn == trn)).first()
+        exist = User.query.filter(or_(User.email_normalized == normalize_email(email), User.trn == trn)).first()
         if exist:
             assigned_reg = exist.registration_number or "(keep)"
             will_update = True
@@ -690,7 +687,7 @@ def confirm_upload_users():
         hashed_pw = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())  # bytes
 
         try:
-            existing = User.query.filter(or_(User.email == email, User.trn == trn)).first()
+            existing = User.query.filter(or_(User.email_normalized == normalize_email(email), User.trn == trn)).first()
             if will_update and existing:
                 existing.full_name = full_name
                 existing.trn = trn
@@ -761,6 +758,7 @@ def confirm_upload_users():
 # -------------------------
 @accounts_bp.route('/export-users')
 @admin_required
+@report_view
 def export_users():
     export_format = request.args.get('format', 'csv')
     search = request.args.get('search', '').strip()
@@ -809,6 +807,11 @@ def export_users():
 
     # PDF
     elif export_format == 'pdf':
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
+
         output = io.BytesIO()
         doc = SimpleDocTemplate(output, pagesize=letter)
         elements = [Paragraph("Registered Users", getSampleStyleSheet()['Heading1'])]
@@ -836,6 +839,8 @@ def export_users():
 
     # Excel
     elif export_format == 'excel':
+        import xlsxwriter
+
         output = io.BytesIO()
         workbook = xlsxwriter.Workbook(output, {'in_memory': True})
         worksheet = workbook.add_worksheet('Users')
@@ -2036,6 +2041,11 @@ def delete_account(id: int):
                 new_value="Account deleted",
             ))
 
+            delete_mailbox_rows_for_user(user.id)
+            NotificationArchive.query.filter_by(
+                user_id=user.id
+            ).delete(synchronize_session=False)
+
             DBMessage.query.filter(
                 (DBMessage.recipient_id == user.id) |
                 (DBMessage.sender_id == user.id)
@@ -2487,7 +2497,7 @@ def manage_account(id: int):
     if email != current_email:
         existing = db.session.execute(
             select(User.id).where(
-                User.email == email,
+                User.email_normalized == normalize_email(email),
                 User.id != user.id,
             )
         ).scalar_one_or_none()
@@ -2589,51 +2599,20 @@ def manage_account(id: int):
             f"{user.default_sort_code}"
         )
 
-        eligible_packages = (
-            Package.query
-            .filter(
-                Package.user_id == user.id,
-                Package.sort_code_locked.is_(False),
-                or_(
-                    Package.sort_code_source.in_(
-                        [
-                            "system",
-                            "customer_default",
-                        ]
-                    ),
-                    Package.sort_code.is_(None),
-                    Package.sort_code == "",
-                    Package.sort_code == "UNASSIGNED",
-                ),
-                func.lower(
-                    func.trim(
-                        func.coalesce(
-                            Package.status,
-                            "",
-                        )
-                    )
-                ).notin_(
-                    [
-                        "delivered",
-                        "cancelled",
-                        "collected",
-                    ]
-                ),
-            )
-            .all()
-        )
+        # the UPDATE below reads the new default from users
+        db.session.flush()
 
-        for package in eligible_packages:
-            set_package_sort_code(
-                package,
-                user.default_sort_code,
-                source="customer_default",
-                admin_id=current_user.id,
-                lock=False,
-                force=True,
-            )
+        result = bulk_apply_customer_default_sort_codes(
+            user_id=user.id,
+            admin_id=current_user.id,
+            sources=[
+                "system",
+                "customer_default",
+            ],
+            reason="Customer default changed",
+        )
 
-            updated_package_count += 1
+        updated_package_count = result["updated"]
 
         changes.append(
             f"{updated_package_count} active package(s) synchronized"
@@ -3032,42 +3011,11 @@ def manual_add_subscription(id):
         )
     )
 
-def sync_expired_subscriptions():
-    """
-    Subscription date columns store timezone-naive UTC values.
-    """
-    now = datetime.utcnow()
-
-    expired_subscriptions = (
-        Subscription.query
-        .filter(
-            Subscription.status.in_(
-                ["active", "exhausted"]
-            ),
-            Subscription.end_date.isnot(None),
-            Subscription.end_date < now,
-        )
-        .all()
-    )
-
-    for subscription in expired_subscriptions:
-        subscription.status = "expired"
-        _deactivate_subscription_members(
-            subscription
-        )
-
-    if expired_subscriptions:
-        db.session.commit()
-
-    return len(expired_subscriptions)
-
 @accounts_bp.route("/subscriptions")
 @admin_required
 def admin_subscriptions():
     from zoneinfo import ZoneInfo
 
-    sync_expired_subscriptions()
-
     status_filter = (
         request.args.get("status") or ""
     ).strip().lower()
@@ -4975,315 +4923,19 @@ def bulk_upgrade_subscriptions():
 @login_required
 @admin_required
 def process_subscription_reminders():
-    from app.utils.email_utils import send_email
-
-    now = datetime.now(timezone.utc)
-
-    subscriptions = (
-        Subscription.query
-        .filter(
-            Subscription.status.in_(
-                [
-                    "active",
-                    "exhausted",
-                ]
-            )
-        )
-        .all()
-    )
-
-    sent_count = 0
-    expired_count = 0
-    failed_count = 0
-
-    def send_subscription_email(
-        *,
-        subscription,
-        user,
-        subject,
-        plain_body,
-        html_body,
-    ):
-        try:
-            result = send_email(
-                to_email=user.email,
-                subject=subject,
-                plain_body=plain_body,
-                html_body=html_body,
-                recipient_user_id=user.id,
-            )
-
-            return result is not False
-
-        except Exception:
-            current_app.logger.exception(
-                "Subscription reminder email failed "
-                "for subscription %s and user %s",
-                subscription.id,
-                user.id,
-            )
-            return False
-
-    for subscription in subscriptions:
-        if not subscription.end_date:
-            continue
-
-        end_date = subscription.end_date
-
-        # Subscription dates are stored as timezone-naive UTC.
-        if end_date.tzinfo is None:
-            end_date = end_date.replace(
-                tzinfo=timezone.utc
-            )
-
-        seconds_remaining = (
-            end_date - now
-        ).total_seconds()
-
-        days_remaining = max(
-            math.ceil(
-                seconds_remaining / 86400
-            ),
-            0,
-        )
-
-        user = subscription.user
-
-        # -------------------------------------------------
-        # Expired subscription
-        # -------------------------------------------------
-        if seconds_remaining <= 0:
-            subscription.status = "expired"
-            subscription.renewal_reminder_5d_sent = True
-            subscription.renewal_reminder_2d_sent = True
-
-            _deactivate_subscription_members(
-                subscription
-            )
-
-            expired_count += 1
-
-            if (
-                user
-                and user.email
-                and not subscription.expiry_notice_sent
-            ):
-                customer_name = (
-                    user.full_name
-                    or "Customer"
-                )
-
-                email_sent = send_subscription_email(
-                    subscription=subscription,
-                    user=user,
-                    subject=(
-                        "Your FAFL Subscription "
-                        "Has Expired"
-                    ),
-                    plain_body=(
-                        f"Hi {customer_name},\n\n"
-                        "Your Foreign A Foot Logistics "
-                        "subscription has expired.\n\n"
-                        "Normal package pricing now applies. "
-                        "You may renew anytime from your "
-                        "dashboard.\n\n"
-                        "Login here:\n"
-                        "https://app.faflcourier.com/"
-                        "customer/subscriptions\n\n"
-                        "— Foreign A Foot Logistics Limited"
-                    ),
-                    html_body=(
-                        '<div style="font-family:Arial,'
-                        'sans-serif;line-height:1.6;">'
-                        f"<p>Hi {customer_name},</p>"
-                        "<p>Your <strong>Foreign A Foot "
-                        "Logistics</strong> subscription "
-                        "has expired.</p>"
-                        "<p>Normal package pricing now "
-                        "applies. You may renew anytime "
-                        "from your dashboard.</p>"
-                        '<p><a href="https://app.'
-                        'faflcourier.com/customer/'
-                        'subscriptions" '
-                        'style="background:#4A148C;'
-                        'color:#fff;padding:12px 18px;'
-                        'text-decoration:none;'
-                        'border-radius:6px;'
-                        'font-weight:600;">'
-                        "Renew Subscription"
-                        "</a></p>"
-                        "</div>"
-                    ),
-                )
-
-                if email_sent:
-                    subscription.expiry_notice_sent = True
-                    sent_count += 1
-                else:
-                    failed_count += 1
-
-            continue
-
-        # The subscription must still expire even if the
-        # customer does not have an email address.
-        if not user or not user.email:
-            continue
-
-        customer_name = (
-            user.full_name
-            or "Customer"
-        )
-
-        # -------------------------------------------------
-        # Five-day reminder
-        # Sends once when 3–5 days remain.
-        # -------------------------------------------------
-        if (
-            3 <= days_remaining <= 5
-            and not subscription.renewal_reminder_5d_sent
-        ):
-            email_sent = send_subscription_email(
-                subscription=subscription,
-                user=user,
-                subject=(
-                    "Your FAFL Subscription "
-                    "Expires Soon"
-                ),
-                plain_body=(
-                    f"Hi {customer_name},\n\n"
-                    "Your Foreign A Foot Logistics "
-                    f"subscription expires in "
-                    f"{days_remaining} day(s).\n\n"
-                    "Please renew soon to continue "
-                    "enjoying your subscription "
-                    "benefits.\n\n"
-                    "Login here:\n"
-                    "https://app.faflcourier.com/"
-                    "customer/subscriptions\n\n"
-                    "— Foreign A Foot Logistics Limited"
-                ),
-                html_body=(
-                    '<div style="font-family:Arial,'
-                    'sans-serif;line-height:1.6;">'
-                    f"<p>Hi {customer_name},</p>"
-                    "<p>Your <strong>Foreign A Foot "
-                    "Logistics</strong> subscription "
-                    f"expires in <strong>{days_remaining} "
-                    "day(s)</strong>.</p>"
-                    "<p>Please renew soon to continue "
-                    "enjoying your subscription "
-                    "benefits.</p>"
-                    '<p><a href="https://app.'
-                    'faflcourier.com/customer/'
-                    'subscriptions" '
-                    'style="background:#4A148C;'
-                    'color:#fff;padding:12px 18px;'
-                    'text-decoration:none;'
-                    'border-radius:6px;'
-                    'font-weight:600;">'
-                    "Renew Subscription"
-                    "</a></p>"
-                    "</div>"
-                ),
-            )
-
-            if email_sent:
-                subscription.renewal_reminder_5d_sent = True
-                sent_count += 1
-            else:
-                failed_count += 1
-
-        # -------------------------------------------------
-        # Two-day/final reminder
-        # Sends once when 0–2 days remain.
-        # -------------------------------------------------
-        elif (
-            0 <= days_remaining <= 2
-            and not subscription.renewal_reminder_2d_sent
-        ):
-            email_sent = send_subscription_email(
-                subscription=subscription,
-                user=user,
-                subject=(
-                    "Final Reminder: Your FAFL "
-                    "Subscription Is Expiring"
-                ),
-                plain_body=(
-                    f"Hi {customer_name},\n\n"
-                    "Your Foreign A Foot Logistics "
-                    f"subscription expires in "
-                    f"{days_remaining} day(s).\n\n"
-                    "Please renew to avoid interruption "
-                    "to your subscription benefits.\n\n"
-                    "Login here:\n"
-                    "https://app.faflcourier.com/"
-                    "customer/subscriptions\n\n"
-                    "— Foreign A Foot Logistics Limited"
-                ),
-                html_body=(
-                    '<div style="font-family:Arial,'
-                    'sans-serif;line-height:1.6;">'
-                    f"<p>Hi {customer_name},</p>"
-                    "<p>Your <strong>Foreign A Foot "
-                    "Logistics</strong> subscription "
-                    f"expires in <strong>{days_remaining} "
-                    "day(s)</strong>.</p>"
-                    "<p>Please renew to avoid interruption "
-                    "to your subscription benefits.</p>"
-                    '<p><a href="https://app.'
-                    'faflcourier.com/customer/'
-                    'subscriptions" '
-                    'style="background:#4A148C;'
-                    'color:#fff;padding:12px 18px;'
-                    'text-decoration:none;'
-                    'border-radius:6px;'
-                    'font-weight:600;">'
-                    "Renew Subscription"
-                    "</a></p>"
-                    "</div>"
-                ),
-            )
-
-            if email_sent:
-                subscription.renewal_reminder_2d_sent = True
-                sent_count += 1
-            else:
-                failed_count += 1
-
-    try:
-        db.session.commit()
-
-    except Exception as error:
-        db.session.rollback()
-
-        current_app.logger.exception(
-            "Saving subscription reminder results failed"
-        )
-
-        flash(
-            f"Subscription reminders could not be saved: "
-            f"{error}",
-            "danger",
-        )
+    """
+    Reminders are sent by the "subscription_reminders" job; this only
+    makes it due now so the jobs worker picks it up on its next poll.
+    """
+    from app.utils.jobs import request_job_run
 
-        return redirect(
-            url_for(
-                "accounts_profiles.admin_subscriptions"
-            )
-        )
+    request_job_run("subscription_reminders")
+    request_job_run("subscription_expiry")
 
     flash(
-        (
-            "Subscription reminders processed. "
-            f"Emails sent: {sent_count}. "
-            f"Expired: {expired_count}. "
-            f"Email failures: {failed_count}."
-        ),
-        (
-            "success"
-            if failed_count == 0
-            else "warning"
-        ),
+        "Subscription reminders queued. "
+        "They will be sent by the background jobs worker within a minute.",
+        "success",
     )
 
     return redirect(
@@ -5296,7 +4948,8 @@ def process_subscription_reminders():
 @accounts_bp.route("/audit-logs")
 @admin_required
 def audit_logs():
-    page = request.args.get("page", 1, type=int)
+    # keyset pagination: ?before=<id of the last row on the previous page>
+    before = request.args.get("before", type=int)
     per_page = request.args.get("per_page", 25, type=int)
 
     if per_page not in [10, 25, 50, 100]:
@@ -5305,31 +4958,18 @@ def audit_logs():
     module = (request.args.get("module") or "").strip()
     search = (request.args.get("search") or "").strip()
 
-    q = AuditLog.query
-
-    if module:
-        q = q.filter(AuditLog.module == module)
-
-    if search:
-        like = f"%{search}%"
-        q = q.outerjoin(User, AuditLog.user_id == User.id).filter(or_(
-            AuditLog.action.ilike(like),
-            AuditLog.description.ilike(like),
-            AuditLog.entity_type.ilike(like),
-            User.full_name.ilike(like),
-            User.email.ilike(like),
-            User.registration_number.ilike(like),
-        ))
-
-    q = q.order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
-
-    pagination = q.paginate(page=page, per_page=per_page, error_out=False)
+    logs, next_before = audit_page(
+        limit=per_page,
+        before_id=before,
+        module=module or None,
+        search=search or None,
+    )
 
     return render_template(
         "admin/audit_logs/index.html",
-        logs=pagination.items,
-        pagination=pagination,
-        page=page,
+        logs=logs,
+        before=before,
+        next_before=next_before,
         per_page=per_page,
         module=module,
         search=search,
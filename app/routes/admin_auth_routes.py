@@ -6,7 +6,7 @@ from datetime import datetime
 from app.utils.time import to_jamaica
 
 from sqlalchemy.orm import load_only
-from app.models import User
+from app.models import User, normalize_email
 from app.forms import AdminLoginForm
 from functools import wraps
 import bcrypt
@@ -171,7 +171,7 @@ def admin_login():
                         User.is_superadmin,
                     )
                 )
-                .filter(User.email == email, User.is_admin == True)
+                .filter(User.email_normalized == normalize_email(email), User.is_admin == True)
                 .first()
             )
 
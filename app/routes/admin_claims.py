@@ -11,11 +11,14 @@ from app.forms import AdminClaimDecisionForm
 from app.routes.admin_auth_routes import admin_required
 from app.utils.email_utils import send_claim_status_update_email
 from app.utils.time import to_jamaica
+from app.utils.unassigned_matching import candidates_for_claims
 
 from zoneinfo import ZoneInfo
 
 from app.utils.claims import (
+    claim_status_counts,
     get_eligible_claim_packages,
+    search_claim_customers,
 )
 
 # Optional in-app messaging
@@ -240,64 +243,15 @@ def queue():
 
     claims = pagination.items
 
-    counts = {
-        "all": Claim.query.count(),
+    counts = claim_status_counts()
 
-        "submitted": (
-            Claim.query
-            .filter_by(status="submitted")
-            .count()
-        ),
-
-        "under_review": (
-            Claim.query
-            .filter_by(status="under_review")
-            .count()
-        ),
-
-        "need_more_info": (
-            Claim.query
-            .filter_by(
-                status="need_more_info"
-            )
-            .count()
-        ),
-
-        "approved": (
-            Claim.query
-            .filter_by(status="approved")
-            .count()
-        ),
-
-        "rejected": (
-            Claim.query
-            .filter_by(status="rejected")
-            .count()
-        ),
-
-        "paid": (
-            Claim.query
-            .filter_by(status="paid")
-            .count()
-        ),
-    }
-
-    claim_customers = (
-        User.query
-        .filter(
-            User.is_admin.isnot(True),
-            User.is_enabled.is_(True),
-        )
-        .order_by(
-            User.full_name.asc(),
-            User.email.asc(),
-        )
-        .all()
-    )
+    # unassigned packages that look like each open claim, one query
+    candidates = candidates_for_claims(claims)
 
     return render_template(
         "admin/claims/queue.html",
         claims=claims,
+        candidates=candidates,
         status=status,
         counts=counts,
         search=search,
@@ -318,9 +272,37 @@ def queue():
             page * per_page,
             pagination.total,
         ),
-        claim_customers=claim_customers,
     )
 
+@admin_claims_bp.route(
+    "/customers/search",
+    methods=["GET"],
+)
+@admin_required
+def customer_search():
+    customers = search_claim_customers(
+        request.args.get("q"),
+        limit=request.args.get(
+            "limit",
+            20,
+            type=int,
+        ),
+    )
+
+    return jsonify({
+        "success": True,
+        "customers": [
+            {
+                "id": u.id,
+                "name": u.full_name or u.email or f"Customer #{u.id}",
+                "email": u.email or "",
+                "registration_number": u.registration_number or "",
+            }
+            for u in customers
+        ],
+    })
+
+
 @admin_claims_bp.route(
     "/customers/<int:user_id>/eligible-packages",
     methods=["GET"],
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request
 from app.routes.admin_auth_routes import admin_required
 from app.models import PackageSearchCase
 from app.extensions import db
+from app.utils.unassigned_matching import candidates_for_cases
 
 admin_search_bp = Blueprint("admin_search", __name__, url_prefix="/admin/search")
 
@@ -21,9 +22,13 @@ def queue():
 
     cases = q.order_by(PackageSearchCase.created_at.desc()).all()
 
+    # unassigned packages that look like each open case, one query
+    candidates = candidates_for_cases(cases)
+
     return render_template(
         "admin/package_search/queue.html",
         cases=cases,
+        candidates=candidates,
         unread_search_count=unread_search_count,
         status=request.args.get("status", "submitted"),
     )
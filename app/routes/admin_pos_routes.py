@@ -1,5 +1,5 @@
 import re
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 from app.utils.time import to_jamaica
 from decimal import Decimal
@@ -9,10 +9,23 @@ from sqlalchemy import or_, func
 
 from app.extensions import db
 from flask_login import current_user
-from app.models import User, Package, Invoice, Payment, POSCloseout, AuditLog, ScheduledPickup
+from app.models import User, Package, Invoice, Payment, POSCloseout, POSShiftLedger, AuditLog, ScheduledPickup
 from app.routes.admin_auth_routes import admin_required
 from app.utils.invoice_totals import fetch_invoice_totals_pg
 from app.utils.wallet import debit_wallet_for_payment
+from app.utils.pickup_cart import (
+    completed_payments_by_invoice,
+    invoice_balances,
+    package_charge_amount,
+    pickup_cart,
+    preload_invoices,
+)
+from app.utils.pos_ledger import (
+    ensure_pos_ledger,
+    ledger_summary,
+    pos_day_summary,
+    pos_payment_rows,
+)
 from app.utils.scheduled_pickups import (
     sync_scheduled_pickups_for_delivered_package,
 )
@@ -26,15 +39,6 @@ admin_pos_bp = Blueprint("admin_pos", __name__, url_prefix="/admin/pos")
 
 JAMAICA_TZ = ZoneInfo("America/Jamaica")
 
-def _to_decimal(value, default="0.00"):
-    try:
-        if value is None or value == "":
-            return Decimal(default)
-        return Decimal(str(value))
-    except Exception:
-        return Decimal(default)
-
-
 def _create_or_update_pending_pos_payment(
     *,
     invoice,
@@ -110,15 +114,6 @@ def _create_or_update_pending_pos_payment(
     return pending_payment
 
 
-def _package_charge_amount(pkg):
-    total = getattr(pkg, "grand_total", None)
-    if total not in (None, "", 0, "0"):
-        return _to_decimal(total)
-
-    amount_due = getattr(pkg, "amount_due", None)
-    return _to_decimal(amount_due)
-
-
 def _normalize_scan_value(value):
     return re.sub(r"\s+", "", str(value or "").strip()).upper()
 
@@ -237,94 +232,9 @@ def search_customers():
 def customer_packages(user_id):
     user = User.query.get_or_404(user_id)
 
-    packages = (
-        Package.query
-        .filter(
-            Package.user_id == user.id,
-            Package.status == "Ready for Pick Up",
-            Package.is_locked.is_(False),
-        )
-        .order_by(Package.created_at.asc())
-        .all()
-    )
+    packages, package_balances, total = pickup_cart(user.id)
 
     rows = []
-    total = Decimal("0.00")
-
-    # Group visible packages by invoice.
-    invoice_groups = {}
-    uninvoiced_packages = []
-
-    for package in packages:
-        if package.invoice_id:
-            invoice_groups.setdefault(
-                package.invoice_id,
-                []
-            ).append(package)
-        else:
-            uninvoiced_packages.append(package)
-
-    package_balances = {}
-
-    # Calculate and allocate each invoice's live outstanding balance.
-    for invoice_id, invoice_packages in invoice_groups.items():
-        invoice = Invoice.query.get(invoice_id)
-
-        if not invoice:
-            for package in invoice_packages:
-                package_balances[package.id] = Decimal("0.00")
-            continue
-
-        subtotal, discount_total, payments_total, total_due = (
-            fetch_invoice_totals_pg(invoice.id)
-        )
-
-        invoice_balance = Decimal(
-            str(max(float(total_due or 0), 0.0))
-        ).quantize(Decimal("0.01"))
-
-        package_charges = {
-            package.id: _package_charge_amount(package).quantize(
-                Decimal("0.01")
-            )
-            for package in invoice_packages
-        }
-
-        group_charge_total = sum(
-            package_charges.values(),
-            Decimal("0.00"),
-        )
-
-        allocated = Decimal("0.00")
-
-        for index, package in enumerate(invoice_packages):
-            is_last = index == len(invoice_packages) - 1
-
-            if is_last:
-                package_balance = invoice_balance - allocated
-
-            elif group_charge_total > Decimal("0.00"):
-                package_balance = (
-                    invoice_balance
-                    * package_charges[package.id]
-                    / group_charge_total
-                ).quantize(Decimal("0.01"))
-
-            else:
-                package_balance = Decimal("0.00")
-
-            if package_balance < Decimal("0.00"):
-                package_balance = Decimal("0.00")
-
-            package_balances[package.id] = package_balance
-            allocated += package_balance
-
-    # Uninvoiced packages still use their original package charge.
-    for package in uninvoiced_packages:
-        package_balances[package.id] = (
-            _package_charge_amount(package)
-            .quantize(Decimal("0.01"))
-        )
 
     # Build the response sent to the POS screen.
     for package in packages:
@@ -333,8 +243,6 @@ def customer_packages(user_id):
             Decimal("0.00"),
         )
 
-        total += amount_due
-
         invoice_number = ""
 
         if package.invoice_id and package.invoice:
@@ -372,7 +280,7 @@ def customer_packages(user_id):
             ),
         },
         "packages": rows,
-        "total": str(total.quantize(Decimal("0.01"))),
+        "total": str(total),
     })
 
 
@@ -416,7 +324,7 @@ def scan_deliver():
         return jsonify({"ok": False, "error": error}), 404
 
     invoice = package.invoice
-    charge = _package_charge_amount(package)
+    charge = package_charge_amount(package)
 
     if invoice:
         subtotal, discount_total, payments_total, total_due = (
@@ -583,26 +491,25 @@ def checkout():
         if p.invoice_id
     }
 
-    for invoice_id in selected_invoice_ids:
-        (
-            _invoice_subtotal,
-            _invoice_discount,
-            _invoice_payments,
-            invoice_total_due,
-        ) = fetch_invoice_totals_pg(invoice_id)
+    # One locked SELECT for every selected invoice (same numbers the
+    # pickup cart showed), then the invoices themselves in one more.
+    selected_balances = invoice_balances(
+        selected_invoice_ids,
+        lock=True,
+    )
+    preload_invoices(selected_invoice_ids)
+    paid_by_invoice = completed_payments_by_invoice(
+        selected_invoice_ids
+    )
 
-        subtotal += Decimal(
-            str(
-                max(
-                    float(invoice_total_due or 0),
-                    0.0,
-                )
-            )
-        ).quantize(Decimal("0.01"))
+    subtotal += sum(
+        selected_balances.values(),
+        Decimal("0.00"),
+    )
 
     for p in packages:
         if not p.invoice_id:
-            subtotal += _package_charge_amount(
+            subtotal += package_charge_amount(
                 p
             ).quantize(Decimal("0.01"))
 
@@ -1032,7 +939,7 @@ def checkout():
             group_total = Decimal("0.00")
 
             for p in pkg_list:
-                group_total += _package_charge_amount(p)
+                group_total += package_charge_amount(p)
 
             group_discount = Decimal("0.00")
             if discount > 0:
@@ -1052,20 +959,10 @@ def checkout():
             invoice.grand_total = float(group_final_total)
             invoice.amount = float(group_final_total)
 
-            # Check payments already recorded against this invoice.
-            existing_paid_raw = (
-                db.session.query(
-                    func.coalesce(func.sum(Payment.amount_jmd), 0)
-                )
-                .filter(
-                    Payment.invoice_id == invoice.id,
-                    func.lower(Payment.status) == "completed",
-                )
-                .scalar()
-            )
-
-            existing_paid = Decimal(str(existing_paid_raw or 0)).quantize(
-                Decimal("0.01")
+            # Payments already recorded against this invoice.
+            existing_paid = paid_by_invoice.get(
+                invoice.id,
+                Decimal("0.00"),
             )
 
             invoice_total = group_final_total.quantize(Decimal("0.01"))
@@ -1217,7 +1114,7 @@ def checkout():
             new_weight = Decimal("0.00")
 
             for p in uninvoiced_packages:
-                new_total += _package_charge_amount(p)
+                new_total += package_charge_amount(p)
 
                 try:
                     new_weight += Decimal(str(p.weight or 0))
@@ -2075,80 +1972,28 @@ def daily_sales():
     else:
         business_date = datetime.now(JAMAICA_TZ).date()
 
-    start_local = datetime.combine(
-        business_date,
-        datetime.min.time(),
-        tzinfo=JAMAICA_TZ
-    )
-    end_local = start_local + timedelta(days=1)
-
-    # Your DB timestamps are stored naive UTC, so convert local day to UTC naive range
-    start_utc = start_local.astimezone(timezone.utc).replace(tzinfo=None)
-    end_utc = end_local.astimezone(timezone.utc).replace(tzinfo=None)
-
-    payments = (
-        Payment.query
-        .filter(
-            Payment.created_at >= start_utc,
-            Payment.created_at < end_utc,
-            Payment.status == "completed",
-            Payment.transaction_type == "invoice_payment",
-            Payment.source == "pos"
-        )
-        .order_by(Payment.created_at.desc())
-        .all()
-    )
-
-    summary = {
-        "cash": Decimal("0.00"),
-        "card": Decimal("0.00"),
-        "transfer": Decimal("0.00"),
-        "wallet": Decimal("0.00"),
-        "gross_total": Decimal("0.00"),
-        "discount": Decimal("0.00"),
-        "total": Decimal("0.00"),
-    }
+    # Totals come from the running shift ledger; the detail list is one
+    # joined SELECT (payment + invoice + customer).
+    payments = pos_payment_rows(business_date)
+    summary = pos_day_summary(business_date, payments)
 
     rows = []
 
     for p in payments:
-        amount = Decimal(str(p.amount_jmd or 0))
-        method = (p.method or "").strip().lower()
-
-        invoice_discount = Decimal("0.00")
-
-        if p.invoice:
-            invoice_discount = Decimal(
-                str(p.invoice.discount_total or 0)
-            ).quantize(Decimal("0.01"))
+        amount = Decimal(str(p.amount_jmd or 0)).quantize(Decimal("0.01"))
+        invoice_discount = Decimal(
+            str(p.discount_total or 0)
+        ).quantize(Decimal("0.01"))
 
         # Gross for this POS transaction—not the invoice's historical total.
         invoice_gross = (
             amount + invoice_discount
         ).quantize(Decimal("0.01"))
 
-        if method == "cash":
-            summary["cash"] += amount
-        elif method == "card":
-            summary["card"] += amount
-        elif method in {"transfer", "bank", "bank transfer"}:
-            summary["transfer"] += amount
-        elif method in {
-            "wallet",
-            "e-wallet",
-            "ewallet",
-            "wallet payment",
-        }:
-            summary["wallet"] += amount
-
-        summary["gross_total"] += invoice_gross
-        summary["discount"] += invoice_discount
-        summary["total"] += amount
-
         rows.append({
             "time": to_jamaica(p.created_at),
-            "customer": p.user.full_name if p.user else "",
-            "invoice": p.invoice.invoice_number if p.invoice else "",
+            "customer": p.customer or "",
+            "invoice": p.invoice_number or "",
             "method": p.method,
             "gross": invoice_gross,
             "discount": invoice_discount,
@@ -2160,6 +2005,33 @@ def daily_sales():
     ).first()
 
     if request.method == "POST":
+        # Lock the ledger row so no sale lands mid-closeout, and refuse to
+        # close on totals the cashier hasn't seen.
+        ensure_pos_ledger(business_date)
+        ledger = (
+            POSShiftLedger.query
+            .filter_by(business_date=business_date)
+            .with_for_update()
+            .populate_existing()
+            .first()
+        )
+        summary = ledger_summary(ledger)
+
+        seen_revision = request.form.get("ledger_revision", type=int)
+        if seen_revision is not None and seen_revision != summary["revision"]:
+            db.session.rollback()
+            flash(
+                "New sales were recorded while this page was open. "
+                "Review the updated totals and close out again.",
+                "warning",
+            )
+            return redirect(
+                url_for(
+                    "admin_pos.daily_sales",
+                    date=business_date.strftime("%Y-%m-%d")
+                )
+            )
+
         actual_cash = Decimal(str(request.form.get("actual_cash") or "0"))
         notes = (request.form.get("notes") or "").strip()
 
@@ -16,12 +16,6 @@ import base64
 import mimetypes
 
 import bcrypt
-import openpyxl
-from weasyprint import HTML
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
 from markupsafe import escape
 
 from flask_wtf import FlaskForm
@@ -41,12 +35,18 @@ from app.utils.wallet import (
 )
 from app.utils.invoice_utils import generate_invoice
 from app.utils.rates import get_rate_for_weight
-from app.utils.invoice_pdf import generate_invoice_pdf
-from app.utils.messages import make_thread_key
+from app.utils.invoice_pdf import (
+    build_invoice_pdf_dict,
+    invoice_pdf_filename,
+    invoice_pdf_path,
+)
+from app.utils.pdf_cache import cached_pdf_bytes, template_path
+from app.utils.pdf_service import render_pdf
+from app.utils.messages import mailbox_query, make_thread_key, unread_message_count
+from app.utils.notifications import broadcast_read_counts, create_broadcast, mark_personal_read, unread_notification_count
 from app.utils.message_notify import send_new_message_email
 from app.utils.email_utils import send_bulk_message_email
-from app.calculator import calculate_charges
-from app.calculator_data import CATEGORIES, USD_TO_JMD
+from app.calculator_data import calculate_charges, CATEGORIES, USD_TO_JMD
 from app.utils.invoice_totals import (
     fetch_invoice_totals_pg,
     mark_invoice_packages_delivered,
@@ -66,9 +66,10 @@ import sqlalchemy as sa
 from sqlalchemy import func, extract, asc
 from app.extensions import db
 from app.models import (
-    User, Wallet, Message, MessageAttachment, ScheduledDelivery,
+    User, Wallet, Message, MessageAttachment, MessageParticipantState, ScheduledDelivery,
     WalletTransaction, Package, Invoice, Notification, Payment, PurchaseRequest, ScheduledPickup,
-    RateBracket, Discount, shipment_packages, Prealert, ShipmentLog, AuditLog
+    RateBracket, Discount, shipment_packages, Prealert, ShipmentLog, AuditLog,
+    BroadcastNotification,
 )
 from app.routes.admin_auth_routes import admin_required
 
@@ -128,84 +129,6 @@ def _num(x):
     except Exception:
         return 0.0
 
-def _build_invoice_view_dict(inv):
-    packages = []
-
-    for p in Package.query.filter_by(invoice_id=inv.id).all():
-
-        _is_subscription_covered = (
-            bool(getattr(p, "subscription_applied", False))
-            and (getattr(p, "subscription_result", "") or "") == "subscription_applied"
-        )
-
-        _value_usd = _num(
-            getattr(p, "value", getattr(p, "invoice_value", getattr(p, "value_usd", 0)))
-        )
-
-        _bad_address_fee = _num(getattr(p, "bad_address_fee", 0))
-
-        if bool(getattr(p, "epc", False)) and _bad_address_fee <= 0:
-            _bad_address_fee = 500.0
-
-        if _is_subscription_covered:
-            _freight = 0
-            _storage = 0
-        else:
-            _freight = _num(getattr(p, "freight_fee", getattr(p, "freight", 0)))
-            _storage = _num(
-                getattr(
-                    p,
-                    "handling_fee",
-                    getattr(
-                        p,
-                        "storage_fee",
-                        getattr(p, "handling", 0),
-                    ),
-                )
-            )
-
-        packages.append({
-            "house_awb":     getattr(p, "house_awb", "") or "",
-            "description":   getattr(p, "description", "") or "",
-            "weight":        _num(getattr(p, "weight", 0)),
-            "value":         _value_usd,
-
-            "other_charges": _num(getattr(p, "other_charges", 0)),
-            "bad_address_fee": _bad_address_fee,
-            "freight":       _freight,
-            "storage":       _storage,
-
-            "duty":          _num(getattr(p, "duty", 0)),
-            "scf":           _num(getattr(p, "scf", 0)),
-            "envl":          _num(getattr(p, "envl", 0)),
-            "caf":           _num(getattr(p, "caf", 0)),
-            "gct":           _num(getattr(p, "gct", 0)),
-            "discount_due":  _num(getattr(p, "discount_due", 0)),
-
-            "subscription_applied": bool(getattr(p, "subscription_applied", False)),
-            "subscription_result": getattr(p, "subscription_result", None),
-            "subscription_covered": _is_subscription_covered,
-
-            "customs_only_due_to_subscription": (
-                _is_subscription_covered
-                and float(getattr(p, "customs_total", 0) or 0) > 0
-            ),
-        })
-
-    invoice_dict = {
-        "id": inv.id,
-        "number": inv.invoice_number,
-        "date": inv.date_submitted or datetime.utcnow(),
-        "customer_code": getattr(inv.user, "registration_number", "") if getattr(inv, "user", None) else "",
-        "customer_name": getattr(inv.user, "full_name", "") if getattr(inv, "user", None) else "",
-        "subtotal": _num(getattr(inv, "subtotal", getattr(inv, "grand_total", 0))),
-        "discount_total": _num(getattr(inv, "discount_total", 0)),
-        "total_due": _num(getattr(inv, "grand_total", getattr(inv, "amount", 0))),
-        "packages": packages,
-    }
-
-    return invoice_dict
-
 def _money(n):
     try:
         return f"{float(n):,.2f}"
@@ -278,7 +201,7 @@ def register_admin():
         password = (form.password.data or "").strip()
         role = (request.form.get("role") or "admin").strip()
 
-        if User.query.filter_by(email=email).first():
+        if User.find_by_email(email):
             flash("Email already exists", "danger")
             return render_template('admin/register_admin.html', form=form)
 
@@ -982,83 +905,31 @@ def messages():
     per_page = request.args.get("per_page", type=int) or 20
     per_page = max(10, min(per_page, 200))
 
-    from sqlalchemy.orm import selectinload
-
-    base = Message.query.options(
-        selectinload(Message.attachments)
-    )
+    from sqlalchemy.orm import joinedload, selectinload
 
-    if box == "sent":
-        base = base.filter(Message.sender_id == current_user.id)
-    elif box == "all":
-        base = base.filter(sa.or_(
-            Message.sender_id == current_user.id,
-            Message.recipient_id == current_user.id
-        ))
-    else:
-        base = base.filter(Message.recipient_id == current_user.id)
-
-    if include_deleted:
-        base = base.filter(sa.or_(
-            sa.and_(Message.sender_id == current_user.id, Message.deleted_by_sender.is_(True)),
-            sa.and_(Message.recipient_id == current_user.id, Message.deleted_by_recipient.is_(True)),
-        ))
-    else:
-        base = base.filter(sa.and_(
-            sa.or_(Message.sender_id != current_user.id, Message.deleted_by_sender.is_(False)),
-            sa.or_(Message.recipient_id != current_user.id, Message.deleted_by_recipient.is_(False)),
-        ))
-
-    if include_archived:
-        base = base.filter(sa.or_(
-            sa.and_(Message.sender_id == current_user.id, Message.archived_by_sender.is_(True)),
-            sa.and_(Message.recipient_id == current_user.id, Message.archived_by_recipient.is_(True)),
-        ))
-    else:
-        base = base.filter(sa.and_(
-            sa.or_(Message.sender_id != current_user.id, Message.archived_by_sender.is_(False)),
-            sa.or_(Message.recipient_id != current_user.id, Message.archived_by_recipient.is_(False)),
-        ))
-
-    if unread_only:
-        base = base.filter(
-            Message.recipient_id == current_user.id,
-            Message.is_read.is_(False)
+    pagination = (
+        mailbox_query(
+            current_user.id,
+            box if box in ("sent", "all") else "inbox",
+            q=q,
+            unread_only=unread_only,
+            archived=include_archived,
+            deleted=include_deleted,
         )
+        .options(
+            joinedload(MessageParticipantState.message).selectinload(Message.attachments)
+        )
+        .paginate(page=page, per_page=per_page, error_out=False)
+    )
 
-    if q:
-        base = base.filter(sa.or_(
-            Message.subject.ilike(f"%{q}%"),
-            Message.body.ilike(f"%{q}%"),
-        ))
-
-    base = base.order_by(Message.created_at.desc())
-
-    pagination = base.paginate(page=page, per_page=per_page, error_out=False)
-    messages_list = pagination.items
-
-    user_ids = set()
-
-    for m in messages_list:
-        user_ids.add(m.sender_id)
-        user_ids.add(m.recipient_id)
-
-    users = {
-        u.id: u
-        for u in User.query.filter(User.id.in_(user_ids)).all()
-    }
-
-    rows = []
-
-    for m in messages_list:
-        is_sent = (m.sender_id == current_user.id)
-        other_id = m.recipient_id if is_sent else m.sender_id
-
-        rows.append({
-            "m": m,
-            "other": users.get(other_id),
-            "is_sent": is_sent,
-        })
+    rows = [
+        {
+            "m": st.message,
+            "other": st.counterparty,
+            "is_sent": st.folder == "sent",
+        }
+        for st in pagination.items
+    ]
 
     # ==================================
     # Selected Message for Reading Pane
@@ -1091,7 +962,10 @@ def messages():
             else selected_message.sender_id
         )
 
-        selected_other = User.query.get(other_id)
+        selected_other = next(
+            (r["other"] for r in rows if r["m"].id == selected_message.id),
+            None,
+        ) or db.session.get(User, other_id)
 
     # Auto mark as read
     if (
@@ -1651,60 +1525,42 @@ def view_notifications():
         subject = form.subject.data.strip()
         message = form.message.data.strip()
 
-        customers = (
-            User.query
-            .filter(User.role == "customer")
-            .with_entities(User.id)
-            .all()
+        broadcast = create_broadcast(
+            subject,
+            message,
+            created_by_id=current_user.id,
         )
-
-        rows = []
-        now = datetime.now(timezone.utc)
-
-        for (uid,) in customers:
-            rows.append({
-                "user_id": uid,
-                "subject": subject,
-                "message": message,
-                "is_read": False,
-                "is_broadcast": True,
-                "created_at": now,
-            })
-
-        db.session.bulk_insert_mappings(Notification, rows)
         db.session.commit()
 
-        flash(f"Broadcast sent to {len(customers)} customers.", "success")
+        flash(f"Broadcast sent to {broadcast.recipient_count} customers.", "success")
         return redirect(url_for("admin.view_notifications"))
 
     notes = (
-        Notification.query
-        .filter(Notification.is_broadcast.is_(True))
-        .order_by(Notification.created_at.desc())
+        BroadcastNotification.query
+        .order_by(BroadcastNotification.created_at.desc())
         .limit(300)
         .all()
     )
 
-    delivered_map = {}
-    for n in notes:
-        delivered_map[n.id] = db.session.scalar(
-            sa.select(func.count()).select_from(Notification).where(
-                Notification.is_broadcast.is_(True),
-                Notification.subject == n.subject,
-                Notification.message == n.message,
-                Notification.created_at == n.created_at
-            )
-        ) or 0
+    delivered_map = {n.id: n.recipient_count for n in notes}
+    read_map = broadcast_read_counts([n.id for n in notes])
 
-    return render_template("admin/notifications.html", notes=notes, form=form, datetime=datetime, delivered_map=delivered_map)
+    return render_template(
+        "admin/notifications.html",
+        notes=notes,
+        form=form,
+        datetime=datetime,
+        delivered_map=delivered_map,
+        read_map=read_map,
+    )
 
 
 
 @admin_bp.route("/notifications/mark_read/<int:nid>", methods=["POST"])
 @admin_required
 def mark_notification_read(nid):
-    n = Notification.query.get_or_404(nid)
-    n.is_read = True
+    if not mark_personal_read(nid):
+        abort(404)
     db.session.commit()
     flash("Notification marked as read.", "success")
     return redirect(url_for("admin.view_notifications"))
@@ -3485,8 +3341,7 @@ def generate_pdf_invoice(user_id):
 
     today = datetime.utcnow().strftime('%B %d, %Y')
 
-    html = render_template(
-        "invoice.html",
+    context = dict(
         full_name=getattr(user, "full_name", ""),
         registration_number=getattr(user, "registration_number", ""),
         date=today,
@@ -3494,7 +3349,12 @@ def generate_pdf_invoice(user_id):
         grand_total=round(total, 2)
     )
 
-    pdf = HTML(string=html).write_pdf()
+    pdf = cached_pdf_bytes(
+        "customer_invoice_summary",
+        context,
+        lambda: render_pdf("invoice.html", context),
+        template_files=(template_path("invoice.html"),),
+    )
     resp = make_response(pdf)
     resp.headers['Content-Type'] = 'application/pdf'
 
@@ -3558,71 +3418,13 @@ def invoice_pdf(invoice_id):
     )
 
     # This shared builder uses saved subscription-protected
-    # package charges.
-    invoice_dict = _build_invoice_view_dict(
+    # package charges and live invoice totals.
+    invoice_dict = build_invoice_pdf_dict(
         invoice
     )
 
-    (
-        subtotal,
-        discount_total,
-        payments_total,
-        total_due,
-    ) = fetch_invoice_totals_pg(invoice_id)
-
-    invoice_status = (
-        invoice.status or ""
-    ).strip().lower()
-
-    if invoice_status == "paid":
-        total_due = 0.0
-
-    invoice_dict.update(
-        {
-            "id": invoice.id,
-            "number": (
-                invoice.invoice_number
-                or f"INV{invoice.id:05d}"
-            ),
-            "invoice_number": (
-                invoice.invoice_number
-                or f"INV{invoice.id:05d}"
-            ),
-            "date": (
-                invoice.date_issued
-                or invoice.date_submitted
-                or invoice.created_at
-                or datetime.utcnow()
-            ),
-            "date_issued": (
-                invoice.date_issued
-                or invoice.date_submitted
-                or invoice.created_at
-                or datetime.utcnow()
-            ),
-            "subtotal": float(
-                subtotal or 0
-            ),
-            "grand_total": float(
-                subtotal or 0
-            ),
-            "discount_total": float(
-                discount_total or 0
-            ),
-            "payments_total": float(
-                payments_total or 0
-            ),
-            "total_due": float(
-                total_due or 0
-            ),
-            "amount_due": float(
-                total_due or 0
-            ),
-        }
-    )
-
     try:
-        relative_path = generate_invoice_pdf(
+        pdf_path = invoice_pdf_path(
             invoice_dict
         )
 
@@ -3644,11 +3446,14 @@ def invoice_pdf(invoice_id):
             )
         )
 
-    return redirect(
-        url_for(
-            "static",
-            filename=relative_path,
-        )
+    return send_file(
+        pdf_path,
+        mimetype="application/pdf",
+        as_attachment=False,
+        download_name=invoice_pdf_filename(
+            invoice_dict
+        ),
+        conditional=True,
     )
 
 
@@ -7000,10 +6805,9 @@ def email_proforma_invoice(invoice_id):
     # Generate PDF
     # -------------------------------------------------
     try:
-        pdf_bytes = HTML(
-            string=html,
-            base_url=request.url_root,
-        ).write_pdf()
+        pdf_bytes = render_pdf(
+            html=html,
+        )
 
     except Exception as error:
         current_app.logger.exception(
@@ -7125,6 +6929,11 @@ def email_proforma_invoice(invoice_id):
 @admin_bp.route("/invoice/receipt/<int:invoice_id>")
 @admin_required
 def invoice_receipt(invoice_id):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
     inv = Invoice.query.get_or_404(invoice_id)
     user = inv.user if hasattr(inv, "user") else None
 
@@ -7376,31 +7185,14 @@ def inject_admin_badges():
 
     try:
         if current_user.is_authenticated:
-            # Broadcast notifications unread.
-            unread_broadcast_count = (
-                db.session.scalar(
-                    sa.select(func.count())
-                    .select_from(Notification)
-                    .where(
-                        Notification.is_broadcast.is_(True),
-                        Notification.is_read.is_(False),
-                    )
-                )
-                or 0
+            # Notifications (personal + broadcasts) unread by this user.
+            unread_broadcast_count = unread_notification_count(
+                current_user
             )
 
             # Messages where the current admin is the recipient.
-            unread_messages_count = (
-                db.session.scalar(
-                    sa.select(func.count())
-                    .select_from(Message)
-                    .where(
-                        Message.recipient_id
-                        == current_user.id,
-                        Message.is_read.is_(False),
-                    )
-                )
-                or 0
+            unread_messages_count = unread_message_count(
+                current_user.id
             )
 
             # Shop For Me requests requiring an admin action:
@@ -12,8 +12,11 @@ from flask_login import login_required
 from app.extensions import db
 from app.models import User, Package, Invoice, Prealert, ScheduledDelivery, ShipmentLog, shipment_packages
 from app.routes.admin_auth_routes import admin_required
+from app.utils.db_routing import report_request
 
 analytics_bp = Blueprint("analytics", __name__, url_prefix="/analytics")
+# every page here is a read-only report
+analytics_bp.before_request(report_request)
 
 
 def _coalesced_user_dt():
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
 from flask_cors import CORS
-from app.calculator_data import CATEGORIES, categories as CATEGORY_LIST, calculate_charges, USD_TO_JMD
+from app.calculator_data import CATEGORIES, categories as CATEGORY_LIST, USD_TO_JMD
+from app.utils.estimate_cache import estimate_charges
 
 api_bp = Blueprint("api", __name__, url_prefix="/api")
 CORS(api_bp, resources={r"/*": {"origins": "*"}})
@@ -19,7 +20,7 @@ def estimate():
     category    = (data.get("category") or "").strip()
     invoice_usd = float(data.get("invoice_usd") or 0)
     weight      = float(data.get("weight") or 0)
-    result = calculate_charges(category=category, invoice_usd=invoice_usd, weight=weight)
+    result = estimate_charges(category, invoice_usd, weight)
     return jsonify({
         "ok": True,
         "inputs": {"category": category, "invoice_usd": invoice_usd, "weight": weight, "usd_to_jmd": USD_TO_JMD},
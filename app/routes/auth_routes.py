@@ -271,9 +271,7 @@ def register():
         # ---------------------------------
         # Check existing customer details
         # ---------------------------------
-        existing_email = User.query.filter(
-            db.func.lower(User.email) == email
-        ).first()
+        existing_email = User.find_by_email(email)
 
         if existing_email:
             flash(
@@ -623,16 +621,7 @@ def login():
         password_plain = form.password.data or ""
         password_bytes = password_plain.encode("utf-8")
 
-        user = (
-            User.query
-            .filter(
-                db.func.lower(
-                    db.func.trim(User.email)
-                )
-                == email
-            )
-            .first()
-        )
+        user = User.find_by_email(email)
 
         if user and user.password:
             stored_password = user.password
@@ -697,16 +686,7 @@ def forgot_password():
             return redirect(url_for("auth.forgot_password"))
 
 
-        user = (
-            User.query
-            .filter(
-                db.func.lower(
-                    db.func.trim(User.email)
-                )
-                == email
-            )
-            .first()
-        )
+        user = User.find_by_email(email)
 
         if not user:
             flash("If that email exists, we sent a password reset link.", "success")
@@ -760,16 +740,7 @@ def reset_password(token):
 
     email = str(email or "").strip().lower()
 
-    user = (
-            User.query
-            .filter(
-                db.func.lower(
-                    db.func.trim(User.email)
-                )
-                == email
-            )
-            .first()
-        )
+    user = User.find_by_email(email)
     if not user:
         flash("No account found for this reset link.", "danger")
         return redirect(url_for("auth.forgot_password"))
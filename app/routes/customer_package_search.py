@@ -1,10 +1,12 @@
-from flask import Blueprint, render_template, redirect, url_for, flash
+from flask import Blueprint, render_template, redirect, url_for, flash, current_app
 from flask_login import login_required, current_user
 from app.extensions import db
 from app.forms import PackageSearchForm
 from app.models import PackageSearchCase, Package, generate_search_case_id, normalize_tracking
 from app.utils.claims_uploads import upload_claim_file_to_cloudinary
 from app.utils.email_utils import send_package_search_submitted_email
+from app.utils.unassigned import get_unassigned_user_id
+from app.utils.unassigned_matching import candidates_for_cases
 
 customer_search_bp = Blueprint("customer_search", __name__, url_prefix="/customer/search")
 
@@ -17,8 +19,11 @@ def create_search_case():
         try:
             tn = normalize_tracking(form.tracking_number.data)
 
-            # ✅ 1) Check warehouse first
-            existing_pkg = Package.query.filter(Package.tracking_number == tn).first()
+            # ✅ 1) Check warehouse first (UNASSIGNED packages are matched to the case below)
+            existing_pkg = Package.query.filter(
+                Package.tracking_number == tn,
+                Package.user_id != get_unassigned_user_id(),
+            ).first()
             if existing_pkg:
                 flash(
                     f"✅ We found this tracking number already in our system (Package #{existing_pkg.id}). "
@@ -64,6 +69,18 @@ def create_search_case():
             db.session.add(case)
             db.session.commit()
 
+            try:
+                matches = candidates_for_cases([case]).get(case.id) or []
+                if matches:
+                    current_app.logger.info(
+                        "[UNASSIGNED MATCH] search case %s: %s candidate package(s) %s",
+                        case.case_id,
+                        len(matches),
+                        ", ".join(f"#{m['id']} ({m['kind']})" for m in matches),
+                    )
+            except Exception:
+                current_app.logger.exception("Unassigned matching failed for case %s", case.case_id)
+
             send_package_search_submitted_email(case=case)
 
             flash("Search request submitted. Our overseas team will investigate.", "success")
@@ -30,8 +30,16 @@ from app.utils.email_utils import send_referral_email
 from app.utils.referrals import ensure_user_referral_code
 from app.utils.helpers import customer_required
 from app.utils.invoice_utils import generate_invoice
-from app.utils.invoice_pdf import generate_invoice_pdf
-from app.utils.messages import make_thread_key
+from app.utils.invoice_pdf import invoice_pdf_filename, invoice_pdf_path
+from app.utils.messages import MAILBOX_BOXES, mailbox_query, make_thread_key
+from app.utils.notifications import (
+    delete_personal_notification,
+    mark_all_notifications_read,
+    mark_broadcast_read,
+    mark_personal_read,
+    notification_feed,
+    unread_notification_count,
+)
 from app.utils.message_notify import send_new_message_email
 from app.utils.email_utils import pick_admin_recipient
 from app.utils.subscription_utils import get_subscription_summary
@@ -48,10 +56,6 @@ from app.calculator_data import calculate_charges, CATEGORIES, USD_TO_JMD
 from app.calculator_data import get_freight
 from app.services.package_view import fetch_packages_normalized
 
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
 from urllib.parse import urlsplit, urlunsplit
 
 
@@ -62,7 +66,7 @@ from app.models import (
     ScheduledPickup, pickup_packages,
     Notification,
     Message as DBMessage,  # 👈 avoid name clash with Flask-Mail
-    MessageAttachment,
+    MessageAttachment, MessageParticipantState,
     Wallet, WalletTransaction, Payment, Settings,
     Prealert, PackageAttachment, normalize_tracking,
     PurchaseRequest, generate_purchase_request_number, PurchaseRequestItem, PurchaseRequestAttachment, PrealertAttachment
@@ -70,11 +74,11 @@ from app.models import (
 
 from app.models import SubscriptionInvite, SubscriptionMember
 from app.utils.subscription_utils import get_active_subscription
-from app.models import normalize_tracking
+from app.models import normalize_email, normalize_tracking
 from sqlalchemy import func, or_
 # Email class from Flask-Mail (alias to avoid clash)
 from flask_mail import Message as MailMessage
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 from app.utils.cloudinary_storage import serve_prealert_invoice_file
 from decimal import Decimal
 from app.utils.delivery_engine import build_delivery_details
@@ -2066,8 +2070,7 @@ def receipt_pdf_inline(payment_id):
         "doc_type": "receipt",
     }
 
-    rel = generate_invoice_pdf(invoice_dict)  # returns something like "invoices/xxx.pdf"
-    abs_path = os.path.join(current_app.static_folder, rel)
+    abs_path = invoice_pdf_path(invoice_dict)  # cached by render inputs
 
     if not os.path.exists(abs_path):
         abort(404)
@@ -2076,7 +2079,7 @@ def receipt_pdf_inline(payment_id):
         abs_path,
         mimetype="application/pdf",
         as_attachment=False,                 # IMPORTANT: inline preview
-        download_name=os.path.basename(abs_path),
+        download_name=invoice_pdf_filename(invoice_dict),
         conditional=True
     )
 
@@ -2413,9 +2416,15 @@ def invoice_pdf(invoice_id):
         "USD_TO_JMD":     getattr(settings, "usd_to_jmd", None) or USD_TO_JMD,
     }
 
-    from app.utils.invoice_pdf import generate_invoice_pdf
-    rel = generate_invoice_pdf(invoice_dict)
-    return redirect(url_for("static", filename=rel))
+    abs_path = invoice_pdf_path(invoice_dict)  # cached by render inputs
+
+    return send_file(
+        abs_path,
+        mimetype="application/pdf",
+        as_attachment=False,
+        download_name=invoice_pdf_filename(invoice_dict),
+        conditional=True
+    )
 
 @customer_bp.route("/purchase-requests/new", methods=["GET", "POST"])
 @login_required
@@ -3482,83 +3491,20 @@ def view_messages():
         per_page = 20
     per_page = per_page if per_page in (10, 20, 50, 100) else 20
 
-    # Base: customer mailbox messages only (no threads)
-    base = DBMessage.query.filter(
-        sa.or_(
-            DBMessage.sender_id == current_user.id,
-            DBMessage.recipient_id == current_user.id
-        )
-    )
-
-    # Box filter
-    if box == "inbox":
-        base = base.filter(DBMessage.recipient_id == current_user.id)
-    elif box == "sent":
-        base = base.filter(DBMessage.sender_id == current_user.id)
-    else:
+    if box not in MAILBOX_BOXES:
         box = "all"  # normalize
 
-    # Search (subject/body)
-    if q:
-        like = f"%{q}%"
-        base = base.filter(
-            sa.or_(
-                DBMessage.subject.ilike(like),
-                DBMessage.body.ilike(like),
-            )
-        )
-
-    if include_deleted:
-        base = base.filter(sa.or_(
-            sa.and_(
-                DBMessage.sender_id == current_user.id,
-                DBMessage.deleted_by_sender.is_(True)
-            ),
-            sa.and_(
-                DBMessage.recipient_id == current_user.id,
-                DBMessage.deleted_by_recipient.is_(True)
-            )
-        ))
-    else:
-        base = base.filter(sa.and_(
-            sa.or_(DBMessage.sender_id != current_user.id, DBMessage.deleted_by_sender.is_(False)),
-            sa.or_(DBMessage.recipient_id != current_user.id, DBMessage.deleted_by_recipient.is_(False)),
-        ))
-
-    if include_archived:
-        base = base.filter(sa.or_(
-            sa.and_(
-                DBMessage.sender_id == current_user.id,
-                DBMessage.archived_by_sender.is_(True)
-            ),
-            sa.and_(
-                DBMessage.recipient_id == current_user.id,
-                DBMessage.archived_by_recipient.is_(True)
-            )
-        ))
-    else:
-        base = base.filter(sa.and_(
-            sa.or_(DBMessage.sender_id != current_user.id, DBMessage.archived_by_sender.is_(False)),
-            sa.or_(DBMessage.recipient_id != current_user.id, DBMessage.archived_by_recipient.is_(False)),
-        ))
-
-    if unread_only:
-        base = base.filter(
-            DBMessage.recipient_id == current_user.id,
-            DBMessage.is_read.is_(False)
-        )
-
-    base = base.order_by(DBMessage.created_at.desc())
-
-    pagination = base.paginate(page=page, per_page=per_page, error_out=False)
-    messages_list = pagination.items
+    pagination = mailbox_query(
+        current_user.id,
+        box,
+        q=q,
+        unread_only=unread_only,
+        archived=include_archived,
+        deleted=include_deleted,
+    ).paginate(page=page, per_page=per_page, error_out=False)
 
     # For display (always show "Administrator" as the other side)
-    rows = []
-    for m in messages_list:
-        other_id = m.recipient_id if m.sender_id == current_user.id else m.sender_id
-        other = User.query.get(other_id)
-        rows.append((m, other))
+    rows = [(st.message, st.counterparty) for st in pagination.items]
 
     selected_id = request.args.get("message_id", type=int)
 
@@ -3587,7 +3533,10 @@ def view_messages():
             if selected_message.sender_id == current_user.id
             else selected_message.sender_id
         )
-        selected_other = User.query.get(other_id)
+        selected_other = (
+            dict((m.id, other) for m, other in rows).get(selected_message.id)
+            or db.session.get(User, other_id)
+        )
 
         if (
             selected_message.recipient_id == current_user.id
@@ -4064,34 +4013,55 @@ def download_message_attachment(attachment_id):
 @customer_bp.route("/notifications", methods=["GET"])
 @login_required
 def view_notifications():
-    notes = (Notification.query
-             .filter(
-                 sa.or_(
-                     Notification.user_id == current_user.id,
-                     Notification.is_broadcast.is_(True)  # broadcast
-                 )
-             )
-             .order_by(Notification.created_at.desc())
-             .all())
+    notes = notification_feed(current_user)
     return render_template("customer/notifications.html", notes=notes)
 
 
 @customer_bp.route("/notifications/mark_read/<int:nid>", methods=["POST"])
 @login_required
 def mark_notification_read(nid):
-    n = Notification.query.get_or_404(nid)
+    # customer can only mark their own notifications (live or archived)
+    if not mark_personal_read(nid, current_user.id):
+        flash("Not authorized.", "danger")
+        return redirect(url_for("customer.view_notifications"))
+
+    db.session.commit()
+    flash("Notification marked as read.", "success")
+    return redirect(url_for("customer.view_notifications"))
+
+
+@customer_bp.route("/notifications/<int:nid>/delete", methods=["POST"])
+@login_required
+def delete_notification(nid):
+    if not delete_personal_notification(nid, current_user.id):
+        flash("Not authorized.", "danger")
+        return redirect(url_for("customer.view_notifications"))
+
+    db.session.commit()
+    flash("Notification deleted.", "success")
+    return redirect(url_for("customer.view_notifications"))
+
 
-    # customer can mark read if:
-    # - it belongs to them OR it's a broadcast
-    if n.user_id != current_user.id and not n.is_broadcast:
+@customer_bp.route("/notifications/broadcast/<int:bid>/mark_read", methods=["POST"])
+@login_required
+def mark_broadcast_notification_read(bid):
+    if not mark_broadcast_read(current_user, bid):
         flash("Not authorized.", "danger")
         return redirect(url_for("customer.view_notifications"))
 
-    n.is_read = True
     db.session.commit()
     flash("Notification marked as read.", "success")
     return redirect(url_for("customer.view_notifications"))
 
+
+@customer_bp.route("/notifications/mark_all_read", methods=["POST"])
+@login_required
+def mark_all_notifications_read_route():
+    mark_all_notifications_read(current_user)
+    db.session.commit()
+    flash("All notifications marked as read.", "success")
+    return redirect(url_for("customer.view_notifications"))
+
 @customer_bp.app_context_processor
 def inject_customer_shop_for_me_badge():
     shop_for_me_customer_action_count = 0
@@ -4138,17 +4108,7 @@ def inject_notification_counts():
     count = 0
     try:
         if current_user.is_authenticated:
-            count = db.session.scalar(
-                sa.select(func.count()).select_from(Notification).where(
-                    sa.and_(
-                        sa.or_(
-                            Notification.user_id == current_user.id,
-                            Notification.is_broadcast.is_(True)
-                        ),
-                        Notification.is_read.is_(False)
-                    )
-                )
-            ) or 0
+            count = unread_notification_count(current_user)
     except Exception as e:
         db.session.rollback()
         current_app.logger.warning("inject_notification_counts failed: %s", e)
@@ -4237,7 +4197,10 @@ def change_email():
             return redirect(url_for("customer.change_email"))
 
         # Prevent duplicates
-        exists = User.query.filter(User.email == new_email, User.id != user.id).first()
+        exists = User.query.filter(
+            User.email_normalized == normalize_email(new_email),
+            User.id != user.id,
+        ).first()
         if exists:
             flash("That email is already in use.", "danger")
             return redirect(url_for("customer.change_email"))
@@ -4288,7 +4251,10 @@ def change_email_modal_submit():
 
     # Validate uniqueness
     if new_email and not errors.get("new_email"):
-        exists = User.query.filter(User.email == new_email, User.id != user.id).first()
+        exists = User.query.filter(
+            User.email_normalized == normalize_email(new_email),
+            User.id != user.id,
+        ).first()
         if exists:
             errors["new_email"] = "That email is already in use."
 
@@ -6145,11 +6111,7 @@ def invite_family_member():
     db.session.flush()
 
     # Prevent inviting somebody who is already in this plan.
-    existing_user = (
-        User.query
-        .filter(User.email.ilike(email))
-        .first()
-    )
+    existing_user = User.find_by_email(email)
 
     if existing_user:
         existing_member = (
@@ -8996,7 +8958,7 @@ def api_customer_login():
 
     user = User.query.filter(
         or_(
-            func.lower(User.email) == identifier.lower(),
+            User.email_normalized == normalize_email(identifier),
             func.lower(User.registration_number) == identifier.lower(),
         )
     ).first()
@@ -9337,31 +9299,21 @@ def api_customer_notifications():
     if not user:
         return jsonify({"error": "Unauthorized"}), 401
 
-    notes = (
-        Notification.query
-        .filter(
-            sa.or_(
-                Notification.user_id == user.id,
-                Notification.is_broadcast.is_(True)
-            )
-        )
-        .order_by(Notification.created_at.desc())
-        .all()
-    )
+    notes = notification_feed(user)
 
     return jsonify({
         "notifications": [
             {
-                "id": n.id,
-                "title": getattr(n, "title", "") or "Notification",
-                "message": getattr(n, "message", "") or getattr(n, "body", "") or "",
-                "is_read": bool(getattr(n, "is_read", False)),
+                "id": n["id"],
+                "title": n["subject"] or "Notification",
+                "message": n["message"] or "",
+                "is_read": n["is_read"],
                 "created_at": (
-                    n.created_at.strftime("%Y-%m-%d %H:%M:%S")
-                    if getattr(n, "created_at", None)
+                    n["created_at"].strftime("%Y-%m-%d %H:%M:%S")
+                    if n["created_at"]
                     else ""
                 ),
-                "is_broadcast": bool(getattr(n, "is_broadcast", False)),
+                "is_broadcast": n["is_broadcast"],
             }
             for n in notes
         ]
@@ -9375,12 +9327,20 @@ def api_customer_notification_mark_read(nid):
     if not user:
         return jsonify({"error": "Unauthorized"}), 401
 
-    n = Notification.query.get_or_404(nid)
+    # broadcasts and personal notifications have separate id spaces;
+    # the list endpoint returns is_broadcast for the client to send back
+    data = request.get_json(silent=True) or {}
+    is_broadcast = (
+        str(request.args.get("broadcast") or data.get("is_broadcast") or "").lower()
+        in ("1", "true", "yes")
+    )
 
-    if n.user_id != user.id and not n.is_broadcast:
+    if is_broadcast:
+        if not mark_broadcast_read(user, nid):
+            return jsonify({"error": "Not authorized"}), 403
+    elif not mark_personal_read(nid, user.id):
         return jsonify({"error": "Not authorized"}), 403
 
-    n.is_read = True
     db.session.commit()
 
     return jsonify({
@@ -9395,22 +9355,21 @@ def api_customer_messages():
     if not user:
         return jsonify({"error": "Unauthorized"}), 401
 
-    messages_list = (
-        DBMessage.query
-        .filter(
-            sa.or_(
-                DBMessage.sender_id == user.id,
-                DBMessage.recipient_id == user.id
-            )
+    states = (
+        MessageParticipantState.query
+        .options(
+            joinedload(MessageParticipantState.message),
+            joinedload(MessageParticipantState.counterparty),
         )
-        .order_by(DBMessage.created_at.desc())
+        .filter(MessageParticipantState.user_id == user.id)
+        .order_by(MessageParticipantState.created_at.desc())
         .all()
     )
 
     rows = []
-    for m in messages_list:
-        other_id = m.recipient_id if m.sender_id == user.id else m.sender_id
-        other = User.query.get(other_id)
+    for st in states:
+        m = st.message
+        other = st.counterparty
 
         rows.append({
             "id": m.id,
@@ -9422,7 +9381,7 @@ def api_customer_messages():
                 if getattr(m, "created_at", None)
                 else ""
             ),
-            "direction": "sent" if m.sender_id == user.id else "received",
+            "direction": "sent" if st.folder == "sent" else "received",
             "other_name": (other.full_name if other else "Administrator") or "Administrator",
         })
 
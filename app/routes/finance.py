@@ -12,13 +12,13 @@ from html import escape
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, send_file, abort, current_app, make_response, jsonify
 from datetime import datetime, date, timedelta, timezone
 from calendar import monthrange
-from weasyprint import HTML
 
 from flask_login import current_user
 from wtforms import StringField, PasswordField, SubmitField
 from wtforms.validators import DataRequired, Email
 
 from sqlalchemy import func, or_
+from sqlalchemy.orm import joinedload
 import sqlalchemy as sa
 
 from app.forms import LoginForm, ExpenseForm
@@ -39,14 +39,43 @@ from app.models import (
     AuditLog,
     ShipmentLog,
     ExpectedPackageCollection,
+    PayslipDelivery,
 )
 from app.utils.expected_collections import calculate_expected_collection
+from app.utils.finance_facts import (
+    PAYMENT_METRICS,
+    REFUND_TYPES,
+    business_bounds,
+    daily_facts,
+    fact_method_totals,
+    fact_methods,
+    fact_totals,
+    monthly_fact_totals,
+)
+from app.utils.db_routing import report_view
+from app.utils.audit import audit_history
 from app.utils.time import to_jamaica
+from app.utils.pdf_cache import cached_pdf_bytes, template_path
+from app.utils.receivables import (
+    aging_buckets,
+    open_invoice_rows,
+    receivables_total,
+    reminder_invoice_rows,
+    status_counts as receivable_status_counts,
+    unpaid_customer_totals,
+)
+from app.utils.pdf_service import render_pdf
+from app.utils.payslip_batch import (
+    build_payslip_zip,
+    payslip_run_is_active,
+    payslip_run_progress,
+    queue_payslip_deliveries,
+    resume_payslip_run,
+    start_payslip_run,
+)
 from app.utils.shipment_profitability import calculate_profitability_report
 from decimal import Decimal, InvalidOperation
 from sqlalchemy.orm import selectinload
-import cloudinary
-import cloudinary.uploader
 
 from app.utils.invoice_totals import fetch_invoice_totals_pg, mark_invoice_packages_delivered
 from app.utils.email_utils import send_email, EMAIL_FROM, EMAIL_ADDRESS
@@ -66,6 +95,8 @@ def _cloudinary_ready():
     ])
 
 def _init_cloudinary_from_config():
+    import cloudinary
+
     cloudinary.config(
         cloud_name=current_app.config["CLOUDINARY_CLOUD_NAME"],
         api_key=current_app.config["CLOUDINARY_API_KEY"],
@@ -98,6 +129,8 @@ def _upload_expense_attachment_to_cloudinary(file_storage):
 
     resource_type = "raw" if ext == ".pdf" else "image"
 
+    import cloudinary.uploader
+
     res = cloudinary.uploader.upload(
         file_storage,
         resource_type=resource_type,
@@ -126,6 +159,8 @@ def _delete_cloudinary_asset(public_id: str, mime: str | None = None):
         return
     _init_cloudinary_from_config()
 
+    import cloudinary.uploader
+
     resource_type = "image" if (mime or "").lower().startswith("image/") else "raw"
     try:
         cloudinary.uploader.destroy(public_id, resource_type=resource_type)
@@ -151,15 +186,6 @@ def _invoice_paid_amount_expr():
     )
 
 
-def _invoice_due_amount_expr():
-    # Prefer grand_total, then amount_due, then amount
-    return func.coalesce(
-        Invoice.grand_total,
-        Invoice.amount_due,
-        Invoice.amount,
-        0.0
-    )
-
 def _invoice_issued_date_expr():
     # COALESCE(i.date_issued, i.date_submitted, i.created_at)
     return func.coalesce(Invoice.date_issued, Invoice.date_submitted, Invoice.created_at)
@@ -234,85 +260,11 @@ def _money(x):
     except Exception:
         return 0.0
 
-def _refund_expense_total(start_date=None, end_date=None):
-    """
-    Sum completed refund payments so they can be treated as finance expenses.
-    Includes:
-      - package_refund
-      - delivery_refund
-    """
-    q = (
-        db.session.query(func.coalesce(func.sum(Payment.amount_jmd), 0.0))
-        .filter(Payment.transaction_type.in_(["package_refund", "delivery_refund"]))
-        .filter(Payment.status == "completed")
-    )
-
-    if start_date:
-        q = q.filter(func.date(Payment.created_at) >= start_date)
-
-    if end_date:
-        q = q.filter(func.date(Payment.created_at) <= end_date)
-
-    return float(q.scalar() or 0.0)
-
 def _get_unpaid_user_rows(search=None, date_from=None, date_to=None):
-    # sum payments per invoice
-    pay_sum = (
-        db.session.query(
-            Payment.invoice_id.label("inv_id"),
-            func.coalesce(func.sum(Payment.amount_jmd), 0).label("paid_jmd"),
-        )
-        .group_by(Payment.invoice_id)
-        .subquery()
-    )
-
-    # owed = (grand_total OR amount_due OR amount) - payments
-    billed_expr = func.coalesce(Invoice.grand_total, Invoice.amount_due, Invoice.amount, 0.0)
-    owed_expr = func.greatest(billed_expr - func.coalesce(pay_sum.c.paid_jmd, 0), 0)
-
-    inv_q = (
-        db.session.query(
-            Invoice.user_id.label("user_id"),
-            func.count(Invoice.id).label("unpaid_count"),
-            func.coalesce(func.sum(owed_expr), 0).label("unpaid_total"),
-        )
-        .outerjoin(pay_sum, pay_sum.c.inv_id == Invoice.id)
-        .filter(func.lower(Invoice.status).in_(("pending", "unpaid", "issued", "partial")))
-        .group_by(Invoice.user_id)
-    )
-
-    # optional date filter (uses invoice created_at; change if you prefer date_issued)
-    if date_from:
-        inv_q = inv_q.filter(func.date(Invoice.created_at) >= date_from)
-    if date_to:
-        inv_q = inv_q.filter(func.date(Invoice.created_at) <= date_to)
-
-    inv_sub = inv_q.subquery()
-
-    q = (
-        db.session.query(
-            User.full_name,
-            User.registration_number,
-            User.email,
-            User.mobile,
-            inv_sub.c.unpaid_count,
-            inv_sub.c.unpaid_total,
-        )
-        .join(inv_sub, inv_sub.c.user_id == User.id)
-    )
-
-    if search:
-        like = f"%{search.strip()}%"
-        q = q.filter(
-            or_(
-                User.full_name.ilike(like),
-                User.email.ilike(like),
-                User.registration_number.ilike(like),
-            )
-        )
-
+    # per-customer open balances from the receivables snapshot,
+    # filtered on invoice issue date like the reminder preview
     rows = []
-    for r in q.order_by(User.full_name.asc()).all():
+    for r in unpaid_customer_totals(search, date_from, date_to):
         rows.append({
             "name": r.full_name,
             "reg": r.registration_number,
@@ -388,6 +340,7 @@ def _static_image_data_uri(filename: str) -> str | None:
 # ---------------------- FINANCE DASHBOARD ---------------------- #
 @finance_bp.route('/dashboard')
 @admin_required(roles=['finance'])
+@report_view
 def finance_dashboard():
     # ---- Period ----
     ym = request.args.get('month')          # 'YYYY-MM'
@@ -404,155 +357,55 @@ def finance_dashboard():
     start_date = datetime.fromisoformat(start).date()
     end_date = datetime.fromisoformat(end).date()
 
-    issued_date_expr = _invoice_issued_date_expr()
     paid_date_expr = _invoice_paid_date_expr()
     amt_paid_expr = _invoice_paid_amount_expr()
-    amt_due_expr = _invoice_due_amount_expr()
-
-    open_statuses = ['pending', 'issued', 'unpaid', 'partial']
 
     # ---- KPIs ----
 
-    # Total paid in period
-    total_paid = (
-        db.session.query(
-            func.coalesce(
-                func.sum(amt_paid_expr),
-                0.0
-            )
-        )
-        .filter(func.lower(Invoice.status) == 'paid')
-        .filter(func.date(paid_date_expr).between(start_date, end_date))
-        .scalar() or 0.0
-    )
+    # Pre-aggregated per Jamaica business day (see app/utils/finance_facts.py)
+    totals = fact_totals(start_date, end_date)
 
-   
-    manual_expenses = (
-        db.session.query(func.coalesce(func.sum(Expense.amount), 0.0))
-        .filter(func.date(Expense.date).between(start_date, end_date))
-        .scalar() or 0.0
-    )
+    def _total(metric):
+        return totals.get(metric, {}).get("amount", 0.0)
 
-    refund_expenses = _refund_expense_total(start_date, end_date)
+    # Total paid in period
+    total_paid = _total("invoice_paid")
 
-    total_expenses = float(manual_expenses or 0.0) + float(refund_expenses or 0.0)
+    manual_expenses = _total("expense")
+    refund_expenses = sum(_total(m) for m in REFUND_TYPES)
 
-    # Receivables for the period
-    total_amount_due = (
-        db.session.query(
-            func.coalesce(
-                func.sum(amt_due_expr),
-                0.0
-            )
-        )
-        .filter(amt_due_expr > 0)
-        .filter(func.lower(Invoice.status).in_(open_statuses))
-        .filter(func.date(issued_date_expr).between(start_date, end_date))
-        .scalar() or 0.0
-    )
+    total_expenses = float(manual_expenses or 0.0) + float(refund_expenses or 0.0)
 
-    # All-time outstanding
-    total_amount_due_all = (
-        db.session.query(
-            func.coalesce(
-                func.sum(amt_due_expr),
-                0.0
-            )
-        )
-        .filter(amt_due_expr > 0)
-        .filter(func.lower(Invoice.status).in_(open_statuses))
-        .scalar() or 0.0
-    )
+    # Receivables for the period / all-time (see app/utils/receivables.py)
+    total_amount_due = receivables_total(start_date, end_date)
+    total_amount_due_all = receivables_total()
 
     net = total_paid - total_expenses
 
     # ---- Charts ----
 
     # Paid trend (daily)
-    paid_trend_rows = (
-        db.session.query(
-            func.date(paid_date_expr).label('d'),
-            func.coalesce(func.sum(amt_paid_expr), 0.0).label('total'),
-        )
-        .filter(func.lower(Invoice.status) == 'paid')
-        .filter(func.date(paid_date_expr).between(start_date, end_date))
-        .group_by(func.date(paid_date_expr))
-        .order_by(func.date(paid_date_expr))
-        .all()
-    )
-    paid_labels = [
-        (r.d.isoformat() if isinstance(r.d, (datetime, date)) else str(r.d))
-        for r in paid_trend_rows
-    ]
-    paid_values = [float(r.total or 0) for r in paid_trend_rows]
-
-    # Expense mix by category
-    expense_mix_rows = (
-        db.session.query(
-            Expense.category.label('category'),
-            func.coalesce(func.sum(Expense.amount), 0.0).label('total'),
-        )
-        .filter(func.date(Expense.date).between(start_date, end_date))
-        .group_by(Expense.category)
-        .order_by(func.coalesce(func.sum(Expense.amount), 0.0).desc())
-        .all()
-    )
-
-    exp_map = {str(r.category): float(r.total or 0) for r in expense_mix_rows}
-
-    refund_mix_rows = (
-        db.session.query(
-            Payment.transaction_type.label("category"),
-            func.coalesce(func.sum(Payment.amount_jmd), 0.0).label("total"),
-        )
-        .filter(Payment.transaction_type.in_(["package_refund", "delivery_refund"]))
-        .filter(Payment.status == "completed")
-        .filter(func.date(Payment.created_at).between(start_date, end_date))
-        .group_by(Payment.transaction_type)
-        .all()
-    )
+    paid_trend_rows = daily_facts(start_date, end_date, metrics=["invoice_paid"])
+    paid_labels = [r.business_date.isoformat() for r in paid_trend_rows]
+    paid_values = [float(r.amount or 0) for r in paid_trend_rows]
+
+    # Expense mix by category, refunds as their own slices
+    refund_labels = {
+        "package_refund": "Package Refund",
+        "delivery_refund": "Delivery Refund",
+    }
+    exp_map = {}
 
-    for r in refund_mix_rows:
-        if r.category == "package_refund":
-            label = "Package Refund"
-        elif r.category == "delivery_refund":
-            label = "Delivery Refund"
-        else:
-            label = "Refund"
+    for r in fact_method_totals(start_date, end_date, metrics=("expense",) + REFUND_TYPES):
+        label = r.method if r.metric == "expense" else refund_labels.get(r.metric, "Refund")
+        exp_map[label] = exp_map.get(label, 0.0) + float(r.amount or 0)
 
-        exp_map[label] = exp_map.get(label, 0.0) + float(r.total or 0)
+    exp_mix = sorted(exp_map.items(), key=lambda kv: kv[1], reverse=True)
+    exp_labels = [label for label, _ in exp_mix]
+    exp_values = [total for _, total in exp_mix]
 
-    exp_labels = [r.category for r in expense_mix_rows]
-    exp_values = [float(r.total or 0) for r in expense_mix_rows]
-
-    # A/R aging – do buckets in Python for portability
-    open_invoices = (
-        db.session.query(Invoice)
-        .filter(amt_due_expr > 0)
-        .filter(func.lower(Invoice.status).in_(open_statuses))
-        .filter(func.date(issued_date_expr).between(start_date, end_date))
-        .all()
-    )
-    today = date.today()
-    aging = {'0-30': 0.0, '31-60': 0.0, '61-90': 0.0, '91+': 0.0}
-
-    for inv in open_invoices:
-        base_dt = inv.date_issued or inv.date_submitted or inv.created_at
-        if not base_dt:
-            continue
-        base_date = base_dt.date() if isinstance(base_dt, datetime) else base_dt
-        days = (today - base_date).days
-        # Prefer outstanding if present, otherwise fall back to full billed
-        due_amt = float(inv.amount_due or inv.grand_total or inv.amount or 0.0)
-
-        if days <= 30:
-            aging['0-30'] += due_amt
-        elif 31 <= days <= 60:
-            aging['31-60'] += due_amt
-        elif 61 <= days <= 90:
-            aging['61-90'] += due_amt
-        else:
-            aging['91+'] += due_amt
+    # A/R aging of invoices issued in the period
+    aging = aging_buckets(start_date, end_date)
 
     # Top customers (paid)
     top_customers_rows = (
@@ -598,21 +451,6 @@ def finance_dashboard():
         for r in paid_rows_raw
     ]
 
-    due_rows_raw = (
-        db.session.query(
-            Invoice.id.label('invoice_id'),
-            Invoice.invoice_number,
-            User.full_name.label('customer'),
-            amt_due_expr.label('amount_due'),
-            func.date(issued_date_expr).label('date_issued'),
-        )
-        .join(User, User.id == Invoice.user_id)
-        .filter(amt_due_expr > 0)
-        .filter(func.lower(Invoice.status).in_(open_statuses))
-        .filter(func.date(issued_date_expr).between(start_date, end_date))
-        .order_by(func.date(issued_date_expr).desc())
-        .all()
-    )
     due_rows = [
         {
             'invoice_id': r.invoice_id,
@@ -621,7 +459,7 @@ def finance_dashboard():
             'amount_due': float(r.amount_due or 0),
             'date_issued': r.date_issued,
         }
-        for r in due_rows_raw
+        for r in open_invoice_rows(start=start_date, end=end_date)
     ]
 
     user_role = getattr(current_user, 'role', 'Admin')
@@ -690,55 +528,26 @@ def unpaid_invoices():
     except ValueError:
         max_due = None
 
-    issued_date_expr = _invoice_issued_date_expr()
-    amt_due_expr = func.coalesce(
-        Invoice.amount_due,
-        Invoice.grand_total,
-        Invoice.amount,
-        0.0
-    )
-
-    query = (
-        db.session.query(
-            Invoice.id.label('invoice_id'),
-            Invoice.invoice_number,
-            User.full_name.label('customer'),
-            User.registration_number,
-            Invoice.status,
-            amt_due_expr.label('amount_due'),
-            func.date(issued_date_expr).label('date_issued'),
-        )
-        .join(User, User.id == Invoice.user_id)
-        .filter(amt_due_expr > 0)
-        .filter(func.lower(Invoice.status).in_(status_list))
-    )
-
     # ✅ IMPORTANT: only apply date filter if user actually chose it
+    start_date = None
+    end_date = None
     if start and end:
         start_date = datetime.fromisoformat(start).date()
         end_date = datetime.fromisoformat(end).date()
-        query = query.filter(func.date(issued_date_expr).between(start_date, end_date))
     else:
         # so template inputs don't look broken
         start = ''
         end = ''
 
-    if q:
-        like = f"%{q.lower()}%"
-        query = query.filter(
-            or_(
-                func.lower(func.coalesce(User.full_name, '')).like(like),
-                func.lower(func.coalesce(User.registration_number, '')).like(like),
-                func.lower(func.coalesce(Invoice.invoice_number, '')).like(like),
-            )
-        )
-
-    if min_due is not None:
-        query = query.filter(amt_due_expr >= min_due)
-    if max_due is not None:
-        query = query.filter(amt_due_expr <= max_due)
-
-    invoices_raw = query.order_by(func.date(issued_date_expr).desc()).all()
+    # Open invoices come from the receivables snapshot (app/utils/receivables.py)
+    invoices_raw = open_invoice_rows(
+        statuses=status_list,
+        start=start_date,
+        end=end_date,
+        search=q,
+        min_due=min_due,
+        max_due=max_due,
+    )
 
     invoices = [
         {
@@ -756,13 +565,7 @@ def unpaid_invoices():
     total_due = sum(r['amount_due'] for r in invoices)
 
     # ✅ counts for all outstanding by status
-    status_counts_rows = (
-        db.session.query(func.lower(Invoice.status).label('s'), func.count(Invoice.id).label('cnt'))
-        .filter(amt_due_expr > 0)
-        .group_by(func.lower(Invoice.status))
-        .all()
-    )
-    status_counts = {r.s: r.cnt for r in status_counts_rows}
+    status_counts = receivable_status_counts()
 
     return render_template(
         'admin/finance/unpaid_invoices.html',
@@ -839,7 +642,7 @@ def _render_unpaid_users_pdf(send_email: bool = False):
         logo_data_uri=logo_data_uri,
     )
 
-    pdf = HTML(string=html, base_url=request.url_root).write_pdf()
+    pdf = render_pdf(html=html)
 
     if send_email:
         _send_unpaid_report_email(pdf_bytes=pdf, generated_at=generated_at)
@@ -912,97 +715,8 @@ def unpaid_users_reminder_preview():
     date_to = (request.args.get("date_to") or "").strip() or None
 
     try:
-        # Sum completed payments per invoice.
-        payment_sum = (
-            db.session.query(
-                Payment.invoice_id.label("invoice_id"),
-                func.coalesce(
-                    func.sum(Payment.amount_jmd),
-                    0.0
-                ).label("paid_total"),
-            )
-            .filter(
-                func.lower(
-                    func.coalesce(Payment.status, "completed")
-                ) == "completed"
-            )
-            .group_by(Payment.invoice_id)
-            .subquery()
-        )
-
-        billed_amount = func.coalesce(
-            Invoice.grand_total,
-            Invoice.amount_due,
-            Invoice.amount,
-            0.0,
-        )
-
-        remaining_balance = func.greatest(
-            billed_amount -
-            func.coalesce(payment_sum.c.paid_total, 0.0),
-            0.0,
-        )
-
-        issued_date = func.coalesce(
-            Invoice.date_issued,
-            Invoice.date_submitted,
-            Invoice.created_at,
-        )
-
-        query = (
-            db.session.query(
-                User.id.label("user_id"),
-                User.full_name.label("customer_name"),
-                User.email.label("customer_email"),
-                User.registration_number.label("registration_number"),
-                Invoice.id.label("invoice_id"),
-                Invoice.invoice_number.label("invoice_number"),
-                issued_date.label("invoice_date"),
-                remaining_balance.label("balance_due"),
-            )
-            .join(User, User.id == Invoice.user_id)
-            .outerjoin(
-                payment_sum,
-                payment_sum.c.invoice_id == Invoice.id,
-            )
-            .filter(
-                func.lower(Invoice.status).in_(
-                    ("pending", "unpaid", "issued", "partial")
-                )
-            )
-            .filter(remaining_balance > 0)
-        )
-
-        if search:
-            like = f"%{search}%"
-
-            query = query.filter(
-                or_(
-                    User.full_name.ilike(like),
-                    User.email.ilike(like),
-                    User.registration_number.ilike(like),
-                )
-            )
-
-        if date_from:
-            query = query.filter(
-                func.date(issued_date) >= date_from
-            )
-
-        if date_to:
-            query = query.filter(
-                func.date(issued_date) <= date_to
-            )
-
-        results = (
-            query
-            .order_by(
-                User.full_name.asc(),
-                issued_date.asc(),
-                Invoice.id.asc(),
-            )
-            .all()
-        )
+        # Open invoices with a balance, from the receivables snapshot
+        results = reminder_invoice_rows(search, date_from, date_to)
 
         grouped = {}
 
@@ -1112,123 +826,12 @@ def send_collections_reminders():
     date_from = (data.get("date_from") or "").strip() or None
     date_to = (data.get("date_to") or "").strip() or None
 
-    open_statuses = (
-        "pending",
-        "unpaid",
-        "issued",
-        "partial",
-    )
-
     try:
         # -----------------------------------------
-        # Completed payments grouped by invoice
-        # -----------------------------------------
-        payment_sum = (
-            db.session.query(
-                Payment.invoice_id.label("invoice_id"),
-                func.coalesce(
-                    func.sum(Payment.amount_jmd),
-                    0.0,
-                ).label("paid_total"),
-            )
-            .filter(
-                func.lower(
-                    func.coalesce(
-                        Payment.status,
-                        "completed",
-                    )
-                ) == "completed"
-            )
-            .group_by(Payment.invoice_id)
-            .subquery()
-        )
-
-        billed_amount = func.coalesce(
-            Invoice.grand_total,
-            Invoice.amount_due,
-            Invoice.amount,
-            0.0,
-        )
-
-        remaining_balance = func.greatest(
-            billed_amount
-            - func.coalesce(
-                payment_sum.c.paid_total,
-                0.0,
-            ),
-            0.0,
-        )
-
-        issued_date = func.coalesce(
-            Invoice.date_issued,
-            Invoice.date_submitted,
-            Invoice.created_at,
-        )
-
-        query = (
-            db.session.query(
-                User.id.label("user_id"),
-                User.full_name.label("customer_name"),
-                User.email.label("customer_email"),
-                User.registration_number.label(
-                    "registration_number"
-                ),
-                Invoice.id.label("invoice_id"),
-                Invoice.invoice_number.label(
-                    "invoice_number"
-                ),
-                issued_date.label("invoice_date"),
-                remaining_balance.label("balance_due"),
-            )
-            .join(
-                User,
-                User.id == Invoice.user_id,
-            )
-            .outerjoin(
-                payment_sum,
-                payment_sum.c.invoice_id == Invoice.id,
-            )
-            .filter(
-                func.lower(Invoice.status).in_(
-                    open_statuses
-                )
-            )
-            .filter(remaining_balance > 0)
-        )
-
-        # -----------------------------------------
-        # Apply the same filters as the preview
+        # Open invoices with a balance, from the
+        # receivables snapshot (same rows as the preview)
         # -----------------------------------------
-        if search:
-            like = f"%{search}%"
-
-            query = query.filter(
-                or_(
-                    User.full_name.ilike(like),
-                    User.email.ilike(like),
-                    User.registration_number.ilike(like),
-                )
-            )
-
-        if date_from:
-            query = query.filter(
-                func.date(issued_date) >= date_from
-            )
-
-        if date_to:
-            query = query.filter(
-                func.date(issued_date) <= date_to
-            )
-
-        rows = (
-            query
-            .order_by(
-                User.full_name.asc(),
-                issued_date.asc(),
-                Invoice.id.asc(),
-            )
-            .all()
-        )
+        rows = reminder_invoice_rows(search, date_from, date_to)
 
         # -----------------------------------------
         # Group invoices by customer
@@ -2732,6 +2335,7 @@ def expense_audit_logs():
 # ---------------------- MONTHLY INCOME ---------------------- #
 @finance_bp.route('/monthly-income')
 @admin_required(roles=['finance'])
+@report_view
 def monthly_income():
     today = date.today()
     default_start = date(today.year, today.month, 1)
@@ -2826,34 +2430,15 @@ def monthly_income():
 
     total_income = sum(r["amount"] for r in incomes)
 
-    methods = [
-        x[0] for x in (
-            db.session.query(Payment.method)
-            .filter(Payment.method.isnot(None))
-            .distinct()
-            .order_by(Payment.method.asc())
-            .all()
-        )
-        if x[0]
-    ]
+    methods = fact_methods(PAYMENT_METRICS)
 
-    daily_paid_raw = (
-        db.session.query(
-            func.date(Payment.created_at).label("d"),
-            func.coalesce(func.sum(Payment.amount_jmd), 0.0).label("total"),
-        )
-        .filter(func.date(Payment.created_at).between(start_date, end_date))
-        .filter(func.lower(func.coalesce(Payment.status, "completed")) == "completed")
-        .group_by(func.date(Payment.created_at))
-        .order_by(func.date(Payment.created_at))
-        .all()
-    )
+    # Every completed payment (refunds included) per business day
+    daily_paid = {}
+    for r in daily_facts(start_date, end_date, metrics=PAYMENT_METRICS):
+        daily_paid[r.business_date] = daily_paid.get(r.business_date, 0.0) + float(r.amount or 0)
 
-    chart_labels = [
-        r.d.isoformat() if isinstance(r.d, date) else str(r.d)
-        for r in daily_paid_raw
-    ]
-    chart_values = [float(r.total or 0) for r in daily_paid_raw]
+    chart_labels = [d.isoformat() for d in daily_paid]
+    chart_values = list(daily_paid.values())
 
     due_rows_query = (
         db.session.query(
@@ -3119,6 +2704,7 @@ Foreign A Foot Logistics Limited
 # ---------------------- MONTHLY PROFIT/LOSS ---------------------- #
 @finance_bp.route('/monthly_profit_loss')
 @admin_required(roles=['finance'])
+@report_view
 def monthly_profit_loss():
     today = date.today()
     current_month_key = today.strftime('%Y-%m')
@@ -3159,108 +2745,23 @@ def monthly_profit_loss():
     end_date = datetime.fromisoformat(end_date).date()
 
     # -----------------------------
-    # Income = actual completed payments
-    # -----------------------------
-    payment_rows = (
-        db.session.query(
-            Payment.amount_jmd.label("amount"),
-            Payment.created_at.label("date_paid"),
-        )
-        .filter(func.date(Payment.created_at).between(start_date, end_date))
-        .filter(func.lower(func.coalesce(Payment.status, "completed")) == "completed")
-        .filter(
-            or_(
-                Payment.transaction_type.is_(None),
-                ~Payment.transaction_type.in_(["package_refund", "delivery_refund"]),
-            )
-        )
-        .all()
-    )
-
-    for r in payment_rows:
-        if not r.date_paid:
-            continue
-
-        d = r.date_paid.date() if isinstance(r.date_paid, datetime) else r.date_paid
-        key = d.strftime("%Y-%m")
-
-        if key in monthly_data:
-            monthly_data[key]["income"] += float(r.amount or 0)
-
-    # -----------------------------
-    # Manual expenses
-    # -----------------------------
-    expense_rows = (
-        db.session.query(
-            Expense.amount.label("amount"),
-            Expense.date.label("date"),
-            Expense.category.label("category"),
-        )
-        .filter(func.date(Expense.date).between(start_date, end_date))
-        .all()
-    )
-
-    for r in expense_rows:
-        if not r.date:
-            continue
-
-        d = r.date if isinstance(r.date, date) else r.date.date()
-        key = d.strftime("%Y-%m")
-
-        if key in monthly_data:
-            monthly_data[key]["manual_expenses"] += float(r.amount or 0)
-
-    # -----------------------------
-    # Refund expenses
-    # -----------------------------
-    refund_rows = (
-        db.session.query(
-            Payment.amount_jmd.label("amount"),
-            Payment.created_at.label("date"),
-            Payment.transaction_type.label("transaction_type"),
-        )
-        .filter(Payment.transaction_type.in_(["package_refund", "delivery_refund"]))
-        .filter(func.lower(func.coalesce(Payment.status, "completed")) == "completed")
-        .filter(func.date(Payment.created_at).between(start_date, end_date))
-        .all()
-    )
-
-    for r in refund_rows:
-        if not r.date:
-            continue
-
-        d = r.date.date() if isinstance(r.date, datetime) else r.date
-        key = d.strftime("%Y-%m")
-
-        if key in monthly_data:
-            monthly_data[key]["refund_expenses"] += float(r.amount or 0)
-
-    # -----------------------------
-    # Payroll expenses
-    # Uses PayrollRun paid date if available.
-    # Falls back to created_at.
+    # One pre-aggregated row per month and metric
+    # (see app/utils/finance_facts.py):
+    #   income   = completed non-refund payments
+    #   refunds  = completed package/delivery refunds
+    #   expenses = manual expenses
+    #   payroll  = paid payroll runs (paid date, else created date)
     # -----------------------------
-    payroll_date_expr = func.coalesce(PayrollRun.paid_at, PayrollRun.created_at)
-
-    payroll_rows = (
-        db.session.query(
-            PayrollRun.total_net.label("amount"),
-            payroll_date_expr.label("payroll_date"),
-        )
-        .filter(func.lower(func.coalesce(PayrollRun.status, "")) == "paid")
-        .filter(func.date(payroll_date_expr).between(start_date, end_date))
-        .all()
-    )
+    pl_metrics = ("income", "expense", "payroll") + REFUND_TYPES
 
-    for r in payroll_rows:
-        if not r.payroll_date:
+    for key, metrics in monthly_fact_totals(start_date, end_date, metrics=pl_metrics).items():
+        if key not in monthly_data:
             continue
 
-        d = r.payroll_date.date() if isinstance(r.payroll_date, datetime) else r.payroll_date
-        key = d.strftime("%Y-%m")
-
-        if key in monthly_data:
-            monthly_data[key]["payroll_expenses"] += float(r.amount or 0)
+        monthly_data[key]["income"] += metrics.get("income", 0.0)
+        monthly_data[key]["manual_expenses"] += metrics.get("expense", 0.0)
+        monthly_data[key]["refund_expenses"] += sum(metrics.get(m, 0.0) for m in REFUND_TYPES)
+        monthly_data[key]["payroll_expenses"] += metrics.get("payroll", 0.0)
 
     # -----------------------------
     # Final calculations
@@ -3330,6 +2831,7 @@ def monthly_profit_loss():
 
 @finance_bp.route('/monthly-pl/<month>')
 @admin_required(roles=['finance'])
+@report_view
 def monthly_pl_detail(month):
     start, end = _month_bounds(month)
 
@@ -3357,12 +2859,32 @@ def monthly_pl_detail(month):
         .all()
     )
 
+    # Month totals, same figures as the P&L summary row
+    totals = fact_totals(start_date, end_date, metrics=("income", "expense", "payroll") + REFUND_TYPES)
+
+    def _total(metric):
+        return totals.get(metric, {}).get("amount", 0.0)
+
+    income = _total("income")
+    refund_expenses = sum(_total(m) for m in REFUND_TYPES)
+    total_expenses = _total("expense") + refund_expenses + _total("payroll")
+
+    month_totals = {
+        "income": income,
+        "manual_expenses": _total("expense"),
+        "refund_expenses": refund_expenses,
+        "payroll_expenses": _total("payroll"),
+        "expenses": total_expenses,
+        "profit": income - total_expenses,
+    }
+
     return render_template(
         "admin/finance/monthly_pl_detail.html",
         month=month,
         payments=payments,
         expenses=expenses,
-        payroll=payroll
+        payroll=payroll,
+        month_totals=month_totals,
     )
 
 @finance_bp.route('/monthly-pl/pdf')
@@ -3373,7 +2895,7 @@ def monthly_pl_pdf():
         summary=summary   # reuse your existing data
     )
 
-    pdf = HTML(string=html).write_pdf()
+    pdf = render_pdf(html=html)
 
     return Response(
         pdf,
@@ -3463,8 +2985,7 @@ def _build_customer_statement_pdf(user_id, start="", end=""):
 
         row["balance"] = balance
 
-    html = render_template(
-        "admin/finance/customer_statement_pdf.html",
+    context = dict(
         user=user,
         rows=rows,
         total_invoiced=total_invoiced,
@@ -3472,10 +2993,25 @@ def _build_customer_statement_pdf(user_id, start="", end=""):
         balance=balance,
         start=start,
         end=end,
-        generated_at=datetime.now(),
     )
+    base_url = request.url_root
 
-    pdf = HTML(string=html, base_url=request.url_root).write_pdf()
+    def _render():
+        html = render_template(
+            "admin/finance/customer_statement_pdf.html",
+            generated_at=datetime.now(),
+            **context,
+        )
+        return render_pdf(html=html, base_url=base_url)
+
+    # generated_at is left out of the key: an unchanged ledger reuses the
+    # PDF rendered when it was last generated.
+    pdf = cached_pdf_bytes(
+        "customer_statement",
+        dict(context, user_name=user.full_name, user_code=user.registration_number),
+        _render,
+        template_files=(template_path("admin/finance/customer_statement_pdf.html"),),
+    )
     filename = f"statement_{user.registration_number or user.id}.pdf"
 
     return user, pdf, filename, balance
@@ -4139,7 +3675,7 @@ def payslip_pdf(item_id):
         pdf_mode=True
     )
 
-    pdf = HTML(string=html, base_url=request.url_root).write_pdf()
+    pdf = render_pdf(html=html)
 
     filename = f"payslip_{item.user.full_name if item.user else item.id}_{run.period_start}_{run.period_end}.pdf"
     filename = secure_filename(filename)
@@ -4173,7 +3709,7 @@ def email_payslip(item_id):
         pdf_mode=True
     )
 
-    pdf = HTML(string=html, base_url=request.url_root).write_pdf()
+    pdf = render_pdf(html=html)
 
     employee_name = user.full_name or user.email
     subject = f"Payslip for {run.period_start} to {run.period_end}"
@@ -4220,6 +3756,7 @@ Foreign A Foot Logistics Limited
 
 @finance_bp.route("/payroll/<int:run_id>/export")
 @admin_required(roles=["finance"])
+@report_view
 def export_payroll(run_id):
     import csv
     from io import StringIO
@@ -4373,69 +3910,116 @@ def bulk_email_payslips(run_id):
         flash("Select at least one employee.", "warning")
         return redirect(url_for("finance.payroll_detail", run_id=run_id))
 
-    sent = 0
-    failed = 0
+    queued = queue_payslip_deliveries(run, item_ids)
 
-    for item in PayrollItem.query.filter(PayrollItem.id.in_(item_ids)).all():
-        user = item.user
+    if queued:
+        start_payslip_run(run.id)
+        flash(f"{queued} payslip(s) queued for email.", "success")
+    else:
+        flash("Nothing to send - selected payslips were already sent or have no email.", "warning")
 
-        if not user or not user.email:
-            failed += 1
-            continue
+    return redirect(url_for("finance.payslip_run_status", run_id=run_id))
 
-        html = render_template(
-            "admin/finance/payslip.html",
-            item=item,
-            run=run,
-            pdf_mode=True
+
+@finance_bp.route("/payroll/<int:run_id>/payslips/status")
+@admin_required(roles=["finance"])
+def payslip_run_status(run_id):
+    run = PayrollRun.query.get_or_404(run_id)
+
+    deliveries = (
+        PayslipDelivery.query
+        .options(joinedload(PayslipDelivery.user))
+        .filter(PayslipDelivery.payroll_run_id == run.id)
+        .order_by(PayslipDelivery.id.asc())
+        .all()
+    )
+
+    return render_template(
+        "admin/finance/payslip_run_status.html",
+        run=run,
+        deliveries=deliveries,
+        progress=payslip_run_progress(run.id),
+    )
+
+
+@finance_bp.route("/payroll/<int:run_id>/payslips/status.json")
+@admin_required(roles=["finance"])
+def payslip_run_status_json(run_id):
+    PayrollRun.query.get_or_404(run_id)
+
+    rows = (
+        db.session.query(
+            PayslipDelivery.id,
+            PayslipDelivery.status,
+            PayslipDelivery.last_error,
+            PayslipDelivery.sent_at,
         )
+        .filter(PayslipDelivery.payroll_run_id == run_id)
+        .all()
+    )
 
-        pdf = HTML(string=html, base_url=request.url_root).write_pdf()
+    return jsonify({
+        "progress": payslip_run_progress(run_id),
+        "deliveries": [
+            {
+                "id": r.id,
+                "status": r.status,
+                "last_error": r.last_error,
+                "sent_at": r.sent_at.isoformat() if r.sent_at else None,
+            }
+            for r in rows
+        ],
+    })
 
-        subject = f"Payslip for {run.period_start} to {run.period_end}"
 
-        plain_body = f"""
-Hi {user.full_name},
+@finance_bp.route("/payroll/<int:run_id>/payslips/resume", methods=["POST"])
+@admin_required(roles=["finance"])
+def resume_payslip_emails(run_id):
+    run = PayrollRun.query.get_or_404(run_id)
 
-Please find attached your payslip.
+    if payslip_run_is_active(run.id):
+        flash("This payslip run is still in progress.", "info")
+        return redirect(url_for("finance.payslip_run_status", run_id=run.id))
 
-Net Pay: JMD {float(item.net_pay or 0):,.2f}
+    queued = resume_payslip_run(run)
 
-Foreign A Foot Logistics
-""".strip()
+    if queued:
+        start_payslip_run(run.id)
+        flash(f"Resumed: {queued} unsent payslip(s) queued. Sent payslips will not be re-sent.", "success")
+    else:
+        flash("Nothing left to send for this payroll run.", "info")
 
-        ok = send_email(
-            to_email=user.email,
-            subject=subject,
-            plain_body=plain_body,
-            html_body=html,
-            attachments=[(pdf, f"payslip_{item.id}.pdf", "application/pdf")],
-            recipient_user_id=user.id,
-        )
+    return redirect(url_for("finance.payslip_run_status", run_id=run.id))
 
-        if ok:
-            sent += 1
-        else:
-            failed += 1
 
-    flash(f"{sent} payslips sent, {failed} failed.", "success" if sent else "warning")
+@finance_bp.route("/payroll/<int:run_id>/payslips.zip")
+@admin_required(roles=["finance"])
+def download_payslips_zip(run_id):
+    run = PayrollRun.query.get_or_404(run_id)
+
+    buf, failed = build_payslip_zip(run)
+
+    if failed:
+        current_app.logger.warning(
+            "Payslip zip for run %s skipped items %s (render failed)", run.id, failed
+        )
 
-    return redirect(url_for("finance.payroll_detail", run_id=run_id))
+    return send_file(
+        buf,
+        mimetype="application/zip",
+        as_attachment=True,
+        download_name=f"payslips_{run.period_start}_{run.period_end}.zip",
+    )
 
 @finance_bp.route("/payroll/employees/<int:emp_id>/history")
 @admin_required(roles=["finance"])
 def payroll_employee_history(emp_id):
     emp = EmployeePayroll.query.get_or_404(emp_id)
 
-    logs = (
-        AuditLog.query
-        .filter(
-            AuditLog.module == "Finance",
-            AuditLog.entity_type == "EmployeePayroll",
-            AuditLog.entity_id == emp.id
-        )
-        .order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
-        .all()
+    logs = audit_history(
+        "EmployeePayroll",
+        emp.id,
+        module="Finance",
     )
 
     return render_template(
@@ -4533,6 +4117,7 @@ def bulk_reactivate_payroll_employees():
 
 @finance_bp.route("/monthly-income/daily-sales")
 @admin_required(roles=["finance"])
+@report_view
 def daily_sales_report():
     today = date.today()
     default_start = date(today.year, today.month, 1)
@@ -4553,30 +4138,17 @@ def daily_sales_report():
         end_date = default_end
         end = default_end.isoformat()
 
-    rows_raw = (
-        db.session.query(
-            func.date(Payment.created_at).label("sale_date"),
-            Payment.method.label("method"),
-            func.count(Payment.id).label("payment_count"),
-            func.coalesce(func.sum(Payment.amount_jmd), 0.0).label("total_sales"),
-        )
-        .filter(func.date(Payment.created_at).between(start_date, end_date))
-        .filter(func.lower(func.coalesce(Payment.status, "completed")) == "completed")
-        .group_by(
-            func.date(Payment.created_at),
-            Payment.method
-        )
-        .order_by(func.date(Payment.created_at).desc())
-        .all()
-    )
+    # Completed payments (refunds included) per business day and tender,
+    # from finance_daily_facts
+    rows_raw = daily_facts(start_date, end_date, metrics=PAYMENT_METRICS)
 
     by_day = {}
 
     for r in rows_raw:
-        d = r.sale_date
+        d = r.business_date
         method = (r.method or "Other").strip()
-        amount = float(r.total_sales or 0)
-        count = int(r.payment_count or 0)
+        amount = float(r.amount or 0)
+        count = int(r.count or 0)
 
         if d not in by_day:
             by_day[d] = {
@@ -4633,6 +4205,7 @@ def daily_sales_report():
 
 @finance_bp.route("/monthly-income/daily-sales/<sale_date>")
 @admin_required(roles=["finance"])
+@report_view
 def daily_sales_detail(sale_date):
     try:
         selected_date = datetime.fromisoformat(sale_date).date()
@@ -4640,6 +4213,9 @@ def daily_sales_detail(sale_date):
         flash("Invalid sales date.", "danger")
         return redirect(url_for("finance.daily_sales_report"))
 
+    # same Jamaica business day the daily sales report is keyed on
+    day_start, day_end = business_bounds(selected_date)
+
     rows_raw = (
         db.session.query(
             Payment.id.label("payment_id"),
@@ -4656,7 +4232,7 @@ def daily_sales_detail(sale_date):
         )
         .outerjoin(Invoice, Invoice.id == Payment.invoice_id)
         .outerjoin(User, User.id == Payment.user_id)
-        .filter(func.date(Payment.created_at) == selected_date)
+        .filter(Payment.created_at >= day_start, Payment.created_at < day_end)
         .filter(func.lower(func.coalesce(Payment.status, "completed")) == "completed")
         .order_by(Payment.created_at.asc())
         .all()
@@ -4693,6 +4269,7 @@ def daily_sales_detail(sale_date):
 
 @finance_bp.route("/shipment-profitability")
 @admin_required(roles=["finance"])
+@report_view
 def shipment_profitability():
     current_app.logger.info("[PROFIT] Route started")
 
@@ -5625,7 +5202,7 @@ def expected_package_collection_pdf(collection_id):
         record=record,
         logo_data_uri=_static_image_data_uri("logo.png"),
     )
-    pdf = HTML(string=html, base_url=request.url_root).write_pdf()
+    pdf = render_pdf(html=html)
     filename = f"{record.collection_number}_expected_collection.pdf"
     return send_file(
         BytesIO(pdf),
@@ -36,24 +36,9 @@ from flask import (
 )
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
-import pandas as pd
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_RIGHT
-from reportlab.platypus import (
-    SimpleDocTemplate,
-    Table,
-    TableStyle,
-    Paragraph,
-    Spacer,
-    Image,
-)
 from sqlalchemy import func, or_, and_, asc, desc, cast, distinct
 from sqlalchemy.types import Date
-from weasyprint import HTML
+from sqlalchemy.orm import selectinload
 
 from app.extensions import db
 from app.routes.admin_auth_routes import admin_required
@@ -72,9 +57,10 @@ from app.models import (
     ScheduledPickup,
     PackageAttachment,
     ShipmentScanLog,
+    ShipmentScanLogArchive,
 )
 from app.models import Message as DBMessage
-from app.models import normalize_tracking
+from app.models import normalize_email, normalize_tracking
 from app.models import (
     PurchaseRequest,
     PurchaseRequestItem,
@@ -90,6 +76,8 @@ from app.forms import (
     ScheduledDeliveryForm,
 )
 from app.utils.file_url import is_url
+from app.utils.finance_facts import remove_facts_for
+from app.utils.receivables import refresh_receivables
 from app.utils import email_utils, update_wallet
 from app.utils.wallet import process_first_shipment_bonus
 from app.utils.subscription_utils import (
@@ -104,6 +92,8 @@ from app.utils.delivery_engine import (
     calculate_real_distance,
 )
 from app.utils.invoice_totals import fetch_invoice_totals_pg
+from app.utils.invoice_pdf import prerender_invoice_pdfs
+from app.utils.pdf_service import render_pdf
 from app.utils.expected_collections import calculate_expected_collection
 from app.utils.scheduled_pickups import (
     sync_scheduled_pickups_for_delivered_package,
@@ -112,6 +102,7 @@ from app.utils.sorting_codes import (
     SORT_CODE_LABELS,
     VALID_SORT_CODES,
     apply_customer_default_to_package,
+    bulk_apply_customer_default_sort_codes,
     normalize_sort_code,
     set_package_sort_code,
     sort_code_label,
@@ -127,15 +118,14 @@ from app.utils.files import allowed_file
 from app.utils.prealert_sync import sync_package_and_prealert
 from app.utils.time import to_jamaica
 
-from app.utils.shop_for_me_utils import (
-    link_shop_for_me_package,
-)
+from app.utils.prealert_reconcile import reconcile_packages, reconcile_shipment
 
 from app.utils.unassigned import (
     ensure_unassigned_user,
     get_unassigned_user_id,
     is_pkg_unassigned,
 )
+from app.utils.unassigned_matching import matches_for_packages
 from urllib.parse import urlsplit, urlunsplit
 
 # Base URL for links used in emails (fallback to Render URL)
@@ -160,6 +150,9 @@ TAB_ALIASES = {
 }
 ALLOWED_TABS = {"prealert", "view_packages", "shipmentLog", "uploadPackages"}
 
+# newest pre-alerts shown on the dashboard tab; the full list is /prealerts
+PREALERT_DASHBOARD_LIMIT = 500
+
 HEADER_MAP = {
     "USER CODE": "registration_number",
     "SHIPPER": "shipper",
@@ -292,7 +285,9 @@ def _normalize_headers(cols):
     return norm
 
 
-def _read_any_table(file_storage) -> pd.DataFrame:
+def _read_any_table(file_storage) -> "pd.DataFrame":
+    import pandas as pd
+
     raw = file_storage.read()
     try:
         file_storage.seek(0)
@@ -308,7 +303,9 @@ def _read_any_table(file_storage) -> pd.DataFrame:
             return pd.read_csv(io.BytesIO(raw), encoding="latin-1")
 
 
-def _validate_rows(df: pd.DataFrame):
+def _validate_rows(df: "pd.DataFrame"):
+    import pandas as pd
+
     df = df.copy()
     display_headers = list(df.columns)
     df.columns = _normalize_headers(df.columns)
@@ -345,6 +342,8 @@ def _validate_rows(df: pd.DataFrame):
 
 
 def _parse_date_any(v):
+    import pandas as pd
+
     if v is None:
         return None
 
@@ -958,172 +957,25 @@ def _bulk_calc_apply_to_package(
     return breakdown
 
 
-def _try_link_prealert_invoice_to_package(pkg: Package) -> bool:
+def _try_link_prealert_invoice_to_package(pkg: Package, link_shop: bool = True) -> bool:
     """
     Safely synchronize a matching pre-alert with a package.
+    Single-package wrapper around reconcile_packages(); see
+    app/utils/prealert_reconcile.py for the matching rules.
 
-    Match requirements:
-      - same customer
-      - same tracking number, case-insensitive
-      - newest matching pre-alert is used
-
-    Actions:
-      - copies the pre-alert invoice value to the package
-      - links the pre-alert to the package
-      - links a purchased Shop For Me request to the package
-      - copies the pre-alert invoice attachment when available
-      - does not commit; the caller must commit
+    Does not commit; the caller must commit.
 
     Returns True when the pre-alert/package relationship was
     successfully processed, even if no invoice attachment exists.
     """
 
     try:
-        tracking = (
-            getattr(pkg, "tracking_number", "") or ""
-        ).strip()
-
-        if not tracking:
-            return False
-
-        customer_id = getattr(pkg, "user_id", None)
-
-        if not customer_id:
-            return False
-
-        # Find the newest matching pre-alert belonging to this customer.
-        pa = (
-            Prealert.query
-            .filter(
-                Prealert.customer_id == customer_id,
-                Prealert.tracking_number.ilike(tracking),
-            )
-            .order_by(
-                Prealert.created_at.desc(),
-                Prealert.id.desc(),
-            )
-            .first()
-        )
-
-        if not pa:
-            return False
-
-        existing_package_id = getattr(
-            pa,
-            "linked_package_id",
-            None,
-        )
-
-        # Never move a pre-alert already linked to another package.
-        if (
-            existing_package_id
-            and int(existing_package_id) != int(pkg.id)
-        ):
-            return False
-
-        # Use the customer's pre-alert invoice value when available.
-        prealert_value = float(
-            getattr(pa, "item_value_usd", 0) or 0
-        )
-
-        if prealert_value > 0:
-            if hasattr(pkg, "value"):
-                pkg.value = prealert_value
-
-            if hasattr(pkg, "declared_value"):
-                pkg.declared_value = prealert_value
-
-        # Link and lock the pre-alert even when no invoice file exists.
-        if not existing_package_id:
-            pa.linked_package_id = pkg.id
-            pa.linked_at = datetime.now(timezone.utc)
-
-        if hasattr(pa, "is_locked"):
-            pa.is_locked = True
-
-        # Link a matching purchased Shop For Me request.
-        link_shop_for_me_package(pkg)
-
-        invoice_url = (
-            getattr(pa, "invoice_filename", None) or ""
-        ).strip()
-
-        # The pre-alert and Shop For Me request are still linked
-        # successfully when the customer did not upload an invoice.
-        if not invoice_url:
-            return True
-
-        public_id = (
-            getattr(pa, "invoice_public_id", None) or ""
-        ).strip()
-
-        resource_type = (
-            getattr(pa, "invoice_resource_type", None) or ""
-        ).strip() or "raw"
-
-        original_name = (
-            getattr(pa, "invoice_original_name", None) or ""
-        ).strip() or "prealert_invoice"
-
-        # First, check for an attachment with the same cloud public ID.
-        existing_attachment = None
-
-        if public_id:
-            existing_attachment = (
-                PackageAttachment.query
-                .filter_by(
-                    package_id=pkg.id,
-                    cloud_public_id=public_id,
-                )
-                .first()
-            )
-
-        # Fall back to checking the file URL.
-        if not existing_attachment:
-            existing_attachment = (
-                PackageAttachment.query
-                .filter_by(
-                    package_id=pkg.id,
-                    file_url=invoice_url,
-                )
-                .first()
-            )
-
-        if existing_attachment:
-            # Keep the package's legacy invoice field synchronized.
-            if (
-                hasattr(pkg, "invoice_file")
-                and not (
-                    getattr(pkg, "invoice_file", None) or ""
-                ).strip()
-            ):
-                pkg.invoice_file = invoice_url
-
-            return True
-
-        attachment_kwargs = {
-            "package_id": pkg.id,
-            "file_name": invoice_url,
-            "file_url": invoice_url,
-            "original_name": original_name,
-            "cloud_public_id": public_id or None,
-            "cloud_resource_type": resource_type or None,
-        }
-
-        db.session.add(
-            PackageAttachment(**attachment_kwargs)
+        result = reconcile_packages(
+            [pkg],
+            link_shop=link_shop,
+            report=False,
         )
-
-        # Mirror the attachment onto the legacy package field.
-        if (
-            hasattr(pkg, "invoice_file")
-            and not (
-                getattr(pkg, "invoice_file", None) or ""
-            ).strip()
-        ):
-            pkg.invoice_file = invoice_url
-
-        return True
+        return result.matched > result.conflicts
 
     except Exception as error:
         current_app.logger.exception(
@@ -2095,13 +1947,7 @@ def logistics_dashboard():
     raw_tab = request.args.get("tab") or request.form.get("tab")
     tab = normalize_tab(raw_tab)
 
-    from app.utils.shipment_archive import sync_auto_archive_for_eligible_shipments
-
-    if request.method == "GET":
-        try:
-            sync_auto_archive_for_eligible_shipments(limit=200)
-        except Exception as e:
-            print("AUTO-ARCHIVE ERROR:", e)
+    # fully-delivered shipments are archived by the "shipment_auto_archive" job
 
     selected_shipment = None
     selected_shipment_id = None
@@ -2129,21 +1975,15 @@ def logistics_dashboard():
     # Pre-Alerts tab data for Logistics Dashboard
     # --------------------------------------------
     prealerts_data = []
-    prealert_customers = []
 
     if tab == "prealert":
-        prealert_customers = (
-            User.query.filter(User.is_admin.is_(False))
-            .order_by(
-                User.full_name.asc(),
-                User.registration_number.asc(),
-            )
-            .all()
-        )
+        # customers are looked up by type-ahead in the Add Pre-Alert modal
         rows = (
             db.session.query(Prealert, User.full_name, User.registration_number)
             .join(User, Prealert.customer_id == User.id)
+            .options(selectinload(Prealert.attachments))
             .order_by(Prealert.id.desc())
+            .limit(PREALERT_DASHBOARD_LIMIT)
             .all()
         )
 
@@ -2189,7 +2029,6 @@ def logistics_dashboard():
                 }
             )
 
-        print("DEBUG dashboard prealerts count:", len(prealerts_data))
     # ----------------------------------------------------------------------------------
     # Upload Tab — Stage: preview
     # ----------------------------------------------------------------------------------
@@ -2273,6 +2112,7 @@ def logistics_dashboard():
 
         created, skipped = 0, 0
         hard_errors: list[str] = []
+        created_packages: list[Package] = []
 
         for i in selected_indices:
             try:
@@ -2296,9 +2136,7 @@ def logistics_dashboard():
                 if not user:
                     email = str(r.get("email") or "").strip()
                     if email:
-                        user = User.query.filter(
-                            func.lower(User.email) == func.lower(email)
-                        ).first()
+                        user = User.find_by_email(email)
                 assigned_unassigned = False
                 if not user and unassigned_id is not None:
                     user = db.session.get(User, unassigned_id)
@@ -2363,10 +2201,9 @@ def logistics_dashboard():
                     p.subscription_result = "subscription_error"
                     p.subscription_applied_at = None
 
-                # ✅ AUTO-LINK prealert invoice -> package attachment
-                _try_link_prealert_invoice_to_package(p)
-
+                # pre-alerts are linked for the whole import after the loop
                 created += 1
+                created_packages.append(p)
 
                 if (p.status or "").lower() == "overseas":
                     process_first_shipment_bonus(user.id)
@@ -2375,6 +2212,17 @@ def logistics_dashboard():
                 skipped += 1
                 hard_errors.append(f"Row {i+1}: {e}")
 
+        # ✅ AUTO-LINK prealerts (values, invoices, Shop For Me) for the whole import
+        try:
+            reconcile_packages(
+                created_packages,
+                scope="upload",
+                scope_ref=preview_token,
+                actor_admin_id=current_user.id,
+            )
+        except Exception as e:
+            current_app.logger.exception(f"Pre-alert reconciliation failed during import: {e}")
+
         try:
             db.session.commit()
         except Exception as e:
@@ -2393,6 +2241,27 @@ def logistics_dashboard():
             flash(f"Imported {created} package(s).", "success")
         if skipped:
             flash(f"Skipped {skipped} row(s).", "warning")
+
+        # ✅ UNASSIGNED packages that look like an open search case / claim
+        try:
+            matches = matches_for_packages(created_packages)
+            if matches:
+                case_hits = sum(len(m["cases"]) for m in matches.values())
+                claim_hits = sum(len(m["claims"]) for m in matches.values())
+                current_app.logger.info(
+                    "[UNASSIGNED MATCH] import %s: %s package(s), %s case / %s claim candidates",
+                    preview_token,
+                    len(matches),
+                    case_hits,
+                    claim_hits,
+                )
+                flash(
+                    f"{len(matches)} unassigned package(s) match open package search cases "
+                    f"({case_hits}) or claims ({claim_hits}). Review them in the search and claims queues.",
+                    "info",
+                )
+        except Exception as e:
+            current_app.logger.exception(f"Unassigned matching failed during import: {e}")
         for err in hard_errors[:5]:
             flash(err, "danger")
         if len(hard_errors) > 5:
@@ -3022,7 +2891,7 @@ def logistics_dashboard():
         CATEGORIES=CATEGORIES,
         USD_TO_JMD=USD_TO_JMD,
         prealerts=prealerts_data,
-        prealert_customers=prealert_customers,
+        prealert_limit=PREALERT_DASHBOARD_LIMIT,
         sort_code_labels=SORT_CODE_LABELS,
         sort_codes=[
             "THN",
@@ -3184,22 +3053,22 @@ def bulk_update_shipment_sort_code(shipment_id):
                 ),
             }), 400
 
-        for package in packages:
-            if reset_to_customer_default:
-                # Remove the accidental manual lock.
-                package.sort_code_locked = False
-                package.sort_code = "UNASSIGNED"
-                package.sort_code_source = "system"
-                package.sort_code_updated_at = None
-                package.sort_code_updated_by_id = None
-
-                # Apply this package owner's saved default.
-                apply_customer_default_to_package(
-                    package,
-                    admin_id=current_user.id,
-                )
+        counts = None
 
-            else:
+        if reset_to_customer_default:
+            # Unlock and apply each owner's saved default in one
+            # statement for the whole selection.
+            counts = bulk_apply_customer_default_sort_codes(
+                shipment_id=shipment.id,
+                package_ids=[package.id for package in packages],
+                admin_id=current_user.id,
+                force=True,
+                include_inactive=True,
+                reason="Reset to customer default",
+            )["counts"]
+
+        else:
+            for package in packages:
                 set_package_sort_code(
                     package,
                     code,
@@ -3251,6 +3120,59 @@ def bulk_update_shipment_sort_code(shipment_id):
         "reset_to_customer_default": (
             reset_to_customer_default
         ),
+        "counts": counts,
+    })
+
+
+@logistics_bp.route(
+    "/shipmentlog/<int:shipment_id>/sort-code/resort",
+    methods=["POST"],
+)
+@admin_required
+def resort_shipment_sort_codes(shipment_id):
+    """
+    Re-apply customer defaults to every unlocked, undelivered package
+    in the shipment and return the per-code dock counts.
+    """
+    shipment = ShipmentLog.query.get_or_404(
+        shipment_id
+    )
+
+    blocked = _abort_if_archived(shipment)
+
+    if blocked:
+        return blocked
+
+    try:
+        result = bulk_apply_customer_default_sort_codes(
+            shipment_id=shipment.id,
+            admin_id=current_user.id,
+            reason="Shipment re-sort",
+        )
+
+        db.session.commit()
+
+    except Exception:
+        db.session.rollback()
+
+        current_app.logger.exception(
+            "Sorting-code re-sort failed for "
+            "shipment %s",
+            shipment.id,
+        )
+
+        return jsonify({
+            "success": False,
+            "error": (
+                "The shipment could not be re-sorted."
+            ),
+        }), 500
+
+    return jsonify({
+        "success": True,
+        "updated_count": result["updated"],
+        "changed_count": len(result["changed"]),
+        "counts": result["counts"],
     })
 
 
@@ -3269,13 +3191,13 @@ def api_user_lookup():
 
     # If it looks like an email, prefer email search
     if "@" in q:
-        user = User.query.filter(User.email.ilike(q)).first()
+        user = User.find_by_email(q)
     else:
         user = User.query.filter(User.registration_number.ilike(q)).first()
 
         # fallback: some people paste email even without @ (rare), or reg mismatch
         if not user:
-            user = User.query.filter(User.email.ilike(q)).first()
+            user = User.find_by_email(q)
 
     if not user:
         return jsonify({"found": False}), 200
@@ -3343,11 +3265,11 @@ def create_single_package_from_view():
     # find user by reg# or email
     user = None
     if "@" in user_code:
-        user = User.query.filter(User.email.ilike(user_code)).first()
+        user = User.find_by_email(user_code)
     else:
         user = User.query.filter(User.registration_number.ilike(user_code)).first()
         if not user:
-            user = User.query.filter(User.email.ilike(user_code)).first()
+            user = User.find_by_email(user_code)
 
     if not user:
         flash(f"Customer not found: {user_code}", "danger")
@@ -3705,7 +3627,7 @@ def bulk_assign_packages():
     user = User.query.filter(
         or_(
             func.upper(User.registration_number) == user_code.upper(),
-            func.lower(User.email) == user_code.lower(),
+            User.email_normalized == normalize_email(user_code),
         )
     ).first()
 
@@ -4181,6 +4103,8 @@ def download_shipment_log_csv(shipment_id):
 @logistics_bp.route("/shipmentlog/<int:shipment_id>/download-excel", methods=["GET"])
 @admin_required
 def download_shipment_log_excel(shipment_id):
+    import pandas as pd
+
     data = _get_shipment_export_rows(shipment_id)
     shipment = data["shipment"]
     packages = data["packages"]
@@ -4263,9 +4187,7 @@ def download_shipment_log_pdf(shipment_id):
         total_due=data["total_due"],
     )
 
-    pdf_io = io.BytesIO()
-    HTML(string=html, base_url=request.host_url).write_pdf(pdf_io)
-    pdf_io.seek(0)
+    pdf_io = io.BytesIO(render_pdf(html=html, base_url=request.host_url))
 
     filename = f'{(data["shipment"].sl_name or data["shipment"].sl_id or "shipment").replace(" ", "_")}_log.pdf'
     return send_file(
@@ -4314,6 +4236,8 @@ def download_preview_invalid(token):
 @logistics_bp.route("/download-packages", methods=["GET"])
 @admin_required
 def download_packages():
+    import pandas as pd
+
     fmt = (request.args.get("format") or "").lower()
     date_from = request.args.get("date_from")
     date_to = request.args.get("date_to")
@@ -4774,9 +4698,13 @@ def packages_bulk_action():
                 ]
 
                 if to_delete:
+                    # bulk DELETE skips the flush listeners
+                    remove_facts_for(Invoice, to_delete)
                     Invoice.query.filter(Invoice.id.in_(to_delete)).delete(
                         synchronize_session=False
                     )
+                    # drops their receivables_snapshot rows, same transaction
+                    refresh_receivables(to_delete, commit=False)
 
             db.session.commit()
             flash(f"Deleted {len(pkgs)} package(s).", "success")
@@ -5147,6 +5075,37 @@ def archive_shipment(shipment_id):
     )
 
 
+@logistics_bp.route("/shipments/<int:shipment_id>/reconcile-prealerts", methods=["POST"])
+@admin_required
+def reconcile_shipment_prealerts(shipment_id):
+    shipment = ShipmentLog.query.get_or_404(shipment_id)
+
+    try:
+        result = reconcile_shipment(
+            shipment.id,
+            actor_admin_id=getattr(current_user, "id", None),
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception(f"Pre-alert reconciliation failed for shipment {shipment.id}: {e}")
+        flash(f"Pre-alert linking failed: {e}", "danger")
+    else:
+        flash(
+            f"Pre-alerts linked for {result.packages_seen} package(s): "
+            f"{result.linked} newly linked, {result.attachments_created} invoice(s) attached, "
+            f"{result.unmatched} without a pre-alert, {result.conflicts} conflict(s).",
+            "warning" if result.conflicts else "success",
+        )
+
+    return redirect(
+        url_for(
+            "logistics.logistics_dashboard", tab="shipmentLog", shipment_id=shipment.id
+        ),
+        code=303,
+    )
+
+
 @logistics_bp.route("/shipments/<int:shipment_id>/unarchive", methods=["POST"])
 @admin_required
 def unarchive_shipment(shipment_id):
@@ -5466,6 +5425,11 @@ def delete_shipment(shipment_id):
         ).delete(
             synchronize_session=False
         )
+        ShipmentScanLogArchive.query.filter_by(
+            shipment_id=shipment_id
+        ).delete(
+            synchronize_session=False
+        )
 
         # Delete archive-history records referencing this shipment.
         ShipmentArchiveLog.query.filter_by(
@@ -7087,6 +7051,8 @@ def view_packages_finance_invoice_preview_json():
 )
 @admin_required
 def view_packages_finance_invoice_export_excel():
+    import pandas as pd
+
     payload = request.get_json(silent=True) or {}
 
     date_from = (payload.get("date_from") or "").strip()
@@ -7310,6 +7276,12 @@ def view_packages_finance_invoice_export_excel():
 )
 @admin_required
 def view_packages_finance_invoice_export_pdf():
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_RIGHT
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
     payload = request.get_json(silent=True) or {}
 
     date_from = (payload.get("date_from") or "").strip()
@@ -7830,6 +7802,12 @@ def bulk_invoice_finalize_json():
 
         db.session.commit()
 
+        # warm the invoice PDF cache so the first download is instant
+        try:
+            prerender_invoice_pdfs([row["invoice_id"] for row in out])
+        except Exception:
+            current_app.logger.exception("Invoice PDF pre-render could not be scheduled")
+
         redirect_url = None
         try:
             if shipment_id:
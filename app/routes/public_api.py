@@ -1,18 +1,10 @@
-from flask import Blueprint, jsonify, request
-from app.extensions import db, csrf
-from app.models import Settings, AdminRate
-from app.calculator_data import calculate_charges, CATEGORIES
+from flask import Blueprint, current_app, jsonify, request
+from app.extensions import csrf
+from app.calculator_data import CATEGORIES
+from app.utils.estimate_cache import estimate_charges, pricing_snapshot
 
 public_api_bp = Blueprint("public_api", __name__, url_prefix="/public-api")
 
-def _get_settings_row():
-    s = db.session.get(Settings, 1)
-    if not s:
-        s = Settings(id=1)
-        db.session.add(s)
-        db.session.commit()
-    return s
-
 @public_api_bp.get("/categories")
 def categories():
     return jsonify(ok=True, categories=list(CATEGORIES.keys()))
@@ -25,24 +17,26 @@ def estimate():
     invoice_usd = float(data.get("invoice_usd") or 0)
     weight = float(data.get("weight") or 0)
 
-    result = calculate_charges(category, invoice_usd, weight)
+    result = estimate_charges(category, invoice_usd, weight)
     return jsonify(ok=True, result=result)
 
 @public_api_bp.get("/rates")
 def rates():
-    s = _get_settings_row()
+    snap = pricing_snapshot()
+
+    # Unchanged since the client's copy: no body at all.
+    if snap.version in request.if_none_match:
+        resp = current_app.response_class(status=304)
+        return _cacheable(resp, snap.version)
 
-    brackets = (
-        AdminRate.query
-        .order_by(AdminRate.max_weight.asc())
-        .all()
-    )
+    # Settings row not created yet -> same defaults as before
+    s = snap.settings or _EmptySettings()
 
     bracket_rows = []
-    for b in brackets:
+    for max_weight, rate in snap.brackets:
         bracket_rows.append({
-            "max_weight_lbs": int(b.max_weight),
-            "rate_jmd": float(b.rate or 0),
+            "max_weight_lbs": int(max_weight),
+            "rate_jmd": float(rate or 0),
         })
 
 
@@ -78,4 +72,18 @@ def rates():
     }
 
         # Return both for convenience:
-    return jsonify(ok=True, brackets=bracket_rows, rates=result)
+    resp = jsonify(ok=True, brackets=bracket_rows, rates=result)
+    return _cacheable(resp, snap.version)
+
+
+class _EmptySettings:
+    def __getattr__(self, name):
+        return None
+
+
+def _cacheable(resp, version):
+    """ETag = pricing snapshot version; public so CDNs/browsers can share it."""
+    resp.set_etag(version)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = int(current_app.config.get("PUBLIC_RATES_MAX_AGE", 300))
+    return resp
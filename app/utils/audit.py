@@ -0,0 +1,387 @@
+# app/utils/audit.py
+"""
+Audit log writer, readers and retention.
+
+Writing
+-------
+Routes keep doing db.session.add(AuditLog(...)). At flush time rows for
+modules outside AUDIT_DURABLE_MODULES are taken out of the session and
+held on it until commit; after the commit they go to an in-process
+buffer, and a background thread inserts them with one executemany per
+AUDIT_BATCH_SIZE rows or every AUDIT_FLUSH_SECONDS, on the engine's own
+connection. A rolled-back request drops its pending rows with the rest
+of its work. The buffer is flushed again at interpreter exit.
+
+Financial modules (AUDIT_DURABLE_MODULES, by default Finance, POS and
+Wallet) are still inserted in the request's own transaction, so they
+commit or roll back with the money they describe. AUDIT_BUFFERED=0
+turns buffering off entirely.
+
+Reading
+-------
+audit_page() is keyset-paginated on id DESC and backed by the
+(module, id), (entity_type, entity_id, id) and (admin_id, id) indexes.
+When the live table runs out it continues into audit_logs_archive.
+
+Retention
+---------
+Postgres: audit_logs is partitioned by month on created_at (see the
+migration); the audit_maintenance job keeps AUDIT_PARTITION_MONTHS_AHEAD
+future partitions in place. SQLite: the same job moves rows older than
+AUDIT_ARCHIVE_AFTER_DAYS into audit_logs_archive in batches.
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, insert, or_, select, text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.orm import Session, joinedload
+
+from app.extensions import db
+from app.models import AuditLog, AuditLogArchive, User
+
+
+AUDIT_BATCH_SIZE = 100
+AUDIT_FLUSH_SECONDS = 5
+AUDIT_DURABLE_MODULES = ("Finance", "POS", "Wallet")
+AUDIT_PARTITION_MONTHS_AHEAD = 3
+AUDIT_ARCHIVE_AFTER_DAYS = 180
+
+# never queue more than this many rows if inserts keep failing
+MAX_BUFFERED_ROWS = 20000
+
+_PENDING = "audit_pending_rows"
+
+_COLUMNS = tuple(c.name for c in AuditLog.__table__.columns if c.name != "id")
+
+_buffer = []
+_buffer_lock = threading.Lock()
+_wake = threading.Event()
+_state = {"app": None, "pid": None}
+
+
+def _cfg(key, default):
+    try:
+        return current_app.config.get(key, default)
+    except RuntimeError:
+        return default
+
+
+def _durable_modules():
+    value = _cfg("AUDIT_DURABLE_MODULES", AUDIT_DURABLE_MODULES)
+    if isinstance(value, str):
+        value = value.split(",")
+    return {m.strip() for m in value or () if m and m.strip()}
+
+
+def _row(log):
+    row = {name: getattr(log, name, None) for name in _COLUMNS}
+    row["created_at"] = row["created_at"] or datetime.utcnow()
+    return row
+
+
+# ---------------------------------------------------
+# Session hooks
+# ---------------------------------------------------
+
+@event.listens_for(Session, "before_flush")
+def _divert_audit_rows(session, flush_context, instances):
+    if not has_app_context() or not _cfg("AUDIT_BUFFERED", True):
+        return
+
+    durable = None
+    for obj in list(session.new):
+        if not isinstance(obj, AuditLog):
+            continue
+        if durable is None:
+            durable = _durable_modules()
+        if obj.module in durable:
+            continue
+
+        session.info.setdefault(_PENDING, []).append(_row(obj))
+        session.expunge(obj)
+
+
+@event.listens_for(Session, "after_commit")
+def _queue_audit_rows_after_commit(session):
+    rows = session.info.pop(_PENDING, None)
+    if rows:
+        enqueue_audit_rows(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_audit_rows(session):
+    session.info.pop(_PENDING, None)
+
+
+# ---------------------------------------------------
+# Buffered writer
+# ---------------------------------------------------
+
+def enqueue_audit_rows(rows):
+    """Queue audit_logs row dicts for the background writer."""
+    batch_size = int(_cfg("AUDIT_BATCH_SIZE", AUDIT_BATCH_SIZE) or 1)
+
+    with _buffer_lock:
+        _buffer.extend(rows)
+        dropped = len(_buffer) - MAX_BUFFERED_ROWS
+        if dropped > 0:
+            del _buffer[:dropped]
+        full = len(_buffer) >= batch_size
+
+        if _state["app"] is None and has_app_context():
+            _state["app"] = current_app._get_current_object()
+
+    if dropped > 0:
+        current_app.logger.error("[AUDIT] buffer full, dropped %s oldest rows", dropped)
+
+    _ensure_writer()
+    if full:
+        _wake.set()
+
+
+def _ensure_writer():
+    # threads don't survive fork: each gunicorn worker starts its own
+    if _state["pid"] == os.getpid() or _state["app"] is None:
+        return
+
+    with _buffer_lock:
+        if _state["pid"] == os.getpid():
+            return
+        _state["pid"] = os.getpid()
+
+    threading.Thread(
+        target=_writer_loop,
+        args=(_state["app"],),
+        name="audit-writer",
+        daemon=True,
+    ).start()
+
+
+def _writer_loop(app):
+    with app.app_context():
+        interval = max(int(_cfg("AUDIT_FLUSH_SECONDS", AUDIT_FLUSH_SECONDS) or 1), 1)
+
+    while True:
+        _wake.wait(interval)
+        _wake.clear()
+        try:
+            with app.app_context():
+                flush_audit_logs()
+        except Exception:
+            # keep the writer alive; rows stay queued for the next pass
+            time.sleep(interval)
+
+
+def flush_audit_logs():
+    """Insert every queued row in one statement. Returns the number written."""
+    with _buffer_lock:
+        rows = _buffer[:]
+        _buffer.clear()
+
+    if not rows:
+        return 0
+
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(insert(AuditLog.__table__), rows)
+        return len(rows)
+    except Exception as e:
+        current_app.logger.warning("[AUDIT] flush of %s rows failed: %s", len(rows), e)
+
+    # one bad row (e.g. its user was deleted in the meantime) must not
+    # hold back the rest: retry one by one, requeue only on outage
+    written = 0
+    for i, row in enumerate(rows):
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(insert(AuditLog.__table__), [row])
+            written += 1
+        except DBAPIError as e:
+            if e.connection_invalidated or isinstance(e, OperationalError):
+                with _buffer_lock:
+                    _buffer[:0] = rows[i:]
+                    del _buffer[:-MAX_BUFFERED_ROWS]
+                break
+            current_app.logger.error("[AUDIT] dropped row %s: %s", row, e)
+
+    return written
+
+
+@atexit.register
+def _flush_at_exit():
+    app = _state["app"]
+    if app is None:
+        return
+    try:
+        with app.app_context():
+            flush_audit_logs()
+    except Exception:
+        pass
+
+
+# ---------------------------------------------------
+# Reading
+# ---------------------------------------------------
+
+def _filtered(model, *, module=None, entity_type=None, entity_id=None,
+              admin_id=None, user_id=None, search=None, before_id=None):
+    q = model.query.options(
+        joinedload(model.user),
+        joinedload(model.admin),
+    )
+
+    if module:
+        q = q.filter(model.module == module)
+    if entity_type:
+        q = q.filter(model.entity_type == entity_type)
+    if entity_id is not None:
+        q = q.filter(model.entity_id == entity_id)
+    if admin_id is not None:
+        q = q.filter(model.admin_id == admin_id)
+    if user_id is not None:
+        q = q.filter(model.user_id == user_id)
+    if before_id:
+        q = q.filter(model.id < before_id)
+
+    if search:
+        like = f"%{search}%"
+        q = q.outerjoin(User, model.user_id == User.id).filter(or_(
+            model.action.ilike(like),
+            model.description.ilike(like),
+            model.entity_type.ilike(like),
+            User.full_name.ilike(like),
+            User.email.ilike(like),
+            User.registration_number.ilike(like),
+        ))
+
+    return q.order_by(model.id.desc())
+
+
+def audit_page(*, limit=25, before_id=None, **filters):
+    """
+    One page of audit rows, newest first: (rows, next_before_id).
+
+    Pass next_before_id back as before_id for the following page; it is
+    None on the last page. Filters: module, entity_type, entity_id,
+    admin_id, user_id, search.
+    """
+    rows = _filtered(AuditLog, before_id=before_id, **filters).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        archive_before = rows[-1].id if rows else before_id
+        rows += (
+            _filtered(AuditLogArchive, before_id=archive_before, **filters)
+            .limit(limit + 1 - len(rows))
+            .all()
+        )
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1].id
+
+    return rows, None
+
+
+def audit_history(entity_type, entity_id, *, module=None):
+    """Every audit row for one entity, newest first, archive included."""
+    filters = dict(module=module, entity_type=entity_type, entity_id=entity_id)
+    return (
+        _filtered(AuditLog, **filters).all()
+        + _filtered(AuditLogArchive, **filters).all()
+    )
+
+
+# ---------------------------------------------------
+# Retention
+# ---------------------------------------------------
+
+def _month_start(d, offset=0):
+    month = d.month - 1 + offset
+    return date(d.year + month // 12, month % 12 + 1, 1)
+
+
+def _is_partitioned(conn):
+    return conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass('audit_logs')")
+    ).scalar() == "p"
+
+
+def ensure_audit_partitions(months_ahead=None):
+    """
+    Postgres: create the monthly audit_logs partitions for this month and
+    the next months_ahead. Returns how many were created.
+    """
+    if months_ahead is None:
+        months_ahead = int(_cfg("AUDIT_PARTITION_MONTHS_AHEAD", AUDIT_PARTITION_MONTHS_AHEAD) or 0)
+
+    conn = db.session.connection()
+    if conn.dialect.name != "postgresql" or not _is_partitioned(conn):
+        return 0
+
+    today = datetime.utcnow().date()
+    created = 0
+
+    for offset in range(months_ahead + 1):
+        lo = _month_start(today, offset)
+        hi = _month_start(today, offset + 1)
+        name = f"audit_logs_y{lo.year}m{lo.month:02d}"
+
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+            continue
+
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF audit_logs "
+            f"FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+        ))
+        created += 1
+
+    db.session.commit()
+    return created
+
+
+def archive_audit_logs(limit=500, older_than_days=None):
+    """
+    SQLite (or an unpartitioned Postgres): move up to limit rows older
+    than older_than_days into audit_logs_archive. Returns rows moved.
+    """
+    if older_than_days is None:
+        older_than_days = int(_cfg("AUDIT_ARCHIVE_AFTER_DAYS", AUDIT_ARCHIVE_AFTER_DAYS) or 0)
+    if older_than_days <= 0:
+        return 0
+
+    conn = db.session.connection()
+    if conn.dialect.name == "postgresql" and _is_partitioned(conn):
+        return 0
+
+    live = AuditLog.__table__
+    archive = AuditLogArchive.__table__
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+
+    ids = conn.execute(
+        select(live.c.id)
+        .where(live.c.created_at < cutoff)
+        .order_by(live.c.id)
+        .limit(limit)
+    ).scalars().all()
+
+    if not ids:
+        return 0
+
+    columns = [c.name for c in archive.columns]
+    conn.execute(
+        insert(archive).from_select(
+            columns,
+            select(*(live.c[name] for name in columns)).where(live.c.id.in_(ids)),
+        )
+    )
+    conn.execute(delete(live).where(live.c.id.in_(ids)))
+    db.session.commit()
+
+    return len(ids)
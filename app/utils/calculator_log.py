@@ -0,0 +1,136 @@
+# app/utils/calculator_log.py
+"""
+Buffered CalculatorLog writes.
+
+The calculator used to insert and commit one calculator_logs row per
+request. Rows are now queued in memory and inserted with one executemany
+once CALCULATOR_LOG_BATCH_SIZE rows are waiting or the oldest has
+waited CALCULATOR_LOG_FLUSH_SECONDS, on the engine's own connection so
+the request's session is never committed or rolled back.
+
+If the batch insert fails the rows are retried one by one; a row that
+still fails is logged and dropped, and only a lost connection puts the
+rest back (at most MAX_BUFFERED_ROWS are ever queued).
+
+The buffer is flushed again at interpreter exit. Rows still queued when
+a worker is killed are lost; these logs are analytics only.
+"""
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+from app.extensions import db
+from app.models import CalculatorLog
+
+
+CALCULATOR_LOG_BATCH_SIZE = 50
+CALCULATOR_LOG_FLUSH_SECONDS = 30
+
+# never queue more than this many rows if inserts keep failing
+MAX_BUFFERED_ROWS = 5000
+
+_buffer = []
+_buffer_lock = threading.Lock()
+_state = {"oldest": None, "app": None}
+
+
+def _cfg(key, default):
+    try:
+        return current_app.config.get(key, default)
+    except RuntimeError:
+        return default
+
+
+def log_calculation(*, user_id, category, invoice_usd, weight, result):
+    """Queue one calculator_logs row; flushes when the batch is due."""
+    row = {
+        "user_id": user_id,
+        "category": category,
+        "weight": weight,
+        "value_usd": invoice_usd,
+        "duty_amount": float(result.get("duty") or 0),
+        "scf_amount": float(result.get("scf") or 0),
+        "envl_amount": float(result.get("envl") or 0),
+        "caf_amount": float(result.get("caf") or 0),
+        "gct_amount": float(result.get("gct") or 0),
+        "total_amount": float(result.get("grand_total") or 0),
+        "created_at": datetime.utcnow(),
+    }
+
+    batch_size = int(_cfg("CALCULATOR_LOG_BATCH_SIZE", CALCULATOR_LOG_BATCH_SIZE) or 1)
+    max_wait = int(_cfg("CALCULATOR_LOG_FLUSH_SECONDS", CALCULATOR_LOG_FLUSH_SECONDS) or 0)
+
+    with _buffer_lock:
+        if len(_buffer) >= MAX_BUFFERED_ROWS:
+            _buffer.pop(0)
+        _buffer.append(row)
+
+        if _state["oldest"] is None:
+            _state["oldest"] = time.monotonic()
+        if _state["app"] is None:
+            _state["app"] = current_app._get_current_object()
+
+        due = (
+            len(_buffer) >= batch_size
+            or time.monotonic() - _state["oldest"] >= max_wait
+        )
+
+    if due:
+        flush_calculator_logs()
+
+
+def flush_calculator_logs():
+    """Insert every queued row in one statement. Returns the number written."""
+    with _buffer_lock:
+        rows = _buffer[:]
+        _buffer.clear()
+        _state["oldest"] = None
+
+    if not rows:
+        return 0
+
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(insert(CalculatorLog.__table__), rows)
+        return len(rows)
+    except Exception as e:
+        current_app.logger.warning("[CALCULATOR LOG] flush of %s rows failed: %s", len(rows), e)
+
+    # same as audit.flush_audit_logs: one bad row must not fail every
+    # later flush, so retry one by one and requeue only on an outage
+    written = 0
+    for i, row in enumerate(rows):
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(insert(CalculatorLog.__table__), [row])
+            written += 1
+        except Exception as e:
+            if isinstance(e, DBAPIError) and (e.connection_invalidated or isinstance(e, OperationalError)):
+                with _buffer_lock:
+                    _buffer[:0] = rows[i:]
+                    del _buffer[:-MAX_BUFFERED_ROWS]
+                    if _state["oldest"] is None:
+                        _state["oldest"] = time.monotonic()
+                break
+            current_app.logger.error("[CALCULATOR LOG] dropped row %s: %s", row, e)
+
+    return written
+
+
+@atexit.register
+def _flush_at_exit():
+    app = _state["app"]
+    if app is None:
+        return
+    try:
+        with app.app_context():
+            flush_calculator_logs()
+    except Exception:
+        pass
@@ -1,4 +1,11 @@
-from app.models import Package
+import threading
+import time
+
+from sqlalchemy import event, func, inspect, or_
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import Claim, Package, User
 
 
 ELIGIBLE_CLAIM_PACKAGE_STATUSES = (
@@ -7,6 +14,24 @@ ELIGIBLE_CLAIM_PACKAGE_STATUSES = (
     "Ready for Pick Up",
 )
 
+CLAIM_STATUSES = (
+    "submitted",
+    "under_review",
+    "need_more_info",
+    "approved",
+    "rejected",
+    "paid",
+)
+
+# Queue facet counts are cached this long per worker; a committed
+# claim insert/status change/delete clears the cache immediately.
+CLAIM_COUNTS_TTL_SECONDS = 30
+
+CUSTOMER_SEARCH_LIMIT = 20
+
+_counts_cache = {"at": 0.0, "counts": None}
+_counts_lock = threading.Lock()
+
 
 def get_eligible_claim_packages(user_id: int):
     """
@@ -51,4 +76,109 @@ def get_eligible_claim_package(
             ),
         )
         .first()
-    )
\ No newline at end of file
+    )
+
+
+# ---------------------------------------------------
+# Queue status facets
+# ---------------------------------------------------
+
+def claim_status_counts():
+    """
+    {"all": n, "submitted": n, ...} from a single GROUP BY status query,
+    cached for CLAIM_COUNTS_TTL_SECONDS.
+    """
+    now = time.monotonic()
+
+    with _counts_lock:
+        cached = _counts_cache["counts"]
+        if cached is not None and now - _counts_cache["at"] < CLAIM_COUNTS_TTL_SECONDS:
+            return dict(cached)
+
+    rows = (
+        db.session.query(
+            Claim.status,
+            func.count(Claim.id),
+        )
+        .group_by(Claim.status)
+        .all()
+    )
+
+    by_status = {status: int(n or 0) for status, n in rows}
+
+    counts = {"all": sum(by_status.values())}
+    for status in CLAIM_STATUSES:
+        counts[status] = by_status.get(status, 0)
+
+    with _counts_lock:
+        _counts_cache["counts"] = counts
+        _counts_cache["at"] = now
+
+    return dict(counts)
+
+
+def invalidate_claim_status_counts():
+    with _counts_lock:
+        _counts_cache["counts"] = None
+        _counts_cache["at"] = 0.0
+
+
+def _mark_claims_dirty(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info["claim_counts_dirty"] = True
+
+
+def _mark_claims_dirty_on_status(mapper, connection, target):
+    if inspect(target).attrs.status.history.has_changes():
+        _mark_claims_dirty(mapper, connection, target)
+
+
+event.listen(Claim, "after_insert", _mark_claims_dirty)
+event.listen(Claim, "after_delete", _mark_claims_dirty)
+event.listen(Claim, "after_update", _mark_claims_dirty_on_status)
+
+
+@event.listens_for(Session, "after_commit")
+def _clear_claim_counts_after_commit(session):
+    if session.info.pop("claim_counts_dirty", False):
+        invalidate_claim_status_counts()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_claim_counts_flag(session):
+    session.info.pop("claim_counts_dirty", None)
+
+
+# ---------------------------------------------------
+# Customer type-ahead
+# ---------------------------------------------------
+
+def search_claim_customers(q, limit=CUSTOMER_SEARCH_LIMIT):
+    """
+    Enabled, non-admin customers matching name/email/registration number.
+    """
+    q = (q or "").strip()
+    if len(q) < 2:
+        return []
+
+    like = f"%{q}%"
+
+    return (
+        User.query
+        .filter(
+            User.is_admin.isnot(True),
+            User.is_enabled.is_(True),
+            or_(
+                User.full_name.ilike(like),
+                User.email.ilike(like),
+                User.registration_number.ilike(like),
+            ),
+        )
+        .order_by(
+            User.full_name.asc(),
+            User.email.asc(),
+        )
+        .limit(max(1, min(int(limit or CUSTOMER_SEARCH_LIMIT), 50)))
+        .all()
+    )
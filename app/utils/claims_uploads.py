@@ -61,9 +61,9 @@ def upload_claim_file_to_cloudinary(
         f"{name_without_extension}"
     )
 
-    import cloudinary.uploader
+    from app.utils.cloudinary_storage import cloudinary_uploader
 
-    result = cloudinary.uploader.upload(
+    result = cloudinary_uploader().upload(
         file_storage,
         folder=folder,
         public_id=public_id,
@@ -6,9 +6,6 @@ import mimetypes
 import requests
 from urllib.parse import urlsplit, urlunsplit
 
-import cloudinary
-import cloudinary.uploader
-
 from werkzeug.utils import secure_filename
 from flask import (
     current_app, abort, Response, stream_with_context,
@@ -16,26 +13,45 @@ from flask import (
 )
 
 
+_sdk = {"configured": False}
+
+
 def init_cloudinary(app) -> bool:
     """
-    Configure Cloudinary from app.config.
+    Check the Cloudinary settings in app.config.
     Returns True if all required values exist, otherwise False.
     Does NOT print secrets.
+
+    The SDK is imported and configured on first use (cloudinary_uploader()),
+    not at startup.
     """
     cloud_name = app.config.get("CLOUDINARY_CLOUD_NAME")
     api_key = app.config.get("CLOUDINARY_API_KEY")
     api_secret = app.config.get("CLOUDINARY_API_SECRET")
 
-    if not (cloud_name and api_key and api_secret):
-        return False
+    return bool(cloud_name and api_key and api_secret)
 
-    cloudinary.config(
-        cloud_name=cloud_name,
-        api_key=api_key,
-        api_secret=api_secret,
-        secure=True,
-    )
-    return True
+
+def cloudinary_uploader():
+    """cloudinary.uploader, configured from current_app.config the first time."""
+    import cloudinary
+    import cloudinary.uploader
+
+    if not _sdk["configured"]:
+        cloud_name = current_app.config.get("CLOUDINARY_CLOUD_NAME")
+        api_key = current_app.config.get("CLOUDINARY_API_KEY")
+        api_secret = current_app.config.get("CLOUDINARY_API_SECRET")
+
+        if cloud_name and api_key and api_secret:
+            cloudinary.config(
+                cloud_name=cloud_name,
+                api_key=api_key,
+                api_secret=api_secret,
+                secure=True,
+            )
+        _sdk["configured"] = True
+
+    return cloudinary.uploader
 
 
 # -----------------------------
@@ -92,7 +108,7 @@ def upload_file(file_storage, folder="fafl/uploads"):
     unique = uuid.uuid4().hex[:10]
     public_id = f"{folder}/{clean_base}_{unique}"
 
-    result = cloudinary.uploader.upload(
+    result = cloudinary_uploader().upload(
         file_storage,
         resource_type=resource_type,
         type="upload",
@@ -280,7 +296,7 @@ def delete_cloudinary_file(public_id, resource_type="raw"):
         return False
 
     try:
-        cloudinary.uploader.destroy(public_id, resource_type=resource_type)
+        cloudinary_uploader().destroy(public_id, resource_type=resource_type)
         return True
     except Exception:
         return False
\ No newline at end of file
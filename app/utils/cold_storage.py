@@ -0,0 +1,194 @@
+# app/utils/cold_storage.py
+"""
+Cold storage for finished history.
+
+Each policy moves live rows that reached a terminal state and are older
+than COLD_STORAGE_AFTER_DAYS into a same-shaped *_archive table:
+
+  - shipment_scan_logs: scans of shipments archived that long ago
+  - notifications: personal notifications already read
+
+The cold_storage job runs every policy in batches (one INSERT ... SELECT
+plus DELETE per batch, in one transaction), sleeps
+COLD_STORAGE_THROTTLE_SECONDS between batches, and records the last id
+it looked at in archive_checkpoints so a run cut off by the job deadline
+resumes where it stopped. When a pass reaches the end of the table the
+checkpoint wraps to 0 for the next run.
+
+Readers that show history (notification_feed) read through to the
+archive tables.
+
+Not archived (deferred)
+-----------------------
+Delivered packages and old messages are NOT moved, although they are
+the largest tables; the cold_storage job leaves them in place.
+
+  - packages are referenced by invoices, payments, pickups,
+    shipment_packages and several other tables, so an archive has to
+    move or re-point those children first; until that FK-safe ordering
+    exists a package row stays live.
+  - messages cascade to message_attachments and per-user message state
+    (ON DELETE CASCADE), so moving a message would silently delete its
+    attachments and read state. The mailbox is served from
+    message_participant_state / message_threads, so cold message rows
+    are only read by primary key and cost little where they are.
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import (
+    ArchiveCheckpoint,
+    Notification,
+    NotificationArchive,
+    ShipmentLog,
+    ShipmentScanLog,
+    ShipmentScanLogArchive,
+)
+
+
+COLD_STORAGE_AFTER_DAYS = 365
+COLD_STORAGE_THROTTLE_SECONDS = 0.2
+
+POLICIES = {}
+
+
+def _cfg(key, default):
+    return current_app.config.get(key, default)
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+class ColdStoragePolicy:
+    __slots__ = ("name", "live", "archive", "eligible")
+
+    def __init__(self, name, live, archive, eligible):
+        self.name = name
+        self.live = live
+        self.archive = archive
+        self.eligible = eligible
+
+
+def cold_storage_policy(name, model, archive_model):
+    """
+    Register a policy. The decorated function gets the live table and
+    the age cutoff and returns the WHERE clauses that make a row
+    eligible.
+    """
+    def wrap(fn):
+        POLICIES[name] = ColdStoragePolicy(
+            name,
+            model.__table__,
+            archive_model.__table__,
+            fn,
+        )
+        return fn
+    return wrap
+
+
+# ---------------------------------------------------
+# Policies
+# ---------------------------------------------------
+
+@cold_storage_policy("shipment_scan_logs", ShipmentScanLog, ShipmentScanLogArchive)
+def _scans_of_archived_shipments(t, cutoff):
+    shipments = ShipmentLog.__table__
+    return [
+        t.c.scanned_at < cutoff,
+        t.c.shipment_id.in_(
+            select(shipments.c.id).where(
+                shipments.c.is_archived.is_(True),
+                shipments.c.archived_at < cutoff,
+            )
+        ),
+    ]
+
+
+@cold_storage_policy("notifications", Notification, NotificationArchive)
+def _read_notifications(t, cutoff):
+    return [
+        t.c.is_read.is_(True),
+        t.c.created_at < cutoff,
+    ]
+
+
+# ---------------------------------------------------
+# Mover
+# ---------------------------------------------------
+
+def _checkpoint(name):
+    row = db.session.get(ArchiveCheckpoint, name)
+    if row is not None:
+        return row
+    try:
+        with db.session.begin_nested():
+            db.session.add(ArchiveCheckpoint(name=name, last_id=0, moved_total=0, passes=0))
+    except IntegrityError:
+        pass
+    return db.session.get(ArchiveCheckpoint, name)
+
+
+def archive_batch(name, limit=200, older_than_days=None):
+    """
+    Move up to limit eligible rows for one policy, starting after its
+    checkpoint. Returns how many rows moved (0 = this pass is finished).
+    """
+    policy = POLICIES[name]
+
+    if older_than_days is None:
+        older_than_days = int(_cfg("COLD_STORAGE_AFTER_DAYS", COLD_STORAGE_AFTER_DAYS) or 0)
+    if older_than_days <= 0:
+        return 0
+
+    cutoff = _utcnow() - timedelta(days=older_than_days)
+    checkpoint = _checkpoint(name)
+    live, archive = policy.live, policy.archive
+    conn = db.session.connection()
+
+    ids = conn.execute(
+        select(live.c.id)
+        .where(live.c.id > checkpoint.last_id, *policy.eligible(live, cutoff))
+        .order_by(live.c.id)
+        .limit(limit)
+    ).scalars().all()
+
+    if not ids:
+        # end of the table: start from the beginning next run
+        checkpoint.last_id = 0
+        checkpoint.passes = (checkpoint.passes or 0) + 1
+        checkpoint.updated_at = _utcnow()
+        db.session.commit()
+        return 0
+
+    columns = [c.name for c in archive.columns]
+    conn.execute(
+        insert(archive).from_select(
+            columns,
+            select(*(live.c[col] for col in columns)).where(live.c.id.in_(ids)),
+        )
+    )
+    conn.execute(delete(live).where(live.c.id.in_(ids)))
+
+    checkpoint.moved_total = (checkpoint.moved_total or 0) + len(ids)
+    if len(ids) < limit:
+        # reached the end of the table in this batch
+        checkpoint.last_id = 0
+        checkpoint.passes = (checkpoint.passes or 0) + 1
+    else:
+        checkpoint.last_id = ids[-1]
+    checkpoint.updated_at = _utcnow()
+    db.session.commit()
+
+    throttle = float(_cfg("COLD_STORAGE_THROTTLE_SECONDS", COLD_STORAGE_THROTTLE_SECONDS) or 0)
+    if throttle > 0:
+        time.sleep(throttle)
+
+    return len(ids)
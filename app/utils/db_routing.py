@@ -0,0 +1,283 @@
+# app/utils/db_routing.py
+"""
+Connection pool sizing, statement timeouts and read-replica routing.
+
+Pool
+----
+Each gunicorn worker runs GUNICORN_THREADS request threads, and each
+thread holds at most one connection, so the pool is GUNICORN_THREADS
+connections plus DB_POOL_EXTRA overflow for the worker's background
+threads (audit writer, calculator log). With DB_MAX_CONNECTIONS set
+(the database plan's limit) that is capped so WEB_CONCURRENCY workers
+plus the jobs worker fit under it. Connections are pinged on checkout
+and recycled after DB_POOL_RECYCLE seconds.
+
+Statement timeouts (Postgres)
+-----------------------------
+Each transaction a web request begins gets SET LOCAL statement_timeout
+= DB_STATEMENT_TIMEOUT_MS; @statement_timeout(ms) on a view changes it
+for that request and @report_view uses REPORT_STATEMENT_TIMEOUT_MS.
+Transactions outside a request (flask db upgrade, the finance backfill,
+the jobs worker, background threads) get DB_CLI_STATEMENT_TIMEOUT_MS,
+which is 0 (no limit) unless the process opts in.
+
+Read replica
+------------
+@report_view (or report_request as a blueprint before_request) also
+sends the request's plain SELECTs to DATABASE_REPLICA_URL. Writes,
+SELECT ... FOR UPDATE, raw db.session.connection() work and everything
+after the first of those stay on the primary. Without a replica URL, or while the replica is
+unreachable (checked again every REPLICA_RETRY_SECONDS), everything
+goes to the primary.
+
+To try it locally point DATABASE_REPLICA_URL at a copy of the SQLite
+file; reports then read the copy.
+
+Preloading
+----------
+With gunicorn --preload the app (and any connection create_app opened)
+is built once in the master; dispose_after_fork() gives each worker
+fresh pools.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+
+from app.extensions import db
+
+
+WEB_CONCURRENCY = 2
+GUNICORN_THREADS = 4
+DB_POOL_EXTRA = 2
+DB_POOL_TIMEOUT = 10
+DB_POOL_RECYCLE = 1800
+DB_STATEMENT_TIMEOUT_MS = 30000
+DB_CLI_STATEMENT_TIMEOUT_MS = 0
+REPORT_STATEMENT_TIMEOUT_MS = 120000
+REPLICA_RETRY_SECONDS = 30
+
+_WROTE = "db_routing_wrote"
+
+_replica_lock = threading.Lock()
+_replica_state = {"engine": None, "url": None, "down_until": 0.0, "checked_until": 0.0}
+
+
+def _cfg(key, default):
+    try:
+        return current_app.config.get(key, default)
+    except RuntimeError:
+        return default
+
+
+# ---------------------------------------------------
+# Engine options
+# ---------------------------------------------------
+
+def pool_size_for(config):
+    """(pool_size, max_overflow) for one worker process."""
+    threads = max(int(config.get("GUNICORN_THREADS", GUNICORN_THREADS) or 1), 1)
+    extra = max(int(config.get("DB_POOL_EXTRA", DB_POOL_EXTRA) or 0), 0)
+
+    budget = int(config.get("DB_MAX_CONNECTIONS", 0) or 0)
+    if budget:
+        workers = max(int(config.get("WEB_CONCURRENCY", WEB_CONCURRENCY) or 1), 1)
+        # + 1: the Procfile jobs worker has its own pool
+        per_worker = max(budget // (workers + 1), 1)
+        threads = min(threads, per_worker)
+        extra = min(extra, per_worker - threads)
+
+    return threads, extra
+
+
+def engine_options(url, config):
+    """SQLALCHEMY_ENGINE_OPTIONS for url (also used for the replica engine)."""
+    options = {
+        "pool_pre_ping": bool(config.get("DB_POOL_PRE_PING", True)),
+        "pool_recycle": int(config.get("DB_POOL_RECYCLE", DB_POOL_RECYCLE) or -1),
+    }
+
+    if not str(url).startswith("postgresql"):
+        # SQLite: keep Flask-SQLAlchemy's pool defaults
+        return options
+
+    pool_size, max_overflow = pool_size_for(config)
+    options.update(
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=int(config.get("DB_POOL_TIMEOUT", DB_POOL_TIMEOUT) or 30),
+    )
+    return options
+
+
+# ---------------------------------------------------
+# Per-request statement timeout
+# ---------------------------------------------------
+
+def _set_statement_timeout(ms):
+    g._statement_timeout_ms = int(ms)
+
+    # the request may already be inside a transaction (e.g. the login lookup)
+    session = db.session()  # scoped_session doesn't proxy in_transaction()
+    if session.in_transaction():
+        conn = session.connection()
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(ms)}")
+
+
+def statement_timeout(ms):
+    """View decorator: statement_timeout for this request's queries (Postgres)."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapped(*args, **kwargs):
+            _set_statement_timeout(ms)
+            return fn(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+def _default_timeout_ms():
+    # only web requests get a limit by default: migrations, backfills and
+    # archive jobs legitimately run for minutes
+    if has_request_context():
+        return _cfg("DB_STATEMENT_TIMEOUT_MS", DB_STATEMENT_TIMEOUT_MS)
+    return _cfg("DB_CLI_STATEMENT_TIMEOUT_MS", DB_CLI_STATEMENT_TIMEOUT_MS)
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_statement_timeout(session, transaction, connection):
+    if connection.dialect.name != "postgresql":
+        return
+    ms = g.get("_statement_timeout_ms") if has_request_context() else None
+    if ms is None:
+        ms = _default_timeout_ms()
+    if ms:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(ms)}")
+
+
+# ---------------------------------------------------
+# Read replica
+# ---------------------------------------------------
+
+def report_request():
+    """Route this request's reads to the replica, with the report timeout."""
+    _set_statement_timeout(_cfg("REPORT_STATEMENT_TIMEOUT_MS", REPORT_STATEMENT_TIMEOUT_MS))
+    g._read_replica = True
+
+
+def report_view(fn):
+    """View decorator for read-only reports: see report_request()."""
+    @wraps(fn)
+    def wrapped(*args, **kwargs):
+        report_request()
+        return fn(*args, **kwargs)
+    return wrapped
+
+
+def _mark_replica_down(reason):
+    retry = float(_cfg("REPLICA_RETRY_SECONDS", REPLICA_RETRY_SECONDS) or 0)
+    _replica_state["down_until"] = time.monotonic() + retry
+    if has_app_context():
+        current_app.logger.warning("[DB] read replica unavailable, using primary for %ss: %s", retry, reason)
+
+
+def _on_replica_error(context):
+    if context.is_disconnect:
+        _mark_replica_down(context.original_exception)
+
+
+def _replica_engine():
+    url = _cfg("DATABASE_REPLICA_URL", None)
+    if not url:
+        return None
+
+    state = _replica_state
+    if state["engine"] is None or state["url"] != url:
+        with _replica_lock:
+            if state["engine"] is None or state["url"] != url:
+                engine = create_engine(url, **engine_options(url, current_app.config))
+                event.listen(engine, "handle_error", _on_replica_error)
+                state.update(engine=engine, url=url, down_until=0.0, checked_until=0.0)
+
+    return state["engine"]
+
+
+def replica_engine():
+    """The replica engine if one is configured and reachable, else None."""
+    engine = _replica_engine()
+    if engine is None:
+        return None
+
+    now = time.monotonic()
+    if now < _replica_state["down_until"]:
+        return None
+
+    if now >= _replica_state["checked_until"]:
+        _replica_state["checked_until"] = now + float(
+            _cfg("REPLICA_RETRY_SECONDS", REPLICA_RETRY_SECONDS) or 0
+        )
+        try:
+            with engine.connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+        except Exception as e:
+            _mark_replica_down(e)
+            return None
+
+    return engine
+
+
+def _is_read(clause):
+    if clause is None:
+        return False
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip()[:6].lower() == "select"
+    return bool(getattr(clause, "is_select", False)) and getattr(clause, "_for_update_arg", None) is None
+
+
+class RoutingSession(FlaskSession):
+    """
+    db.session class: plain reads of a report request go to the replica,
+    everything else to the bind Flask-SQLAlchemy would pick.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context() and g.get("_read_replica"):
+            if self._flushing or not _is_read(clause):
+                # read-your-writes: the rest of this session stays on the primary
+                self.info[_WROTE] = True
+            elif not self.info.get(_WROTE):
+                engine = replica_engine()
+                if engine is not None:
+                    return engine
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def dispose_after_fork(app):
+    """
+    Drop the connections a preloaded app inherited from the gunicorn
+    master (gunicorn.conf.py post_fork). close=False leaves the parent's
+    sockets alone; the worker opens its own on first use.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+    with _replica_lock:
+        engine = _replica_state["engine"]
+        if engine is not None:
+            engine.dispose(close=False)
+        _replica_state.update(engine=None, url=None, down_until=0.0, checked_until=0.0)
+
+
+def init_db_routing(app):
+    # before the first session is created. Not configure(class_=...):
+    # that only adds class_ to the keyword arguments each Session gets.
+    db.session.session_factory.class_ = RoutingSession
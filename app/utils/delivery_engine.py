@@ -1,6 +1,6 @@
 from datetime import datetime
 from math import ceil
-from app.utils.google_maps import get_driving_distance_km
+from app.utils.distance_cache import lookup_driving_distance
 
 from app.models import Settings
 
@@ -200,18 +200,17 @@ def get_dispatch_origin(parish, settings):
 
 
 def calculate_real_distance(parish, destination_address, settings):
-    api_key = settings.google_maps_api_key
-
-    if not api_key:
-        return {
-            "success": False,
-            "error": "Google Maps API key missing"
-        }
+    """
+    Driving distance from the parish's dispatch origin.
 
+    Served from the distance cache when possible; falls back to the
+    offline centroid model when Google is unavailable.
+    """
     origin = get_dispatch_origin(parish, settings)
 
-    return get_driving_distance_km(
+    return lookup_driving_distance(
         origin=origin,
         destination=destination_address,
-        api_key=api_key
-    )
\ No newline at end of file
+        api_key=settings.google_maps_api_key,
+        parish=parish
+    )
@@ -0,0 +1,641 @@
+# app/utils/distance_cache.py
+"""
+Cached driving-distance lookups for delivery estimates.
+
+Lookup order:
+  1. in-process memo (fresh rows only)
+  2. distance_cache table (fresh rows only)
+  3. Google Distance Matrix, coalesced per route and guarded by a
+     circuit breaker (skipped when there is no API key)
+  4. offline model: zone/parish centroids, haversine x road factor,
+     calibrated from cached Google results
+
+Cache reads/writes use their own connection so they never commit or
+roll back the caller's db.session.
+"""
+from __future__ import annotations
+
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from statistics import median
+
+from flask import current_app
+from sqlalchemy import select, update, insert, delete
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import DistanceCacheEntry
+from app.utils.google_maps import get_driving_distance_km
+
+
+DEFAULT_ROAD_FACTOR = 1.35
+MIN_ROAD_FACTOR = 1.10
+MAX_ROAD_FACTOR = 2.20
+OFFLINE_AVG_SPEED_KMH = 30.0
+
+MEMO_MAX_ENTRIES = 512
+CALIBRATION_TTL_SECONDS = 600
+CALIBRATION_SAMPLE_SIZE = 200
+
+
+# ---------------------------------------------------
+# Centroid tables (lat, lng) - approximate town/zone centres
+# ---------------------------------------------------
+
+PARISH_CENTROIDS = {
+    "kingston": (17.9970, -76.7936),
+    "st andrew": (18.0300, -76.7800),
+    "st catherine": (17.9911, -76.9574),
+    "clarendon": (17.9645, -77.2452),
+    "manchester": (18.0420, -77.5071),
+    "st elizabeth": (18.0500, -77.7200),
+    "westmoreland": (18.2187, -78.1326),
+    "hanover": (18.4509, -78.1736),
+    "st james": (18.4762, -77.8939),
+    "trelawny": (18.4936, -77.6559),
+    "st ann": (18.4360, -77.2010),
+    "st mary": (18.3700, -76.8900),
+    "portland": (18.1760, -76.4500),
+    "st thomas": (17.8814, -76.4093),
+}
+
+KINGSTON_POSTAL_ZONES = {
+    "1": (17.9680, -76.7930),
+    "2": (17.9800, -76.7750),
+    "3": (17.9750, -76.7550),
+    "4": (17.9780, -76.8050),
+    "5": (18.0080, -76.7850),
+    "6": (18.0250, -76.7650),
+    "7": (18.0180, -76.7450),
+    "8": (18.0380, -76.7900),
+    "10": (18.0130, -76.7990),
+    "11": (17.9900, -76.8300),
+    "13": (17.9950, -76.8150),
+    "14": (17.9870, -76.8100),
+    "15": (17.9650, -76.8200),
+    "16": (17.9900, -76.7700),
+    "17": (17.9480, -76.7230),
+    "19": (18.0420, -76.8300),
+    "20": (18.0300, -76.8200),
+}
+
+AREA_CENTROIDS = {
+    "portmore": (17.9530, -76.8830),
+    "greater portmore": (17.9540, -76.8950),
+    "gregory park": (17.9690, -76.8800),
+    "independence city": (17.9610, -76.8680),
+    "edgewater": (17.9560, -76.8700),
+    "waterford": (17.9600, -76.8610),
+    "naggo head": (17.9470, -76.8730),
+    "braeton": (17.9420, -76.8880),
+    "bridgeport": (17.9590, -76.8540),
+    "spanish town": (17.9911, -76.9574),
+    "ensom city": (17.9940, -76.9690),
+    "lauriston": (18.0050, -76.9470),
+    "old harbour": (17.9414, -77.1090),
+    "linstead": (18.1370, -77.0310),
+    "bog walk": (18.1020, -76.9930),
+    "half way tree": (18.0123, -76.7973),
+    "new kingston": (18.0076, -76.7862),
+    "constant spring": (18.0510, -76.7940),
+    "red hills": (18.0450, -76.8300),
+    "papine": (18.0178, -76.7424),
+    "harbour view": (17.9480, -76.7230),
+    "downtown": (17.9680, -76.7930),
+    "may pen": (17.9645, -77.2452),
+    "mandeville": (18.0420, -77.5071),
+    "montego bay": (18.4762, -77.8939),
+    "ocho rios": (18.4078, -77.1031),
+}
+
+# longest names first so "greater portmore" wins over "portmore"
+_AREA_NAMES = sorted(AREA_CENTROIDS, key=len, reverse=True)
+_PARISH_NAMES = sorted(PARISH_CENTROIDS, key=len, reverse=True)
+_KINGSTON_ZONE_RE = re.compile(r"\bkingston\s*(\d{1,2})\b")
+
+
+# ---------------------------------------------------
+# Normalization
+# ---------------------------------------------------
+
+def normalize_address(value):
+    """
+    Canonical cache key for an address:
+    lowercase, 'saint' -> 'st', punctuation stripped, whitespace
+    collapsed, trailing country dropped.
+    """
+    s = str(value or "").strip().lower()
+    s = re.sub(r"\bsaint\b", "st", s)
+    s = re.sub(r"[^a-z0-9\s]", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    s = re.sub(r"\s*\bjamaica( w i)?$", "", s).strip()
+    return s[:255]
+
+
+def normalize_parish(value):
+    return normalize_address(value)
+
+
+def resolve_point(address, parish=None):
+    """
+    Best-known coordinates for an address: named area, then Kingston
+    postal zone, then parish named in the text, then the parish given.
+
+    Returns (lat, lng, precision) or None.
+    """
+    text = normalize_address(address)
+
+    for name in _AREA_NAMES:
+        if re.search(rf"\b{re.escape(name)}\b", text):
+            lat, lng = AREA_CENTROIDS[name]
+            return lat, lng, "area"
+
+    m = _KINGSTON_ZONE_RE.search(text)
+    if m and m.group(1) in KINGSTON_POSTAL_ZONES:
+        lat, lng = KINGSTON_POSTAL_ZONES[m.group(1)]
+        return lat, lng, "postal_zone"
+
+    for name in _PARISH_NAMES:
+        if re.search(rf"\b{re.escape(name)}\b", text):
+            lat, lng = PARISH_CENTROIDS[name]
+            return lat, lng, "parish"
+
+    parish_norm = normalize_parish(parish)
+    if parish_norm in AREA_CENTROIDS:
+        lat, lng = AREA_CENTROIDS[parish_norm]
+        return lat, lng, "area"
+    if parish_norm in PARISH_CENTROIDS:
+        lat, lng = PARISH_CENTROIDS[parish_norm]
+        return lat, lng, "parish"
+
+    return None
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    r = 6371.0
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * r * math.asin(math.sqrt(a))
+
+
+def _format_duration(minutes):
+    minutes = max(1, int(round(minutes)))
+    if minutes < 60:
+        return f"{minutes} min" if minutes == 1 else f"{minutes} mins"
+    hours, mins = divmod(minutes, 60)
+    hour_part = "1 hour" if hours == 1 else f"{hours} hours"
+    if not mins:
+        return hour_part
+    return f"{hour_part} {mins} mins"
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _as_aware(dt):
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _cfg(key, default):
+    try:
+        return current_app.config.get(key, default)
+    except RuntimeError:
+        return default
+
+
+# ---------------------------------------------------
+# In-process memo
+# ---------------------------------------------------
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _memo_get(key):
+    with _memo_lock:
+        item = _memo.get(key)
+        if not item:
+            return None
+        result, expires_at = item
+        if expires_at <= _utcnow():
+            _memo.pop(key, None)
+            return None
+        _memo.move_to_end(key)
+        return dict(result)
+
+
+def _memo_put(key, result, expires_at):
+    with _memo_lock:
+        _memo[key] = (dict(result), expires_at)
+        _memo.move_to_end(key)
+        while len(_memo) > MEMO_MAX_ENTRIES:
+            _memo.popitem(last=False)
+
+
+def clear_distance_memo():
+    with _memo_lock:
+        _memo.clear()
+    with _calibration_lock:
+        _calibration.clear()
+
+
+# ---------------------------------------------------
+# Persistent cache
+# ---------------------------------------------------
+
+def _read_cached(origin_norm, dest_norm):
+    t = DistanceCacheEntry.__table__
+
+    try:
+        with db.engine.begin() as conn:
+            row = conn.execute(
+                select(
+                    t.c.id,
+                    t.c.distance_km,
+                    t.c.duration_text,
+                    t.c.expires_at,
+                ).where(
+                    t.c.origin_norm == origin_norm,
+                    t.c.destination_norm == dest_norm,
+                )
+            ).first()
+
+            if not row or _as_aware(row.expires_at) <= _utcnow():
+                return None
+
+            conn.execute(
+                update(t)
+                .where(t.c.id == row.id)
+                .values(hit_count=t.c.hit_count + 1)
+            )
+    except Exception as e:
+        current_app.logger.warning("[DISTANCE CACHE] read failed: %s", e)
+        return None
+
+    return {
+        "success": True,
+        "distance_km": float(row.distance_km),
+        "duration_text": row.duration_text,
+        "source": "cache",
+        "estimated": False,
+    }, _as_aware(row.expires_at)
+
+
+def _write_cached(origin_norm, dest_norm, parish_norm, result):
+    t = DistanceCacheEntry.__table__
+    now = _utcnow()
+    ttl_days = int(_cfg("DISTANCE_CACHE_TTL_DAYS", 30) or 30)
+    expires_at = now + timedelta(days=ttl_days)
+
+    values = {
+        "parish": parish_norm or None,
+        "distance_km": float(result["distance_km"]),
+        "duration_text": result.get("duration_text"),
+        "source": "google",
+        "fetched_at": now,
+        "expires_at": expires_at,
+    }
+
+    try:
+        with db.engine.begin() as conn:
+            changed = conn.execute(
+                update(t)
+                .where(
+                    t.c.origin_norm == origin_norm,
+                    t.c.destination_norm == dest_norm,
+                )
+                .values(**values)
+            ).rowcount
+
+            if not changed:
+                conn.execute(
+                    insert(t).values(
+                        origin_norm=origin_norm,
+                        destination_norm=dest_norm,
+                        hit_count=0,
+                        **values,
+                    )
+                )
+    except IntegrityError:
+        # another worker inserted the same route first - theirs is as good as ours
+        pass
+    except Exception as e:
+        current_app.logger.warning("[DISTANCE CACHE] write failed: %s", e)
+
+    return expires_at
+
+
+def purge_stale_distance_cache(keep_days=None):
+    """
+    Delete cache rows that expired more than keep_days ago.
+    Returns number of rows removed.
+    """
+    if keep_days is None:
+        keep_days = int(_cfg("DISTANCE_CACHE_TTL_DAYS", 30) or 30) * 3
+
+    t = DistanceCacheEntry.__table__
+    cutoff = _utcnow() - timedelta(days=int(keep_days))
+
+    with db.engine.begin() as conn:
+        return conn.execute(
+            delete(t).where(t.c.expires_at < cutoff)
+        ).rowcount or 0
+
+
+# ---------------------------------------------------
+# Request coalescing
+# ---------------------------------------------------
+
+class _InflightLookup:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _coalesced(key, fn, wait_seconds):
+    """
+    Run fn() once per key at a time. Concurrent callers for the same
+    key wait for the leader's result instead of issuing their own call.
+    Returns None if the leader did not finish within wait_seconds.
+    """
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _InflightLookup()
+            _inflight[key] = call
+
+    if not leader:
+        call.event.wait(wait_seconds)
+        return dict(call.result) if call.result else None
+
+    try:
+        call.result = fn()
+        return call.result
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        call.event.set()
+
+
+# ---------------------------------------------------
+# Circuit breaker
+# ---------------------------------------------------
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive transient failures and stays open
+    for `cooldown` seconds. After the cooldown one call is let through;
+    a further failure re-opens it, a success closes it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_until = 0.0
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            if now < self._opened_until:
+                return False
+            if self._opened_until:
+                # half-open: block others until this trial reports back
+                self._opened_until = now + 30
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_until = 0.0
+
+    def record_failure(self, threshold, cooldown):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= threshold:
+                self._opened_until = time.monotonic() + cooldown
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return time.monotonic() < self._opened_until
+
+
+google_breaker = CircuitBreaker()
+
+
+def _fetch_google(origin, destination, api_key):
+    timeout = float(_cfg("GOOGLE_MAPS_TIMEOUT_SECONDS", 5) or 5)
+    result = get_driving_distance_km(
+        origin=origin,
+        destination=destination,
+        api_key=api_key,
+        timeout=timeout,
+    )
+
+    if result.get("success") or not result.get("transient"):
+        # Google answered (even "no route"), so the service is healthy
+        google_breaker.record_success()
+    else:
+        google_breaker.record_failure(
+            int(_cfg("DISTANCE_BREAKER_THRESHOLD", 3) or 3),
+            int(_cfg("DISTANCE_BREAKER_COOLDOWN_SECONDS", 120) or 120),
+        )
+        current_app.logger.warning(
+            "[DISTANCE] Google lookup failed (%s); breaker_open=%s",
+            result.get("error"),
+            google_breaker.is_open,
+        )
+
+    return result
+
+
+# ---------------------------------------------------
+# Offline model
+# ---------------------------------------------------
+
+_calibration = {}
+_calibration_lock = threading.Lock()
+
+
+def _load_calibration(origin_norm):
+    """
+    Road factor and per-parish median distances for one origin, derived
+    from cached Google results. Memoized per process.
+    """
+    with _calibration_lock:
+        item = _calibration.get(origin_norm)
+        if item and item[0] > time.monotonic():
+            return item[1]
+
+    road_factor = DEFAULT_ROAD_FACTOR
+    parish_medians = {}
+
+    origin_point = resolve_point(origin_norm)
+    t = DistanceCacheEntry.__table__
+
+    try:
+        with db.engine.connect() as conn:
+            rows = conn.execute(
+                select(t.c.destination_norm, t.c.parish, t.c.distance_km)
+                .where(
+                    t.c.origin_norm == origin_norm,
+                    t.c.source == "google",
+                )
+                .order_by(t.c.fetched_at.desc())
+                .limit(CALIBRATION_SAMPLE_SIZE)
+            ).all()
+    except Exception as e:
+        current_app.logger.warning("[DISTANCE CACHE] calibration read failed: %s", e)
+        rows = []
+
+    ratios = []
+    by_parish = {}
+
+    for dest_norm, parish_norm, km in rows:
+        if parish_norm:
+            by_parish.setdefault(parish_norm, []).append(float(km))
+
+        dest_point = resolve_point(dest_norm, parish_norm)
+        if not origin_point or not dest_point or dest_point[2] == "parish":
+            continue
+
+        straight = haversine_km(origin_point[0], origin_point[1], dest_point[0], dest_point[1])
+        if straight >= 1.0:
+            ratios.append(float(km) / straight)
+
+    if ratios:
+        road_factor = min(MAX_ROAD_FACTOR, max(MIN_ROAD_FACTOR, median(ratios)))
+
+    for parish_norm, kms in by_parish.items():
+        parish_medians[parish_norm] = median(kms)
+
+    calibration = {
+        "road_factor": road_factor,
+        "parish_medians": parish_medians,
+        "samples": len(rows),
+    }
+
+    with _calibration_lock:
+        _calibration[origin_norm] = (
+            time.monotonic() + CALIBRATION_TTL_SECONDS,
+            calibration,
+        )
+
+    return calibration
+
+
+def estimate_offline_distance(origin, destination, parish=None):
+    """
+    Estimate driving distance without the network.
+
+    Area/postal-zone matches use haversine x calibrated road factor.
+    Parish-only matches prefer the median cached Google distance for
+    that origin + parish when one exists.
+    """
+    origin_norm = normalize_address(origin)
+    parish_norm = normalize_parish(parish)
+
+    origin_point = resolve_point(origin_norm)
+    dest_point = resolve_point(destination, parish)
+
+    if not origin_point or not dest_point:
+        return {
+            "success": False,
+            "error": "Unable to estimate distance for this address.",
+        }
+
+    calibration = _load_calibration(origin_norm)
+
+    if dest_point[2] == "parish" and parish_norm in calibration["parish_medians"]:
+        distance_km = calibration["parish_medians"][parish_norm]
+    else:
+        straight = haversine_km(origin_point[0], origin_point[1], dest_point[0], dest_point[1])
+        distance_km = straight * calibration["road_factor"]
+
+    distance_km = round(distance_km, 2)
+
+    return {
+        "success": True,
+        "distance_km": distance_km,
+        "duration_text": _format_duration(distance_km / OFFLINE_AVG_SPEED_KMH * 60),
+        "source": "offline",
+        "estimated": True,
+        "precision": dest_point[2],
+    }
+
+
+# ---------------------------------------------------
+# Public lookup
+# ---------------------------------------------------
+
+def lookup_driving_distance(origin, destination, *, api_key=None, parish=None):
+    """
+    Driving distance origin -> destination with caching and fallbacks.
+
+    Returns the same shape as get_driving_distance_km plus:
+      source    = memo | cache | google | offline
+      estimated = True when the offline model produced the number
+    """
+    origin_norm = normalize_address(origin)
+    dest_norm = normalize_address(destination)
+    parish_norm = normalize_parish(parish)
+
+    if not origin_norm or not dest_norm:
+        return {"success": False, "error": "Origin and destination are required."}
+
+    mode = str(_cfg("DISTANCE_LOOKUP_MODE", "google") or "google").lower()
+    if mode == "offline":
+        return estimate_offline_distance(origin, destination, parish)
+
+    key = (origin_norm, dest_norm)
+
+    memo = _memo_get(key)
+    if memo:
+        memo["source"] = "memo"
+        return memo
+
+    cached = _read_cached(origin_norm, dest_norm)
+    if cached:
+        result, expires_at = cached
+        _memo_put(key, result, expires_at)
+        return result
+
+    # no Maps key (dev, tests, a deployment without one) or Google is
+    # failing: estimate instead
+    if not api_key or not google_breaker.allow():
+        return estimate_offline_distance(origin, destination, parish)
+
+    wait_seconds = float(_cfg("GOOGLE_MAPS_TIMEOUT_SECONDS", 5) or 5) + 1
+    result = _coalesced(
+        key,
+        lambda: _fetch_google(origin, destination, api_key),
+        wait_seconds,
+    )
+
+    if result and result.get("success"):
+        result = dict(result, source="google", estimated=False)
+        expires_at = _write_cached(origin_norm, dest_norm, parish_norm, result)
+        _memo_put(key, dict(result, source="cache"), expires_at)
+        return result
+
+    if result is None or result.get("transient"):
+        return estimate_offline_distance(origin, destination, parish)
+
+    # Google answered but has no route (NOT_FOUND / ZERO_RESULTS)
+    return result
@@ -0,0 +1,181 @@
+# app/utils/estimate_cache.py
+"""
+Memoized rate-calculator estimates.
+
+calculate_charges() needs the Settings row and the AdminRate brackets.
+Here both are read into a PricingSnapshot at most once every
+PRICING_SNAPSHOT_TTL_SECONDS per worker; a commit that touches Settings
+or AdminRate in this worker drops it immediately. snapshot.version is a
+hash of its contents and doubles as the /public-api/rates ETag.
+
+estimate_charges() memoizes results in a bounded LRU keyed on
+(category, weight, invoice value, snapshot version), so repeated
+estimates are served without touching the database and a rate change
+never serves a stale price.
+
+Weight and invoice value are quantized to 0.01 before calculating, so
+an input and its cache key always give the same result.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.calculator_data import _to_float, calculate_charges, normalize_category
+from app.extensions import db
+from app.models import AdminRate, Settings
+
+
+PRICING_MEMO_SIZE = 4096
+PRICING_SNAPSHOT_TTL_SECONDS = 60
+
+
+class PricingSnapshot:
+    """Settings values + rate brackets, detached from the session."""
+
+    def __init__(self, settings, brackets):
+        # None when the Settings row doesn't exist yet
+        self.settings = settings
+        self.brackets = brackets
+
+        payload = json.dumps(
+            {
+                "settings": vars(settings) if settings is not None else None,
+                "brackets": brackets,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        self.version = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+        self.loaded_at = time.monotonic()
+
+
+_snapshot = {"value": None}
+_snapshot_lock = threading.Lock()
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _cfg(key, default):
+    try:
+        return current_app.config.get(key, default)
+    except RuntimeError:
+        return default
+
+
+def _load_snapshot():
+    row = db.session.get(Settings, 1)
+
+    settings = None
+    if row is not None:
+        settings = SimpleNamespace(**{
+            column.key: getattr(row, column.key)
+            for column in Settings.__mapper__.column_attrs
+        })
+
+    brackets = [
+        (int(max_weight), float(rate or 0))
+        for max_weight, rate in (
+            db.session.query(AdminRate.max_weight, AdminRate.rate)
+            .order_by(AdminRate.max_weight.asc())
+            .all()
+        )
+    ]
+
+    return PricingSnapshot(settings, brackets)
+
+
+def pricing_snapshot():
+    """The current PricingSnapshot, reloading it once the TTL is up."""
+    ttl = int(_cfg("PRICING_SNAPSHOT_TTL_SECONDS", PRICING_SNAPSHOT_TTL_SECONDS) or 0)
+
+    with _snapshot_lock:
+        snap = _snapshot["value"]
+        if snap is not None and time.monotonic() - snap.loaded_at < ttl:
+            return snap
+
+    snap = _load_snapshot()
+
+    with _snapshot_lock:
+        _snapshot["value"] = snap
+    return snap
+
+
+def invalidate_pricing():
+    with _snapshot_lock:
+        _snapshot["value"] = None
+    with _memo_lock:
+        _memo.clear()
+
+
+def estimate_charges(category, invoice_usd, weight):
+    """
+    calculate_charges() through the snapshot + LRU memo.
+    Returns a fresh dict the caller may modify.
+    """
+    snap = pricing_snapshot()
+
+    category = normalize_category(category)
+    invoice_usd = round(_to_float(invoice_usd, 0.0), 2)
+    weight = round(_to_float(weight, 0.0), 2)
+
+    key = (category, weight, invoice_usd, snap.version)
+
+    with _memo_lock:
+        result = _memo.get(key)
+        if result is not None:
+            _memo.move_to_end(key)
+            return dict(result)
+
+    result = calculate_charges(
+        category,
+        invoice_usd,
+        weight,
+        settings=snap.settings,
+        brackets=snap.brackets,
+    )
+
+    size = int(_cfg("PRICING_MEMO_SIZE", PRICING_MEMO_SIZE) or PRICING_MEMO_SIZE)
+    with _memo_lock:
+        _memo[key] = dict(result)
+        _memo.move_to_end(key)
+        while len(_memo) > size:
+            _memo.popitem(last=False)
+
+    return dict(result)
+
+
+# ---------------------------------------------------
+# Invalidation on Settings / AdminRate commits
+# ---------------------------------------------------
+
+def _mark_pricing_dirty(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info["pricing_dirty"] = True
+
+
+for _model in (Settings, AdminRate):
+    event.listen(_model, "after_insert", _mark_pricing_dirty)
+    event.listen(_model, "after_update", _mark_pricing_dirty)
+    event.listen(_model, "after_delete", _mark_pricing_dirty)
+
+
+@event.listens_for(Session, "after_commit")
+def _clear_pricing_after_commit(session):
+    if session.info.pop("pricing_dirty", False):
+        invalidate_pricing()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pricing_flag(session):
+    session.info.pop("pricing_dirty", None)
@@ -0,0 +1,656 @@
+# app/utils/finance_facts.py
+"""
+Pre-aggregated finance totals.
+
+The finance pages used to re-sum raw payments, expenses, payroll runs
+and invoices on every view. finance_daily_facts keeps one row per
+(Jamaica business date, metric, method) instead:
+
+  income            completed non-refund payments, method = tender
+  package_refund    completed refund payments, method = tender
+  delivery_refund
+  expense           manual expenses, method = category
+  payroll           paid payroll runs (total_net), method = pay frequency
+  invoiced          issued invoice totals (not draft/cancelled)
+  discount          invoice discount_total on the issue date
+  invoice_paid      paid invoice totals on the paid date
+
+Rows are kept current from ORM flush events: before a flush the old
+state of every changed source row is read back from the database, after
+it the new state, and the difference is applied with one UPSERT per key
+on the flush's own connection, so facts commit or roll back with the
+change that caused them. Deltas commute, so concurrent workers never
+lose an update.
+
+Bulk UPDATE/DELETE statements bypass the ORM; call remove_facts_for()
+before one, or let the nightly finance_facts_verify job repair the last
+FINANCE_FACTS_VERIFY_DAYS days.
+
+    flask finance backfill [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+    flask finance verify   [--start ...] [--end ...] [--fix]
+
+Backfill rewrites the range from the source tables; run it after the
+migration and whenever verify reports drift (or use verify --fix).
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import event, extract, func, inspect, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import Expense, FinanceDailyFact, Invoice, Payment, PayrollRun
+from app.utils.time import JAMAICA_TZ, to_jamaica
+
+
+REFUND_TYPES = ("package_refund", "delivery_refund")
+PAYMENT_METRICS = ("income",) + REFUND_TYPES
+
+UNISSUED_INVOICE_STATUSES = ("draft", "cancelled")
+
+FINANCE_FACTS_VERIFY_DAYS = 35
+
+# amounts closer than this are treated as equal by verify
+AMOUNT_TOLERANCE = 0.005
+
+_ID_CHUNK = 500
+
+_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _cfg(key, default):
+    try:
+        return current_app.config.get(key, default)
+    except RuntimeError:
+        return default
+
+
+def business_date(value):
+    """Jamaica calendar date of a UTC timestamp (dates pass through)."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return to_jamaica(value).date()
+    if isinstance(value, date):
+        return value
+    return None
+
+
+def business_bounds(start, end=None):
+    """
+    Naive-UTC [lo, hi) covering Jamaica business dates start..end, for
+    filtering raw created_at columns the same way the facts are keyed.
+    """
+    end = end or start
+    lo = datetime.combine(start, time.min, tzinfo=JAMAICA_TZ)
+    hi = datetime.combine(end + timedelta(days=1), time.min, tzinfo=JAMAICA_TZ)
+    return (
+        lo.astimezone(timezone.utc).replace(tzinfo=None),
+        hi.astimezone(timezone.utc).replace(tzinfo=None),
+    )
+
+
+def _first(*values):
+    # SQL COALESCE: first value that isn't NULL (0 counts)
+    for v in values:
+        if v is not None:
+            return v
+    return None
+
+
+def _amount(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# ---------------------------------------------------
+# Source rows -> fact contributions
+# ---------------------------------------------------
+
+def _payment_facts(row):
+    if str(row.status or "completed").strip().lower() != "completed":
+        return []
+
+    day = business_date(row.created_at)
+    if day is None:
+        return []
+
+    metric = row.transaction_type if row.transaction_type in REFUND_TYPES else "income"
+    method = (row.method or "").strip()[:120]
+    return [(day, metric, method, _amount(row.amount_jmd), 1)]
+
+
+def _expense_facts(row):
+    day = business_date(row.date)
+    if day is None:
+        return []
+    return [(day, "expense", (row.category or "").strip()[:120], _amount(row.amount), 1)]
+
+
+def _payroll_facts(row):
+    if str(row.status or "").strip().lower() != "paid":
+        return []
+
+    day = business_date(_first(row.paid_at, row.created_at))
+    if day is None:
+        return []
+    return [(day, "payroll", (row.pay_frequency or "").strip()[:120], _amount(row.total_net), 1)]
+
+
+def _invoice_facts(row):
+    status = str(row.status or "").strip().lower()
+    facts = []
+
+    issued = business_date(_first(row.date_issued, row.date_submitted, row.created_at))
+    if issued is not None and status not in UNISSUED_INVOICE_STATUSES:
+        facts.append((issued, "invoiced", "", _amount(_first(row.grand_total, row.amount, row.amount_due)), 1))
+
+        discount = _amount(row.discount_total)
+        if discount:
+            facts.append((issued, "discount", "", discount, 1))
+
+    paid = business_date(_first(row.date_paid, row.created_at))
+    if paid is not None and status == "paid":
+        facts.append((paid, "invoice_paid", "", _amount(_first(row.grand_total, row.amount, row.amount_due)), 1))
+
+    return facts
+
+
+class _Source:
+    def __init__(self, model, fields, facts, window):
+        self.model = model
+        self.fields = fields
+        self.facts = facts
+        # window(start_dt, end_dt) -> WHERE clause covering every row whose
+        # business date can fall in the range
+        self.window = window
+
+    @property
+    def columns(self):
+        table = self.model.__table__
+        return [table.c.id] + [table.c[name] for name in self.fields]
+
+
+def _between(expr, lo, hi):
+    return (expr >= lo) & (expr < hi)
+
+
+_SOURCES = (
+    _Source(
+        Payment,
+        ("created_at", "status", "transaction_type", "method", "amount_jmd"),
+        _payment_facts,
+        lambda lo, hi: _between(Payment.created_at, lo, hi),
+    ),
+    _Source(
+        Expense,
+        ("date", "category", "amount"),
+        _expense_facts,
+        lambda lo, hi: _between(Expense.date, lo.date(), hi.date()),
+    ),
+    _Source(
+        PayrollRun,
+        ("status", "paid_at", "created_at", "total_net", "pay_frequency"),
+        _payroll_facts,
+        lambda lo, hi: _between(func.coalesce(PayrollRun.paid_at, PayrollRun.created_at), lo, hi),
+    ),
+    _Source(
+        Invoice,
+        (
+            "status", "grand_total", "amount", "amount_due", "discount_total",
+            "date_issued", "date_submitted", "date_paid", "created_at",
+        ),
+        _invoice_facts,
+        lambda lo, hi: or_(
+            _between(func.coalesce(Invoice.date_issued, Invoice.date_submitted, Invoice.created_at), lo, hi),
+            _between(func.coalesce(Invoice.date_paid, Invoice.created_at), lo, hi),
+        ),
+    ),
+)
+
+_SOURCE_BY_MODEL = {s.model: s for s in _SOURCES}
+
+
+def _load_rows(conn, source, ids):
+    ids = list(ids)
+    rows = []
+    for i in range(0, len(ids), _ID_CHUNK):
+        rows.extend(conn.execute(
+            select(*source.columns).where(source.model.__table__.c.id.in_(ids[i:i + _ID_CHUNK]))
+        ).all())
+    return rows
+
+
+def _add(totals, facts, sign=1):
+    for day, metric, method, amount, count in facts:
+        entry = totals[(day, metric, method)]
+        entry[0] += sign * amount
+        entry[1] += sign * count
+
+
+# ---------------------------------------------------
+# Applying deltas
+# ---------------------------------------------------
+
+def _apply_deltas(conn, deltas):
+    rows = [
+        {"business_date": day, "metric": metric, "method": method, "amount": amount, "count": count}
+        for (day, metric, method), (amount, count) in deltas.items()
+        if count or abs(amount) >= AMOUNT_TOLERANCE
+    ]
+    if not rows:
+        return 0
+
+    t = FinanceDailyFact.__table__
+    insert = _INSERTS.get(conn.dialect.name)
+
+    if insert is not None:
+        stmt = insert(t)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.c.business_date, t.c.metric, t.c.method],
+            set_={
+                "amount": t.c.amount + stmt.excluded.amount,
+                "count": t.c.count + stmt.excluded.count,
+            },
+        )
+        conn.execute(stmt, rows)
+        return len(rows)
+
+    for row in rows:
+        updated = conn.execute(
+            t.update()
+            .where(
+                t.c.business_date == row["business_date"],
+                t.c.metric == row["metric"],
+                t.c.method == row["method"],
+            )
+            .values(amount=t.c.amount + row["amount"], count=t.c.count + row["count"])
+        )
+        if not updated.rowcount:
+            conn.execute(t.insert().values(**row))
+    return len(rows)
+
+
+def remove_facts_for(model, ids, session=None):
+    """
+    Subtract the facts of rows about to be removed by a bulk DELETE
+    (which skips the flush listeners). Call it in the same transaction.
+    """
+    source = _SOURCE_BY_MODEL[model]
+    conn = (session or db.session).connection()
+
+    deltas = defaultdict(lambda: [0.0, 0])
+    for row in _load_rows(conn, source, ids):
+        _add(deltas, source.facts(row), sign=-1)
+    return _apply_deltas(conn, deltas)
+
+
+# ---------------------------------------------------
+# Flush listeners
+# ---------------------------------------------------
+
+def _tracked_change(obj, source):
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in source.fields)
+
+
+@event.listens_for(Session, "before_flush")
+def _capture_old_facts(session, flush_context, instances):
+    changed = defaultdict(list)
+    removed = defaultdict(set)
+
+    for obj in session.dirty:
+        source = _SOURCE_BY_MODEL.get(type(obj))
+        if source is not None and obj.id is not None and _tracked_change(obj, source):
+            changed[source].append(obj)
+            removed[source].add(obj.id)
+
+    for obj in session.deleted:
+        source = _SOURCE_BY_MODEL.get(type(obj))
+        if source is not None and obj.id is not None:
+            removed[source].add(obj.id)
+
+    for obj in session.new:
+        source = _SOURCE_BY_MODEL.get(type(obj))
+        if source is not None:
+            changed[source].append(obj)
+
+    if not (changed or removed):
+        session.info.pop("finance_fact_changes", None)
+        return
+
+    # the database still holds the pre-flush state (earlier flushes in
+    # this transaction already applied their own deltas)
+    deltas = defaultdict(lambda: [0.0, 0])
+    if removed:
+        conn = session.connection()
+        for source, ids in removed.items():
+            for row in _load_rows(conn, source, ids):
+                _add(deltas, source.facts(row), sign=-1)
+
+    session.info["finance_fact_changes"] = (deltas, changed)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_fact_changes(session, flush_context):
+    pending = session.info.pop("finance_fact_changes", None)
+    if pending is None:
+        return
+
+    deltas, changed = pending
+    conn = session.connection()
+
+    for source, objs in changed.items():
+        ids = {o.id for o in objs if o.id is not None and o not in session.deleted}
+        for row in _load_rows(conn, source, ids):
+            _add(deltas, source.facts(row))
+
+    _apply_deltas(conn, deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_fact_changes(session):
+    session.info.pop("finance_fact_changes", None)
+
+
+# ---------------------------------------------------
+# Backfill / verify
+# ---------------------------------------------------
+
+def expected_facts(conn, start=None, end=None):
+    """
+    Facts recomputed from the source tables, optionally limited to
+    business dates start..end (inclusive).
+    Returns {(business_date, metric, method): [amount, count]}.
+    """
+    totals = defaultdict(lambda: [0.0, 0])
+
+    window = None
+    if start is not None or end is not None:
+        # widen by a day on each side; the business date decides
+        lo = datetime.combine((start or date(1970, 1, 1)) - timedelta(days=1), datetime.min.time())
+        hi = datetime.combine((end or date(9999, 12, 30)) + timedelta(days=2), datetime.min.time())
+        window = (lo, hi)
+
+    for source in _SOURCES:
+        stmt = select(*source.columns)
+        if window is not None:
+            stmt = stmt.where(source.window(*window))
+
+        for row in conn.execute(stmt.execution_options(yield_per=1000)):
+            _add(totals, [
+                f for f in source.facts(row)
+                if (start is None or f[0] >= start) and (end is None or f[0] <= end)
+            ])
+
+    return totals
+
+
+def stored_facts(conn, start=None, end=None, dates=None):
+    t = FinanceDailyFact.__table__
+    stmt = select(t.c.business_date, t.c.metric, t.c.method, t.c.amount, t.c.count)
+    if start is not None:
+        stmt = stmt.where(t.c.business_date >= start)
+    if end is not None:
+        stmt = stmt.where(t.c.business_date <= end)
+    if dates is not None:
+        stmt = stmt.where(t.c.business_date.in_(list(dates)))
+
+    return {
+        (r.business_date, r.metric, r.method): [float(r.amount or 0), int(r.count or 0)]
+        for r in conn.execute(stmt)
+    }
+
+
+def rebuild_facts(start=None, end=None, dates=None, expected=None):
+    """
+    Replace the stored facts for start..end (or only the given dates)
+    with values recomputed from the source tables. Commits.
+    Returns the number of fact rows written.
+    """
+    conn = db.session.connection()
+    t = FinanceDailyFact.__table__
+
+    if expected is None:
+        expected = expected_facts(conn, start, end)
+
+    if dates is not None:
+        dates = set(dates)
+        expected = {k: v for k, v in expected.items() if k[0] in dates}
+
+    stmt = t.delete()
+    if start is not None:
+        stmt = stmt.where(t.c.business_date >= start)
+    if end is not None:
+        stmt = stmt.where(t.c.business_date <= end)
+    if dates is not None:
+        stmt = stmt.where(t.c.business_date.in_(list(dates)))
+    conn.execute(stmt)
+
+    rows = [
+        {"business_date": day, "metric": metric, "method": method, "amount": amount, "count": count}
+        for (day, metric, method), (amount, count) in expected.items()
+        if count or abs(amount) >= AMOUNT_TOLERANCE
+    ]
+    if rows:
+        conn.execute(t.insert(), rows)
+
+    db.session.commit()
+    return len(rows)
+
+
+def verify_facts(start=None, end=None, fix=False):
+    """
+    Compare stored facts with the source tables. Returns the mismatches;
+    with fix=True the affected business dates are rebuilt.
+    """
+    conn = db.session.connection()
+    expected = expected_facts(conn, start, end)
+    stored = stored_facts(conn, start, end)
+
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        exp_amount, exp_count = expected.get(key, (0.0, 0))
+        got_amount, got_count = stored.get(key, (0.0, 0))
+        if exp_count != got_count or abs(exp_amount - got_amount) >= AMOUNT_TOLERANCE:
+            mismatches.append({
+                "business_date": key[0],
+                "metric": key[1],
+                "method": key[2],
+                "stored_amount": got_amount,
+                "stored_count": got_count,
+                "expected_amount": exp_amount,
+                "expected_count": exp_count,
+            })
+
+    if fix and mismatches:
+        rebuild_facts(
+            start,
+            end,
+            dates={m["business_date"] for m in mismatches},
+            expected=expected,
+        )
+    else:
+        db.session.rollback()
+
+    return mismatches
+
+
+def verify_recent_facts(days=None, fix=True):
+    days = int(days or _cfg("FINANCE_FACTS_VERIFY_DAYS", FINANCE_FACTS_VERIFY_DAYS))
+    today = business_date(datetime.utcnow())
+    return verify_facts(today - timedelta(days=days), today, fix=fix)
+
+
+# ---------------------------------------------------
+# Readers for the finance pages
+# ---------------------------------------------------
+
+def _fact_query(*columns, start=None, end=None, metrics=None):
+    q = db.session.query(*columns)
+    if start is not None:
+        q = q.filter(FinanceDailyFact.business_date >= start)
+    if end is not None:
+        q = q.filter(FinanceDailyFact.business_date <= end)
+    if metrics is not None:
+        q = q.filter(FinanceDailyFact.metric.in_(list(metrics)))
+    return q
+
+
+def fact_totals(start, end, metrics=None):
+    """{metric: {"amount": ..., "count": ...}} for business dates start..end."""
+    rows = (
+        _fact_query(
+            FinanceDailyFact.metric,
+            func.coalesce(func.sum(FinanceDailyFact.amount), 0.0).label("amount"),
+            func.coalesce(func.sum(FinanceDailyFact.count), 0).label("count"),
+            start=start,
+            end=end,
+            metrics=metrics,
+        )
+        .group_by(FinanceDailyFact.metric)
+        .all()
+    )
+    return {r.metric: {"amount": float(r.amount or 0), "count": int(r.count or 0)} for r in rows}
+
+
+def fact_method_totals(start, end, metrics=None):
+    """Rows of (metric, method, amount, count) for business dates start..end."""
+    return (
+        _fact_query(
+            FinanceDailyFact.metric,
+            FinanceDailyFact.method,
+            func.coalesce(func.sum(FinanceDailyFact.amount), 0.0).label("amount"),
+            func.coalesce(func.sum(FinanceDailyFact.count), 0).label("count"),
+            start=start,
+            end=end,
+            metrics=metrics,
+        )
+        .group_by(FinanceDailyFact.metric, FinanceDailyFact.method)
+        .all()
+    )
+
+
+def daily_facts(start, end, metrics=None):
+    """Rows of (business_date, metric, method, amount, count), oldest first."""
+    return (
+        _fact_query(
+            FinanceDailyFact.business_date,
+            FinanceDailyFact.metric,
+            FinanceDailyFact.method,
+            FinanceDailyFact.amount,
+            FinanceDailyFact.count,
+            start=start,
+            end=end,
+            metrics=metrics,
+        )
+        .order_by(FinanceDailyFact.business_date.asc())
+        .all()
+    )
+
+
+def monthly_fact_totals(start, end, metrics=None):
+    """{"YYYY-MM": {metric: amount}}, one row per month and metric."""
+    year = extract("year", FinanceDailyFact.business_date)
+    month = extract("month", FinanceDailyFact.business_date)
+
+    rows = (
+        _fact_query(
+            year.label("y"),
+            month.label("m"),
+            FinanceDailyFact.metric,
+            func.coalesce(func.sum(FinanceDailyFact.amount), 0.0).label("amount"),
+            start=start,
+            end=end,
+            metrics=metrics,
+        )
+        .group_by(year, month, FinanceDailyFact.metric)
+        .all()
+    )
+
+    out = defaultdict(dict)
+    for r in rows:
+        out[f"{int(r.y):04d}-{int(r.m):02d}"][r.metric] = float(r.amount or 0)
+    return out
+
+
+def fact_methods(metrics=PAYMENT_METRICS):
+    """Distinct non-empty methods recorded for the given metrics."""
+    return [
+        r[0] for r in (
+            db.session.query(FinanceDailyFact.method)
+            .filter(FinanceDailyFact.metric.in_(list(metrics)))
+            .filter(FinanceDailyFact.method != "")
+            .distinct()
+            .order_by(FinanceDailyFact.method.asc())
+            .all()
+        )
+    ]
+
+
+# ---------------------------------------------------
+# CLI: flask finance ...
+# ---------------------------------------------------
+
+finance_cli = AppGroup("finance", help="Finance daily facts.")
+
+
+def _parse_day(ctx, param, value):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise click.BadParameter("expected YYYY-MM-DD")
+
+
+@finance_cli.command("backfill")
+@click.option("--start", callback=_parse_day, help="First business date (default: all history).")
+@click.option("--end", callback=_parse_day, help="Last business date (default: all history).")
+def backfill_command(start, end):
+    """Rebuild finance_daily_facts from payments, expenses, payroll and invoices."""
+    written = rebuild_facts(start, end)
+    click.echo(f"finance facts: wrote {written} rows for {start or 'beginning'} .. {end or 'today'}")
+
+
+@finance_cli.command("verify")
+@click.option("--start", callback=_parse_day, help="First business date (default: all history).")
+@click.option("--end", callback=_parse_day, help="Last business date (default: all history).")
+@click.option("--fix", is_flag=True, help="Rebuild the business dates that differ.")
+def verify_command(start, end, fix):
+    """Compare finance_daily_facts with the source tables."""
+    mismatches = verify_facts(start, end, fix=fix)
+
+    for m in mismatches:
+        click.echo(
+            f"{m['business_date']} {m['metric']:<16} {m['method'] or '-':<20} "
+            f"stored {m['stored_amount']:>14,.2f} ({m['stored_count']})  "
+            f"expected {m['expected_amount']:>14,.2f} ({m['expected_count']})"
+        )
+
+    if not mismatches:
+        click.echo("finance facts: OK")
+        return
+
+    days = len({m["business_date"] for m in mismatches})
+    if fix:
+        click.echo(f"finance facts: rebuilt {days} business date(s)")
+        return
+
+    click.echo(f"finance facts: {len(mismatches)} mismatch(es) on {days} business date(s); rerun with --fix")
+    raise SystemExit(1)
+
+
+def init_finance_facts(app):
+    app.cli.add_command(finance_cli)
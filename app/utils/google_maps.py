@@ -1,7 +1,17 @@
 import requests
 
 
-def get_driving_distance_km(origin, destination, api_key):
+# Statuses that mean Google could not answer right now (quota, outage,
+# bad key) rather than "this address has no route".
+TRANSIENT_STATUSES = {
+    "OVER_QUERY_LIMIT",
+    "OVER_DAILY_LIMIT",
+    "REQUEST_DENIED",
+    "UNKNOWN_ERROR",
+}
+
+
+def get_driving_distance_km(origin, destination, api_key, timeout=15):
     try:
         url = "https://maps.googleapis.com/maps/api/distancematrix/json"
 
@@ -13,16 +23,20 @@ def get_driving_distance_km(origin, destination, api_key):
             "key": api_key,
         }
 
-        response = requests.get(url, params=params, timeout=15)
+        response = requests.get(url, params=params, timeout=timeout)
         data = response.json()
 
         if data.get("status") != "OK":
-            return {"success": False, "error": data.get("status")}
+            return {
+                "success": False,
+                "error": data.get("status"),
+                "transient": data.get("status") in TRANSIENT_STATUSES,
+            }
 
         element = data["rows"][0]["elements"][0]
 
         if element.get("status") != "OK":
-            return {"success": False, "error": element.get("status")}
+            return {"success": False, "error": element.get("status"), "transient": False}
 
         distance_km = element["distance"]["value"] / 1000
 
@@ -33,4 +47,4 @@ def get_driving_distance_km(origin, destination, api_key):
         }
 
     except Exception as e:
-        return {"success": False, "error": str(e)}
\ No newline at end of file
+        return {"success": False, "error": str(e), "transient": True}
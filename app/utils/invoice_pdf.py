@@ -1,18 +1,28 @@
-import os
-from flask import render_template, current_app, url_for
-from weasyprint import HTML, CSS
+from datetime import datetime
 
-def generate_invoice_pdf(invoice: dict) -> str:
-    # filename pieces
-    bill = invoice.get("number") or f"INV-{invoice.get('id', '0')}"
-    filename = f"invoice_{bill}.pdf"
+from flask import current_app, url_for
+
+from app.models import Invoice, Package
+from app.utils.invoice_totals import fetch_invoice_totals_pg
+from app.utils.pdf_cache import (
+    cached_pdf_path,
+    run_in_background,
+    static_path,
+    template_path,
+)
+from app.utils.pdf_service import render_pdf
+
+INVOICE_TEMPLATE = "admin/invoice_template.html"
 
-    # paths
-    static_dir = current_app.static_folder
-    relpath = f"invoices/{filename}"
-    abspath = os.path.join(static_dir, "invoices", filename)
-    os.makedirs(os.path.dirname(abspath), exist_ok=True)
 
+def _num(x):
+    try:
+        return float(x or 0)
+    except Exception:
+        return 0.0
+
+
+def _render_context(invoice: dict) -> dict:
     # use passed-in dynamic logo first
     logo_data_uri = invoice.get("logo_data_uri")
     logo_url = invoice.get("logo_url") or url_for(
@@ -29,8 +39,7 @@ def generate_invoice_pdf(invoice: dict) -> str:
         _scheme="https",
     )
 
-    html = render_template(
-        "admin/invoice_template.html",
+    return dict(
         invoice=invoice,
         logo_data_uri=logo_data_uri,
         logo_url=logo_url,
@@ -39,8 +48,179 @@ def generate_invoice_pdf(invoice: dict) -> str:
         USD_TO_JMD=invoice.get("USD_TO_JMD"),
     )
 
-    HTML(string=html, base_url=current_app.static_folder).write_pdf(
-        abspath,
-        stylesheets=[CSS(os.path.join(static_dir, "css", "invoice.css"))]
+
+def render_invoice_pdf(invoice: dict) -> bytes:
+    return render_pdf(
+        INVOICE_TEMPLATE,
+        _render_context(invoice),
+        stylesheets=("invoice",),
+        base_url=current_app.static_folder,
     )
-    return relpath
+
+
+def invoice_pdf_path(invoice: dict) -> str:
+    """
+    Absolute path to the invoice/receipt PDF, rendered only when the
+    invoice's render inputs have changed since the last request.
+    """
+    kind = invoice.get("doc_type") or "invoice"
+
+    return cached_pdf_path(
+        kind,
+        _render_context(invoice),
+        lambda: render_invoice_pdf(invoice),
+        template_files=(
+            template_path(INVOICE_TEMPLATE),
+            static_path("css", "invoice.css"),
+        ),
+    )
+
+
+def invoice_pdf_filename(invoice: dict) -> str:
+    bill = invoice.get("number") or f"INV-{invoice.get('id', '0')}"
+    prefix = "receipt" if invoice.get("doc_type") == "receipt" else "invoice"
+    return f"{prefix}_{bill}.pdf"
+
+
+def build_invoice_view_dict(inv):
+    packages = []
+
+    for p in Package.query.filter_by(invoice_id=inv.id).all():
+
+        _is_subscription_covered = (
+            bool(getattr(p, "subscription_applied", False))
+            and (getattr(p, "subscription_result", "") or "") == "subscription_applied"
+        )
+
+        _value_usd = _num(
+            getattr(p, "value", getattr(p, "invoice_value", getattr(p, "value_usd", 0)))
+        )
+
+        _bad_address_fee = _num(getattr(p, "bad_address_fee", 0))
+
+        if bool(getattr(p, "epc", False)) and _bad_address_fee <= 0:
+            _bad_address_fee = 500.0
+
+        if _is_subscription_covered:
+            _freight = 0
+            _storage = 0
+        else:
+            _freight = _num(getattr(p, "freight_fee", getattr(p, "freight", 0)))
+            _storage = _num(
+                getattr(
+                    p,
+                    "handling_fee",
+                    getattr(
+                        p,
+                        "storage_fee",
+                        getattr(p, "handling", 0),
+                    ),
+                )
+            )
+
+        packages.append({
+            "house_awb":     getattr(p, "house_awb", "") or "",
+            "description":   getattr(p, "description", "") or "",
+            "weight":        _num(getattr(p, "weight", 0)),
+            "value":         _value_usd,
+
+            "other_charges": _num(getattr(p, "other_charges", 0)),
+            "bad_address_fee": _bad_address_fee,
+            "freight":       _freight,
+            "storage":       _storage,
+
+            "duty":          _num(getattr(p, "duty", 0)),
+            "scf":           _num(getattr(p, "scf", 0)),
+            "envl":          _num(getattr(p, "envl", 0)),
+            "caf":           _num(getattr(p, "caf", 0)),
+            "gct":           _num(getattr(p, "gct", 0)),
+            "discount_due":  _num(getattr(p, "discount_due", 0)),
+
+            "subscription_applied": bool(getattr(p, "subscription_applied", False)),
+            "subscription_result": getattr(p, "subscription_result", None),
+            "subscription_covered": _is_subscription_covered,
+
+            "customs_only_due_to_subscription": (
+                _is_subscription_covered
+                and float(getattr(p, "customs_total", 0) or 0) > 0
+            ),
+        })
+
+    invoice_dict = {
+        "id": inv.id,
+        "number": inv.invoice_number,
+        "date": inv.date_submitted or datetime.utcnow(),
+        "customer_code": getattr(inv.user, "registration_number", "") if getattr(inv, "user", None) else "",
+        "customer_name": getattr(inv.user, "full_name", "") if getattr(inv, "user", None) else "",
+        "subtotal": _num(getattr(inv, "subtotal", getattr(inv, "grand_total", 0))),
+        "discount_total": _num(getattr(inv, "discount_total", 0)),
+        "total_due": _num(getattr(inv, "grand_total", getattr(inv, "amount", 0))),
+        "packages": packages,
+    }
+
+    return invoice_dict
+
+
+def build_invoice_pdf_dict(invoice):
+    """
+    Admin invoice PDF context: saved package charges plus live totals.
+    """
+    invoice_dict = build_invoice_view_dict(invoice)
+
+    (
+        subtotal,
+        discount_total,
+        payments_total,
+        total_due,
+    ) = fetch_invoice_totals_pg(invoice.id)
+
+    if (invoice.status or "").strip().lower() == "paid":
+        total_due = 0.0
+
+    number = invoice.invoice_number or f"INV{invoice.id:05d}"
+    issued = (
+        invoice.date_issued
+        or invoice.date_submitted
+        or invoice.created_at
+        or datetime.utcnow()
+    )
+
+    invoice_dict.update(
+        {
+            "id": invoice.id,
+            "number": number,
+            "invoice_number": number,
+            "date": issued,
+            "date_issued": issued,
+            "subtotal": float(subtotal or 0),
+            "grand_total": float(subtotal or 0),
+            "discount_total": float(discount_total or 0),
+            "payments_total": float(payments_total or 0),
+            "total_due": float(total_due or 0),
+            "amount_due": float(total_due or 0),
+        }
+    )
+
+    return invoice_dict
+
+
+def _prerender_invoices(invoice_ids):
+    for invoice_id in invoice_ids:
+        inv = Invoice.query.get(invoice_id)
+        if not inv:
+            continue
+        try:
+            invoice_pdf_path(build_invoice_pdf_dict(inv))
+        except Exception:
+            current_app.logger.exception("[PDF CACHE] pre-render of invoice %s failed", invoice_id)
+
+
+def prerender_invoice_pdfs(invoice_ids):
+    """
+    Warm the PDF cache for freshly finalized invoices on a background
+    thread so the first download is served from disk.
+    """
+    ids = [int(i) for i in invoice_ids or [] if i]
+    if not ids:
+        return None
+    return run_in_background(_prerender_invoices, ids)
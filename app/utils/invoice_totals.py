@@ -36,104 +36,76 @@ def fetch_invoice_totals_pg(invoice_id: int):
             Remaining invoice balance.
     """
 
-    inv = Invoice.query.get(invoice_id)
+    return fetch_invoice_totals_many([invoice_id]).get(
+        invoice_id,
+        (0.0, 0.0, 0.0, 0.0),
+    )
 
-    if not inv:
-        return 0.0, 0.0, 0.0, 0.0
 
-    # ---------------------------------------------------------
-    # Package total
-    # ---------------------------------------------------------
-    package_sum = (
-        db.session.query(
-            func.coalesce(
-                func.sum(Package.amount_due),
-                0.0,
-            )
-        )
-        .filter(Package.invoice_id == invoice_id)
-        .scalar()
-        or 0.0
-    )
+def fetch_invoice_totals_many(invoice_ids, lock: bool = False):
+    """
+    fetch_invoice_totals_pg() for many invoices in one SELECT.
 
-    # ---------------------------------------------------------
-    # Invoice subtotal before discount
-    # ---------------------------------------------------------
-    subtotal = float(
-        getattr(inv, "subtotal_before_discount", 0)
-        or package_sum
-        or getattr(inv, "grand_total", 0)
-        or getattr(inv, "amount", 0)
-        or getattr(inv, "invoice_value", 0)
-        or 0.0
-    )
+    Package, discount and payment sums are grouped subqueries joined
+    to the invoices, so the cost does not grow with the number of
+    invoices.
 
-    subtotal = round(
-        max(subtotal, 0.0),
-        2,
-    )
+    Args:
+        invoice_ids:
+            Invoice IDs to total. Missing invoices are left out of
+            the result.
+
+        lock:
+            Take FOR UPDATE on the invoice rows (checkout).
+
+    Returns:
+        {invoice_id: (subtotal, discount_total, payments_total, total_due)}
+    """
+
+    invoice_ids = {
+        int(invoice_id)
+        for invoice_id in invoice_ids or ()
+        if invoice_id
+    }
+
+    if not invoice_ids:
+        return {}
 
     # ---------------------------------------------------------
-    # Discount rows attached to the invoice
+    # Package total per invoice
     # ---------------------------------------------------------
-    discount_rows_total = (
+    package_sums = (
         db.session.query(
-            func.coalesce(
-                func.sum(Discount.amount_jmd),
-                0.0,
-            )
+            Package.invoice_id.label("invoice_id"),
+            func.sum(Package.amount_due).label("total"),
         )
-        .filter(Discount.invoice_id == invoice_id)
-        .scalar()
-        or 0.0
-    )
-
-    discount_rows_total = round(
-        max(float(discount_rows_total), 0.0),
-        2,
+        .filter(Package.invoice_id.in_(invoice_ids))
+        .group_by(Package.invoice_id)
+        .subquery()
     )
 
     # ---------------------------------------------------------
-    # Discount saved directly on the Invoice
+    # Discount rows per invoice
     # ---------------------------------------------------------
-    saved_discount_total = round(
-        max(
-            float(
-                getattr(inv, "discount_total", 0)
-                or 0.0
-            ),
-            0.0,
-        ),
-        2,
-    )
-
-    # Older invoices may use Discount rows, while newer invoices
-    # may store the total directly on Invoice.discount_total.
-    #
-    # Use the larger value rather than adding them together so
-    # that the same discount is not counted twice.
-    discount_total = max(
-        discount_rows_total,
-        saved_discount_total,
+    discount_sums = (
+        db.session.query(
+            Discount.invoice_id.label("invoice_id"),
+            func.sum(Discount.amount_jmd).label("total"),
+        )
+        .filter(Discount.invoice_id.in_(invoice_ids))
+        .group_by(Discount.invoice_id)
+        .subquery()
     )
 
-    # A discount cannot exceed the invoice subtotal.
-    if discount_total > subtotal:
-        discount_total = subtotal
-
-    discount_total = round(discount_total, 2)
-
     # ---------------------------------------------------------
-    # Completed invoice payments
+    # Completed invoice payments per invoice
     # ---------------------------------------------------------
     payments_q = (
         db.session.query(
-            func.coalesce(
-                func.sum(Payment.amount_jmd),
-                0.0,
-            )
+            Payment.invoice_id.label("invoice_id"),
+            func.sum(Payment.amount_jmd).label("total"),
         )
-        .filter(Payment.invoice_id == invoice_id)
+        .filter(Payment.invoice_id.in_(invoice_ids))
     )
 
     if hasattr(Payment, "transaction_type"):
@@ -146,32 +118,115 @@ def fetch_invoice_totals_pg(invoice_id: int):
             func.lower(Payment.status) == "completed"
         )
 
-    payments_total = payments_q.scalar() or 0.0
-
-    payments_total = round(
-        max(float(payments_total), 0.0),
-        2,
+    payment_sums = (
+        payments_q
+        .group_by(Payment.invoice_id)
+        .subquery()
     )
 
-    # ---------------------------------------------------------
-    # Remaining balance
-    # ---------------------------------------------------------
-    total_due = round(
-        max(
-            subtotal
-            - discount_total
-            - payments_total,
-            0.0,
-        ),
-        2,
+    query = (
+        db.session.query(
+            Invoice.id,
+            Invoice.subtotal_before_discount,
+            Invoice.grand_total,
+            Invoice.amount,
+            Invoice.invoice_value,
+            Invoice.discount_total,
+            func.coalesce(package_sums.c.total, 0.0),
+            func.coalesce(discount_sums.c.total, 0.0),
+            func.coalesce(payment_sums.c.total, 0.0),
+        )
+        .outerjoin(package_sums, package_sums.c.invoice_id == Invoice.id)
+        .outerjoin(discount_sums, discount_sums.c.invoice_id == Invoice.id)
+        .outerjoin(payment_sums, payment_sums.c.invoice_id == Invoice.id)
+        .filter(Invoice.id.in_(invoice_ids))
     )
 
-    return (
-        float(subtotal),
-        float(discount_total),
-        float(payments_total),
-        float(total_due),
-    )
+    if lock:
+        query = query.with_for_update(of=Invoice)
+
+    totals = {}
+
+    for (
+        invoice_id,
+        subtotal_before_discount,
+        grand_total,
+        amount,
+        invoice_value,
+        saved_discount,
+        package_sum,
+        discount_rows_total,
+        payments_total,
+    ) in query.all():
+        # -----------------------------------------------------
+        # Invoice subtotal before discount
+        # -----------------------------------------------------
+        subtotal = float(
+            subtotal_before_discount
+            or package_sum
+            or grand_total
+            or amount
+            or invoice_value
+            or 0.0
+        )
+
+        subtotal = round(
+            max(subtotal, 0.0),
+            2,
+        )
+
+        discount_rows_total = round(
+            max(float(discount_rows_total or 0.0), 0.0),
+            2,
+        )
+
+        saved_discount_total = round(
+            max(float(saved_discount or 0.0), 0.0),
+            2,
+        )
+
+        # Older invoices may use Discount rows, while newer invoices
+        # may store the total directly on Invoice.discount_total.
+        #
+        # Use the larger value rather than adding them together so
+        # that the same discount is not counted twice.
+        discount_total = max(
+            discount_rows_total,
+            saved_discount_total,
+        )
+
+        # A discount cannot exceed the invoice subtotal.
+        if discount_total > subtotal:
+            discount_total = subtotal
+
+        discount_total = round(discount_total, 2)
+
+        payments_total = round(
+            max(float(payments_total or 0.0), 0.0),
+            2,
+        )
+
+        # -----------------------------------------------------
+        # Remaining balance
+        # -----------------------------------------------------
+        total_due = round(
+            max(
+                subtotal
+                - discount_total
+                - payments_total,
+                0.0,
+            ),
+            2,
+        )
+
+        totals[invoice_id] = (
+            float(subtotal),
+            float(discount_total),
+            float(payments_total),
+            float(total_due),
+        )
+
+    return totals
 
 
 def mark_invoice_packages_delivered(invoice_id: int):
@@ -1,6 +1,4 @@
 import os
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
 
 INVOICE_FOLDER = os.path.join('static', 'invoices')
 os.makedirs(INVOICE_FOLDER, exist_ok=True)
@@ -10,6 +8,9 @@ def generate_invoice(payment):
     Generate a PDF invoice for a payment.
     payment: dict containing bill_number, user_id, payment_date, payment_type, amount, authorized_by
     """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
     filename = f"invoice_{payment['bill_number']}.pdf"
     filepath = os.path.join(INVOICE_FOLDER, filename)
 
@@ -0,0 +1,533 @@
+# app/utils/jobs.py
+"""
+Periodic job runner.
+
+Jobs are declared with @job(name, "<cron>") and executed by a separate
+process (Procfile "worker: flask --app run:app jobs run"), never on web
+requests.
+
+  - schedule: 5-field cron ("*/15 * * * *") or @hourly/@daily/@weekly,
+    evaluated in JOBS_TIMEZONE
+  - single execution: each job has a JobLease row; a runner claims it
+    with a conditional UPDATE (free lease + due) and keeps it alive
+    while batches complete, so two workers/dynos never run a job at once
+    and a crashed runner's lease simply expires
+  - history: every execution writes a JobRun (status, rows, batches,
+    duration)
+
+Job functions take a JobContext and should work in batches through
+ctx.batches(step) so they commit as they go and can be re-run safely.
+"""
+from __future__ import annotations
+
+import os
+import signal
+import socket
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import JobLease, JobRun
+
+
+JOBS = {}
+
+_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+}
+
+# how far ahead next_after() searches before giving up
+_MAX_LOOKAHEAD_DAYS = 366 * 4
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _as_aware(dt):
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _cfg(key, default):
+    return current_app.config.get(key, default)
+
+
+# ---------------------------------------------------
+# Schedules
+# ---------------------------------------------------
+
+def _parse_field(field, lo, hi):
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step = part.split("/", 1)
+            step = int(step)
+            if step < 1:
+                raise ValueError(f"bad step in {field!r}")
+
+        if part == "*":
+            start, end = lo, hi
+        elif "-" in part:
+            start, end = (int(x) for x in part.split("-", 1))
+        else:
+            start = int(part)
+            end = hi if step > 1 else start
+
+        if start < lo or end > hi or start > end:
+            raise ValueError(f"{field!r} is outside {lo}-{hi}")
+
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSchedule:
+    """
+    minute hour day-of-month month day-of-week (0 = Sunday).
+    As in cron, when both day fields are restricted either may match.
+    """
+    __slots__ = ("expr", "minutes", "hours", "days", "months", "weekdays", "_any_day", "_any_weekday")
+
+    def __init__(self, expr):
+        self.expr = expr
+        fields = _ALIASES.get(expr.strip(), expr).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields: {expr!r}")
+
+        minute, hour, dom, month, dow = fields
+        self.minutes = _parse_field(minute, 0, 59)
+        self.hours = _parse_field(hour, 0, 23)
+        self.days = _parse_field(dom, 1, 31)
+        self.months = _parse_field(month, 1, 12)
+        self.weekdays = frozenset(d % 7 for d in _parse_field(dow, 0, 7))
+        self._any_day = dom == "*"
+        self._any_weekday = dow == "*"
+
+    def _day_matches(self, t):
+        dom_ok = t.day in self.days
+        dow_ok = (t.weekday() + 1) % 7 in self.weekdays
+        if self._any_day:
+            return dow_ok
+        if self._any_weekday:
+            return dom_ok
+        return dom_ok or dow_ok
+
+    def next_after(self, after, tz=timezone.utc):
+        """First matching minute strictly after `after` (returned in UTC)."""
+        t = _as_aware(after).astimezone(tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=_MAX_LOOKAHEAD_DAYS)
+
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+                continue
+            if t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+                continue
+            return t.astimezone(timezone.utc)
+
+        raise ValueError(f"cron expression never matches: {self.expr!r}")
+
+    def __str__(self):
+        return self.expr
+
+
+# ---------------------------------------------------
+# Registry
+# ---------------------------------------------------
+
+class Job:
+    __slots__ = ("name", "fn", "schedule", "lease_seconds", "description")
+
+    def __init__(self, name, fn, schedule, lease_seconds=None, description=None):
+        self.name = name
+        self.fn = fn
+        self.schedule = schedule
+        self.lease_seconds = lease_seconds
+        self.description = description
+
+
+def job(name, schedule, *, lease_seconds=None, description=None):
+    """
+    Register a periodic job:
+
+        @job("subscription_expiry", "*/10 * * * *")
+        def expire_subscriptions(ctx):
+            ctx.batches(lambda n: sync_expired_subscriptions(commit=True, limit=n))
+    """
+    cron = CronSchedule(schedule)
+
+    def decorator(fn):
+        if name in JOBS:
+            raise ValueError(f"job {name!r} is already registered")
+        JOBS[name] = Job(
+            name,
+            fn,
+            cron,
+            lease_seconds=lease_seconds,
+            description=description or (fn.__doc__ or "").strip().split("\n")[0],
+        )
+        return fn
+
+    return decorator
+
+
+def _timezone():
+    return ZoneInfo(_cfg("JOBS_TIMEZONE", "America/Jamaica"))
+
+
+def _lease_seconds(j):
+    return int(j.lease_seconds or _cfg("JOBS_LEASE_SECONDS", 600) or 600)
+
+
+def make_owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+# ---------------------------------------------------
+# Execution context
+# ---------------------------------------------------
+
+class JobContext:
+    def __init__(self, j, run, owner):
+        self.job = j
+        self.run = run
+        self.owner = owner
+        self.rows = 0
+        self.batch_count = 0
+        self.batch_size = int(_cfg("JOBS_BATCH_SIZE", 200) or 200)
+        # a run that is still going after this hands the rest to the next tick
+        self.deadline = time.monotonic() + int(_cfg("JOBS_MAX_RUN_SECONDS", 300) or 300)
+
+    def time_left(self):
+        return self.deadline - time.monotonic()
+
+    def add(self, rows):
+        """Count one finished batch and keep the lease alive."""
+        self.rows += int(rows or 0)
+        self.batch_count += 1
+        self.heartbeat()
+
+    def log(self, message, *args):
+        current_app.logger.warning("[JOBS] %s: " + message, self.job.name, *args)
+
+    def heartbeat(self):
+        t = JobLease.__table__
+        db.session.execute(
+            update(t)
+            .where(t.c.name == self.job.name, t.c.owner == self.owner)
+            .values(locked_until=_utcnow() + timedelta(seconds=_lease_seconds(self.job)))
+        )
+        db.session.commit()
+
+    def batches(self, step, *, max_batches=None):
+        """
+        Call step(batch_size) until it handles fewer rows than asked for.
+        step must commit its own work and return how many rows it handled.
+        """
+        done = 0
+        while max_batches is None or done < max_batches:
+            n = int(step(self.batch_size) or 0)
+            self.add(n)
+            done += 1
+            if n < self.batch_size or self.time_left() <= 0:
+                break
+        return self.rows
+
+
+# ---------------------------------------------------
+# Leases
+# ---------------------------------------------------
+
+def _ensure_lease(name):
+    if db.session.get(JobLease, name) is not None:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(JobLease(name=name))
+    except IntegrityError:
+        pass
+    db.session.commit()
+
+
+def _claim(j, owner, *, force=False):
+    _ensure_lease(j.name)
+
+    now = _utcnow()
+    t = JobLease.__table__
+
+    conditions = [
+        t.c.name == j.name,
+        or_(t.c.locked_until.is_(None), t.c.locked_until < now),
+    ]
+    if not force:
+        conditions.append(or_(t.c.next_run_at.is_(None), t.c.next_run_at <= now))
+
+    result = db.session.execute(
+        update(t)
+        .where(*conditions)
+        .values(
+            owner=owner,
+            locked_until=now + timedelta(seconds=_lease_seconds(j)),
+            last_started_at=now,
+        )
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _release(j, owner, status):
+    now = _utcnow()
+    t = JobLease.__table__
+
+    db.session.execute(
+        update(t)
+        .where(t.c.name == j.name, t.c.owner == owner)
+        .values(
+            owner=None,
+            locked_until=None,
+            last_finished_at=now,
+            last_status=status,
+            next_run_at=j.schedule.next_after(now, _timezone()),
+        )
+    )
+
+
+def request_job_run(name):
+    """Make a job due now; the worker picks it up on its next poll."""
+    if name not in JOBS:
+        raise KeyError(name)
+
+    _ensure_lease(name)
+    t = JobLease.__table__
+    db.session.execute(update(t).where(t.c.name == name).values(next_run_at=_utcnow()))
+    db.session.commit()
+
+
+# ---------------------------------------------------
+# Running
+# ---------------------------------------------------
+
+def run_job(name, *, owner=None, force=False):
+    """
+    Run one job if it is due and nobody else holds it (force=True skips
+    the due check, never the lease). Returns a summary dict of the
+    JobRun, or None if the job was not claimed.
+    """
+    j = JOBS[name]
+    owner = owner or make_owner()
+
+    if not _claim(j, owner, force=force):
+        return None
+
+    run = JobRun(job_name=j.name, owner=owner, status="running")
+    db.session.add(run)
+    db.session.commit()
+    run_id = run.id
+
+    ctx = JobContext(j, run, owner)
+    started = time.perf_counter()
+    status, error = "ok", None
+
+    try:
+        j.fn(ctx)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        status = "failed"
+        error = traceback.format_exc()[-4000:]
+        current_app.logger.exception("[JOBS] %s failed", j.name)
+
+    duration_ms = int((time.perf_counter() - started) * 1000)
+
+    run = db.session.get(JobRun, run_id)
+    run.status = status
+    run.error = error
+    run.rows_affected = ctx.rows
+    run.batches = ctx.batch_count
+    run.finished_at = _utcnow()
+    run.duration_ms = duration_ms
+
+    _release(j, owner, status)
+    db.session.commit()
+
+    summary = {
+        "run_id": run_id,
+        "job_name": j.name,
+        "status": status,
+        "rows": ctx.rows,
+        "batches": ctx.batch_count,
+        "duration_ms": duration_ms,
+        "error": error,
+    }
+
+    current_app.logger.info(
+        "[JOBS] %s %s rows=%s batches=%s %sms",
+        j.name,
+        status,
+        ctx.rows,
+        ctx.batch_count,
+        duration_ms,
+    )
+    return summary
+
+
+def run_due_jobs(owner=None):
+    owner = owner or make_owner()
+    runs = []
+    for name in list(JOBS):
+        try:
+            run = run_job(name, owner=owner)
+        except Exception:
+            # lease bookkeeping failed (e.g. DB restart) - try again next poll
+            db.session.rollback()
+            current_app.logger.exception("[JOBS] could not run %s", name)
+            continue
+        finally:
+            db.session.remove()
+        if run is not None:
+            runs.append(run)
+    return runs
+
+
+def run_forever(poll_seconds=None):
+    poll_seconds = int(poll_seconds or _cfg("JOBS_POLL_SECONDS", 30) or 30)
+    owner = make_owner()
+    stopping = []
+
+    def _stop(signum, frame):
+        stopping.append(signum)
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    current_app.logger.info("[JOBS] runner %s started (%s jobs, poll %ss)", owner, len(JOBS), poll_seconds)
+
+    while not stopping:
+        run_due_jobs(owner)
+
+        waited = 0.0
+        while waited < poll_seconds and not stopping:
+            time.sleep(0.5)
+            waited += 0.5
+
+    current_app.logger.info("[JOBS] runner %s stopped", owner)
+
+
+def purge_job_runs(keep_days=None, limit=1000):
+    """Delete JobRun rows older than keep_days. Returns rows removed."""
+    keep_days = int(keep_days or _cfg("JOB_RUNS_KEEP_DAYS", 30) or 30)
+    cutoff = _utcnow() - timedelta(days=keep_days)
+
+    ids = [
+        rid
+        for (rid,) in db.session.query(JobRun.id)
+        .filter(JobRun.started_at < cutoff)
+        .order_by(JobRun.id.asc())
+        .limit(limit)
+        .all()
+    ]
+    if ids:
+        JobRun.query.filter(JobRun.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+    return len(ids)
+
+
+def job_status_rows():
+    leases = {l.name: l for l in JobLease.query.all()}
+    rows = []
+    for name, j in JOBS.items():
+        lease = leases.get(name)
+        last = (
+            JobRun.query
+            .filter(JobRun.job_name == name)
+            .order_by(JobRun.id.desc())
+            .first()
+        )
+        rows.append({
+            "name": name,
+            "schedule": str(j.schedule),
+            "description": j.description,
+            "next_run_at": lease.next_run_at if lease else None,
+            "running": bool(lease and lease.locked_until and _as_aware(lease.locked_until) > _utcnow()),
+            "last_status": last.status if last else None,
+            "last_started_at": last.started_at if last else None,
+            "last_duration_ms": last.duration_ms if last else None,
+            "last_rows": last.rows_affected if last else None,
+        })
+    return rows
+
+
+# ---------------------------------------------------
+# CLI: flask jobs ...
+# ---------------------------------------------------
+
+jobs_cli = AppGroup("jobs", help="Scheduled maintenance jobs.")
+
+
+@jobs_cli.command("run")
+@click.option("--once", is_flag=True, help="Run whatever is due, then exit.")
+@click.option("--poll", type=int, default=None, help="Seconds between schedule checks.")
+def run_command(once, poll):
+    """Run the scheduler loop (Procfile worker)."""
+    if once:
+        for run in run_due_jobs():
+            click.echo(f"{run['job_name']}: {run['status']} rows={run['rows']} {run['duration_ms']}ms")
+        return
+    run_forever(poll)
+
+
+@jobs_cli.command("run-one")
+@click.argument("name")
+@click.option("--force", is_flag=True, help="Run even if the job is not due yet.")
+def run_one_command(name, force):
+    """Run a single job now."""
+    if name not in JOBS:
+        raise click.BadParameter(f"unknown job {name!r}; see 'flask jobs list'")
+
+    run = run_job(name, force=force)
+    if run is None:
+        click.echo(f"{name}: not due or already running elsewhere")
+        return
+    click.echo(f"{name}: {run['status']} rows={run['rows']} batches={run['batches']} {run['duration_ms']}ms")
+    if run["error"]:
+        click.echo(run["error"], err=True)
+
+
+@jobs_cli.command("list")
+def list_command():
+    """Show registered jobs with their last run."""
+    for r in job_status_rows():
+        last = "never"
+        if r["last_status"]:
+            last = f"{r['last_status']} {r['last_started_at']:%Y-%m-%d %H:%M} rows={r['last_rows']} {r['last_duration_ms']}ms"
+        state = "RUNNING" if r["running"] else f"next {r['next_run_at'] or 'now'}"
+        click.echo(f"{r['name']:<28} {r['schedule']:<16} {state:<36} last: {last}")
+        if r["description"]:
+            click.echo(f"    {r['description']}")
+
+
+def init_jobs(app):
+    # registers the @job definitions
+    from app.utils import maintenance_jobs  # noqa: F401
+
+    app.cli.add_command(jobs_cli)
@@ -0,0 +1,124 @@
+# app/utils/maintenance_jobs.py
+"""
+Periodic maintenance, run by the jobs worker (see app/utils/jobs.py).
+Each job is safe to re-run: it only touches rows that still need work.
+"""
+from app.utils.jobs import job, purge_job_runs
+
+
+@job("subscription_expiry", "*/10 * * * *")
+def expire_subscriptions(ctx):
+    """Mark ended subscriptions expired and remove their family members."""
+    from app.utils.subscription_utils import sync_expired_subscriptions
+
+    ctx.batches(lambda n: sync_expired_subscriptions(commit=True, limit=n))
+
+
+@job("subscription_reminders", "5 * * * *")
+def subscription_reminders(ctx):
+    """Send 5-day / final renewal reminders and expiry notices."""
+    from app.utils.subscription_utils import send_subscription_reminders
+
+    cursor = {"after_id": 0}
+
+    def step(n):
+        counts, cursor["after_id"], scanned = send_subscription_reminders(
+            limit=n,
+            after_id=cursor["after_id"],
+        )
+        if counts["failed"]:
+            ctx.log("%s reminder emails failed", counts["failed"])
+        return scanned
+
+    ctx.batches(step)
+
+
+@job("shipment_auto_archive", "*/15 * * * *")
+def shipment_auto_archive(ctx):
+    """Archive shipments whose packages are all delivered."""
+    from app.utils.shipment_archive import sync_auto_archive_for_eligible_shipments
+
+    ctx.batches(lambda n: sync_auto_archive_for_eligible_shipments(limit=n))
+
+
+@job("prealert_orphan_sweep", "15 2 * * *")
+def prealert_orphan_sweep(ctx):
+    """Link recent packages to matching pre-alerts that were missed."""
+    from app.extensions import db
+    from app.utils.prealert_reconcile import sweep_orphan_prealerts
+
+    cursor = {"after_id": 0}
+
+    def step(n):
+        report, cursor["after_id"], scanned = sweep_orphan_prealerts(
+            limit=n,
+            after_id=cursor["after_id"],
+        )
+        db.session.commit()
+        if report is not None and report.conflicts:
+            ctx.log("%s pre-alert conflicts in packages %s", report.conflicts, report.scope_ref)
+        return scanned
+
+    ctx.batches(step)
+
+
+@job("receivables_refresh", "*/5 * * * *")
+def receivables_refresh(ctx):
+    """Rebuild the receivables snapshot (catches bulk updates that skip the ORM)."""
+    from app.utils.receivables import refresh_receivables
+
+    ctx.add(refresh_receivables())
+
+
+@job("distance_cache_purge", "30 3 * * *")
+def distance_cache_purge(ctx):
+    """Delete long-expired distance cache rows."""
+    from app.utils.distance_cache import purge_stale_distance_cache
+
+    ctx.add(purge_stale_distance_cache())
+
+
+@job("job_runs_purge", "45 3 * * *")
+def job_runs_purge(ctx):
+    """Delete job history older than JOB_RUNS_KEEP_DAYS."""
+    ctx.batches(lambda n: purge_job_runs(limit=n))
+
+
+@job("rate_limit_purge", "50 3 * * *")
+def rate_limit_purge(ctx):
+    """Delete expired rate-limit counters."""
+    from app.utils.ratelimit_storage import purge_expired_counters
+
+    ctx.batches(lambda n: purge_expired_counters(limit=n))
+
+
+@job("finance_facts_verify", "20 4 * * *")
+def finance_facts_verify(ctx):
+    """Re-check recent finance_daily_facts and rebuild any day that drifted."""
+    from app.utils.finance_facts import verify_recent_facts
+
+    mismatches = verify_recent_facts(fix=True)
+    if mismatches:
+        days = sorted({str(m["business_date"]) for m in mismatches})
+        ctx.log("rebuilt finance facts for %s", ", ".join(days))
+    ctx.add(len(mismatches))
+
+
+@job("audit_maintenance", "40 3 * * *")
+def audit_maintenance(ctx):
+    """Create upcoming audit_logs partitions (Postgres) or archive old rows (SQLite)."""
+    from app.utils.audit import archive_audit_logs, ensure_audit_partitions
+
+    ctx.add(ensure_audit_partitions())
+    ctx.batches(lambda n: archive_audit_logs(limit=n))
+
+
+@job("cold_storage", "10 2 * * *")
+def cold_storage(ctx):
+    """Archive read notifications and old scan logs (not packages or messages, see cold_storage.py)."""
+    from app.utils.cold_storage import POLICIES, archive_batch
+
+    for name in POLICIES:
+        if ctx.time_left() <= 0:
+            break
+        ctx.batches(lambda n, name=name: archive_batch(name, limit=n))
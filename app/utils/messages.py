@@ -1,3 +1,267 @@
+"""
+Mailbox helpers.
+
+Per-user mailbox state lives in message_participant_state (one "inbox"
+row for the recipient, one "sent" row for the sender) and a summary row
+per conversation in message_threads. Both are maintained here from ORM
+flush events, so the existing code that sets Message.is_read /
+archived_by_* / deleted_by_* keeps working unchanged.
+"""
+from sqlalchemy import func, or_, select
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, joinedload
+
+from app.extensions import db
+from app.models import Message, MessageParticipantState, MessageThread
+
+
+MAILBOX_BOXES = ("inbox", "sent", "all")
+
+_STATE_FIELDS = (
+    "is_read",
+    "archived_by_sender",
+    "archived_by_recipient",
+    "deleted_by_sender",
+    "deleted_by_recipient",
+)
+
+
 def make_thread_key(a_id: int, b_id: int) -> str:
     lo, hi = sorted([int(a_id), int(b_id)])
     return f"u{lo}_u{hi}"
+
+
+# ---------------------------------------------------
+# Queries
+# ---------------------------------------------------
+
+def mailbox_query(user_id, box="inbox", *, q=None, unread_only=False, archived=False, deleted=False):
+    """
+    MessageParticipantState rows for one user's mailbox view, newest
+    first, with the message and counterparty eager-loaded.
+    """
+    S = MessageParticipantState
+
+    query = (
+        S.query
+        .options(
+            joinedload(S.message),
+            joinedload(S.counterparty),
+        )
+        .filter(
+            S.user_id == user_id,
+            S.deleted.is_(bool(deleted)),
+            S.archived.is_(bool(archived)),
+        )
+    )
+
+    if box in ("inbox", "sent"):
+        query = query.filter(S.folder == box)
+
+    if unread_only:
+        query = query.filter(
+            S.folder == "inbox",
+            S.is_read.is_(False),
+        )
+
+    if q:
+        like = f"%{q}%"
+        query = query.filter(
+            S.message.has(
+                or_(
+                    Message.subject.ilike(like),
+                    Message.body.ilike(like),
+                )
+            )
+        )
+
+    return query.order_by(S.created_at.desc(), S.id.desc())
+
+
+def unread_message_count(user_id):
+    S = MessageParticipantState
+
+    return int(
+        db.session.scalar(
+            select(func.count())
+            .select_from(S)
+            .where(
+                S.user_id == user_id,
+                S.folder == "inbox",
+                S.is_read.is_(False),
+                S.deleted.is_(False),
+            )
+        )
+        or 0
+    )
+
+
+def delete_mailbox_rows_for_user(user_id):
+    """
+    Remove mailbox state and thread summaries tied to a user before a
+    bulk Message delete (which bypasses the flush listeners).
+    """
+    S = MessageParticipantState
+    T = MessageThread
+
+    message_ids = select(Message.id).where(
+        or_(
+            Message.sender_id == user_id,
+            Message.recipient_id == user_id,
+        )
+    )
+
+    S.query.filter(
+        or_(
+            S.message_id.in_(message_ids),
+            S.user_id == user_id,
+            S.counterparty_id == user_id,
+        )
+    ).delete(synchronize_session=False)
+
+    T.query.filter(
+        or_(
+            T.user_low_id == user_id,
+            T.user_high_id == user_id,
+            T.last_sender_id == user_id,
+        )
+    ).delete(synchronize_session=False)
+
+
+# ---------------------------------------------------
+# Sync from Message flushes
+# ---------------------------------------------------
+
+def _state_rows(m):
+    common = {
+        "message_id": m.id,
+        "thread_key": m.thread_key,
+        "created_at": m.created_at,
+    }
+    return [
+        dict(
+            common,
+            user_id=m.recipient_id,
+            counterparty_id=m.sender_id,
+            folder="inbox",
+            is_read=bool(m.is_read),
+            archived=bool(m.archived_by_recipient),
+            deleted=bool(m.deleted_by_recipient),
+        ),
+        dict(
+            common,
+            user_id=m.sender_id,
+            counterparty_id=m.recipient_id,
+            folder="sent",
+            is_read=True,
+            archived=bool(m.archived_by_sender),
+            deleted=bool(m.deleted_by_sender),
+        ),
+    ]
+
+
+def _state_changed(m):
+    state = inspect(m)
+    return any(state.attrs[name].history.has_changes() for name in _STATE_FIELDS)
+
+
+def _refresh_thread(conn, thread_key):
+    """
+    Recompute one thread summary row from the messages table.
+    """
+    M = Message.__table__
+    T = MessageThread.__table__
+
+    count = conn.execute(
+        select(func.count()).select_from(M).where(M.c.thread_key == thread_key)
+    ).scalar() or 0
+
+    if not count:
+        conn.execute(T.delete().where(T.c.thread_key == thread_key))
+        return
+
+    last = conn.execute(
+        select(M.c.id, M.c.sender_id, M.c.recipient_id, M.c.subject, M.c.created_at)
+        .where(M.c.thread_key == thread_key)
+        .order_by(M.c.created_at.desc(), M.c.id.desc())
+        .limit(1)
+    ).first()
+
+    lo, hi = sorted([last.sender_id, last.recipient_id])
+    values = {
+        "user_low_id": lo,
+        "user_high_id": hi,
+        "subject": last.subject,
+        "last_message_id": last.id,
+        "last_sender_id": last.sender_id,
+        "last_message_at": last.created_at,
+        "message_count": int(count),
+    }
+
+    dialect = conn.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(T).values(thread_key=thread_key, **values)
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[T.c.thread_key],
+                set_=values,
+            )
+        )
+        return
+
+    updated = conn.execute(T.update().where(T.c.thread_key == thread_key).values(**values))
+    if not updated.rowcount:
+        conn.execute(T.insert().values(thread_key=thread_key, **values))
+
+
+@event.listens_for(Session, "before_flush")
+def _assign_thread_keys(session, flush_context, instances):
+    for obj in session.new:
+        if isinstance(obj, Message) and not obj.thread_key and obj.sender_id and obj.recipient_id:
+            obj.thread_key = make_thread_key(obj.sender_id, obj.recipient_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_message_state(session, flush_context):
+    new = [o for o in session.new if isinstance(o, Message)]
+    dirty = [o for o in session.dirty if isinstance(o, Message) and _state_changed(o)]
+    deleted = [o for o in session.deleted if isinstance(o, Message)]
+
+    if not (new or dirty or deleted):
+        return
+
+    conn = session.connection()
+    S = MessageParticipantState.__table__
+    threads = set()
+
+    if new:
+        rows = [row for m in new for row in _state_rows(m)]
+        conn.execute(S.insert(), rows)
+        threads.update(m.thread_key for m in new if m.thread_key)
+
+    for m in dirty:
+        for row in _state_rows(m):
+            conn.execute(
+                S.update()
+                .where(
+                    S.c.message_id == m.id,
+                    S.c.folder == row["folder"],
+                )
+                .values(
+                    is_read=row["is_read"],
+                    archived=row["archived"],
+                    deleted=row["deleted"],
+                )
+            )
+
+    if deleted:
+        conn.execute(S.delete().where(S.c.message_id.in_([m.id for m in deleted])))
+        threads.update(m.thread_key for m in deleted if m.thread_key)
+
+    for thread_key in threads:
+        _refresh_thread(conn, thread_key)
@@ -0,0 +1,417 @@
+# app/utils/notifications.py
+"""
+Personal notifications + fan-out-on-read broadcasts.
+
+A broadcast is one BroadcastNotification row, however many customers it
+goes to. Whether a user has read it is derived on read:
+
+  - NotificationWatermark.last_read_broadcast_id: everything at or
+    below it is read (no row yet = the newest broadcast sent before the
+    account was created)
+  - BroadcastReceipt: individual reads above the watermark, created on
+    first "mark read" and folded into the watermark once contiguous
+
+So the unread count is two index range counts above the watermark plus
+the user's personal unread Notification rows.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import false, func, select, true, union_all
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import (
+    BroadcastNotification,
+    BroadcastReceipt,
+    Notification,
+    NotificationArchive,
+    NotificationWatermark,
+    User,
+)
+
+
+BROADCAST_AUDIENCE = "customer"
+
+# receipts looked at per watermark advance
+ADVANCE_WINDOW = 500
+
+
+def _sees_broadcasts(user):
+    return (getattr(user, "role", "") or "").lower() == BROADCAST_AUDIENCE
+
+
+def _joined_at(user):
+    joined = getattr(user, "created_at_dt", None)
+    if joined and joined.tzinfo is None:
+        joined = joined.replace(tzinfo=timezone.utc)
+    return joined
+
+
+def broadcast_watermark(user):
+    row = db.session.get(NotificationWatermark, user.id)
+    if row is not None:
+        return int(row.last_read_broadcast_id or 0)
+
+    joined = _joined_at(user)
+    if not joined:
+        return 0
+
+    return int(
+        db.session.scalar(
+            select(func.max(BroadcastNotification.id))
+            .where(
+                BroadcastNotification.audience == BROADCAST_AUDIENCE,
+                BroadcastNotification.created_at < joined,
+            )
+        )
+        or 0
+    )
+
+
+def _set_watermark(user_id, value):
+    row = db.session.get(NotificationWatermark, user_id)
+    if row is not None:
+        if value > (row.last_read_broadcast_id or 0):
+            row.last_read_broadcast_id = value
+    else:
+        try:
+            with db.session.begin_nested():
+                db.session.add(NotificationWatermark(user_id=user_id, last_read_broadcast_id=value))
+        except IntegrityError:
+            # created concurrently by another request
+            row = db.session.get(NotificationWatermark, user_id)
+            if row is not None and value > (row.last_read_broadcast_id or 0):
+                row.last_read_broadcast_id = value
+
+    BroadcastReceipt.query.filter(
+        BroadcastReceipt.user_id == user_id,
+        BroadcastReceipt.broadcast_id <= value,
+    ).delete(synchronize_session=False)
+
+
+# ---------------------------------------------------
+# Counts
+# ---------------------------------------------------
+
+def unread_broadcast_count(user):
+    if not _sees_broadcasts(user):
+        return 0
+
+    hwm = broadcast_watermark(user)
+
+    total = db.session.scalar(
+        select(func.count())
+        .select_from(BroadcastNotification)
+        .where(
+            BroadcastNotification.audience == BROADCAST_AUDIENCE,
+            BroadcastNotification.id > hwm,
+        )
+    ) or 0
+
+    if not total:
+        return 0
+
+    read = db.session.scalar(
+        select(func.count())
+        .select_from(BroadcastReceipt)
+        .where(
+            BroadcastReceipt.user_id == user.id,
+            BroadcastReceipt.broadcast_id > hwm,
+        )
+    ) or 0
+
+    return max(int(total) - int(read), 0)
+
+
+def unread_notification_count(user):
+    personal = db.session.scalar(
+        select(func.count())
+        .select_from(Notification)
+        .where(
+            Notification.user_id == user.id,
+            Notification.is_read.is_(False),
+        )
+    ) or 0
+
+    return int(personal) + unread_broadcast_count(user)
+
+
+# ---------------------------------------------------
+# Feed
+# ---------------------------------------------------
+
+def _note(n, is_broadcast, is_read, is_archived=False):
+    return {
+        "id": n.id,
+        "subject": n.subject,
+        "message": n.message,
+        "created_at": n.created_at,
+        "is_broadcast": is_broadcast,
+        "is_read": bool(is_read),
+        "is_archived": bool(is_archived),
+    }
+
+
+def _personal_rows(user, limit=None):
+    """
+    Live and archived (app/utils/cold_storage.py) personal notifications
+    merged newest first in one query, limit applied once.
+    """
+    live = select(
+        Notification.id, Notification.subject, Notification.message,
+        Notification.created_at, Notification.is_read,
+        false().label("is_archived"),
+    ).where(Notification.user_id == user.id)
+
+    archived = select(
+        NotificationArchive.id, NotificationArchive.subject, NotificationArchive.message,
+        NotificationArchive.created_at, true().label("is_read"),
+        true().label("is_archived"),
+    ).where(NotificationArchive.user_id == user.id)
+
+    merged = union_all(live, archived).subquery()
+    query = select(merged).order_by(merged.c.created_at.desc(), merged.c.id.desc())
+    if limit:
+        query = query.limit(limit)
+    return db.session.execute(query).all()
+
+
+def notification_feed(user, limit=None):
+    """
+    The user's personal notifications (live and archived) and the
+    broadcasts they can see, newest first, as dicts with id/subject/
+    message/created_at/is_broadcast/is_read/is_archived.
+    """
+    notes = [_note(n, False, n.is_read, n.is_archived) for n in _personal_rows(user, limit)]
+
+    if _sees_broadcasts(user):
+        query = BroadcastNotification.query.filter(
+            BroadcastNotification.audience == BROADCAST_AUDIENCE
+        )
+
+        joined = _joined_at(user)
+        if joined:
+            query = query.filter(BroadcastNotification.created_at >= joined)
+
+        query = query.order_by(BroadcastNotification.id.desc())
+        if limit:
+            query = query.limit(limit)
+
+        broadcasts = query.all()
+
+        hwm = broadcast_watermark(user)
+        above = [b.id for b in broadcasts if b.id > hwm]
+
+        receipts = set()
+        if above:
+            receipts = {
+                bid
+                for (bid,) in db.session.query(BroadcastReceipt.broadcast_id)
+                .filter(
+                    BroadcastReceipt.user_id == user.id,
+                    BroadcastReceipt.broadcast_id.in_(above),
+                )
+                .all()
+            }
+
+        notes.extend(
+            _note(b, True, b.id <= hwm or b.id in receipts)
+            for b in broadcasts
+        )
+
+    epoch = datetime.min.replace(tzinfo=timezone.utc)
+    notes.sort(
+        key=lambda n: (
+            n["created_at"].replace(tzinfo=n["created_at"].tzinfo or timezone.utc)
+            if n["created_at"] else epoch
+        ),
+        reverse=True,
+    )
+
+    return notes[:limit] if limit else notes
+
+
+# ---------------------------------------------------
+# Read state
+# ---------------------------------------------------
+
+def mark_broadcast_read(user, broadcast_id):
+    """
+    Record that user read one broadcast. Returns False if the broadcast
+    isn't visible to them. Caller commits.
+    """
+    b = db.session.get(BroadcastNotification, broadcast_id)
+    if not b or not _sees_broadcasts(user) or b.audience != BROADCAST_AUDIENCE:
+        return False
+
+    hwm = broadcast_watermark(user)
+    if b.id <= hwm:
+        return True
+
+    exists = db.session.scalar(
+        select(BroadcastReceipt.id).where(
+            BroadcastReceipt.user_id == user.id,
+            BroadcastReceipt.broadcast_id == b.id,
+        )
+    )
+    if not exists:
+        try:
+            with db.session.begin_nested():
+                db.session.add(BroadcastReceipt(user_id=user.id, broadcast_id=b.id))
+        except IntegrityError:
+            pass
+
+    _advance_watermark(user, hwm)
+    return True
+
+
+def _advance_watermark(user, hwm):
+    """
+    Move the watermark past every broadcast directly above it that
+    already has a receipt.
+    """
+    ids = [
+        bid
+        for (bid,) in db.session.query(BroadcastNotification.id)
+        .filter(
+            BroadcastNotification.audience == BROADCAST_AUDIENCE,
+            BroadcastNotification.id > hwm,
+        )
+        .order_by(BroadcastNotification.id.asc())
+        .limit(ADVANCE_WINDOW)
+        .all()
+    ]
+    if not ids:
+        return
+
+    read = {
+        bid
+        for (bid,) in db.session.query(BroadcastReceipt.broadcast_id)
+        .filter(
+            BroadcastReceipt.user_id == user.id,
+            BroadcastReceipt.broadcast_id.in_(ids),
+        )
+        .all()
+    }
+
+    new_hwm = hwm
+    for bid in ids:
+        if bid not in read:
+            break
+        new_hwm = bid
+
+    if new_hwm > hwm:
+        _set_watermark(user.id, new_hwm)
+
+
+def _personal_note(nid, user_id=None):
+    """
+    (row, archived) for a personal notification id, live or moved to
+    cold storage (archive rows keep their id). None if it doesn't exist
+    or belongs to someone other than user_id.
+    """
+    for model, archived in ((Notification, False), (NotificationArchive, True)):
+        row = db.session.get(model, nid)
+        if row is not None:
+            if user_id is not None and row.user_id != user_id:
+                return None
+            return row, archived
+    return None
+
+
+def mark_personal_read(nid, user_id=None):
+    """
+    Mark one personal notification read. Archived ones already are.
+    False if it isn't the user's (or doesn't exist). Caller commits.
+    """
+    found = _personal_note(nid, user_id)
+    if found is None:
+        return False
+
+    row, archived = found
+    if not archived:
+        row.is_read = True
+    return True
+
+
+def delete_personal_notification(nid, user_id=None):
+    """Delete one personal notification, live or archived. Caller commits."""
+    found = _personal_note(nid, user_id)
+    if found is None:
+        return False
+
+    db.session.delete(found[0])
+    return True
+
+
+def mark_all_notifications_read(user):
+    """Personal rows + every visible broadcast. Caller commits."""
+    Notification.query.filter(
+        Notification.user_id == user.id,
+        Notification.is_read.is_(False),
+    ).update({"is_read": True}, synchronize_session=False)
+
+    if not _sees_broadcasts(user):
+        return
+
+    latest = db.session.scalar(
+        select(func.max(BroadcastNotification.id))
+        .where(BroadcastNotification.audience == BROADCAST_AUDIENCE)
+    )
+    if latest:
+        _set_watermark(user.id, int(latest))
+
+
+# ---------------------------------------------------
+# Sending / admin reporting
+# ---------------------------------------------------
+
+def create_broadcast(subject, message, *, created_by_id=None, audience=BROADCAST_AUDIENCE):
+    """One insert, whatever the audience size. Caller commits."""
+    recipient_count = db.session.scalar(
+        select(func.count())
+        .select_from(User)
+        .where(User.role == audience)
+    ) or 0
+
+    b = BroadcastNotification(
+        subject=subject,
+        message=message,
+        audience=audience,
+        created_by_id=created_by_id,
+        recipient_count=int(recipient_count),
+    )
+    db.session.add(b)
+    return b
+
+
+def broadcast_read_counts(broadcast_ids):
+    """{broadcast_id: number of users who have read it}"""
+    ids = [int(i) for i in broadcast_ids or []]
+    if not ids:
+        return {}
+
+    B = BroadcastNotification
+    W = NotificationWatermark
+    R = BroadcastReceipt
+
+    by_watermark = (
+        select(func.count())
+        .select_from(W)
+        .where(W.last_read_broadcast_id >= B.id)
+        .correlate(B)
+        .scalar_subquery()
+    )
+    by_receipt = (
+        select(func.count())
+        .select_from(R)
+        .where(R.broadcast_id == B.id)
+        .correlate(B)
+        .scalar_subquery()
+    )
+
+    rows = db.session.execute(
+        select(B.id, by_watermark + by_receipt).where(B.id.in_(ids))
+    ).all()
+
+    return {bid: int(n or 0) for bid, n in rows}
@@ -1,9 +1,10 @@
 import os
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
 from flask import current_app
 
 def generate_payment_invoice(payment: dict) -> str:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
     static_dir = current_app.static_folder
     rel = f"invoices/receipt_{payment['bill_number']}.pdf"
     abs_ = os.path.join(static_dir, rel)
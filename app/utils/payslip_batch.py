@@ -0,0 +1,376 @@
+# app/utils/payslip_batch.py
+"""
+Batch payslip delivery for a payroll run.
+
+queue_payslip_deliveries() records one PayslipDelivery per selected
+payroll item; process_payslip_run() then renders every pending payslip
+in one pass through the PDF workers and emails them one by one,
+committing after each so a crashed or timed-out run can be resumed.
+Rows already marked "sent" are never sent again.
+"""
+from __future__ import annotations
+
+import io
+import os
+import threading
+import zipfile
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app, render_template
+from sqlalchemy import func, update
+from sqlalchemy.orm import joinedload
+from werkzeug.utils import secure_filename
+
+from app.extensions import db
+from app.models import EmployeePayroll, PayrollItem, PayrollRun, PayslipDelivery
+from app.utils.email_utils import send_email
+from app.utils.pdf_cache import cached_pdf_paths, run_in_background, template_path
+from app.utils.pdf_service import render_pdf_batch
+
+PAYSLIP_TEMPLATE = "admin/finance/payslip.html"
+
+DELIVERY_STATUSES = ("pending", "rendered", "sending", "sent", "failed", "skipped")
+
+# a "sending" row older than this is treated as interrupted on resume
+STALE_SENDING_MINUTES = 10
+
+_active_runs = set()
+_active_lock = threading.Lock()
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _as_aware(dt):
+    if dt is None:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _payslip_html(item, run, emp):
+    return render_template(
+        PAYSLIP_TEMPLATE,
+        item=item,
+        run=run,
+        emp=emp,
+        pdf_mode=True
+    )
+
+
+def _employees_by_user(user_ids):
+    if not user_ids:
+        return {}
+    rows = EmployeePayroll.query.filter(EmployeePayroll.user_id.in_(user_ids)).all()
+    return {e.user_id: e for e in rows}
+
+
+def payslip_pdf_paths(run, items):
+    """
+    Cached PDF path (or Exception) for each item, rendering every miss
+    in a single batch.
+    """
+    emps = _employees_by_user({i.user_id for i in items if i.user_id})
+    htmls = [_payslip_html(item, run, emps.get(item.user_id)) for item in items]
+
+    return cached_pdf_paths(
+        "payslip",
+        htmls,
+        lambda missing: render_pdf_batch([{"html": h} for h in missing]),
+        template_files=(template_path(PAYSLIP_TEMPLATE),),
+    )
+
+
+def payslip_filename(item, run):
+    name = item.user.full_name if item.user and item.user.full_name else str(item.id)
+    return secure_filename(f"payslip_{name}_{run.period_start}_{run.period_end}.pdf")
+
+
+def queue_payslip_deliveries(run, item_ids):
+    """
+    Create/refresh delivery rows for the selected items.
+    Failed, skipped and interrupted rows are re-queued; sent rows are left alone.
+    Returns the number of rows queued for sending.
+    """
+    items = (
+        PayrollItem.query
+        .options(joinedload(PayrollItem.user))
+        .filter(
+            PayrollItem.payroll_run_id == run.id,
+            PayrollItem.id.in_(item_ids),
+        )
+        .all()
+    )
+
+    existing = {
+        d.payroll_item_id: d
+        for d in PayslipDelivery.query.filter(
+            PayslipDelivery.payroll_item_id.in_([i.id for i in items])
+        ).all()
+    }
+
+    queued = 0
+
+    for item in items:
+        delivery = existing.get(item.id)
+
+        if delivery is None:
+            delivery = PayslipDelivery(
+                payroll_run_id=run.id,
+                payroll_item_id=item.id,
+                user_id=item.user_id,
+            )
+            db.session.add(delivery)
+        elif delivery.status == "sent":
+            continue
+
+        email = (item.user.email or "").strip() if item.user else ""
+        delivery.email = email or None
+
+        if not email:
+            delivery.status = "skipped"
+            delivery.last_error = "Employee does not have an email address."
+            continue
+
+        delivery.status = "pending"
+        delivery.last_error = None
+        queued += 1
+
+    db.session.commit()
+    return queued
+
+
+def resume_payslip_run(run):
+    """
+    Re-queue everything in the run that was not sent.
+    Interrupted "sending" rows are only re-queued once they are stale.
+    """
+    stale_before = _utcnow() - timedelta(minutes=STALE_SENDING_MINUTES)
+
+    deliveries = PayslipDelivery.query.filter(
+        PayslipDelivery.payroll_run_id == run.id,
+        PayslipDelivery.status.in_(("pending", "rendered", "failed", "sending")),
+    ).all()
+
+    queued = 0
+    for d in deliveries:
+        if d.status == "sending" and _as_aware(d.updated_at) > stale_before:
+            continue
+        if not d.email:
+            continue
+        d.status = "pending"
+        queued += 1
+
+    db.session.commit()
+    return queued
+
+
+def _render_pending(run):
+    deliveries = (
+        PayslipDelivery.query
+        .options(
+            joinedload(PayslipDelivery.payroll_item).joinedload(PayrollItem.user)
+        )
+        .filter(
+            PayslipDelivery.payroll_run_id == run.id,
+            PayslipDelivery.status == "pending",
+        )
+        .order_by(PayslipDelivery.id.asc())
+        .all()
+    )
+
+    if not deliveries:
+        return 0
+
+    paths = payslip_pdf_paths(run, [d.payroll_item for d in deliveries])
+
+    for d, path in zip(deliveries, paths):
+        if isinstance(path, Exception):
+            d.status = "failed"
+            d.last_error = f"PDF render failed: {path}"
+            continue
+        d.status = "rendered"
+        d.pdf_path = path
+        d.rendered_at = _utcnow()
+
+    db.session.commit()
+    return len(deliveries)
+
+
+def _claim(delivery_id):
+    """
+    Atomically move rendered -> sending so two workers never send the
+    same payslip.
+    """
+    t = PayslipDelivery.__table__
+    result = db.session.execute(
+        update(t)
+        .where(t.c.id == delivery_id, t.c.status == "rendered")
+        .values(status="sending", updated_at=_utcnow(), attempts=t.c.attempts + 1)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _send_rendered(run):
+    ids = [
+        row.id
+        for row in db.session.query(PayslipDelivery.id)
+        .filter(
+            PayslipDelivery.payroll_run_id == run.id,
+            PayslipDelivery.status == "rendered",
+        )
+        .order_by(PayslipDelivery.id.asc())
+        .all()
+    ]
+
+    sent = 0
+    subject = f"Payslip for {run.period_start} to {run.period_end}"
+
+    for delivery_id in ids:
+        if not _claim(delivery_id):
+            continue
+
+        d = PayslipDelivery.query.get(delivery_id)
+        item = d.payroll_item
+        user = item.user
+
+        try:
+            pdf_path = d.pdf_path
+            if not pdf_path or not os.path.exists(pdf_path):
+                # evicted from the cache since render - render again
+                pdf_path = payslip_pdf_paths(run, [item])[0]
+                if isinstance(pdf_path, Exception):
+                    raise pdf_path
+
+            with open(pdf_path, "rb") as f:
+                pdf = f.read()
+
+            plain_body = f"""
+Hi {user.full_name},
+
+Please find attached your payslip.
+
+Net Pay: JMD {float(item.net_pay or 0):,.2f}
+
+Foreign A Foot Logistics
+""".strip()
+
+            html_body = f"""
+<p>Hi {user.full_name},</p>
+
+<p>Please find attached your payslip for the period <strong>{run.period_start}</strong> to <strong>{run.period_end}</strong>.</p>
+
+<p><strong>Net Pay:</strong> JMD {float(item.net_pay or 0):,.2f}</p>
+
+<p>Foreign A Foot Logistics</p>
+""".strip()
+
+            ok = send_email(
+                to_email=d.email,
+                subject=subject,
+                plain_body=plain_body,
+                html_body=html_body,
+                attachments=[(pdf, payslip_filename(item, run), "application/pdf")],
+                recipient_user_id=user.id if user else None,
+            )
+            error = None if ok else "Email provider rejected the message."
+        except Exception as e:
+            current_app.logger.exception("[PAYSLIPS] sending item %s failed", item.id)
+            ok = False
+            error = str(e)
+
+        d.status = "sent" if ok else "failed"
+        d.sent_at = _utcnow() if ok else None
+        d.last_error = error
+        db.session.commit()
+
+        if ok:
+            sent += 1
+
+    return sent
+
+
+def process_payslip_run(run_id):
+    """
+    Render all pending payslips for the run in one batch, then send them.
+    Safe to call repeatedly; only unsent rows are touched.
+    """
+    with _active_lock:
+        if run_id in _active_runs:
+            return False
+        _active_runs.add(run_id)
+
+    try:
+        run = PayrollRun.query.get(run_id)
+        if not run:
+            return False
+        _render_pending(run)
+        _send_rendered(run)
+        return True
+    finally:
+        with _active_lock:
+            _active_runs.discard(run_id)
+
+
+def start_payslip_run(run_id):
+    """Kick off process_payslip_run on a background thread."""
+    return run_in_background(process_payslip_run, run_id)
+
+
+def payslip_run_is_active(run_id):
+    with _active_lock:
+        return run_id in _active_runs
+
+
+def payslip_run_progress(run_id):
+    counts = dict(
+        db.session.query(PayslipDelivery.status, func.count(PayslipDelivery.id))
+        .filter(PayslipDelivery.payroll_run_id == run_id)
+        .group_by(PayslipDelivery.status)
+        .all()
+    )
+
+    summary = {status: int(counts.get(status, 0)) for status in DELIVERY_STATUSES}
+    summary["total"] = sum(summary.values())
+    summary["done"] = summary["sent"] + summary["failed"] + summary["skipped"]
+    summary["active"] = payslip_run_is_active(run_id)
+    return summary
+
+
+def build_payslip_zip(run):
+    """
+    Zip of every payslip in the run (rendered in one batch on a miss).
+    Returns (BytesIO, failed_item_ids).
+    """
+    items = (
+        PayrollItem.query
+        .options(joinedload(PayrollItem.user))
+        .filter(PayrollItem.payroll_run_id == run.id)
+        .order_by(PayrollItem.id.asc())
+        .all()
+    )
+
+    paths = payslip_pdf_paths(run, items)
+
+    buf = io.BytesIO()
+    failed = []
+    used = set()
+
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for item, path in zip(items, paths):
+            if isinstance(path, Exception):
+                failed.append(item.id)
+                continue
+
+            name = payslip_filename(item, run)
+            if name in used:
+                name = f"{item.id}_{name}"
+            used.add(name)
+
+            zf.write(path, arcname=name)
+
+    buf.seek(0)
+    return buf, failed
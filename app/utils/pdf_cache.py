@@ -0,0 +1,328 @@
+# app/utils/pdf_cache.py
+"""
+Content-addressed cache for rendered PDFs.
+
+A PDF is stored under a sha256 of everything that affects its output
+(render inputs + template/CSS file contents + PDF_TEMPLATE_VERSION +
+the Settings row every template sees as `settings`). When an invoice or
+the company details/branding change the hash changes, so stale files
+are simply never looked up again and age out through the LRU size limit.
+
+Files live on PDF_CACHE_FOLDER (the /var/data disk on Render).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import current_app, g
+from sqlalchemy import inspect, select
+
+
+# Bump to invalidate every cached PDF after a rendering change that the
+# template/CSS fingerprints would not catch (e.g. a filter or helper).
+PDF_TEMPLATE_VERSION = "1"
+
+PRUNE_INTERVAL_SECONDS = 60
+
+_fingerprints = {}
+_fingerprint_lock = threading.Lock()
+
+_prune_lock = threading.Lock()
+_last_prune = 0.0
+
+
+def _canonical(value):
+    """
+    JSON-safe, order-stable representation of render inputs.
+    ORM rows are reduced to (table, id, updated_at), or to their column
+    values when the table has no updated_at, so an edited row still
+    produces a new key.
+    """
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, float):
+        return round(value, 4)
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        items = [_canonical(v) for v in value]
+        return sorted(items, key=repr) if isinstance(value, set) else items
+
+    table = getattr(value, "__tablename__", None)
+    if table:
+        updated_at = getattr(value, "updated_at", None)
+        if updated_at is not None:
+            return {"__row__": table, "id": getattr(value, "id", None), "updated_at": _canonical(updated_at)}
+        return {
+            "__row__": table,
+            "columns": {a.key: _canonical(getattr(value, a.key)) for a in inspect(value).mapper.column_attrs},
+        }
+
+    return type(value).__name__
+
+
+def file_fingerprint(path):
+    """
+    sha256 of a template/CSS file, memoized by (path, mtime).
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return "missing"
+
+    with _fingerprint_lock:
+        item = _fingerprints.get(path)
+        if item and item[0] == mtime:
+            return item[1]
+
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+
+    with _fingerprint_lock:
+        _fingerprints[path] = (mtime, digest)
+
+    return digest
+
+
+def template_path(name):
+    return os.path.join(current_app.root_path, current_app.template_folder, name)
+
+
+def static_path(*parts):
+    return os.path.join(current_app.static_folder, *parts)
+
+
+def settings_fingerprint():
+    """
+    sha256 of the Settings row that inject_settings() hands every
+    template (company name/address, logo, currency...). Templates read
+    it from the context processor, not from the render inputs, so it
+    has to be part of every key. The whole row is hashed (an UPDATE
+    that skips onupdate still counts); once per app context.
+    """
+    cached = g.get("_pdf_settings_fingerprint")
+    if cached is not None:
+        return cached
+
+    from app.extensions import db
+    from app.models import Settings
+
+    t = Settings.__table__
+    row = db.session.execute(select(t).where(t.c.id == 1)).mappings().first()
+    raw = json.dumps(_canonical(dict(row)) if row else None, sort_keys=True, default=str)
+    g._pdf_settings_fingerprint = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    return g._pdf_settings_fingerprint
+
+
+def pdf_cache_key(kind, inputs, *, template_files=()):
+    payload = {
+        "kind": kind,
+        "version": PDF_TEMPLATE_VERSION,
+        "templates": [file_fingerprint(p) for p in template_files],
+        "settings": settings_fingerprint(),
+        "inputs": _canonical(inputs),
+    }
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_root():
+    folder = current_app.config.get("PDF_CACHE_FOLDER") or os.path.join(
+        current_app.instance_path, "pdf_cache"
+    )
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _entry_path(kind, key):
+    safe_kind = "".join(c for c in kind if c.isalnum() or c in "_-") or "pdf"
+    return os.path.join(_cache_root(), safe_kind, key[:2], f"{key}.pdf")
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def cached_pdf_path(kind, inputs, render, *, template_files=()):
+    """
+    Return the absolute path of the cached PDF for these inputs,
+    calling render() -> bytes only on a miss.
+    """
+    key = pdf_cache_key(kind, inputs, template_files=template_files)
+    path = _entry_path(kind, key)
+
+    if os.path.exists(path):
+        try:
+            # mtime doubles as "last used" for LRU pruning
+            os.utime(path, None)
+        except OSError:
+            pass
+        return path
+
+    started = time.monotonic()
+    data = render()
+    _write_atomic(path, data)
+
+    current_app.logger.info(
+        "[PDF CACHE] rendered %s %s in %.0f ms (%d bytes)",
+        kind,
+        key[:12],
+        (time.monotonic() - started) * 1000,
+        len(data),
+    )
+
+    _maybe_prune()
+    return path
+
+
+def cached_pdf_paths(kind, inputs_list, render_many, *, template_files=()):
+    """
+    Batch form of cached_pdf_path: render_many(list_of_inputs) is called
+    once with only the cache misses and must return bytes (or an
+    Exception) per input. Returns a path or Exception per input.
+    """
+    paths = [
+        _entry_path(kind, pdf_cache_key(kind, inputs, template_files=template_files))
+        for inputs in inputs_list
+    ]
+
+    results = list(paths)
+    missing = []
+
+    for i, path in enumerate(paths):
+        if os.path.exists(path):
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+        else:
+            missing.append(i)
+
+    if missing:
+        started = time.monotonic()
+        rendered = render_many([inputs_list[i] for i in missing])
+
+        for i, data in zip(missing, rendered):
+            if isinstance(data, Exception):
+                results[i] = data
+                continue
+            _write_atomic(paths[i], data)
+
+        current_app.logger.info(
+            "[PDF CACHE] batch rendered %d %s in %.0f ms",
+            len(missing),
+            kind,
+            (time.monotonic() - started) * 1000,
+        )
+        _maybe_prune()
+
+    return results
+
+
+def cached_pdf_bytes(kind, inputs, render, *, template_files=()):
+    path = cached_pdf_path(kind, inputs, render, template_files=template_files)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def prune_pdf_cache(max_bytes=None):
+    """
+    Delete least-recently-used PDFs until the cache fits in max_bytes.
+    Returns (files_removed, bytes_removed).
+    """
+    if max_bytes is None:
+        max_bytes = int(current_app.config.get("PDF_CACHE_MAX_MB", 512) or 512) * 1024 * 1024
+
+    entries = []
+    total = 0
+
+    for dirpath, _dirnames, filenames in os.walk(_cache_root()):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+    removed = 0
+    freed = 0
+
+    if total <= max_bytes:
+        return removed, freed
+
+    entries.sort()
+    for _mtime, size, path in entries:
+        if total - freed <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        removed += 1
+        freed += size
+
+    current_app.logger.info("[PDF CACHE] pruned %d files (%d bytes)", removed, freed)
+    return removed, freed
+
+
+def _maybe_prune():
+    global _last_prune
+
+    with _prune_lock:
+        now = time.monotonic()
+        if now - _last_prune < PRUNE_INTERVAL_SECONDS:
+            return
+        _last_prune = now
+
+    try:
+        prune_pdf_cache()
+    except Exception as e:
+        current_app.logger.warning("[PDF CACHE] prune failed: %s", e)
+
+
+def run_in_background(fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) on a daemon thread inside an app + request
+    context (so url_for(..., _external=True) works).
+    """
+    app = current_app._get_current_object()
+    base_url = app.config.get("BASE_URL") or "http://localhost:5000"
+
+    def _worker():
+        from app.extensions import db
+
+        with app.app_context(), app.test_request_context("/", base_url=base_url):
+            try:
+                fn(*args, **kwargs)
+            except Exception:
+                app.logger.exception("[PDF CACHE] background job %s failed", getattr(fn, "__name__", fn))
+            finally:
+                db.session.remove()
+
+    t = threading.Thread(target=_worker, daemon=True)
+    t.start()
+    return t
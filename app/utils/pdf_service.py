@@ -0,0 +1,282 @@
+# app/utils/pdf_service.py
+"""
+WeasyPrint rendering off the web process.
+
+Templates are rendered to HTML in the request (cheap, needs the Flask
+app), then the HTML -> PDF step runs in a small process pool whose
+workers keep WeasyPrint imported, share one FontConfiguration and hold
+pre-parsed CSS for the shared stylesheets. Static assets referenced by
+the HTML (logo, signature, invoice.css) are read from disk instead of
+being fetched back over HTTP from our own server.
+
+PDF_WORKERS=0 renders in-process (same warm state, no pool).
+"""
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlparse
+
+from flask import current_app, has_request_context, render_template, request
+
+
+# Stylesheets every worker pre-parses once; referenced by name in jobs.
+SHARED_STYLESHEETS = {
+    "invoice": ("css", "invoice.css"),
+}
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+# ---------------------------------------------------
+# Worker side (runs inside the pool processes)
+# ---------------------------------------------------
+
+_worker_state = {}
+
+
+def _init_worker(static_folder):
+    from weasyprint import CSS, HTML, default_url_fetcher
+    from weasyprint.text.fonts import FontConfiguration
+
+    font_config = FontConfiguration()
+
+    css = {}
+    for name, parts in SHARED_STYLESHEETS.items():
+        path = os.path.join(static_folder, *parts)
+        if os.path.exists(path):
+            css[name] = CSS(filename=path, font_config=font_config)
+
+    def url_fetcher(url, *args, **kwargs):
+        # /static/... -> local file, whatever host the HTML was built for
+        path = urlparse(url).path if "://" in url else url
+        if "/static/" in path:
+            rel = path.split("/static/", 1)[1]
+            local = os.path.normpath(os.path.join(static_folder, rel))
+            if local.startswith(os.path.normpath(static_folder)) and os.path.isfile(local):
+                return default_url_fetcher("file://" + local, *args, **kwargs)
+        return default_url_fetcher(url, *args, **kwargs)
+
+    _worker_state.update(
+        HTML=HTML,
+        font_config=font_config,
+        css=css,
+        url_fetcher=url_fetcher,
+        static_folder=static_folder,
+    )
+
+
+def _render_one(job):
+    state = _worker_state
+    stylesheets = [state["css"][name] for name in job.get("stylesheets") or () if name in state["css"]]
+
+    document = state["HTML"](
+        string=job["html"],
+        base_url=job.get("base_url") or state["static_folder"],
+        url_fetcher=state["url_fetcher"],
+    )
+
+    output_path = job.get("output_path")
+    if output_path:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        document.write_pdf(output_path, stylesheets=stylesheets, font_config=state["font_config"])
+        return output_path
+
+    return document.write_pdf(stylesheets=stylesheets, font_config=state["font_config"])
+
+
+def _render_many(jobs):
+    results = []
+    for job in jobs:
+        try:
+            results.append(_render_one(job))
+        except Exception as e:
+            results.append(PdfRenderError(str(e)))
+    return results
+
+
+# ---------------------------------------------------
+# Web process side
+# ---------------------------------------------------
+
+class PdfRenderError(Exception):
+    pass
+
+
+def _get_pool():
+    """
+    One pool per OS process; recreated after a fork (gunicorn --preload).
+    Returns None when PDF_WORKERS=0.
+    """
+    global _pool, _pool_pid
+
+    workers = int(current_app.config.get("PDF_WORKERS", 2) or 0)
+    if workers <= 0:
+        return None
+
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            return _pool
+
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(current_app.static_folder,),
+        )
+        _pool_pid = os.getpid()
+        return _pool
+
+
+def _discard_pool(pool):
+    """
+    Drop a broken or stuck pool so the next render starts a fresh one.
+    shutdown() leaves a worker that is still rendering running, so the
+    workers are terminated too (a hung WeasyPrint job never returns).
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+def shutdown_pdf_pool():
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+atexit.register(shutdown_pdf_pool)
+
+
+def _default_base_url():
+    if has_request_context():
+        return request.url_root
+    return current_app.config.get("BASE_URL")
+
+
+def _build_job(job):
+    """
+    Normalize a job dict:
+      template + context  -> rendered here to html
+      html                -> used as-is
+      stylesheets         -> names from SHARED_STYLESHEETS
+      base_url, output_path optional
+    """
+    html = job.get("html")
+    if html is None:
+        html = render_template(job["template"], **(job.get("context") or {}))
+
+    return {
+        "html": html,
+        "base_url": job.get("base_url") or _default_base_url(),
+        "stylesheets": tuple(job.get("stylesheets") or ()),
+        "output_path": job.get("output_path"),
+    }
+
+
+def _timeout():
+    return float(current_app.config.get("PDF_RENDER_TIMEOUT_SECONDS", 120) or 120)
+
+
+def _submit(pool, jobs):
+    # spread a batch over the pool; each worker renders its chunk in one pass
+    workers = max(1, int(current_app.config.get("PDF_WORKERS", 2) or 1))
+    size = max(1, -(-len(jobs) // workers))
+    chunks = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+
+    timeout = _timeout()
+    deadline = time.monotonic() + timeout
+    futures = [pool.submit(_render_many, chunk) for chunk in chunks]
+
+    results = []
+    try:
+        # one limit for the whole call, not one per chunk
+        for future in futures:
+            results.extend(future.result(timeout=max(deadline - time.monotonic(), 0)))
+    except FutureTimeoutError:
+        # the stuck worker would hold its slot for every later render
+        _discard_pool(pool)
+        raise PdfRenderError(f"PDF rendering timed out after {timeout:g}s")
+    return results
+
+
+def _run(jobs):
+    pool = _get_pool()
+
+    if pool is None:
+        if not _worker_state:
+            _init_worker(current_app.static_folder)
+        return _render_many(jobs)
+
+    try:
+        return _submit(pool, jobs)
+    except BrokenProcessPool:
+        # a worker died (OOM kill, segfault); the pool is unusable from
+        # now on, so retry once on a new one
+        current_app.logger.warning("[PDF] render pool broke; restarting it")
+        _discard_pool(pool)
+
+    pool = _get_pool()
+    try:
+        return _submit(pool, jobs)
+    except BrokenProcessPool as e:
+        _discard_pool(pool)
+        raise PdfRenderError(f"PDF render worker crashed: {e}") from e
+
+
+def render_pdf(template=None, context=None, *, html=None, stylesheets=(), base_url=None, output_path=None):
+    """
+    Render one PDF. Returns bytes, or output_path when one is given.
+    Raises PdfRenderError if WeasyPrint fails, a worker crashes or the
+    render takes longer than PDF_RENDER_TIMEOUT_SECONDS.
+    """
+    job = _build_job(
+        {
+            "template": template,
+            "context": context,
+            "html": html,
+            "stylesheets": stylesheets,
+            "base_url": base_url,
+            "output_path": output_path,
+        }
+    )
+
+    result = _run([job])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def render_pdf_batch(jobs):
+    """
+    Render many PDFs in one pass (e.g. every payslip of a payroll run).
+
+    jobs: iterable of dicts accepted by render_pdf (template/context or
+    html, stylesheets, base_url, output_path).
+    Returns results in job order; a failed job yields a PdfRenderError
+    instance instead of raising, so one bad document doesn't sink the batch.
+    A crashed worker or a timeout still raises PdfRenderError for the batch.
+    """
+    built = [_build_job(job) for job in jobs]
+    if not built:
+        return []
+    return _run(built)
@@ -0,0 +1,188 @@
+# app/utils/pickup_cart.py
+"""
+Pickup cart for the POS screen.
+
+Selecting a customer used to cost one Invoice.query.get plus
+fetch_invoice_totals_pg() (four queries) per invoice, and checkout
+repeated the per-invoice totals. Now the cart is two queries whatever
+the invoice count:
+
+    1. the customer's ready packages with their invoices (one join)
+    2. fetch_invoice_totals_many() over all of those invoice ids
+
+Each invoice's live balance is then spread over its visible packages in
+proportion to their charges. Checkout uses invoice_balances(lock=True)
+for the same numbers under FOR UPDATE.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager
+
+from app.extensions import db
+from app.models import Invoice, Package, Payment
+from app.utils.invoice_totals import fetch_invoice_totals_many
+
+
+READY_STATUS = "Ready for Pick Up"
+
+_CENT = Decimal("0.01")
+_ZERO = Decimal("0.00")
+
+
+def _to_decimal(value, default="0.00"):
+    try:
+        if value is None or value == "":
+            return Decimal(default)
+        return Decimal(str(value))
+    except Exception:
+        return Decimal(default)
+
+
+def package_charge_amount(pkg):
+    total = getattr(pkg, "grand_total", None)
+    if total not in (None, "", 0, "0"):
+        return _to_decimal(total)
+
+    amount_due = getattr(pkg, "amount_due", None)
+    return _to_decimal(amount_due)
+
+
+def ready_packages(user_id):
+    """The customer's unlocked ready packages, oldest first, invoices joined in."""
+    return (
+        Package.query
+        .outerjoin(Package.invoice)
+        .options(contains_eager(Package.invoice))
+        .filter(
+            Package.user_id == user_id,
+            Package.status == READY_STATUS,
+            Package.is_locked.is_(False),
+        )
+        .order_by(Package.created_at.asc())
+        .all()
+    )
+
+
+def invoice_balances(invoice_ids, lock=False):
+    """{invoice_id: live outstanding balance (Decimal)} from one SELECT."""
+    return {
+        invoice_id: _to_decimal(max(float(total_due or 0), 0.0)).quantize(_CENT)
+        for invoice_id, (_subtotal, _discount, _paid, total_due)
+        in fetch_invoice_totals_many(invoice_ids, lock=lock).items()
+    }
+
+
+def completed_payments_by_invoice(invoice_ids):
+    """{invoice_id: completed payments (Decimal)}, any transaction type."""
+    invoice_ids = {invoice_id for invoice_id in invoice_ids or () if invoice_id}
+    if not invoice_ids:
+        return {}
+
+    rows = (
+        db.session.query(
+            Payment.invoice_id,
+            func.coalesce(func.sum(Payment.amount_jmd), 0),
+        )
+        .filter(
+            Payment.invoice_id.in_(invoice_ids),
+            func.lower(Payment.status) == "completed",
+        )
+        .group_by(Payment.invoice_id)
+        .all()
+    )
+
+    return {
+        invoice_id: _to_decimal(total).quantize(_CENT)
+        for invoice_id, total in rows
+    }
+
+
+def allocate_balance(packages, balance):
+    """
+    Split an invoice balance over its packages by package charge.
+    The last package takes the rounding remainder.
+    """
+    charges = {
+        package.id: package_charge_amount(package).quantize(_CENT)
+        for package in packages
+    }
+    charge_total = sum(charges.values(), _ZERO)
+
+    allocated = _ZERO
+    balances = {}
+
+    for index, package in enumerate(packages):
+        if index == len(packages) - 1:
+            package_balance = balance - allocated
+        elif charge_total > _ZERO:
+            package_balance = (
+                balance * charges[package.id] / charge_total
+            ).quantize(_CENT)
+        else:
+            package_balance = _ZERO
+
+        if package_balance < _ZERO:
+            package_balance = _ZERO
+
+        balances[package.id] = package_balance
+        allocated += package_balance
+
+    return balances
+
+
+def pickup_cart(user_id):
+    """
+    The customer's ready packages and what is owed on each.
+
+    Returns (packages, {package_id: amount_due}, total).
+    """
+    packages = ready_packages(user_id)
+
+    invoice_groups = {}
+    for package in packages:
+        if package.invoice_id:
+            invoice_groups.setdefault(package.invoice_id, []).append(package)
+
+    balances = invoice_balances(invoice_groups)
+
+    package_balances = {}
+
+    for invoice_id, invoice_packages in invoice_groups.items():
+        if invoice_id not in balances:
+            for package in invoice_packages:
+                package_balances[package.id] = _ZERO
+            continue
+
+        package_balances.update(
+            allocate_balance(invoice_packages, balances[invoice_id])
+        )
+
+    # Uninvoiced packages still use their original package charge.
+    for package in packages:
+        if not package.invoice_id:
+            package_balances[package.id] = (
+                package_charge_amount(package).quantize(_CENT)
+            )
+
+    total = sum(package_balances.values(), _ZERO).quantize(_CENT)
+
+    return packages, package_balances, total
+
+
+def preload_invoices(invoice_ids, lock=False):
+    """
+    Load invoices into the session in one query so later
+    Invoice.query.get() calls are identity-map hits.
+    """
+    invoice_ids = {invoice_id for invoice_id in invoice_ids or () if invoice_id}
+    if not invoice_ids:
+        return {}
+
+    query = Invoice.query.filter(Invoice.id.in_(invoice_ids))
+    if lock:
+        query = query.with_for_update(of=Invoice)
+
+    return {invoice.id: invoice for invoice in query.all()}
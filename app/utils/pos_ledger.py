@@ -0,0 +1,388 @@
+# app/utils/pos_ledger.py
+"""
+POS shift ledger.
+
+Daily sales used to load every POS payment of the day and re-add the
+tender totals on each view, and again at closeout. pos_shift_ledgers
+keeps one row of running totals per business date instead.
+
+The row is kept current from ORM flush events, like finance_facts:
+before a flush the old state of every changed Payment is read back, after
+it the new state, and the difference is added with one UPSERT on the
+flush's own connection. A completed POS sale adds itself; reversing it
+(or deleting / editing it) takes it out again, so the totals always
+match the completed-payment detail list.
+
+A date without a row yet (the first sale after deploy, or a date from
+before the ledger) is seeded from that day's completed payments, which
+already include the flush's own change. If another worker seeds the
+same date first, the delta is added to its row instead.
+
+The per-payment discount is the invoice's discount_total, as the daily
+sales page has always shown it, so a discount change re-counts that
+invoice's payments too. Bulk UPDATE/DELETE statements bypass the
+listeners; rebuild_pos_ledger() recomputes a date.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import Invoice, Payment, POSShiftLedger, User
+from app.utils.time import JAMAICA_TZ, to_jamaica
+
+
+TENDER_COLUMNS = ("cash", "card", "transfer", "wallet", "other")
+
+_TENDERS = {
+    "cash": "cash",
+    "card": "card",
+    "transfer": "transfer",
+    "bank": "transfer",
+    "bank transfer": "transfer",
+    "wallet": "wallet",
+    "e-wallet": "wallet",
+    "ewallet": "wallet",
+    "wallet payment": "wallet",
+}
+
+_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+_CENT = Decimal("0.01")
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(_CENT)
+
+
+def tender_column(method):
+    return _TENDERS.get((method or "").strip().lower(), "other")
+
+
+def pos_business_date(created_at):
+    return to_jamaica(created_at).date()
+
+
+def business_day_utc_bounds(business_date):
+    """Naive-UTC [start, end) of a Jamaica business date (created_at is naive UTC)."""
+    start_local = datetime.combine(business_date, time.min, tzinfo=JAMAICA_TZ)
+    end_local = start_local + timedelta(days=1)
+    return (
+        start_local.astimezone(timezone.utc).replace(tzinfo=None),
+        end_local.astimezone(timezone.utc).replace(tzinfo=None),
+    )
+
+
+def _is_pos_sale(row):
+    return (
+        (row.status or "").strip().lower() == "completed"
+        and row.transaction_type == "invoice_payment"
+        and row.source == "pos"
+    )
+
+
+def _empty():
+    values = {col: Decimal("0.00") for col in TENDER_COLUMNS}
+    values.update(gross_total=Decimal("0.00"), discount=Decimal("0.00"), total=Decimal("0.00"), payment_count=0)
+    return values
+
+
+def _entry(amount, discount, method):
+    amount = _money(amount)
+    discount = _money(discount)
+
+    values = _empty()
+    values[tender_column(method)] = amount
+    values.update(
+        gross_total=amount + discount,
+        discount=discount,
+        total=amount,
+        payment_count=1,
+    )
+    return values
+
+
+def _add(totals, row, sign=1):
+    for key, value in _entry(row.amount_jmd, row.discount_total, row.method).items():
+        totals[key] += sign * value
+
+
+def _totals_from_rows(rows):
+    values = _empty()
+    for r in rows:
+        _add(values, r)
+    return values
+
+
+# ---------------------------------------------------
+# Source rows
+# ---------------------------------------------------
+
+_TRACKED_FIELDS = ("created_at", "status", "transaction_type", "source", "method", "amount_jmd", "invoice_id")
+
+_ID_CHUNK = 500
+
+
+def _payment_select():
+    p = Payment.__table__
+    i = Invoice.__table__
+    return (
+        select(
+            p.c.id, p.c.created_at, p.c.status, p.c.transaction_type, p.c.source,
+            p.c.method, p.c.amount_jmd, i.c.discount_total,
+        )
+        .select_from(p.outerjoin(i, i.c.id == p.c.invoice_id))
+    )
+
+
+def _load_rows(conn, ids):
+    """The ledger-relevant rows among payment ids, by business date."""
+    ids = list(ids)
+    by_date = defaultdict(list)
+    for i in range(0, len(ids), _ID_CHUNK):
+        for row in conn.execute(_payment_select().where(Payment.__table__.c.id.in_(ids[i:i + _ID_CHUNK]))):
+            if _is_pos_sale(row) and row.created_at is not None:
+                by_date[pos_business_date(row.created_at)].append(row)
+    return by_date
+
+
+def _day_rows(conn, business_date):
+    p = Payment.__table__
+    start_utc, end_utc = business_day_utc_bounds(business_date)
+    return conn.execute(
+        _payment_select().where(
+            p.c.created_at >= start_utc,
+            p.c.created_at < end_utc,
+            p.c.status == "completed",
+            p.c.transaction_type == "invoice_payment",
+            p.c.source == "pos",
+        )
+    ).all()
+
+
+# ---------------------------------------------------
+# Writing
+# ---------------------------------------------------
+
+def _seed_ledger(conn, business_date, revision):
+    """
+    Create business_date's row from its completed payments. False if a
+    row already exists (it is left alone).
+    """
+    t = POSShiftLedger.__table__
+    row = dict(
+        business_date=business_date,
+        revision=revision,
+        updated_at=datetime.now(timezone.utc),
+        **_totals_from_rows(_day_rows(conn, business_date)),
+    )
+
+    insert = _INSERTS.get(conn.dialect.name)
+    if insert is not None:
+        stmt = insert(t).values(**row).on_conflict_do_nothing(index_elements=[t.c.business_date])
+        return conn.execute(stmt).rowcount == 1
+
+    if conn.execute(select(t.c.id).where(t.c.business_date == business_date)).first() is not None:
+        return False
+    conn.execute(t.insert().values(**row))
+    return True
+
+
+def _add_to_ledger(conn, business_date, values):
+    t = POSShiftLedger.__table__
+    conn.execute(
+        t.update()
+        .where(t.c.business_date == business_date)
+        .values(
+            revision=t.c.revision + 1,
+            updated_at=datetime.now(timezone.utc),
+            **{key: t.c[key] + value for key, value in values.items()},
+        )
+    )
+
+
+def _apply_deltas(conn, deltas):
+    for business_date, values in deltas.items():
+        if not any(values.values()):
+            continue
+        # a new row already counts this flush's change
+        if not _seed_ledger(conn, business_date, revision=1):
+            _add_to_ledger(conn, business_date, values)
+
+
+def rebuild_pos_ledger(business_date, session=None):
+    """Recompute business_date's row from its payments (after bulk edits)."""
+    conn = (session or db.session).connection()
+    if _seed_ledger(conn, business_date, revision=1):
+        return
+
+    t = POSShiftLedger.__table__
+    conn.execute(
+        t.update()
+        .where(t.c.business_date == business_date)
+        .values(
+            revision=t.c.revision + 1,
+            updated_at=datetime.now(timezone.utc),
+            **_totals_from_rows(_day_rows(conn, business_date)),
+        )
+    )
+
+
+# ---------------------------------------------------
+# Flush listeners
+# ---------------------------------------------------
+
+def _tracked_change(obj):
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in _TRACKED_FIELDS)
+
+
+@event.listens_for(Session, "before_flush")
+def _capture_old_entries(session, flush_context, instances):
+    changed = []
+    removed = set()
+    discounted = set()
+
+    for obj in session.dirty:
+        if isinstance(obj, Payment) and obj.id is not None and _tracked_change(obj):
+            changed.append(obj)
+            removed.add(obj.id)
+        elif (
+            isinstance(obj, Invoice)
+            and obj.id is not None
+            and inspect(obj).attrs.discount_total.history.has_changes()
+        ):
+            discounted.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Payment) and obj.id is not None:
+            removed.add(obj.id)
+
+    for obj in session.new:
+        if isinstance(obj, Payment):
+            changed.append(obj)
+
+    if not (changed or removed or discounted):
+        session.info.pop("pos_ledger_changes", None)
+        return
+
+    # the database still holds the pre-flush state
+    conn = session.connection()
+    reload = set()
+    if discounted:
+        # every payment counts its invoice's discount
+        p = Payment.__table__
+        reload = set(conn.execute(select(p.c.id).where(p.c.invoice_id.in_(discounted))).scalars())
+        removed |= reload
+
+    deltas = defaultdict(_empty)
+    for business_date, rows in _load_rows(conn, removed).items():
+        for row in rows:
+            _add(deltas[business_date], row, sign=-1)
+
+    session.info["pos_ledger_changes"] = (deltas, changed, reload)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_ledger_changes(session, flush_context):
+    pending = session.info.pop("pos_ledger_changes", None)
+    if pending is None:
+        return
+
+    deltas, changed, reload = pending
+    conn = session.connection()
+
+    deleted = {o.id for o in session.deleted if isinstance(o, Payment)}
+    ids = ({o.id for o in changed if o.id is not None} | reload) - deleted
+    for business_date, rows in _load_rows(conn, ids).items():
+        for row in rows:
+            _add(deltas[business_date], row)
+
+    _apply_deltas(conn, deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_ledger_changes(session):
+    session.info.pop("pos_ledger_changes", None)
+
+
+# ---------------------------------------------------
+# Reading
+# ---------------------------------------------------
+
+def pos_payment_rows(business_date):
+    """
+    The day's completed POS payments, newest first, with invoice and
+    customer in the same SELECT.
+    """
+    start_utc, end_utc = business_day_utc_bounds(business_date)
+
+    return (
+        db.session.query(
+            Payment.id,
+            Payment.created_at,
+            Payment.method,
+            Payment.amount_jmd,
+            Invoice.invoice_number,
+            Invoice.discount_total,
+            User.full_name.label("customer"),
+        )
+        .outerjoin(Invoice, Invoice.id == Payment.invoice_id)
+        .outerjoin(User, User.id == Payment.user_id)
+        .filter(
+            Payment.created_at >= start_utc,
+            Payment.created_at < end_utc,
+            Payment.status == "completed",
+            Payment.transaction_type == "invoice_payment",
+            Payment.source == "pos",
+        )
+        .order_by(Payment.created_at.desc())
+        .all()
+    )
+
+
+def pos_day_summary(business_date, rows=None):
+    """
+    The totals daily_sales renders, read-only: the ledger row if the date
+    has one, else the sum of rows (revision 0, which ensure_pos_ledger
+    will give the row it creates).
+    """
+    ledger = POSShiftLedger.query.filter_by(business_date=business_date).first()
+    if ledger is not None:
+        return ledger_summary(ledger)
+
+    if rows is None:
+        rows = pos_payment_rows(business_date)
+    summary = _totals_from_rows(rows)
+    summary["revision"] = 0
+    return summary
+
+
+def ensure_pos_ledger(business_date):
+    """
+    Create business_date's row from its payments if it has none yet (for
+    the closeout, which locks it). The caller commits.
+    """
+    _seed_ledger(db.session.connection(), business_date, revision=0)
+
+
+def ledger_summary(ledger):
+    """The dict daily_sales renders (Decimal amounts)."""
+    summary = {col: _money(getattr(ledger, col, 0)) for col in TENDER_COLUMNS}
+    summary.update(
+        gross_total=_money(ledger.gross_total),
+        discount=_money(ledger.discount),
+        total=_money(ledger.total),
+        payment_count=int(ledger.payment_count or 0),
+        revision=int(ledger.revision or 0),
+    )
+    return summary
@@ -0,0 +1,313 @@
+# app/utils/prealert_reconcile.py
+"""
+Bulk package <-> pre-alert reconciliation.
+
+reconcile_packages() takes any set of packages (a shipment, an upload,
+a nightly sweep) and in a fixed number of queries:
+
+  1. finds the newest pre-alert per (customer, normalized tracking)
+     through the prealerts(customer_id, tracking_norm) index
+  2. loads the packages' existing attachments once for de-duplication
+  3. links + locks each pre-alert, copies its declared value and its
+     invoice onto the package (a pre-alert already linked to a
+     different package is reported as a conflict, never moved)
+  4. links purchased Shop For Me requests for the whole set
+  5. records a PrealertReconciliation report row
+
+Nothing is committed; the caller commits.
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import and_, exists, func
+
+from app.extensions import db
+from app.models import (
+    Package,
+    PackageAttachment,
+    Prealert,
+    PrealertReconciliation,
+    normalize_tracking,
+    shipment_packages,
+)
+from app.utils.shop_for_me_utils import link_shop_for_me_packages
+
+
+# cap on ids/conflicts stored in a report's details
+REPORT_DETAIL_LIMIT = 200
+
+# the nightly sweep only looks at packages created this recently
+SWEEP_LOOKBACK_DAYS = 30
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _strip(value):
+    return (value or "").strip()
+
+
+def _newest_prealerts(keys):
+    """{(customer_id, tracking_norm): newest Prealert} in one query."""
+    if not keys:
+        return {}
+
+    rows = (
+        Prealert.query
+        .filter(
+            Prealert.customer_id.in_({customer_id for customer_id, _ in keys}),
+            Prealert.tracking_norm.in_({tracking for _, tracking in keys}),
+        )
+        .order_by(Prealert.created_at.desc(), Prealert.id.desc())
+        .all()
+    )
+
+    newest = {}
+    for pa in rows:
+        newest.setdefault((pa.customer_id, pa.tracking_norm), pa)
+    return newest
+
+
+def _existing_attachments(package_ids):
+    """(set of (package_id, public_id), set of (package_id, url)) in one query."""
+    by_public_id, by_url = set(), set()
+    if not package_ids:
+        return by_public_id, by_url
+
+    rows = (
+        db.session.query(
+            PackageAttachment.package_id,
+            PackageAttachment.cloud_public_id,
+            PackageAttachment.file_url,
+        )
+        .filter(PackageAttachment.package_id.in_(package_ids))
+        .all()
+    )
+    for package_id, public_id, url in rows:
+        if public_id:
+            by_public_id.add((package_id, public_id))
+        if url:
+            by_url.add((package_id, url))
+    return by_public_id, by_url
+
+
+def _apply_invoice(pkg, pa, by_public_id, by_url):
+    """Copy the pre-alert invoice onto the package. True if an attachment was added."""
+    invoice_url = _strip(getattr(pa, "invoice_filename", None))
+    if not invoice_url:
+        return False
+
+    public_id = _strip(getattr(pa, "invoice_public_id", None))
+    created = False
+
+    if (pkg.id, public_id) not in by_public_id and (pkg.id, invoice_url) not in by_url:
+        db.session.add(
+            PackageAttachment(
+                package_id=pkg.id,
+                file_name=invoice_url,
+                file_url=invoice_url,
+                original_name=_strip(getattr(pa, "invoice_original_name", None)) or "prealert_invoice",
+                cloud_public_id=public_id or None,
+                cloud_resource_type=_strip(getattr(pa, "invoice_resource_type", None)) or "raw",
+            )
+        )
+        if public_id:
+            by_public_id.add((pkg.id, public_id))
+        by_url.add((pkg.id, invoice_url))
+        created = True
+
+    # Mirror onto the legacy package field.
+    if hasattr(pkg, "invoice_file") and not _strip(getattr(pkg, "invoice_file", None)):
+        pkg.invoice_file = invoice_url
+
+    return created
+
+
+def reconcile_packages(
+    packages,
+    *,
+    scope="package",
+    scope_ref=None,
+    actor_admin_id=None,
+    link_shop=True,
+    report=True,
+):
+    """
+    Reconcile packages against their customers' pre-alerts.
+
+    Returns the PrealertReconciliation (added to the session, not
+    committed). With report=False the row is built but not added.
+    """
+    started = time.perf_counter()
+
+    packages = [p for p in packages or [] if p is not None and getattr(p, "id", None)]
+
+    keyed = []
+    for pkg in packages:
+        tracking = normalize_tracking(getattr(pkg, "tracking_number", "") or "")
+        if tracking and pkg.user_id:
+            keyed.append(((pkg.user_id, tracking), pkg))
+
+    prealerts = _newest_prealerts({key for key, _ in keyed})
+    matched_pairs = [(pkg, prealerts[key]) for key, pkg in keyed if key in prealerts]
+
+    by_public_id, by_url = _existing_attachments([pkg.id for pkg, _ in matched_pairs])
+
+    now = _utcnow()
+    result = PrealertReconciliation(
+        scope=scope,
+        scope_ref=str(scope_ref) if scope_ref is not None else None,
+        actor_admin_id=actor_admin_id,
+        packages_seen=len(packages),
+        matched=len(matched_pairs),
+        linked=0,
+        values_applied=0,
+        attachments_created=0,
+        shop_links=0,
+        conflicts=0,
+        unmatched=0,
+    )
+
+    conflicts = []
+    matched_ids = set()
+
+    for pkg, pa in matched_pairs:
+        existing_package_id = pa.linked_package_id
+
+        # Never move a pre-alert already linked to another package.
+        if existing_package_id and int(existing_package_id) != int(pkg.id):
+            conflicts.append({
+                "package_id": pkg.id,
+                "prealert_id": pa.id,
+                "linked_package_id": int(existing_package_id),
+            })
+            continue
+
+        matched_ids.add(pkg.id)
+
+        prealert_value = float(getattr(pa, "item_value_usd", 0) or 0)
+        if prealert_value > 0:
+            if hasattr(pkg, "value"):
+                pkg.value = prealert_value
+            if hasattr(pkg, "declared_value"):
+                pkg.declared_value = prealert_value
+            result.values_applied += 1
+
+        if not existing_package_id:
+            pa.linked_package_id = pkg.id
+            pa.linked_at = now
+            result.linked += 1
+
+        if hasattr(pa, "is_locked"):
+            pa.is_locked = True
+
+        if _apply_invoice(pkg, pa, by_public_id, by_url):
+            result.attachments_created += 1
+
+    if link_shop:
+        result.shop_links = len(link_shop_for_me_packages(packages))
+
+    unmatched_ids = [pkg.id for pkg in packages if pkg.id not in matched_ids]
+
+    result.conflicts = len(conflicts)
+    result.unmatched = len(unmatched_ids)
+    result.details = {
+        "conflicts": conflicts[:REPORT_DETAIL_LIMIT],
+        "unmatched_package_ids": unmatched_ids[:REPORT_DETAIL_LIMIT],
+    }
+    result.duration_ms = int((time.perf_counter() - started) * 1000)
+
+    if report:
+        db.session.add(result)
+
+    current_app.logger.info(
+        "[PREALERT RECONCILE] %s %s: %s packages, %s matched, %s linked, "
+        "%s attachments, %s conflicts, %s unmatched (%sms)",
+        scope,
+        scope_ref or "-",
+        result.packages_seen,
+        result.matched,
+        result.linked,
+        result.attachments_created,
+        result.conflicts,
+        result.unmatched,
+        result.duration_ms,
+    )
+    return result
+
+
+def reconcile_shipment(shipment_id, *, actor_admin_id=None):
+    """Reconcile every package in a shipment (packages loaded in one query)."""
+    packages = (
+        Package.query
+        .join(shipment_packages, shipment_packages.c.package_id == Package.id)
+        .filter(shipment_packages.c.shipment_id == shipment_id)
+        .all()
+    )
+    return reconcile_packages(
+        packages,
+        scope="shipment",
+        scope_ref=shipment_id,
+        actor_admin_id=actor_admin_id,
+    )
+
+
+def _tracking_norm_sql(column):
+    """normalize_tracking() in SQL: whitespace removed, upper-cased."""
+    for ch in (" ", "\t", "\n", "\r", "\f", "\v"):
+        column = func.replace(column, ch, "")
+    return func.upper(column)
+
+
+def _orphan_package_query(lookback_days):
+    """
+    Recent packages with a tracking number that no pre-alert points at
+    but whose customer has an unlinked pre-alert with the same key.
+    """
+    since = _utcnow() - timedelta(days=int(lookback_days))
+
+    linked = exists().where(Prealert.linked_package_id == Package.id)
+    candidate = exists().where(
+        and_(
+            Prealert.customer_id == Package.user_id,
+            # Package() normalizes, but edits only strip the tracking number
+            Prealert.tracking_norm == _tracking_norm_sql(Package.tracking_number),
+            Prealert.linked_package_id.is_(None),
+        )
+    )
+
+    return Package.query.filter(
+        Package.created_at >= since,
+        Package.tracking_number.isnot(None),
+        ~linked,
+        candidate,
+    )
+
+
+def sweep_orphan_prealerts(limit=200, after_id=0, lookback_days=None):
+    """
+    One batch of the nightly sweep, in package id order after after_id.
+    Returns (report, last_id, scanned). Caller commits.
+    """
+    lookback_days = lookback_days or current_app.config.get("PREALERT_SWEEP_LOOKBACK_DAYS", SWEEP_LOOKBACK_DAYS)
+
+    packages = (
+        _orphan_package_query(lookback_days)
+        .filter(Package.id > after_id)
+        .order_by(Package.id.asc())
+        .limit(int(limit))
+        .all()
+    )
+    if not packages:
+        return None, after_id, 0
+
+    report = reconcile_packages(
+        packages,
+        scope="sweep",
+        scope_ref=f"{packages[0].id}-{packages[-1].id}",
+    )
+    return report, packages[-1].id, len(packages)
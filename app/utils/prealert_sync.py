@@ -39,11 +39,11 @@ def upsert_prealert_from_package(pkg) -> Prealert | None:
     if not customer_id:
         return None
 
-    # ✅ Use exact match now that we normalize
+    # ✅ Exact match on the indexed normalized key
     pa = (Prealert.query
           .filter(
               Prealert.customer_id == customer_id,
-              Prealert.tracking_number == tracking,
+              Prealert.tracking_norm == tracking,
           )
           .order_by(Prealert.created_at.desc(), Prealert.id.desc())
           .first())
@@ -97,7 +97,7 @@ def sync_prealert_invoice_to_package(pkg) -> bool:
     pa = (Prealert.query
           .filter(
               Prealert.customer_id == pkg.user_id,
-              Prealert.tracking_number == tracking,
+              Prealert.tracking_norm == tracking,
           )
           .order_by(Prealert.created_at.desc(), Prealert.id.desc())
           .first())
@@ -0,0 +1,306 @@
+# app/utils/query_stats.py
+"""
+Per-request SQL instrumentation.
+
+Cursor-execute listeners count every query a request runs, its total DB
+time and how often the same statement shape repeats (the N+1 signal).
+The numbers are surfaced as:
+
+  - a Server-Timing header (visible in the browser devtools timing tab),
+    sent to logged-in admins, and to everyone with PERF_SERVER_TIMING
+    (the default outside production)
+  - a "[PERF] {...}" JSON log line for slow or query-heavy requests
+  - per-endpoint aggregates shown on the admin-only /__perf page
+
+Budgets: @query_budget(n) on a view (or PERF_QUERY_BUDGET globally)
+logs a warning when a request runs more than n queries; with
+PERF_ENFORCE_QUERY_BUDGET=1 (tests) it raises QueryBudgetExceeded.
+
+Aggregates are kept in memory per worker process.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+RECENT_SLOW_REQUESTS = 50
+TOP_DUPLICATES = 5
+
+_PARAM_RE = re.compile(r"%\([^)]*\)s|%s|(?<![:\w]):\w+")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_SPACE_RE = re.compile(r"\s+")
+
+_endpoint_stats = {}
+_slow_requests = deque(maxlen=RECENT_SLOW_REQUESTS)
+_stats_lock = threading.Lock()
+
+_listeners_installed = False
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryStats:
+    __slots__ = ("count", "db_ms", "fingerprints", "samples", "_starts")
+
+    def __init__(self):
+        self.count = 0
+        self.db_ms = 0.0
+        self.fingerprints = Counter()
+        self.samples = {}
+        self._starts = []
+
+    def duplicates(self, limit=TOP_DUPLICATES):
+        """[(fingerprint, times, sample_sql)] for statements run more than once."""
+        return [
+            (fp, n, self.samples.get(fp, ""))
+            for fp, n in self.fingerprints.most_common(limit)
+            if n > 1
+        ]
+
+
+def statement_fingerprint(statement):
+    """
+    Shape of a statement with literals and IN-lists collapsed, so
+    'WHERE id = 1' and 'WHERE id = 2' count as the same query.
+    """
+    s = _STRING_RE.sub("?", statement or "")
+    s = _NUMBER_RE.sub("?", s)
+    s = _PARAM_RE.sub("?", s)
+    s = _IN_LIST_RE.sub("(...)", s)
+    s = _SPACE_RE.sub(" ", s).strip()
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()[:12], s
+
+
+def _current():
+    if not has_app_context():
+        return None
+    return g.get("_query_stats")
+
+
+# ---------------------------------------------------
+# Engine listeners
+# ---------------------------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current()
+    if stats is not None:
+        stats._starts.append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current()
+    if stats is None or not stats._starts:
+        return
+
+    elapsed = (time.perf_counter() - stats._starts.pop()) * 1000
+    fp, shape = statement_fingerprint(statement)
+
+    stats.count += 1
+    stats.db_ms += elapsed
+    stats.fingerprints[fp] += 1
+    if fp not in stats.samples:
+        stats.samples[fp] = shape[:300]
+
+
+def _install_listeners():
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _listeners_installed = True
+
+
+# ---------------------------------------------------
+# Budgets
+# ---------------------------------------------------
+
+def query_budget(max_queries):
+    """
+    View decorator: the most queries this endpoint is expected to run.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapped(*args, **kwargs):
+            g._query_budget = int(max_queries)
+            return fn(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+@contextmanager
+def count_queries():
+    """
+    Count queries run inside the block (works outside a request too):
+
+        with count_queries() as stats:
+            build_something()
+        assert stats.count <= 5
+    """
+    previous = g.get("_query_stats")
+    stats = QueryStats()
+    g._query_stats = stats
+    try:
+        yield stats
+    finally:
+        g._query_stats = previous
+        if previous is not None:
+            previous.count += stats.count
+            previous.db_ms += stats.db_ms
+            previous.fingerprints.update(stats.fingerprints)
+            for fp, sql in stats.samples.items():
+                previous.samples.setdefault(fp, sql)
+
+
+@contextmanager
+def assert_max_queries(max_queries):
+    with count_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise QueryBudgetExceeded(_budget_message(stats, max_queries, "block"))
+
+
+def _budget_message(stats, budget, where):
+    dupes = ", ".join(f"{n}x {sql[:120]}" for _fp, n, sql in stats.duplicates(3))
+    msg = f"{where} ran {stats.count} queries (budget {budget})"
+    return f"{msg}; repeated: {dupes}" if dupes else msg
+
+
+# ---------------------------------------------------
+# Request hooks
+# ---------------------------------------------------
+
+def _record(endpoint, stats, total_ms):
+    with _stats_lock:
+        row = _endpoint_stats.get(endpoint)
+        if row is None:
+            row = _endpoint_stats[endpoint] = {
+                "endpoint": endpoint,
+                "requests": 0,
+                "queries": 0,
+                "db_ms": 0.0,
+                "total_ms": 0.0,
+                "max_queries": 0,
+                "max_db_ms": 0.0,
+            }
+        row["requests"] += 1
+        row["queries"] += stats.count
+        row["db_ms"] += stats.db_ms
+        row["total_ms"] += total_ms
+        row["max_queries"] = max(row["max_queries"], stats.count)
+        row["max_db_ms"] = max(row["max_db_ms"], stats.db_ms)
+
+
+def _before_request():
+    g._query_stats = QueryStats()
+    g._request_started = time.perf_counter()
+
+
+def _server_timing_allowed():
+    if current_app.config.get("PERF_SERVER_TIMING", False):
+        return True
+    # only a user this request already loaded (no extra query)
+    user = g.get("_login_user")
+    return bool(getattr(user, "is_authenticated", False) and getattr(user, "is_admin", False))
+
+
+def _after_request(response):
+    stats = g.get("_query_stats")
+    started = g.get("_request_started")
+    if stats is None or started is None:
+        return response
+
+    cfg = current_app.config
+    total_ms = (time.perf_counter() - started) * 1000
+    endpoint = request.endpoint or "<unmatched>"
+
+    if endpoint != "static":
+        _record(endpoint, stats, total_ms)
+
+    if _server_timing_allowed():
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={stats.db_ms:.1f};desc="{stats.count} queries", app;dur={total_ms:.1f}',
+        )
+
+    slow_ms = float(cfg.get("PERF_SLOW_REQUEST_MS", 1000) or 0)
+    slow_queries = int(cfg.get("PERF_SLOW_QUERY_COUNT", 50) or 0)
+
+    if (slow_ms and total_ms >= slow_ms) or (slow_queries and stats.count >= slow_queries):
+        entry = {
+            "endpoint": endpoint,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 1),
+            "db_ms": round(stats.db_ms, 1),
+            "queries": stats.count,
+            "duplicates": [
+                {"fingerprint": fp, "count": n, "sql": sql[:200]}
+                for fp, n, sql in stats.duplicates()
+            ],
+        }
+        with _stats_lock:
+            _slow_requests.appendleft(entry)
+        current_app.logger.warning("[PERF] %s", json.dumps(entry, default=str))
+
+    budget = g.get("_query_budget") or int(cfg.get("PERF_QUERY_BUDGET", 0) or 0)
+    if budget and stats.count > budget:
+        message = _budget_message(stats, budget, endpoint)
+        if cfg.get("PERF_ENFORCE_QUERY_BUDGET"):
+            raise QueryBudgetExceeded(message)
+        current_app.logger.warning("[PERF BUDGET] %s", message)
+
+    return response
+
+
+def init_query_stats(app):
+    if not app.config.get("PERF_INSTRUMENTATION", True):
+        return
+    _install_listeners()
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+
+# ---------------------------------------------------
+# Reporting
+# ---------------------------------------------------
+
+def top_endpoints(limit=25, order_by="db_ms"):
+    with _stats_lock:
+        rows = [dict(r) for r in _endpoint_stats.values()]
+
+    for r in rows:
+        n = r["requests"] or 1
+        r["avg_queries"] = r["queries"] / n
+        r["avg_db_ms"] = r["db_ms"] / n
+        r["avg_total_ms"] = r["total_ms"] / n
+
+    rows.sort(key=lambda r: r.get(order_by, 0), reverse=True)
+    return rows[:limit]
+
+
+def recent_slow_requests():
+    with _stats_lock:
+        return list(_slow_requests)
+
+
+def reset_query_stats():
+    with _stats_lock:
+        _endpoint_stats.clear()
+        _slow_requests.clear()
@@ -0,0 +1,174 @@
+# app/utils/ratelimit_storage.py
+"""
+Database-backed Flask-Limiter storage.
+
+memory:// keeps one set of counters per gunicorn worker, so a
+"10 per 15 minutes" login limit really allowed 10 per worker and was
+forgotten on every deploy. This storage keeps fixed-window counters in
+the rate_limit_counters table instead, shared by every worker and dyno:
+
+  db://                       the app's own database (Flask-SQLAlchemy
+                              engine, resolved on first use)
+  db+postgresql+psycopg://…   any other SQLAlchemy URL, own engine
+  db+sqlite:///path.db
+
+Each hit is a single INSERT … ON CONFLICT DO UPDATE … RETURNING on its
+own pooled connection, so the count the limiter compares is exact even
+with concurrent workers and the request's session is never touched.
+Only limited endpoints (login/registration POSTs) ever reach it.
+
+Counters are not batched: a batched increment would let a burst through
+before the batch lands, which is exactly what limits exist to stop.
+
+Only the fixed-window strategy (Flask-Limiter's default) is supported.
+Expired rows are reused on the next hit and purged nightly by the
+rate_limit_purge job.
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+from limits.storage import Storage
+from sqlalchemy import case, create_engine, delete, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+
+
+_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _counters_table():
+    from app.models import RateLimitCounter
+
+    return RateLimitCounter.__table__
+
+
+class DatabaseStorage(Storage):
+    STORAGE_SCHEME = [
+        "db",
+        "db+sqlite",
+        "db+postgresql",
+        "db+postgresql+psycopg",
+        "db+postgresql+psycopg2",
+    ]
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        self._url = None
+        if uri and uri.startswith("db+"):
+            self._url = uri[len("db+"):]
+
+        self._engine_options = options
+        self._engine = None
+        self._engine_lock = threading.Lock()
+
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return SQLAlchemyError
+
+    @property
+    def engine(self):
+        if self._url is None:
+            # the app's engine; needs an app context (always true in a request)
+            from app.extensions import db
+
+            return db.engine
+
+        with self._engine_lock:
+            if self._engine is None:
+                self._engine = create_engine(
+                    self._url,
+                    pool_pre_ping=True,
+                    **self._engine_options,
+                )
+            return self._engine
+
+    def _insert(self, engine):
+        try:
+            return _INSERTS[engine.dialect.name]
+        except KeyError:
+            raise NotImplementedError(
+                f"db:// rate-limit storage does not support {engine.dialect.name}"
+            )
+
+    # ---------------------------------------------------
+    # limits.storage.Storage
+    # ---------------------------------------------------
+
+    def incr(self, key, expiry, amount=1, **_):
+        """Add amount to key's window (starting a new one if expired); returns the new count."""
+        t = _counters_table()
+        engine = self.engine
+        now = time.time()
+        expired = t.c.expires_at <= now
+
+        stmt = self._insert(engine)(t).values(
+            key=key,
+            count=amount,
+            expires_at=now + expiry,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.c.key],
+            set_={
+                "count": case((expired, amount), else_=t.c.count + amount),
+                "expires_at": case((expired, now + expiry), else_=t.c.expires_at),
+            },
+        ).returning(t.c.count)
+
+        with engine.begin() as conn:
+            return int(conn.execute(stmt).scalar_one())
+
+    def get(self, key):
+        t = _counters_table()
+        with self.engine.connect() as conn:
+            count = conn.execute(
+                select(t.c.count).where(
+                    t.c.key == key,
+                    t.c.expires_at > time.time(),
+                )
+            ).scalar()
+        return int(count or 0)
+
+    def get_expiry(self, key):
+        t = _counters_table()
+        with self.engine.connect() as conn:
+            expires_at = conn.execute(
+                select(t.c.expires_at).where(t.c.key == key)
+            ).scalar()
+        return float(expires_at) if expires_at and expires_at > time.time() else time.time()
+
+    def check(self):
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            return False
+
+    def reset(self):
+        t = _counters_table()
+        with self.engine.begin() as conn:
+            return conn.execute(delete(t)).rowcount
+
+    def clear(self, key):
+        t = _counters_table()
+        with self.engine.begin() as conn:
+            conn.execute(delete(t).where(t.c.key == key))
+
+
+def purge_expired_counters(limit=1000, engine=None):
+    """Delete up to limit expired counter rows. Returns the number deleted."""
+    from app.extensions import db
+
+    t = _counters_table()
+    engine = engine or db.engine
+
+    with engine.begin() as conn:
+        keys = select(t.c.key).where(t.c.expires_at <= time.time()).limit(int(limit))
+        return conn.execute(delete(t).where(t.c.key.in_(keys))).rowcount
+
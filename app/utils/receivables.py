@@ -0,0 +1,384 @@
+# app/utils/receivables.py
+"""
+Receivables snapshot and A/R aging.
+
+receivables_snapshot holds one row per open invoice (OPEN_INVOICE_WHERE)
+that still has something owed. It is rebuilt with a single
+INSERT ... SELECT over the ix_invoices_open partial index and a
+completed-payments subquery:
+
+  - per invoice, inside the flush that adds/changes/deletes a payment or
+    changes an invoice's totals, status or dates, so the snapshot
+    commits with the change;
+  - in full every five minutes by the receivables_refresh job, which
+    also picks up bulk UPDATEs that skip the ORM.
+
+A bulk DELETE of invoices should call refresh_receivables(ids,
+commit=False) in the same transaction, as it does remove_facts_for().
+
+The finance dashboard, unpaid invoices, the unpaid customers
+summary/PDF and the collections reminders all read from it.
+
+Aging is one CASE / GROUP BY over the snapshot. The bucket cutoffs are
+computed in Python, so the same SQL runs on SQLite and Postgres.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import DateTime, case, event, func, inspect, literal, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import (
+    OPEN_INVOICE_WHERE,
+    Invoice,
+    Payment,
+    ReceivableSnapshot,
+    User,
+)
+
+
+AGING_BUCKETS = ("0-30", "31-60", "61-90", "91+")
+
+_ID_CHUNK = 500
+
+_INVOICE_FIELDS = (
+    "user_id",
+    "status",
+    "grand_total",
+    "amount",
+    "amount_due",
+    "date_issued",
+    "date_submitted",
+    "created_at",
+)
+_PAYMENT_FIELDS = ("invoice_id", "amount_jmd", "status")
+
+
+# ---------------------------------------------------
+# Refresh
+# ---------------------------------------------------
+
+def _snapshot_select(invoice_ids=None):
+    """SELECT producing receivables_snapshot rows (optionally for some invoices)."""
+    inv = Invoice.__table__
+    pay = Payment.__table__
+
+    paid_q = (
+        select(
+            pay.c.invoice_id.label("invoice_id"),
+            func.sum(pay.c.amount_jmd).label("paid"),
+        )
+        .where(pay.c.invoice_id.isnot(None))
+        .where(func.lower(func.coalesce(pay.c.status, "completed")) == "completed")
+        .group_by(pay.c.invoice_id)
+    )
+    if invoice_ids is not None:
+        paid_q = paid_q.where(pay.c.invoice_id.in_(invoice_ids))
+    paid_sub = paid_q.subquery()
+
+    billed = func.coalesce(inv.c.grand_total, inv.c.amount_due, inv.c.amount, 0.0)
+    paid = func.coalesce(paid_sub.c.paid, 0.0)
+    balance = case((billed - paid > 0, billed - paid), else_=0.0)
+    amount_due = func.coalesce(inv.c.amount_due, inv.c.grand_total, inv.c.amount, 0.0)
+    issued_at = func.coalesce(inv.c.date_issued, inv.c.date_submitted, inv.c.created_at)
+
+    stmt = (
+        select(
+            inv.c.id,
+            inv.c.user_id,
+            func.lower(inv.c.status),
+            issued_at,
+            func.date(issued_at),
+            billed,
+            paid,
+            amount_due,
+            balance,
+            literal(datetime.utcnow(), DateTime),
+        )
+        .select_from(inv.outerjoin(paid_sub, paid_sub.c.invoice_id == inv.c.id))
+        # the literal ix_invoices_open predicate, so the planner can use it
+        .where(text(OPEN_INVOICE_WHERE))
+        .where(or_(amount_due > 0, balance > 0))
+    )
+    if invoice_ids is not None:
+        stmt = stmt.where(inv.c.id.in_(invoice_ids))
+    return stmt
+
+
+def _refresh(conn, invoice_ids=None):
+    t = ReceivableSnapshot.__table__
+    columns = [
+        "invoice_id", "user_id", "status", "issued_at", "issued_on",
+        "billed", "paid", "amount_due", "balance_due", "refreshed_at",
+    ]
+
+    if invoice_ids is None:
+        conn.execute(t.delete())
+        return conn.execute(t.insert().from_select(columns, _snapshot_select())).rowcount
+
+    ids = sorted(set(invoice_ids))
+    written = 0
+    for i in range(0, len(ids), _ID_CHUNK):
+        chunk = ids[i:i + _ID_CHUNK]
+        conn.execute(t.delete().where(t.c.invoice_id.in_(chunk)))
+        written += conn.execute(t.insert().from_select(columns, _snapshot_select(chunk))).rowcount
+    return written
+
+
+def refresh_receivables(invoice_ids=None, commit=True):
+    """
+    Rebuild the snapshot for the given invoices, or all of it.
+    Returns the number of snapshot rows written.
+    """
+    written = _refresh(db.session.connection(), invoice_ids)
+    if commit:
+        db.session.commit()
+    return written
+
+
+def snapshot_refreshed_at():
+    return db.session.query(func.max(ReceivableSnapshot.refreshed_at)).scalar()
+
+
+# ---------------------------------------------------
+# Keeping the snapshot current on payment / invoice changes
+# ---------------------------------------------------
+
+def _changed(obj, fields):
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in fields)
+
+
+def _old_and_new_invoice_ids(obj):
+    hist = inspect(obj).attrs["invoice_id"].history
+    return {i for i in (list(hist.deleted or ()) + [obj.invoice_id]) if i}
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_touched_receivables(session, flush_context):
+    invoice_ids = set()
+
+    for obj in session.new:
+        if isinstance(obj, Payment) and obj.invoice_id:
+            invoice_ids.add(obj.invoice_id)
+        elif isinstance(obj, Invoice) and obj.id:
+            invoice_ids.add(obj.id)
+
+    for obj in session.dirty:
+        if isinstance(obj, Payment) and _changed(obj, _PAYMENT_FIELDS):
+            invoice_ids |= _old_and_new_invoice_ids(obj)
+        elif isinstance(obj, Invoice) and _changed(obj, _INVOICE_FIELDS):
+            invoice_ids.add(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Payment):
+            invoice_ids |= _old_and_new_invoice_ids(obj)
+        elif isinstance(obj, Invoice):
+            invoice_ids.add(obj.id)
+
+    invoice_ids.discard(None)
+    if invoice_ids:
+        _refresh(session.connection(), invoice_ids)
+
+
+# ---------------------------------------------------
+# Readers
+# ---------------------------------------------------
+
+def _as_date(value):
+    if not value or isinstance(value, date):
+        return value or None
+    try:
+        return date.fromisoformat(str(value).strip()[:10])
+    except ValueError:
+        return None
+
+
+def _in_period(q, start=None, end=None):
+    start, end = _as_date(start), _as_date(end)
+    if start:
+        q = q.filter(ReceivableSnapshot.issued_on >= start)
+    if end:
+        q = q.filter(ReceivableSnapshot.issued_on <= end)
+    return q
+
+
+def aging_buckets(start=None, end=None, today=None):
+    """
+    {"0-30": amount, "31-60": ..., "61-90": ..., "91+": ...} of open
+    balances by invoice age, optionally for invoices issued start..end.
+    """
+    today = today or date.today()
+    issued = ReceivableSnapshot.issued_on
+
+    bucket = case(
+        (issued >= today - timedelta(days=30), "0-30"),
+        (issued >= today - timedelta(days=60), "31-60"),
+        (issued >= today - timedelta(days=90), "61-90"),
+        else_="91+",
+    )
+
+    q = (
+        db.session.query(
+            bucket.label("bucket"),
+            ReceivableSnapshot.amount_due.label("amount_due"),
+        )
+        .filter(ReceivableSnapshot.amount_due > 0)
+        .filter(issued.isnot(None))
+    )
+    # grouped through a subquery: Postgres won't match a GROUP BY CASE
+    # whose cutoffs are separate bind parameters
+    sub = _in_period(q, start, end).subquery()
+    rows = (
+        db.session.query(sub.c.bucket, func.coalesce(func.sum(sub.c.amount_due), 0.0).label("total"))
+        .group_by(sub.c.bucket)
+        .all()
+    )
+
+    aging = {b: 0.0 for b in AGING_BUCKETS}
+    for r in rows:
+        aging[r.bucket] = float(r.total or 0)
+    return aging
+
+
+def receivables_total(start=None, end=None):
+    """Open balance (amount_due) of invoices issued start..end (all if omitted)."""
+    q = (
+        db.session.query(func.coalesce(func.sum(ReceivableSnapshot.amount_due), 0.0))
+        .filter(ReceivableSnapshot.amount_due > 0)
+    )
+    return float(_in_period(q, start, end).scalar() or 0.0)
+
+
+def status_counts():
+    """{status: open invoice count} for invoices with an open balance."""
+    rows = (
+        db.session.query(ReceivableSnapshot.status, func.count(ReceivableSnapshot.invoice_id))
+        .filter(ReceivableSnapshot.amount_due > 0)
+        .group_by(ReceivableSnapshot.status)
+        .all()
+    )
+    return {s: int(n) for s, n in rows}
+
+
+def open_invoice_rows(*, statuses=None, start=None, end=None, search=None,
+                      min_due=None, max_due=None):
+    """
+    Open invoices by amount_due, newest first, joined to the invoice number
+    and customer. search matches name, registration number or invoice number.
+    """
+    q = (
+        db.session.query(
+            ReceivableSnapshot.invoice_id.label("invoice_id"),
+            Invoice.invoice_number,
+            ReceivableSnapshot.user_id.label("user_id"),
+            User.full_name.label("customer"),
+            User.email.label("customer_email"),
+            User.mobile.label("customer_mobile"),
+            User.registration_number,
+            ReceivableSnapshot.status,
+            ReceivableSnapshot.amount_due,
+            ReceivableSnapshot.issued_on.label("date_issued"),
+        )
+        .join(Invoice, Invoice.id == ReceivableSnapshot.invoice_id)
+        .join(User, User.id == ReceivableSnapshot.user_id)
+        .filter(ReceivableSnapshot.amount_due > 0)
+    )
+
+    if statuses:
+        q = q.filter(ReceivableSnapshot.status.in_(list(statuses)))
+    q = _in_period(q, start, end)
+
+    if search:
+        like = f"%{search.lower()}%"
+        q = q.filter(
+            or_(
+                func.lower(func.coalesce(User.full_name, "")).like(like),
+                func.lower(func.coalesce(User.registration_number, "")).like(like),
+                func.lower(func.coalesce(Invoice.invoice_number, "")).like(like),
+            )
+        )
+
+    if min_due is not None:
+        q = q.filter(ReceivableSnapshot.amount_due >= min_due)
+    if max_due is not None:
+        q = q.filter(ReceivableSnapshot.amount_due <= max_due)
+
+    return q.order_by(ReceivableSnapshot.issued_on.desc(), ReceivableSnapshot.invoice_id.desc()).all()
+
+
+def _customer_filter(q, search):
+    if search:
+        like = f"%{search.strip()}%"
+        q = q.filter(
+            or_(
+                User.full_name.ilike(like),
+                User.email.ilike(like),
+                User.registration_number.ilike(like),
+            )
+        )
+    return q
+
+
+def unpaid_customer_totals(search=None, start=None, end=None):
+    """
+    One row per customer with an open invoice: name, reg, email, mobile,
+    unpaid_count, unpaid_total (sum of balance_due).
+    """
+    sub = (
+        _in_period(
+            db.session.query(
+                ReceivableSnapshot.user_id.label("user_id"),
+                func.count(ReceivableSnapshot.invoice_id).label("unpaid_count"),
+                func.coalesce(func.sum(ReceivableSnapshot.balance_due), 0.0).label("unpaid_total"),
+            ),
+            start,
+            end,
+        )
+        .group_by(ReceivableSnapshot.user_id)
+        .subquery()
+    )
+
+    q = (
+        db.session.query(
+            User.full_name,
+            User.registration_number,
+            User.email,
+            User.mobile,
+            sub.c.unpaid_count,
+            sub.c.unpaid_total,
+        )
+        .join(sub, sub.c.user_id == User.id)
+    )
+    return _customer_filter(q, search).order_by(User.full_name.asc()).all()
+
+
+def reminder_invoice_rows(search=None, start=None, end=None):
+    """
+    Invoices with a positive balance_due for collections reminders,
+    ordered by customer name, then issue date.
+    """
+    q = (
+        db.session.query(
+            User.id.label("user_id"),
+            User.full_name.label("customer_name"),
+            User.email.label("customer_email"),
+            User.registration_number.label("registration_number"),
+            ReceivableSnapshot.invoice_id.label("invoice_id"),
+            Invoice.invoice_number.label("invoice_number"),
+            ReceivableSnapshot.issued_at.label("invoice_date"),
+            ReceivableSnapshot.balance_due.label("balance_due"),
+        )
+        .join(User, User.id == ReceivableSnapshot.user_id)
+        .join(Invoice, Invoice.id == ReceivableSnapshot.invoice_id)
+        .filter(ReceivableSnapshot.balance_due > 0)
+    )
+    q = _in_period(_customer_filter(q, search), start, end)
+
+    return q.order_by(
+        User.full_name.asc(),
+        ReceivableSnapshot.issued_at.asc(),
+        ReceivableSnapshot.invoice_id.asc(),
+    ).all()
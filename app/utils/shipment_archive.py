@@ -123,50 +123,50 @@ def sync_auto_archive_for_eligible_shipments(limit: int = 200) -> int:
     """
     Safety net: archive any non-archived shipments where all packages are delivered.
     Uses M2M table. Returns how many shipments were archived.
+
+    Already-archived and override-window shipments are excluded before
+    the limit, so repeated calls (the "shipment_auto_archive" job) keep
+    making progress.
     """
+    now = _utcnow()
+    delivered_count = func.coalesce(
+        func.sum(case((func.upper(Package.status) == DELIVERED, 1), else_=0)),
+        0
+    )
+
     # Find shipment_ids where total == delivered
-    rows = (
-        db.session.query(
-            shipment_packages.c.shipment_id.label("sid"),
-            func.count(distinct(Package.id)).label("total"),
-            func.coalesce(
-                func.sum(case((func.upper(Package.status) == DELIVERED, 1), else_=0)),
-                0
-            ).label("delivered"),
-        )
+    q = (
+        db.session.query(shipment_packages.c.shipment_id.label("sid"))
         .select_from(shipment_packages)
         .join(Package, Package.id == shipment_packages.c.package_id)
-        .group_by(shipment_packages.c.shipment_id)
-        .having(func.count(distinct(Package.id)) > 0)
-        .having(
-            func.count(distinct(Package.id))
-            == func.coalesce(func.sum(case((func.upper(Package.status) == DELIVERED, 1), else_=0)), 0)
+        .join(ShipmentLog, ShipmentLog.id == shipment_packages.c.shipment_id)
+        .filter(ShipmentLog.is_archived.is_(False))
+    )
+
+    # optional: exclude override window shipments if column exists
+    if hasattr(ShipmentLog, "unarchive_override_until"):
+        q = q.filter(
+            (ShipmentLog.unarchive_override_until.is_(None)) |
+            (ShipmentLog.unarchive_override_until <= now)
         )
+
+    rows = (
+        q.group_by(shipment_packages.c.shipment_id)
+        .having(func.count(distinct(Package.id)) > 0)
+        .having(func.count(distinct(Package.id)) == delivered_count)
+        .order_by(shipment_packages.c.shipment_id.asc())
         .limit(int(limit or 200))
         .all()
     )
 
-    if not rows:
-        return 0
-
     sids = [r.sid for r in rows if r.sid]
     if not sids:
         return 0
 
-    q = ShipmentLog.query.filter(
+    shipments = ShipmentLog.query.filter(
         ShipmentLog.id.in_(sids),
         ShipmentLog.is_archived.is_(False),
-    )
-
-    # optional: exclude override window shipments if column exists
-    now = _utcnow()
-    if hasattr(ShipmentLog, "unarchive_override_until"):
-        q = q.filter(
-            (ShipmentLog.unarchive_override_until.is_(None)) |
-            (ShipmentLog.unarchive_override_until <= now)
-        )
-
-    shipments = q.all()
+    ).all()
 
     changed = 0
     for s in shipments:
@@ -176,4 +176,4 @@ def sync_auto_archive_for_eligible_shipments(limit: int = 200) -> int:
     if changed:
         db.session.commit()
 
-    return changed
\ No newline at end of file
+    return changed
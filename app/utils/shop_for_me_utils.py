@@ -1,4 +1,4 @@
-from app.models import PurchaseRequest
+from app.models import PurchaseRequest, normalize_merchant_tracking
 
 
 PAYABLE_SHOP_FOR_ME_STATUSES = {
@@ -141,19 +141,14 @@ def _normalize_shop_tracking(value):
     1Z 123-ABC -> 1Z123ABC
     1z123abc   -> 1Z123ABC
     """
-    return "".join(
-        character
-        for character in str(
-            value or ""
-        ).upper()
-        if character.isalnum()
-    )
+    return normalize_merchant_tracking(value)
 
 
-def link_shop_for_me_package(package):
+def link_shop_for_me_packages(packages):
     """
-    Link a newly created/imported package to its
-    purchased Shop For Me request.
+    Link newly created/imported packages to their
+    purchased Shop For Me requests with one query,
+    however many packages or past purchases there are.
 
     Matching requires:
     - same customer;
@@ -161,48 +156,40 @@ def link_shop_for_me_package(package):
     - request status purchased;
     - request is not already linked to another package.
 
+    When several requests match, the most recently
+    purchased one wins. Returns {package_id: request}
+    for the packages that were linked.
+
     This function does not commit.
     """
-    if not package:
-        return None
-
-    package_id = getattr(
-        package,
-        "id",
-        None,
-    )
+    wanted = {}
 
-    user_id = getattr(
-        package,
-        "user_id",
-        None,
-    )
-
-    package_tracking = (
-        _normalize_shop_tracking(
-            getattr(
-                package,
-                "tracking_number",
-                "",
-            )
+    for package in packages or []:
+        package_id = getattr(package, "id", None)
+        user_id = getattr(package, "user_id", None)
+        tracking = _normalize_shop_tracking(
+            getattr(package, "tracking_number", "")
         )
-    )
 
-    if (
-        not package_id
-        or not user_id
-        or not package_tracking
-    ):
-        return None
+        if package_id and user_id and tracking:
+            wanted.setdefault(
+                (user_id, tracking),
+                [],
+            ).append(int(package_id))
+
+    if not wanted:
+        return {}
 
-    possible_requests = (
+    candidates = (
         PurchaseRequest.query
         .filter(
-            PurchaseRequest.user_id == user_id,
-            PurchaseRequest.status == "purchased",
-            PurchaseRequest.merchant_tracking_number.isnot(
-                None
+            PurchaseRequest.user_id.in_(
+                {user_id for user_id, _ in wanted}
+            ),
+            PurchaseRequest.merchant_tracking_norm.in_(
+                {tracking for _, tracking in wanted}
             ),
+            PurchaseRequest.status == "purchased",
         )
         .order_by(
             PurchaseRequest.purchased_at.desc(),
@@ -211,32 +198,51 @@ def link_shop_for_me_package(package):
         .all()
     )
 
-    for shop_request in possible_requests:
-        request_tracking = (
-            _normalize_shop_tracking(
-                shop_request.merchant_tracking_number
-            )
-        )
+    by_key = {}
+    for shop_request in candidates:
+        by_key.setdefault(
+            (
+                shop_request.user_id,
+                shop_request.merchant_tracking_norm,
+            ),
+            [],
+        ).append(shop_request)
 
-        if request_tracking != package_tracking:
-            continue
+    linked = {}
 
-        existing_package_id = getattr(
-            shop_request,
-            "package_id",
-            None,
-        )
+    for key, package_ids in wanted.items():
+        for package_id in package_ids:
+            for shop_request in by_key.get(key, []):
+                existing_package_id = shop_request.package_id
 
-        # Never move a Shop For Me request from one
-        # package to a different duplicate package.
-        if (
-            existing_package_id
-            and int(existing_package_id)
-            != int(package_id)
-        ):
-            continue
+                # Never move a Shop For Me request from one
+                # package to a different duplicate package.
+                if (
+                    existing_package_id
+                    and int(existing_package_id)
+                    != package_id
+                ):
+                    continue
 
-        shop_request.package_id = package_id
-        return shop_request
+                shop_request.package_id = package_id
+                linked[package_id] = shop_request
+                break
 
-    return None
\ No newline at end of file
+    return linked
+
+
+def link_shop_for_me_package(package):
+    """
+    Link one package to its purchased Shop For Me
+    request. See link_shop_for_me_packages().
+
+    This function does not commit.
+    """
+    if not package:
+        return None
+
+    return link_shop_for_me_packages(
+        [package]
+    ).get(
+        getattr(package, "id", None)
+    )
@@ -1,6 +1,9 @@
 from datetime import datetime, timezone
 
-from app.models import Package, User
+from sqlalchemy import case, func, insert, literal, or_, select, update
+
+from app.extensions import db
+from app.models import AuditLog, Package, User, shipment_packages
 
 
 SORT_CODE_LABELS = {
@@ -16,6 +19,12 @@ SORT_CODE_LABELS = {
 
 VALID_SORT_CODES = set(SORT_CODE_LABELS)
 
+# codes with a physical lane at the dock
+DOCK_SORT_CODES = ("THN", "PRE", "UE", "GPB", "RTD", "STH", "KED")
+
+# packages in these statuses are never re-sorted in bulk
+INACTIVE_PACKAGE_STATUSES = ("delivered", "cancelled", "collected")
+
 VALID_SORT_CODE_SOURCES = {
     "customer_default",
     "scheduled_pickup",
@@ -178,4 +187,296 @@ def unlock_package_sort_code(
     )
     package.sort_code_updated_by_id = admin_id
 
-    return package
\ No newline at end of file
+    return package
+
+
+# ---------------------------------------------------
+# Bulk (set-based) assignment
+# ---------------------------------------------------
+
+def _customer_default_code():
+    """users.default_sort_code as a valid code, UNASSIGNED otherwise."""
+    code = func.upper(
+        func.trim(
+            func.coalesce(
+                User.default_sort_code,
+                "",
+            )
+        )
+    )
+
+    return case(
+        (code.in_(sorted(VALID_SORT_CODES)), code),
+        else_=literal("UNASSIGNED"),
+    )
+
+
+def _package_scope(
+    *,
+    shipment_id=None,
+    package_ids=None,
+    user_id=None,
+    include_inactive=False,
+):
+    if (
+        shipment_id is None
+        and package_ids is None
+        and user_id is None
+    ):
+        raise ValueError(
+            "A shipment, package list or customer is required."
+        )
+
+    filters = []
+
+    if shipment_id is not None:
+        filters.append(
+            Package.id.in_(
+                select(shipment_packages.c.package_id)
+                .where(
+                    shipment_packages.c.shipment_id
+                    == shipment_id
+                )
+            )
+        )
+
+    if package_ids is not None:
+        filters.append(
+            Package.id.in_(
+                [int(i) for i in package_ids]
+            )
+        )
+
+    if user_id is not None:
+        filters.append(
+            Package.user_id == user_id
+        )
+
+    if not include_inactive:
+        filters.append(
+            func.lower(
+                func.trim(
+                    func.coalesce(
+                        Package.status,
+                        "",
+                    )
+                )
+            ).notin_(INACTIVE_PACKAGE_STATUSES)
+        )
+
+    return filters
+
+
+def sort_code_counts(
+    *,
+    shipment_id=None,
+    package_ids=None,
+    user_id=None,
+    include_inactive=False,
+):
+    """
+    {code: package count} for the scope, with every dock code present.
+    """
+    scope = _package_scope(
+        shipment_id=shipment_id,
+        package_ids=package_ids,
+        user_id=user_id,
+        include_inactive=include_inactive,
+    )
+
+    counts = {code: 0 for code in DOCK_SORT_CODES}
+    counts["UNASSIGNED"] = 0
+
+    rows = db.session.execute(
+        select(
+            Package.sort_code,
+            func.count(Package.id),
+        )
+        .where(*scope)
+        .group_by(Package.sort_code)
+    ).all()
+
+    for code, n in rows:
+        counts[code or "UNASSIGNED"] = counts.get(code or "UNASSIGNED", 0) + int(n)
+
+    return counts
+
+
+def _bulk_set_sort_codes(
+    conditions,
+    new_code,
+    *,
+    source,
+    admin_id=None,
+    force=False,
+    sources=None,
+):
+    """
+    One UPDATE of every package matching conditions whose code, source
+    or lock differs from new_code / source. Returns the
+    (id, user_id, sort_code, new_code) rows it wrote.
+    """
+    conditions = [
+        *conditions,
+        or_(
+            Package.sort_code.is_distinct_from(new_code),
+            Package.sort_code_source != source,
+            Package.sort_code_locked.is_(True),
+        ),
+    ]
+
+    if not force:
+        conditions.append(
+            Package.sort_code_locked.is_(False)
+        )
+
+    if sources is not None:
+        conditions.append(
+            or_(
+                Package.sort_code_source.in_(list(sources)),
+                Package.sort_code.is_(None),
+                Package.sort_code.in_(["", "UNASSIGNED"]),
+            )
+        )
+
+    # Old/new codes for the audit trail; rows stay locked until the
+    # caller commits.
+    rows = db.session.execute(
+        select(
+            Package.id,
+            Package.user_id,
+            Package.sort_code,
+            new_code.label("new_code"),
+        )
+        .where(*conditions)
+        .with_for_update(of=Package)
+    ).all()
+
+    if rows:
+        db.session.execute(
+            update(Package)
+            .where(*conditions)
+            .values(
+                sort_code=new_code,
+                sort_code_source=source,
+                sort_code_locked=False,
+                sort_code_updated_at=datetime.now(timezone.utc),
+                sort_code_updated_by_id=admin_id,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        # Packages already loaded in this session must not keep
+        # their old code.
+        updated_ids = {row.id for row in rows}
+        for obj in list(db.session.identity_map.values()):
+            if isinstance(obj, Package) and obj.id in updated_ids:
+                db.session.expire(
+                    obj,
+                    [
+                        "sort_code",
+                        "sort_code_source",
+                        "sort_code_locked",
+                        "sort_code_updated_at",
+                        "sort_code_updated_by_id",
+                    ],
+                )
+
+    return rows
+
+
+def bulk_apply_customer_default_sort_codes(
+    *,
+    shipment_id=None,
+    package_ids=None,
+    user_id=None,
+    admin_id=None,
+    force=False,
+    sources=None,
+    include_inactive=False,
+    reason="Bulk re-sort",
+):
+    """
+    Set-based apply_customer_default_to_package() for a whole
+    shipment / package list / customer.
+
+    One UPDATE ... FROM users writes every package whose code, source
+    or lock differs from its customer's default; a second UPDATE sets
+    packages without a customer to UNASSIGNED (source "system"), as
+    apply_customer_default_to_package() does. Locked packages are
+    skipped unless force=True (which also unlocks them). sources limits
+    the update to packages whose current code came from one of those
+    sources (or that are still unassigned).
+
+    Code changes are audited with one batched insert. Does not commit.
+
+    Returns {"updated": n, "changed": [(package_id, old, new)],
+             "counts": sort_code_counts(...)}.
+    """
+    scope = _package_scope(
+        shipment_id=shipment_id,
+        package_ids=package_ids,
+        user_id=user_id,
+        include_inactive=include_inactive,
+    )
+
+    options = dict(admin_id=admin_id, force=force, sources=sources)
+
+    rows = _bulk_set_sort_codes(
+        [Package.user_id == User.id, *scope],
+        _customer_default_code(),
+        source="customer_default",
+        **options,
+    )
+
+    if user_id is None:
+        rows += _bulk_set_sort_codes(
+            [Package.user_id.is_(None), *scope],
+            literal("UNASSIGNED"),
+            source="system",
+            **options,
+        )
+
+    changed = [
+        (row.id, row.sort_code, row.new_code)
+        for row in rows
+        if row.sort_code != row.new_code
+    ]
+
+    if changed:
+        audited_at = datetime.utcnow()
+        owners = {row.id: row.user_id for row in rows}
+
+        db.session.execute(
+            insert(AuditLog),
+            [
+                {
+                    "module": "Logistics",
+                    "action": "Sort Code Updated",
+                    "reason": reason[:100] if reason else None,
+                    "entity_type": "Package",
+                    "entity_id": package_id,
+                    "user_id": owners.get(package_id),
+                    "admin_id": admin_id,
+                    "description": (
+                        f"Sorting code {old or 'UNASSIGNED'} → {new} "
+                        + ("(customer default)" if owners.get(package_id) else "(no customer)")
+                    ),
+                    "old_value": old,
+                    "new_value": new,
+                    "created_at": audited_at,
+                }
+                for package_id, old, new in changed
+            ],
+        )
+
+    return {
+        "updated": len(rows),
+        "changed": changed,
+        "counts": sort_code_counts(
+            shipment_id=shipment_id,
+            package_ids=package_ids,
+            user_id=user_id,
+            include_inactive=include_inactive,
+        ),
+    }
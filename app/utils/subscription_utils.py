@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import math
 
 from app.extensions import db
@@ -33,29 +33,61 @@ def get_billable_weight(package):
     return max(1, math.ceil(weight))
 
 
-def sync_expired_subscriptions(commit=False):
+def deactivate_subscription_members(subscription_ids):
     """
-    Mark ended active/exhausted subscriptions as expired.
+    Remove the active family members of the given subscriptions in one
+    UPDATE. Returns the number of members removed.
+    """
+    ids = [int(i) for i in subscription_ids or []]
+    if not ids:
+        return 0
+
+    return (
+        SubscriptionMember.query
+        .filter(
+            SubscriptionMember.subscription_id.in_(ids),
+            SubscriptionMember.status == "active",
+        )
+        .update(
+            {
+                "status": "removed",
+                "removed_at": datetime.now(timezone.utc),
+            },
+            synchronize_session=False,
+        )
+    )
+
+
+def sync_expired_subscriptions(commit=False, limit=None):
+    """
+    Mark ended active/exhausted subscriptions as expired and remove their
+    family members.
 
-    Set commit=True for scheduled/admin maintenance routes.
-    Ordinary page requests can use the default flush behaviour.
+    Runs as the "subscription_expiry" job (app/utils/maintenance_jobs.py)
+    with commit=True and a batch limit; returns how many were expired.
     """
     now = utc_now()
 
-    expired_subscriptions = (
+    query = (
         Subscription.query
         .filter(
             Subscription.status.in_(["active", "exhausted"]),
             Subscription.end_date.isnot(None),
             Subscription.end_date < now,
         )
-        .all()
+        .order_by(Subscription.id.asc())
     )
+    if limit:
+        query = query.limit(int(limit))
+
+    expired_subscriptions = query.all()
 
     for subscription in expired_subscriptions:
         subscription.status = "expired"
 
     if expired_subscriptions:
+        deactivate_subscription_members([s.id for s in expired_subscriptions])
+
         if commit:
             db.session.commit()
         else:
@@ -664,4 +696,224 @@ def get_subscription_summary(user_id):
         ),
 
         "members": members,
-    }
\ No newline at end of file
+    }
+
+# ---------------------------------------------------
+# Renewal reminders / expiry notices
+# ---------------------------------------------------
+
+REMINDER_WINDOW_DAYS = 5
+
+# expiry notices are only sent this long after end_date, so a backlog of
+# long-expired subscriptions is never emailed
+EXPIRY_NOTICE_WINDOW_DAYS = 3
+
+SUBSCRIPTIONS_URL = "https://app.faflcourier.com/customer/subscriptions"
+
+
+def _renew_button_html():
+    return (
+        f'<p><a href="{SUBSCRIPTIONS_URL}" '
+        'style="background:#4A148C;'
+        'color:#fff;padding:12px 18px;'
+        'text-decoration:none;'
+        'border-radius:6px;'
+        'font-weight:600;">'
+        "Renew Subscription"
+        "</a></p>"
+    )
+
+
+def _reminder_email(kind, customer_name, days_remaining):
+    """(subject, plain_body, html_body) for "expired", "5d" or "2d"."""
+    if kind == "expired":
+        return (
+            "Your FAFL Subscription Has Expired",
+            (
+                f"Hi {customer_name},\n\n"
+                "Your Foreign A Foot Logistics "
+                "subscription has expired.\n\n"
+                "Normal package pricing now applies. "
+                "You may renew anytime from your "
+                "dashboard.\n\n"
+                "Login here:\n"
+                f"{SUBSCRIPTIONS_URL}\n\n"
+                "— Foreign A Foot Logistics Limited"
+            ),
+            (
+                '<div style="font-family:Arial,'
+                'sans-serif;line-height:1.6;">'
+                f"<p>Hi {customer_name},</p>"
+                "<p>Your <strong>Foreign A Foot "
+                "Logistics</strong> subscription "
+                "has expired.</p>"
+                "<p>Normal package pricing now "
+                "applies. You may renew anytime "
+                "from your dashboard.</p>"
+                f"{_renew_button_html()}"
+                "</div>"
+            ),
+        )
+
+    if kind == "5d":
+        subject = "Your FAFL Subscription Expires Soon"
+        ask = "Please renew soon to continue enjoying your subscription benefits."
+    else:
+        subject = "Final Reminder: Your FAFL Subscription Is Expiring"
+        ask = "Please renew to avoid interruption to your subscription benefits."
+
+    return (
+        subject,
+        (
+            f"Hi {customer_name},\n\n"
+            "Your Foreign A Foot Logistics "
+            f"subscription expires in "
+            f"{days_remaining} day(s).\n\n"
+            f"{ask}\n\n"
+            "Login here:\n"
+            f"{SUBSCRIPTIONS_URL}\n\n"
+            "— Foreign A Foot Logistics Limited"
+        ),
+        (
+            '<div style="font-family:Arial,'
+            'sans-serif;line-height:1.6;">'
+            f"<p>Hi {customer_name},</p>"
+            "<p>Your <strong>Foreign A Foot "
+            "Logistics</strong> subscription "
+            f"expires in <strong>{days_remaining} "
+            "day(s)</strong>.</p>"
+            f"<p>{ask}</p>"
+            f"{_renew_button_html()}"
+            "</div>"
+        ),
+    )
+
+
+def _send_reminder(subscription, user, kind, days_remaining):
+    from flask import current_app
+    from app.utils.email_utils import send_email
+
+    subject, plain_body, html_body = _reminder_email(
+        kind,
+        user.full_name or "Customer",
+        days_remaining,
+    )
+
+    try:
+        result = send_email(
+            to_email=user.email,
+            subject=subject,
+            plain_body=plain_body,
+            html_body=html_body,
+            recipient_user_id=user.id,
+        )
+        return result is not False
+    except Exception:
+        current_app.logger.exception(
+            "Subscription reminder email failed "
+            "for subscription %s and user %s",
+            subscription.id,
+            user.id,
+        )
+        return False
+
+
+def _reminder_candidates(now, after_id, limit):
+    from sqlalchemy import and_, or_
+    from sqlalchemy.orm import joinedload
+
+    upcoming = and_(
+        Subscription.status.in_(["active", "exhausted"]),
+        Subscription.end_date <= now + timedelta(days=REMINDER_WINDOW_DAYS),
+        or_(
+            Subscription.end_date < now,
+            Subscription.renewal_reminder_5d_sent.isnot(True),
+            Subscription.renewal_reminder_2d_sent.isnot(True),
+        ),
+    )
+
+    recently_expired = and_(
+        Subscription.status == "expired",
+        Subscription.expiry_notice_sent.isnot(True),
+        Subscription.end_date >= now - timedelta(days=EXPIRY_NOTICE_WINDOW_DAYS),
+    )
+
+    return (
+        Subscription.query
+        .options(joinedload(Subscription.user))
+        .filter(
+            Subscription.id > after_id,
+            Subscription.end_date.isnot(None),
+            or_(upcoming, recently_expired),
+        )
+        .order_by(Subscription.id.asc())
+        .limit(limit)
+        .all()
+    )
+
+
+def send_subscription_reminders(limit=200, after_id=0):
+    """
+    One batch of renewal reminders / expiry notices, in id order after
+    after_id. Each email is sent at most once (the *_sent flags are set
+    only on success) and the batch is committed before returning.
+
+    Returns (counts, last_id, scanned) where counts has sent / expired /
+    failed.
+    """
+    now = utc_now()
+    counts = {"sent": 0, "expired": 0, "failed": 0}
+
+    subscriptions = _reminder_candidates(now, after_id, limit)
+    if not subscriptions:
+        return counts, after_id, 0
+
+    newly_expired = []
+
+    for subscription in subscriptions:
+        seconds_remaining = (subscription.end_date - now).total_seconds()
+        days_remaining = max(math.ceil(seconds_remaining / 86400), 0)
+        user = subscription.user
+
+        if seconds_remaining <= 0:
+            if subscription.status != "expired":
+                subscription.status = "expired"
+                newly_expired.append(subscription.id)
+                counts["expired"] += 1
+
+            subscription.renewal_reminder_5d_sent = True
+            subscription.renewal_reminder_2d_sent = True
+
+            if user and user.email and not subscription.expiry_notice_sent:
+                if _send_reminder(subscription, user, "expired", days_remaining):
+                    subscription.expiry_notice_sent = True
+                    counts["sent"] += 1
+                else:
+                    counts["failed"] += 1
+            continue
+
+        # The subscription must still expire even if the
+        # customer does not have an email address.
+        if not user or not user.email:
+            continue
+
+        # Five-day reminder: sends once when 3–5 days remain.
+        if 3 <= days_remaining <= 5 and not subscription.renewal_reminder_5d_sent:
+            if _send_reminder(subscription, user, "5d", days_remaining):
+                subscription.renewal_reminder_5d_sent = True
+                counts["sent"] += 1
+            else:
+                counts["failed"] += 1
+
+        # Two-day/final reminder: sends once when 0–2 days remain.
+        elif 0 <= days_remaining <= 2 and not subscription.renewal_reminder_2d_sent:
+            if _send_reminder(subscription, user, "2d", days_remaining):
+                subscription.renewal_reminder_2d_sent = True
+                counts["sent"] += 1
+            else:
+                counts["failed"] += 1
+
+    deactivate_subscription_members(newly_expired)
+    db.session.commit()
+
+    return counts, subscriptions[-1].id, len(subscriptions)
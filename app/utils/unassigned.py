@@ -19,7 +19,7 @@ def ensure_unassigned_user() -> int:
 
     user = User.query.filter_by(registration_number="UNASSIGNED").first()
     if not user:
-        user = User.query.filter_by(email="unassigned@foreign-a-foot.local").first()
+        user = User.find_by_email("unassigned@foreign-a-foot.local")
 
     now = datetime.utcnow()
     reg_date_str = now.strftime("%Y-%m-%d")
@@ -0,0 +1,238 @@
+# app/utils/unassigned_matching.py
+"""
+Match packages parked on the UNASSIGNED user against open package
+search cases and claims.
+
+Packages, cases and claims keep tracking_suffix (the last
+TRACKING_SUFFIX_LENGTH alphanumerics of the tracking number), packages
+keep awb_norm and claims house_awb_norm, so every lookup here is one
+indexed IN query over a whole batch:
+
+  packages(user_id, tracking_suffix)  -> unassigned packages by tracking
+  packages(user_id, awb_norm)         -> unassigned packages by AWB
+  package_search_cases / claims (tracking_suffix, status)
+  claims(house_awb_norm, status)      -> claims by AWB
+
+Rows sharing a suffix are then checked in Python; a candidate is
+
+  exact   same normalized tracking number
+  awb     the case/claim number is the package's house AWB
+  suffix  one number ends with the other (carrier prefixes such as
+          USPS 420+ZIP, or a number truncated when typed or scanned)
+
+Nothing is written; staff confirm a match by reassigning the package.
+"""
+from sqlalchemy import or_
+
+from app.models import (
+    TRACKING_SUFFIX_LENGTH,
+    Claim,
+    Package,
+    PackageSearchCase,
+    normalize_merchant_tracking,
+    tracking_suffix,
+)
+from app.utils.unassigned import get_unassigned_user_id
+
+
+OPEN_SEARCH_CASE_STATUSES = ("submitted", "searching", "need_more_info")
+OPEN_CLAIM_STATUSES = ("submitted", "under_review", "need_more_info")
+
+MATCH_RANK = {"exact": 0, "awb": 1, "suffix": 2}
+
+# candidates reported per case / claim / package
+CANDIDATE_LIMIT = 5
+
+
+def match_kind(wanted, found):
+    """'exact', 'suffix' or None for two normalized tracking keys."""
+    if not wanted or not found:
+        return None
+    if wanted == found:
+        return "exact"
+
+    shorter = min(len(wanted), len(found))
+    if shorter >= TRACKING_SUFFIX_LENGTH and (
+        wanted.endswith(found) or found.endswith(wanted)
+    ):
+        return "suffix"
+    return None
+
+
+def _best_kind(wanted_keys, pkg):
+    """Best match between a case/claim's keys and one package, or None."""
+    pkg_key = normalize_merchant_tracking(pkg.tracking_number)
+
+    best = None
+    for wanted in wanted_keys:
+        if pkg.awb_norm and wanted == pkg.awb_norm:
+            kind = "awb"
+        else:
+            kind = match_kind(wanted, pkg_key)
+        if kind and (best is None or MATCH_RANK[kind] < MATCH_RANK[best]):
+            best = kind
+    return best
+
+
+def _ranked(candidates):
+    candidates.sort(key=lambda c: (MATCH_RANK[c["kind"]], -c["id"]))
+    return candidates[:CANDIDATE_LIMIT]
+
+
+# ---------------------------------------------------
+# case / claim -> unassigned packages
+# ---------------------------------------------------
+
+def _unassigned_packages(keys):
+    """Unassigned packages sharing a suffix or AWB with any key, one query."""
+    keys = {k for k in keys if k}
+    if not keys:
+        return []
+
+    suffixes = {tracking_suffix(k) for k in keys}
+
+    return (
+        Package.query
+        .filter(
+            Package.user_id == get_unassigned_user_id(),
+            or_(
+                Package.tracking_suffix.in_(suffixes),
+                Package.awb_norm.in_(keys),
+            ),
+        )
+        .order_by(Package.id.desc())
+        .all()
+    )
+
+
+def _package_matches(wanted_keys, packages):
+    found = []
+    for pkg in packages:
+        kind = _best_kind(wanted_keys, pkg)
+        if kind:
+            found.append({"id": pkg.id, "kind": kind, "package": pkg})
+    return _ranked(found)
+
+
+def _candidates_by_keys(targets):
+    """targets: {target_id: [keys]} -> {target_id: [candidate]}"""
+    packages = _unassigned_packages(
+        key for keys in targets.values() for key in keys
+    )
+    if not packages:
+        return {}
+
+    candidates = {}
+    for target_id, keys in targets.items():
+        found = _package_matches(keys, packages)
+        if found:
+            candidates[target_id] = found
+    return candidates
+
+
+def candidates_for_cases(cases):
+    """
+    {case.id: [{"id", "kind", "package"}]} for open search cases, best
+    match first. One query for any number of cases.
+    """
+    return _candidates_by_keys({
+        case.id: [normalize_merchant_tracking(case.tracking_number)]
+        for case in cases or []
+        if case.status in OPEN_SEARCH_CASE_STATUSES
+    })
+
+
+def candidates_for_claims(claims):
+    """
+    Same as candidates_for_cases() for open claims not yet linked to a
+    package, matched on both tracking number and house AWB.
+    """
+    return _candidates_by_keys({
+        claim.id: [
+            normalize_merchant_tracking(claim.tracking_number),
+            normalize_merchant_tracking(claim.house_awb),
+        ]
+        for claim in claims or []
+        if claim.status in OPEN_CLAIM_STATUSES and not claim.package_id
+    })
+
+
+# ---------------------------------------------------
+# unassigned package -> cases / claims
+# ---------------------------------------------------
+
+def _open_rows(model, statuses, suffixes, extra=None):
+    filters = [model.tracking_suffix.in_(suffixes)]
+    if extra is not None:
+        filters.append(extra)
+
+    return (
+        model.query
+        .filter(
+            model.status.in_(statuses),
+            or_(*filters),
+        )
+        .order_by(model.id.desc())
+        .all()
+    )
+
+
+def _row_matches(pkg, rows, keys_of):
+    found = []
+    for row in rows:
+        kind = _best_kind(keys_of(row), pkg)
+        if kind:
+            found.append({"id": row.id, "kind": kind, "row": row})
+    return _ranked(found)
+
+
+def matches_for_packages(packages):
+    """
+    {package.id: {"cases": [...], "claims": [...]}} for the unassigned
+    packages in the list. Two queries for any number of packages.
+    """
+    unassigned_id = get_unassigned_user_id()
+    packages = [
+        p for p in packages or []
+        if p is not None and p.id and p.user_id == unassigned_id
+    ]
+    if not packages:
+        return {}
+
+    suffixes = {p.tracking_suffix for p in packages if p.tracking_suffix}
+    awbs = {p.awb_norm for p in packages if p.awb_norm}
+    if not suffixes and not awbs:
+        return {}
+
+    cases = _open_rows(
+        PackageSearchCase,
+        OPEN_SEARCH_CASE_STATUSES,
+        suffixes,
+    ) if suffixes else []
+
+    claims = _open_rows(
+        Claim,
+        OPEN_CLAIM_STATUSES,
+        suffixes,
+        extra=Claim.house_awb_norm.in_(awbs) if awbs else None,
+    )
+    claims = [c for c in claims if not c.package_id]
+
+    results = {}
+    for pkg in packages:
+        found_cases = _row_matches(
+            pkg,
+            cases,
+            lambda c: [normalize_merchant_tracking(c.tracking_number)],
+        )
+        found_claims = _row_matches(
+            pkg,
+            claims,
+            lambda c: [
+                normalize_merchant_tracking(c.tracking_number),
+                normalize_merchant_tracking(c.house_awb),
+            ],
+        )
+        if found_cases or found_claims:
+            results[pkg.id] = {"cases": found_cases, "claims": found_claims}
+    return results
@@ -0,0 +1,42 @@
+"""
+Synthetic-data benchmarks for the hot endpoints.
+
+    python -m benchmarks.synthetic --url sqlite:////tmp/bench.db --scale 100k --reset
+    python -m benchmarks.harness   --url sqlite:////tmp/bench.db --out before.json
+    # ... change something ...
+    python -m benchmarks.harness   --url sqlite:////tmp/bench.db --out after.json
+    python -m benchmarks.compare before.json after.json
+    python -m benchmarks.startup                                  # import time / RSS
+
+Any --url works, e.g. postgresql+psycopg://localhost/fafl_bench for a
+local Postgres. The generator is seeded: the same --seed and --scale
+give the same rows (dates are relative to the day it runs).
+
+The POS checkout and shipment scan scenarios change the data they use
+(packages get paid / scanned). For two runs that are comparable,
+generate again before each one, or copy the SQLite file first.
+"""
+import os
+
+
+def bench_app(url):
+    """
+    create_app() against url. app.config reads DATABASE_URL when it is
+    first imported, so this must run before anything imports app.
+    """
+    os.environ["DATABASE_URL"] = url
+
+    from app import create_app
+    from app.extensions import limiter
+
+    app = create_app()
+    app.config.update(
+        TESTING=True,
+        WTF_CSRF_ENABLED=False,
+        PERF_SERVER_TIMING=True,
+        # the harness reads the numbers from Server-Timing, no log lines
+        PERF_SLOW_REQUEST_MS=0,
+        PERF_SLOW_QUERY_COUNT=0,
+    )
+    limiter.enabled = False
+    return app
@@ -0,0 +1,111 @@
+"""
+Compare two benchmark runs and flag regressions.
+
+    python -m benchmarks.compare before.json after.json
+    python -m benchmarks.compare before.json after.json --threshold 0.2 --min-ms 5
+
+An endpoint regresses when:
+
+  - p50 or p95 latency grows by more than --threshold (relative) and
+    more than --min-ms (absolute, so 1 ms -> 1.3 ms isn't noise-flagged)
+  - its median query count grows at all (query counts are deterministic)
+  - peak memory grows by more than --threshold and more than --min-kb
+  - it answered with a status code the baseline didn't
+
+Exit status is 1 if anything regressed.
+"""
+import argparse
+import json
+
+
+LATENCY_METRICS = ("p50_ms", "p95_ms")
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _grew(before, after, threshold, minimum):
+    if before is None or after is None:
+        return False
+    return after - before > minimum and after > before * (1 + threshold)
+
+
+def _pct(before, after):
+    if not before:
+        return ""
+    return f"{(after - before) / before * 100:+.0f}%"
+
+
+def compare(before, after, threshold=0.10, min_ms=2.0, min_kb=256.0):
+    """
+    [(endpoint, metric, before, after, regressed)] for every endpoint in
+    both runs.
+    """
+    rows = []
+    base, head = before["endpoints"], after["endpoints"]
+
+    for name in base:
+        if name not in head:
+            continue
+        b, a = base[name], head[name]
+
+        for metric in LATENCY_METRICS:
+            rows.append((name, metric, b.get(metric), a.get(metric),
+                         _grew(b.get(metric), a.get(metric), threshold, min_ms)))
+
+        queries_b, queries_a = b.get("queries"), a.get("queries")
+        rows.append((name, "queries", queries_b, queries_a,
+                     queries_b is not None and queries_a is not None and queries_a > queries_b))
+
+        rows.append((name, "peak_kb", b.get("peak_kb"), a.get("peak_kb"),
+                     _grew(b.get("peak_kb"), a.get("peak_kb"), threshold, min_kb)))
+
+        new_codes = sorted(set(a.get("status_codes", {})) - set(b.get("status_codes", {})))
+        rows.append((name, "status", ",".join(sorted(b.get("status_codes", {}))),
+                     ",".join(sorted(a.get("status_codes", {}))), bool(new_codes)))
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("before", help="baseline run (benchmarks.harness --out)")
+    parser.add_argument("after", help="run to check")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative growth that counts (0.10 = 10%%)")
+    parser.add_argument("--min-ms", type=float, default=2.0, help="ignore latency growth below this")
+    parser.add_argument("--min-kb", type=float, default=256.0, help="ignore memory growth below this")
+    args = parser.parse_args()
+
+    before, after = _load(args.before), _load(args.after)
+
+    counts_b = before.get("meta", {}).get("row_counts")
+    counts_a = after.get("meta", {}).get("row_counts")
+    if counts_b != counts_a:
+        print(f"warning: the runs used different data ({counts_b} vs {counts_a})")
+    if before.get("meta", {}).get("dialect") != after.get("meta", {}).get("dialect"):
+        print("warning: the runs used different databases")
+
+    missing = sorted(set(before["endpoints"]) ^ set(after["endpoints"]))
+    if missing:
+        print(f"only in one run (skipped): {', '.join(missing)}")
+
+    regressions = 0
+    for name, metric, b, a, regressed in compare(
+        before, after,
+        threshold=args.threshold,
+        min_ms=args.min_ms,
+        min_kb=args.min_kb,
+    ):
+        change = _pct(b, a) if isinstance(b, (int, float)) and isinstance(a, (int, float)) else ""
+        flag = "REGRESSED" if regressed else ""
+        regressions += regressed
+        print(f"{name:<22} {metric:<8} {str(b):>12} -> {str(a):<12} {change:>6}  {flag}")
+
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
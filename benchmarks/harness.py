@@ -0,0 +1,347 @@
+"""
+Drive the hot endpoints through the Flask test client and record
+latency percentiles, query counts and peak memory to JSON.
+
+    python -m benchmarks.harness --url sqlite:////tmp/bench.db --out run.json
+    python -m benchmarks.harness --url ... --only pos_checkout,shipment_scan -n 50
+
+Each scenario gets --warmup untimed requests, then --iterations timed
+ones, then --memory-samples more under tracemalloc (kept separate so
+tracing doesn't inflate the latencies). Query counts and DB time come
+from the Server-Timing header app/utils/query_stats.py adds to every
+response, so they are exactly what the request itself ran.
+
+Requests are prepared before timing starts; the scenarios that write
+(pos_checkout, shipment_scan) use a different customer / package per
+request and run last.
+"""
+import argparse
+import json
+import math
+import platform
+import re
+import statistics
+import subprocess
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+
+from benchmarks import bench_app
+
+
+SCENARIOS = {}
+
+_SERVER_TIMING_RE = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+class Scenario:
+    __slots__ = ("name", "login", "prepare")
+
+    def __init__(self, name, login, prepare):
+        self.name = name
+        self.login = login
+        self.prepare = prepare
+
+
+def scenario(name, login="admin"):
+    """
+    Register a scenario. The decorated function gets the fixtures and a
+    request count and returns that many (method, path, json) tuples
+    (fewer if the data runs out). login is "admin" or "customer".
+    """
+    def wrap(fn):
+        SCENARIOS[name] = Scenario(name, login, fn)
+        return fn
+    return wrap
+
+
+# ---------------------------------------------------
+# Scenarios (read-only first)
+# ---------------------------------------------------
+
+@scenario("admin_dashboard")
+def _admin_dashboard(fx, n):
+    return [("GET", "/admin/dashboard", None)] * n
+
+
+@scenario("logistics_dashboard")
+def _logistics_dashboard(fx, n):
+    return [("GET", "/admin/logistics/dashboard", None)] * n
+
+
+@scenario("finance_dashboard")
+def _finance_dashboard(fx, n):
+    return [("GET", "/finance/dashboard", None)] * n
+
+
+@scenario("customer_dashboard", login="customer")
+def _customer_dashboard(fx, n):
+    return [("GET", "/customer/dashboard", None)] * n
+
+
+@scenario("pos_checkout")
+def _pos_checkout(fx, n):
+    from app.extensions import db
+    from app.models import Package
+    from app.utils.pickup_cart import READY_STATUS, pickup_cart
+
+    user_ids = (
+        db.session.query(Package.user_id)
+        .filter(Package.status == READY_STATUS, Package.is_locked.is_(False))
+        .distinct()
+        .order_by(Package.user_id)
+        .limit(n)
+        .all()
+    )
+
+    requests = []
+    for (user_id,) in user_ids:
+        packages, _balances, total = pickup_cart(user_id)
+        requests.append(("POST", "/admin/pos/checkout", {
+            "user_id": user_id,
+            "package_ids": [p.id for p in packages],
+            "payment_method": "cash",
+            "payment_amount": str(total),
+        }))
+    db.session.rollback()
+    return requests
+
+
+@scenario("shipment_scan")
+def _shipment_scan(fx, n):
+    from app.extensions import db
+    from app.models import Package, ShipmentLog, shipment_packages
+
+    rows = (
+        db.session.query(shipment_packages.c.shipment_id, Package.tracking_number)
+        .join(Package, Package.id == shipment_packages.c.package_id)
+        .join(ShipmentLog, ShipmentLog.id == shipment_packages.c.shipment_id)
+        .filter(
+            ShipmentLog.is_archived.is_(False),
+            Package.received_scan_status == "not_scanned",
+        )
+        .order_by(Package.id)
+        .limit(n)
+        .all()
+    )
+    db.session.rollback()
+
+    return [
+        ("POST", f"/admin/logistics/shipment-log/{shipment_id}/scan-package", {"scan_value": tracking})
+        for shipment_id, tracking in rows
+    ]
+
+
+# ---------------------------------------------------
+# Running
+# ---------------------------------------------------
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def _fixtures():
+    from sqlalchemy import func
+
+    from app.extensions import db
+    from app.models import Package, User
+
+    admin_id = (
+        db.session.query(User.id)
+        .filter(User.is_superadmin.is_(True))
+        .order_by(User.id)
+        .scalar()
+    )
+    # the busiest customer: the worst case for their dashboard
+    customer_id = (
+        db.session.query(Package.user_id)
+        .filter(Package.user_id.isnot(None))
+        .group_by(Package.user_id)
+        .order_by(func.count(Package.id).desc(), Package.user_id)
+        .limit(1)
+        .scalar()
+    )
+    db.session.rollback()
+
+    if admin_id is None or customer_id is None:
+        raise SystemExit("no superadmin or customer packages; run python -m benchmarks.synthetic first")
+
+    return {"admin": admin_id, "customer": customer_id}
+
+
+def _client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+    return client
+
+
+def _send(client, method, path, payload):
+    if method == "GET":
+        return client.get(path)
+    return client.open(path, method=method, json=payload)
+
+
+def _server_timing(response):
+    match = _SERVER_TIMING_RE.search(response.headers.get("Server-Timing", ""))
+    if not match:
+        return None, None
+    return float(match.group(1)), int(match.group(2))
+
+
+def run_scenario(app, fx, sc, iterations, warmup, memory_samples):
+    with app.app_context():
+        requests = sc.prepare(fx, warmup + iterations + memory_samples)
+
+    if len(requests) < warmup + iterations + memory_samples:
+        # a small data set can't feed every write request; keep the timed ones
+        warmup = min(warmup, max(len(requests) - iterations - memory_samples, 0))
+
+    warm = requests[:warmup]
+    timed = requests[warmup:warmup + iterations]
+    traced = requests[warmup + iterations:warmup + iterations + memory_samples]
+
+    client = _client(app, fx[sc.login])
+    statuses = Counter()
+
+    for method, path, payload in warm:
+        _send(client, method, path, payload)
+
+    latencies, queries, db_ms = [], [], []
+    for method, path, payload in timed:
+        started = time.perf_counter()
+        response = _send(client, method, path, payload)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        statuses[response.status_code] += 1
+        ms, count = _server_timing(response)
+        if count is not None:
+            queries.append(count)
+            db_ms.append(ms)
+
+    peak_kb = None
+    if traced:
+        tracemalloc.start()
+        try:
+            for method, path, payload in traced:
+                tracemalloc.reset_peak()
+                response = _send(client, method, path, payload)
+                statuses[response.status_code] += 1
+                peak = tracemalloc.get_traced_memory()[1] / 1024
+                peak_kb = max(peak_kb or 0, round(peak, 1))
+        finally:
+            tracemalloc.stop()
+
+    def ms(value):
+        return None if value is None else round(value, 2)
+
+    return {
+        "requests": len(latencies),
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(statistics.mean(latencies)) if latencies else None,
+        "max_ms": ms(max(latencies)) if latencies else None,
+        "queries": percentile(queries, 50),
+        "queries_max": max(queries) if queries else None,
+        "db_ms_p50": ms(percentile(db_ms, 50)),
+        "peak_kb": peak_kb,
+        "status_codes": {str(code): n for code, n in sorted(statuses.items())},
+    }
+
+
+def _row_counts():
+    from sqlalchemy import func
+
+    from app.extensions import db
+    from app.models import Invoice, Message, Package, Payment, Prealert, ShipmentLog, User
+
+    counts = {
+        model.__tablename__: db.session.query(func.count(model.id)).scalar()
+        for model in (User, ShipmentLog, Package, Invoice, Payment, Prealert, Message)
+    }
+    db.session.rollback()
+    return counts
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", required=True, help="SQLAlchemy URL of a database filled by benchmarks.synthetic")
+    parser.add_argument("--out", default="benchmark.json", help="where to write the results")
+    parser.add_argument("--only", help="comma-separated scenario names (default: all)")
+    parser.add_argument("-n", "--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--memory-samples", type=int, default=1)
+    args = parser.parse_args()
+
+    names = list(SCENARIOS)
+    if args.only:
+        names = [name.strip() for name in args.only.split(",") if name.strip()]
+        unknown = [name for name in names if name not in SCENARIOS]
+        if unknown:
+            parser.error(f"unknown scenario(s): {', '.join(unknown)}; choose from {', '.join(SCENARIOS)}")
+
+    app = bench_app(args.url)
+
+    with app.app_context():
+        from app.extensions import db
+
+        fx = _fixtures()
+        counts = _row_counts()
+        dialect = db.engine.dialect.name
+
+    results = {}
+    failed = False
+    for name in names:
+        result = run_scenario(
+            app, fx, SCENARIOS[name],
+            iterations=args.iterations,
+            warmup=args.warmup,
+            memory_samples=args.memory_samples,
+        )
+        results[name] = result
+
+        errors = sum(n for code, n in result["status_codes"].items() if int(code) >= 500)
+        failed = failed or errors > 0 or not result["requests"]
+        print(f"{name:<22} n={result['requests']:<4} p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  "
+              f"queries {result['queries']}  peak {result['peak_kb']} KB  {result['status_codes']}")
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "dialect": dialect,
+            "git": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "row_counts": counts,
+        },
+        "endpoints": results,
+    }
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.out}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,160 @@
+"""
+Startup profile: how long create_app() takes, what it imports and how
+much memory one worker holds afterwards.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --url sqlite:////tmp/bench.db --top 30 --out startup.json
+    python -m benchmarks.startup --warm-routes    # also import what the heavy routes use
+
+To profile another checkout (e.g. the baseline in a git worktree), run
+the script from that checkout's directory:
+
+    cd ../baseline && python /path/to/benchmarks/startup.py
+
+Every run is a fresh interpreter (python -X importtime), so nothing is
+cached from a previous run except .pyc files and the Jinja bytecode
+cache. Run it before and after a change, like benchmarks.harness.
+
+--warm-routes imports pandas / reportlab / weasyprint / cloudinary after
+create_app(), i.e. the memory a worker reaches once those routes have
+been hit; the difference to the plain run is what lazy importing saves
+a worker that never serves them.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+HEAVY_MODULES = ("pandas", "reportlab.platypus", "weasyprint", "cloudinary.uploader", "xlsxwriter")
+
+_CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+app = create_app()
+elapsed = time.perf_counter() - started
+for name in {warm!r}:
+    try:
+        __import__(name)
+    except Exception:
+        # missing, or its system libraries are (WeasyPrint without Pango)
+        pass
+
+def rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+print("STARTUP " + json.dumps({{
+    "create_app_ms": round(elapsed * 1000, 1),
+    "rss_kb": rss_kb(),
+    "modules": len(sys.modules),
+    "heavy_loaded": sorted(m for m in {heavy!r} if m in sys.modules),
+}}), flush=True)
+"""
+
+
+def parse_importtime(stderr):
+    """{module: (self_us, cumulative_us)} from python -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    return modules
+
+
+def profile(url=None, warm=()):
+    env = dict(os.environ)
+    if url:
+        env["DATABASE_URL"] = url
+
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD.format(warm=tuple(warm), heavy=HEAVY_MODULES)],
+        capture_output=True, text=True, env=env,
+    )
+    wall_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    result = None
+    for line in proc.stdout.splitlines():
+        if line.startswith("STARTUP "):
+            result = json.loads(line[len("STARTUP "):])
+    if proc.returncode != 0 or result is None:
+        sys.stderr.write(proc.stderr[-4000:])
+        raise SystemExit(f"create_app() failed (exit {proc.returncode})")
+
+    imports = parse_importtime(proc.stderr)
+    # top-level packages only: their cumulative time includes their submodules
+    top_level = {name: times for name, times in imports.items() if "." not in name}
+
+    result.update(
+        wall_ms=wall_ms,
+        import_ms=round(sum(cumulative for _self, cumulative in top_level.values()) / 1000, 1),
+        imports=imports,
+    )
+    return result
+
+
+def profile_median(url=None, warm=(), repeat=3):
+    """profile() repeat times; the numbers are medians, imports from the median run."""
+    runs = sorted((profile(url, warm) for _ in range(max(repeat, 1))), key=lambda r: r["create_app_ms"])
+    result = dict(runs[len(runs) // 2])
+    for key in ("wall_ms", "create_app_ms", "import_ms", "rss_kb"):
+        result[key] = statistics.median(r[key] for r in runs)
+    result["runs"] = len(runs)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="DATABASE_URL for create_app() (default: the environment's)")
+    parser.add_argument("--top", type=int, default=20, help="slowest top-level imports to list")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters to take the median of")
+    parser.add_argument("--warm-routes", action="store_true", help="also import the heavy route libraries")
+    parser.add_argument("--out", help="write the full result (every module's import time) as JSON")
+    args = parser.parse_args()
+
+    result = profile_median(args.url, warm=HEAVY_MODULES if args.warm_routes else (), repeat=args.repeat)
+
+    print(f"median of {result['runs']} run(s)")
+    print(f"process           {result['wall_ms']} ms (interpreter + imports + create_app)")
+    print(f"create_app()      {result['create_app_ms']} ms (incl. importing app)")
+    print(f"imports           {result['import_ms']} ms across {result['modules']} modules")
+    print(f"RSS               {result['rss_kb'] / 1024:.1f} MB")
+    print(f"heavy libraries   {', '.join(result['heavy_loaded']) or 'none loaded'}")
+    print()
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    ranked = sorted(
+        ((name, times) for name, times in result["imports"].items() if "." not in name),
+        key=lambda item: item[1][1],
+        reverse=True,
+    )
+    for name, (self_us, cumulative_us) in ranked[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"wrote {args.out}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,502 @@
+"""
+Deterministic synthetic data for the benchmarks.
+
+    python -m benchmarks.synthetic --url sqlite:////tmp/bench.db --scale 10k --reset
+    python -m benchmarks.synthetic --url postgresql+psycopg://localhost/fafl_bench --scale 1m --reset
+
+--scale is the number of packages (10k, 100k, 1m or a plain number);
+everything else is sized from it:
+
+    customers   packages / 20         shipments   packages / 250
+    invoices    ~ packages / 2.5      payments    one per paid / partial invoice
+    prealerts   packages / 4          messages    packages / 20 (max 50k)
+
+Package age decides its stage: older than two weeks is Delivered with a
+paid invoice, 4-14 days is Ready for Pick Up with an open invoice (these
+feed the POS checkout scenario), newer ones are still unscanned in the
+newest shipments (these feed the scan scenario).
+
+Rows are written with Core executemany in chunks and explicit ids;
+messages go through the ORM so the mailbox state listeners fill
+message_participant_state / message_threads. finance_daily_facts and
+receivables_snapshot are rebuilt at the end.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import bench_app
+
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+ADMIN_EMAIL = "bench-admin@bench.test"
+PASSWORD = b"benchmark"
+
+ARCHIVE_AFTER_DAYS = 45
+
+MERCHANTS = ("Amazon", "Shein", "eBay", "Walmart", "Temu", "Best Buy", "Target", "AliExpress")
+CATEGORIES = ("Clothing", "Electronics", "Household", "Cosmetics", "Books", "Other")
+COURIERS = ("UPS", "FedEx", "USPS", "DHL", "Amazon Logistics")
+METHODS = ("Cash", "Card", "Bank Transfer", "Wallet")
+
+
+def parse_scale(value):
+    value = str(value).strip().lower()
+    if value in SCALES:
+        return SCALES[value]
+    return int(value.replace("_", ""))
+
+
+def plan(packages):
+    """Row counts for a given number of packages."""
+    return {
+        "customers": max(packages // 20, 10),
+        "shipments": max(packages // 250, 4),
+        "packages": packages,
+        "prealerts": packages // 4,
+        "messages": min(max(packages // 20, 10), 50_000),
+    }
+
+
+def tracking_for(package_id):
+    return f"1ZBM{package_id:012d}"
+
+
+def house_awb_for(package_id):
+    return f"FAFL{package_id:09d}"
+
+
+def _insert(table, rows, chunk):
+    """executemany rows (any iterable of dicts) in chunks. Returns the row count."""
+    from app.extensions import db
+
+    conn = db.session.connection()
+    batch = []
+    written = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk:
+            conn.execute(table.insert(), batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        conn.execute(table.insert(), batch)
+        written += len(batch)
+    db.session.commit()
+    return written
+
+
+class Generator:
+    def __init__(self, packages, seed=1, days=365, chunk=5000, now=None, log=print):
+        self.counts = plan(packages)
+        self.rng = random.Random(seed)
+        self.days = days
+        self.chunk = chunk
+        self.now = (now or datetime.now(timezone.utc)).replace(tzinfo=None, microsecond=0)
+        self.log = log
+
+        self.admin_id = 1
+        # customers are ids 2..customers + 1
+        self.customer_ids = range(2, self.counts["customers"] + 2)
+        # owner of every package, for prealerts
+        self.package_owner = [0] * (packages + 1)
+
+    # ---------------------------------------------------
+    # helpers
+    # ---------------------------------------------------
+
+    def _ago(self, max_days):
+        return self.now - timedelta(seconds=self.rng.randint(0, int(max_days * 86400)))
+
+    def _shipment_created(self, shipment_id):
+        # evenly spread, oldest first; the last one is a day old
+        n = self.counts["shipments"]
+        return self.now - timedelta(days=1 + (self.days - 1) * (n - shipment_id) / n)
+
+    def _shipment_for(self, created_at):
+        n = self.counts["shipments"]
+        age = (self.now - created_at).total_seconds() / 86400
+        index = n - int(age * n / self.days)
+        return min(max(index, 1), n)
+
+    # ---------------------------------------------------
+    # tables
+    # ---------------------------------------------------
+
+    def users(self):
+        import bcrypt
+
+        from app.models import normalize_email
+
+        # one hash for everyone: a real bcrypt per row would dominate the run
+        password = bcrypt.hashpw(PASSWORD, bcrypt.gensalt(rounds=4))
+
+        yield {
+            "id": self.admin_id,
+            "email": ADMIN_EMAIL,
+            "email_normalized": normalize_email(ADMIN_EMAIL),
+            "password": password,
+            "role": "admin",
+            "is_admin": True,
+            "is_superadmin": True,
+            "full_name": "Benchmark Admin",
+            "registration_number": None,
+            "mobile": None,
+            "address": None,
+            "created_at": self.now.isoformat(),
+            "created_at_dt": self.now,
+        }
+
+        for user_id in self.customer_ids:
+            email = f"customer{user_id}@bench.test"
+            joined = self._ago(self.days * 2)
+            yield {
+                "id": user_id,
+                "email": email,
+                "email_normalized": normalize_email(email),
+                "password": password,
+                "role": "customer",
+                "is_admin": False,
+                "is_superadmin": False,
+                "full_name": f"Customer {user_id}",
+                "registration_number": f"FAFL{100000 + user_id}",
+                "mobile": f"876{self.rng.randint(2000000, 9999999)}",
+                "address": f"{self.rng.randint(1, 200)} Bench Road, Kingston",
+                "created_at": joined.isoformat(),
+                "created_at_dt": joined,
+            }
+
+    def shipments(self):
+        for shipment_id in range(1, self.counts["shipments"] + 1):
+            created_at = self._shipment_created(shipment_id)
+            archived = (self.now - created_at).days > ARCHIVE_AFTER_DAYS
+            yield {
+                "id": shipment_id,
+                "sl_id": f"SL-BENCH-{shipment_id:06d}",
+                "sl_name": f"Air {created_at:%Y-%m-%d}",
+                "created_at": created_at,
+                "is_archived": archived,
+                "archived_at": created_at + timedelta(days=30) if archived else None,
+                "archive_reason": "auto" if archived else None,
+            }
+
+    def _package(self, package_id, user_id, created_at, status, scanned):
+        from app.models import normalize_merchant_tracking, tracking_suffix
+
+        weight = round(self.rng.uniform(0.5, 25), 1)
+        freight = round(500 + weight * 350, 2)
+        duty = round(self.rng.uniform(500, 3000), 2) if self.rng.random() < 0.3 else 0.0
+        handling = 500.0 if weight > 15 else 0.0
+        tracking = tracking_for(package_id)
+        awb = house_awb_for(package_id)
+
+        return {
+            "id": package_id,
+            "user_id": user_id,
+            "tracking_number": tracking,
+            "tracking_suffix": tracking_suffix(tracking),
+            "house_awb": awb,
+            "awb_norm": normalize_merchant_tracking(awb),
+            "merchant": self.rng.choice(MERCHANTS),
+            "category": self.rng.choice(CATEGORIES),
+            "description": "Synthetic package",
+            "weight": weight,
+            "value": round(self.rng.uniform(10, 400), 2),
+            "freight_fee": freight,
+            "freight_total": freight,
+            "handling_fee": handling,
+            "duty": duty,
+            "customs_total": duty,
+            "grand_total": round(freight + duty + handling, 2),
+            "amount_due": round(freight + duty + handling, 2),
+            "status": status,
+            "invoice_id": None,
+            "created_at": created_at,
+            "received_date": created_at + timedelta(days=1) if scanned else None,
+            "received_scan_status": "scanned" if scanned else "not_scanned",
+            "received_scanned_at": created_at + timedelta(days=1) if scanned else None,
+            "received_scanned_by_id": self.admin_id if scanned else None,
+        }
+
+    def orders(self):
+        """
+        Packages grouped into orders of 1-4 per customer, with their
+        invoice, payment, shipment link and receiving scan. Returns five
+        row lists per order; the caller streams them into their tables.
+        """
+        total = self.counts["packages"]
+        package_id = invoice_id = payment_id = scan_id = 0
+
+        while package_id < total:
+            user_id = self.rng.choice(self.customer_ids)
+            created_at = self._ago(self.days)
+            age = (self.now - created_at).days
+            size = min(self.rng.randint(1, 4), total - package_id)
+
+            if age > 14:
+                status, invoice_status = "Delivered", "paid"
+            elif age > 3:
+                status = "Ready for Pick Up"
+                invoice_status = "partial" if self.rng.random() < 0.2 else "unpaid"
+            elif age > 1:
+                status, invoice_status = "Received at Local Port", None
+            else:
+                status, invoice_status = "Overseas", None
+
+            scanned = invoice_status is not None
+            shipment_id = self._shipment_for(created_at)
+
+            packages, links, scans = [], [], []
+            for _ in range(size):
+                package_id += 1
+                self.package_owner[package_id] = user_id
+                row = self._package(package_id, user_id, created_at, status, scanned)
+                packages.append(row)
+                links.append({"shipment_id": shipment_id, "package_id": package_id})
+                if scanned:
+                    scan_id += 1
+                    scans.append({
+                        "id": scan_id,
+                        "shipment_id": shipment_id,
+                        "package_id": package_id,
+                        "scanned_value": row["tracking_number"],
+                        "scan_result": "matched",
+                        "scanned_by_id": self.admin_id,
+                        "scanned_at": row["received_scanned_at"],
+                    })
+
+            invoices, payments = [], []
+            if invoice_status:
+                invoice_id += 1
+                issued = min(created_at + timedelta(days=2), self.now)
+                grand_total = round(sum(p["grand_total"] for p in packages), 2)
+
+                paid = {"paid": grand_total, "partial": round(grand_total / 2, 2)}.get(invoice_status, 0.0)
+                paid_at = min(issued + timedelta(hours=self.rng.randint(1, 24 * 10)), self.now)
+
+                for p in packages:
+                    p["invoice_id"] = invoice_id
+                    if invoice_status == "paid":
+                        p["amount_due"] = 0.0
+
+                invoices.append({
+                    "id": invoice_id,
+                    "user_id": user_id,
+                    "invoice_number": f"INV-B{invoice_id:08d}",
+                    "description": f"{size} package(s)",
+                    "total_weight": round(sum(p["weight"] for p in packages), 1),
+                    "invoice_value": round(sum(p["value"] for p in packages), 2),
+                    "duty": round(sum(p["duty"] for p in packages), 2),
+                    "handling": round(sum(p["handling_fee"] for p in packages), 2),
+                    "amount": grand_total,
+                    "grand_total": grand_total,
+                    "amount_due": round(grand_total - paid, 2),
+                    "subtotal_before_discount": grand_total,
+                    "date_issued": issued,
+                    "date_paid": paid_at if invoice_status == "paid" else None,
+                    "created_at": issued,
+                    "status": invoice_status,
+                })
+
+                if paid:
+                    payment_id += 1
+                    payments.append({
+                        "id": payment_id,
+                        "user_id": user_id,
+                        "authorized_by_admin_id": self.admin_id,
+                        "source": "pos" if self.rng.random() < 0.7 else "admin",
+                        "invoice_id": invoice_id,
+                        "method": self.rng.choice(METHODS),
+                        "amount_jmd": paid,
+                        "transaction_type": "invoice_payment",
+                        "status": "completed",
+                        "created_at": paid_at,
+                    })
+
+            yield packages, invoices, payments, links, scans
+
+    def prealerts(self):
+        from app.models import normalize_tracking
+
+        total = self.counts["packages"]
+        for prealert_id in range(1, self.counts["prealerts"] + 1):
+            if self.rng.random() < 0.7:
+                package_id = self.rng.randint(1, total)
+                customer_id = self.package_owner[package_id]
+                tracking = tracking_for(package_id)
+                linked = package_id
+            else:
+                customer_id = self.rng.choice(self.customer_ids)
+                tracking = f"TBA{self.rng.randint(10**11, 10**12 - 1)}"
+                linked = None
+
+            created_at = self._ago(self.days)
+            yield {
+                "id": prealert_id,
+                "prealert_number": prealert_id,
+                "customer_id": customer_id,
+                "vendor_name": self.rng.choice(MERCHANTS),
+                "courier_name": self.rng.choice(COURIERS),
+                "tracking_number": tracking,
+                "tracking_norm": normalize_tracking(tracking) or None,
+                "package_contents": self.rng.choice(CATEGORIES),
+                "purchase_date": (created_at - timedelta(days=3)).date(),
+                "item_value_usd": round(self.rng.uniform(10, 400), 2),
+                "linked_package_id": linked,
+                "linked_at": created_at if linked else None,
+                "created_at": created_at,
+            }
+
+    def messages(self):
+        from app.extensions import db
+        from app.models import Message
+
+        for n in range(1, self.counts["messages"] + 1):
+            customer_id = self.rng.choice(self.customer_ids)
+            inbound = self.rng.random() < 0.5
+            db.session.add(Message(
+                sender_id=customer_id if inbound else self.admin_id,
+                recipient_id=self.admin_id if inbound else customer_id,
+                subject=f"Package question {n}",
+                body="Synthetic message body.",
+                is_read=self.rng.random() < 0.8,
+                created_at=self._ago(self.days).replace(tzinfo=timezone.utc),
+            ))
+            if n % 1000 == 0:
+                db.session.commit()
+                db.session.expunge_all()
+        db.session.commit()
+        return self.counts["messages"]
+
+    # ---------------------------------------------------
+    # run
+    # ---------------------------------------------------
+
+    def run(self):
+        from app.extensions import db
+        from app.models import (
+            Invoice,
+            Package,
+            Payment,
+            Prealert,
+            ShipmentLog,
+            ShipmentScanLog,
+            User,
+            shipment_packages,
+        )
+        from app.utils.finance_facts import rebuild_facts
+        from app.utils.receivables import refresh_receivables
+
+        written = {}
+
+        def step(name, fn):
+            started = time.perf_counter()
+            written[name] = fn()
+            self.log(f"{name:<20} {written[name]:>10,}  {time.perf_counter() - started:6.1f}s")
+
+        step("users", lambda: _insert(User.__table__, self.users(), self.chunk))
+        step("shipments", lambda: _insert(ShipmentLog.__table__, self.shipments(), self.chunk))
+
+        def orders():
+            tables = (
+                Package.__table__,
+                Invoice.__table__,
+                Payment.__table__,
+                shipment_packages,
+                ShipmentScanLog.__table__,
+            )
+            # invoices first: packages reference them
+            order = (1, 0, 2, 3, 4)
+            pending = [[] for _ in tables]
+            totals = [0] * len(tables)
+            conn = db.session.connection()
+
+            def flush():
+                for i in order:
+                    if pending[i]:
+                        conn.execute(tables[i].insert(), pending[i])
+                        totals[i] += len(pending[i])
+                        pending[i].clear()
+
+            for rows in self.orders():
+                for i, part in enumerate(rows):
+                    pending[i].extend(part)
+                if len(pending[0]) >= self.chunk:
+                    flush()
+            flush()
+            db.session.commit()
+
+            written.update(invoices=totals[1], payments=totals[2], scans=totals[4])
+            return totals[0]
+
+        step("packages", orders)
+        step("prealerts", lambda: _insert(Prealert.__table__, self.prealerts(), self.chunk))
+        step("messages", self.messages)
+
+        conn = db.session.connection()
+        if conn.dialect.name == "postgresql":
+            # explicit ids: move the sequences past them
+            for table in (User, ShipmentLog, Package, Invoice, Payment, Prealert, ShipmentScanLog):
+                name = table.__tablename__
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), "
+                    f"COALESCE((SELECT max(id) FROM {name}), 1))"
+                )
+            db.session.commit()
+
+        step("finance_facts", rebuild_facts)
+        step("receivables", refresh_receivables)
+
+        conn = db.session.connection()
+        conn.exec_driver_sql("ANALYZE")
+        db.session.commit()
+
+        return written
+
+
+def _is_empty():
+    from app.extensions import db
+    from app.models import User
+
+    return db.session.query(User.id).first() is None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", required=True, help="SQLAlchemy URL of a database to fill")
+    parser.add_argument("--scale", default="10k", help="number of packages: 10k, 100k, 1m or a number")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--days", type=int, default=365, help="history spread over this many days")
+    parser.add_argument("--chunk", type=int, default=5000, help="rows per executemany")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate every table first")
+    args = parser.parse_args()
+
+    app = bench_app(args.url)
+
+    from app.extensions import db
+
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+
+        if not _is_empty():
+            print("database already has users; pass --reset to start from scratch")
+            return 1
+
+        started = time.perf_counter()
+        written = Generator(
+            parse_scale(args.scale),
+            seed=args.seed,
+            days=args.days,
+            chunk=args.chunk,
+        ).run()
+
+    print(f"seed {args.seed}: {written['packages']:,} packages in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,34 @@
+"""
+Gunicorn settings for the Procfile web process.
+
+    gunicorn -c gunicorn.conf.py run:app
+
+GUNICORN_PRELOAD=1 (the default) builds the app once in the master and
+forks the workers from it: imports, templates and models are loaded
+once and shared copy-on-write instead of once per worker, and workers
+come up as soon as they fork. post_fork then drops any database
+connection the master opened (app/utils/db_routing.py), since a pooled
+connection must never be shared between processes.
+
+Set GUNICORN_PRELOAD=0 to go back to each worker importing the app
+itself (e.g. to rule preloading out when debugging a fork issue).
+"""
+import os
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def post_fork(server, worker):
+    if not server.cfg.preload_app:
+        return
+
+    # already imported by the master, so this doesn't build a second app
+    from run import app
+    from app.utils.db_routing import dispose_after_fork
+
+    dispose_after_fork(app)
@@ -83,7 +83,7 @@ def main():
                 skipped += 1
                 continue
 
-            if User.query.filter_by(email=email).first():
+            if User.find_by_email(email):
                 skipped += 1
                 continue
 
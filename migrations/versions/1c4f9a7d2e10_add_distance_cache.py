@@ -0,0 +1,46 @@
+"""add distance cache
+
+Revision ID: 1c4f9a7d2e10
+Revises: e4b112426638
+Create Date: 2026-10-18 09:12:04.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c4f9a7d2e10'
+down_revision = 'e4b112426638'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('distance_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('origin_norm', sa.String(length=255), nullable=False),
+    sa.Column('destination_norm', sa.String(length=255), nullable=False),
+    sa.Column('parish', sa.String(length=100), nullable=True),
+    sa.Column('distance_km', sa.Float(), nullable=False),
+    sa.Column('duration_text', sa.String(length=50), nullable=True),
+    sa.Column('source', sa.String(length=20), nullable=False, server_default='google'),
+    sa.Column('hit_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('fetched_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('origin_norm', 'destination_norm', name='uq_distance_cache_route')
+    )
+    with op.batch_alter_table('distance_cache', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_distance_cache_parish'), ['parish'], unique=False)
+        batch_op.create_index(batch_op.f('ix_distance_cache_source'), ['source'], unique=False)
+        batch_op.create_index(batch_op.f('ix_distance_cache_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('distance_cache', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_distance_cache_expires_at'))
+        batch_op.drop_index(batch_op.f('ix_distance_cache_source'))
+        batch_op.drop_index(batch_op.f('ix_distance_cache_parish'))
+
+    op.drop_table('distance_cache')
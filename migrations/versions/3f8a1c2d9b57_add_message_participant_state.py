@@ -0,0 +1,134 @@
+"""add message participant state and thread summaries
+
+Revision ID: 3f8a1c2d9b57
+Revises: 7d2b6e0c4a91
+Create Date: 2026-10-18 13:05:12.118402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8a1c2d9b57'
+down_revision = '7d2b6e0c4a91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('message_participant_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('message_id', sa.Integer(), nullable=False),
+    sa.Column('counterparty_id', sa.Integer(), nullable=True),
+    sa.Column('thread_key', sa.String(length=64), nullable=True),
+    sa.Column('folder', sa.String(length=10), nullable=False),
+    sa.Column('is_read', sa.Boolean(), nullable=False),
+    sa.Column('archived', sa.Boolean(), nullable=False),
+    sa.Column('deleted', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['counterparty_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['message_id'], ['messages.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('message_id', 'user_id', 'folder', name='uq_message_state_message_user_folder')
+    )
+    with op.batch_alter_table('message_participant_state', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_message_participant_state_message_id'), ['message_id'], unique=False)
+        batch_op.create_index('ix_message_state_user_folder_created', ['user_id', 'folder', 'deleted', 'archived', 'created_at'], unique=False)
+        batch_op.create_index('ix_message_state_user_created', ['user_id', 'deleted', 'archived', 'created_at'], unique=False)
+        batch_op.create_index('ix_message_state_user_unread', ['user_id', 'folder', 'is_read', 'deleted'], unique=False)
+
+    op.create_table('message_threads',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('thread_key', sa.String(length=64), nullable=False),
+    sa.Column('user_low_id', sa.Integer(), nullable=True),
+    sa.Column('user_high_id', sa.Integer(), nullable=True),
+    sa.Column('subject', sa.String(length=255), nullable=True),
+    sa.Column('last_message_id', sa.Integer(), nullable=True),
+    sa.Column('last_sender_id', sa.Integer(), nullable=True),
+    sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('message_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['last_message_id'], ['messages.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['last_sender_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['user_high_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['user_low_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('thread_key')
+    )
+    with op.batch_alter_table('message_threads', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_message_threads_last_message_at'), ['last_message_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_message_threads_user_high_id'), ['user_high_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_message_threads_user_low_id'), ['user_low_id'], unique=False)
+
+    # ---- backfill from existing messages ----
+    op.execute("""
+        UPDATE messages
+        SET thread_key = CASE
+            WHEN sender_id <= recipient_id THEN 'u' || sender_id || '_u' || recipient_id
+            ELSE 'u' || recipient_id || '_u' || sender_id
+        END
+        WHERE thread_key IS NULL
+    """)
+
+    op.execute("""
+        INSERT INTO message_participant_state
+            (user_id, message_id, counterparty_id, thread_key, folder, is_read, archived, deleted, created_at)
+        SELECT recipient_id, id, sender_id, thread_key, 'inbox',
+               is_read, archived_by_recipient, deleted_by_recipient, created_at
+        FROM messages
+    """)
+
+    op.execute("""
+        INSERT INTO message_participant_state
+            (user_id, message_id, counterparty_id, thread_key, folder, is_read, archived, deleted, created_at)
+        SELECT sender_id, id, recipient_id, thread_key, 'sent',
+               (1 = 1), archived_by_sender, deleted_by_sender, created_at
+        FROM messages
+    """)
+
+    op.execute("""
+        INSERT INTO message_threads
+            (thread_key, user_low_id, user_high_id, last_message_at, message_count)
+        SELECT thread_key,
+               MIN(CASE WHEN sender_id <= recipient_id THEN sender_id ELSE recipient_id END),
+               MAX(CASE WHEN sender_id <= recipient_id THEN recipient_id ELSE sender_id END),
+               MAX(created_at),
+               COUNT(*)
+        FROM messages
+        GROUP BY thread_key
+    """)
+
+    op.execute("""
+        UPDATE message_threads
+        SET last_message_id = (
+            SELECT m.id FROM messages m
+            WHERE m.thread_key = message_threads.thread_key
+            ORDER BY m.created_at DESC, m.id DESC
+            LIMIT 1
+        )
+    """)
+
+    op.execute("""
+        UPDATE message_threads
+        SET subject = (SELECT m.subject FROM messages m WHERE m.id = message_threads.last_message_id),
+            last_sender_id = (SELECT m.sender_id FROM messages m WHERE m.id = message_threads.last_message_id)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('message_threads', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_message_threads_user_low_id'))
+        batch_op.drop_index(batch_op.f('ix_message_threads_user_high_id'))
+        batch_op.drop_index(batch_op.f('ix_message_threads_last_message_at'))
+
+    op.drop_table('message_threads')
+
+    with op.batch_alter_table('message_participant_state', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_state_user_unread')
+        batch_op.drop_index('ix_message_state_user_created')
+        batch_op.drop_index('ix_message_state_user_folder_created')
+        batch_op.drop_index(batch_op.f('ix_message_participant_state_message_id'))
+
+    op.drop_table('message_participant_state')
@@ -0,0 +1,63 @@
+"""add job leases and runs
+
+Revision ID: 5e0c7a3b8d14
+Revises: 9b6e4d1f0a23
+Create Date: 2026-10-18 16:05:12.284417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e0c7a3b8d14'
+down_revision = '9b6e4d1f0a23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job_leases',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('owner', sa.String(length=120), nullable=True),
+    sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('next_run_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_status', sa.String(length=20), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    op.create_table('job_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_name', sa.String(length=100), nullable=False),
+    sa.Column('owner', sa.String(length=120), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False, server_default='running'),
+    sa.Column('rows_affected', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('batches', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('duration_ms', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('job_runs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_job_runs_job_name'), ['job_name'], unique=False)
+        batch_op.create_index(batch_op.f('ix_job_runs_status'), ['status'], unique=False)
+        batch_op.create_index(batch_op.f('ix_job_runs_started_at'), ['started_at'], unique=False)
+
+    with op.batch_alter_table('subscriptions', schema=None) as batch_op:
+        batch_op.create_index('ix_subscriptions_status_end_date', ['status', 'end_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('subscriptions', schema=None) as batch_op:
+        batch_op.drop_index('ix_subscriptions_status_end_date')
+
+    with op.batch_alter_table('job_runs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_job_runs_started_at'))
+        batch_op.drop_index(batch_op.f('ix_job_runs_status'))
+        batch_op.drop_index(batch_op.f('ix_job_runs_job_name'))
+
+    op.drop_table('job_runs')
+    op.drop_table('job_leases')
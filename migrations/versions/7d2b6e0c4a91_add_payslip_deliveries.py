@@ -0,0 +1,50 @@
+"""add payslip deliveries
+
+Revision ID: 7d2b6e0c4a91
+Revises: 1c4f9a7d2e10
+Create Date: 2026-10-18 11:40:27.503116
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2b6e0c4a91'
+down_revision = '1c4f9a7d2e10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('payslip_deliveries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('payroll_run_id', sa.Integer(), nullable=False),
+    sa.Column('payroll_item_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('email', sa.String(length=255), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+    sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('pdf_path', sa.String(length=500), nullable=True),
+    sa.Column('rendered_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['payroll_item_id'], ['payroll_items.id'], ),
+    sa.ForeignKeyConstraint(['payroll_run_id'], ['payroll_runs.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('payroll_item_id')
+    )
+    with op.batch_alter_table('payslip_deliveries', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_payslip_deliveries_payroll_run_id'), ['payroll_run_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_payslip_deliveries_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payslip_deliveries', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_payslip_deliveries_status'))
+        batch_op.drop_index(batch_op.f('ix_payslip_deliveries_payroll_run_id'))
+
+    op.drop_table('payslip_deliveries')
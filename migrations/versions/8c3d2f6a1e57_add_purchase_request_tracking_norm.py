@@ -0,0 +1,63 @@
+"""add purchase_requests.merchant_tracking_norm
+
+Revision ID: 8c3d2f6a1e57
+Revises: 5e0c7a3b8d14
+Create Date: 2026-10-18 17:12:48.906233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3d2f6a1e57'
+down_revision = '5e0c7a3b8d14'
+branch_labels = None
+depends_on = None
+
+
+def _norm(value):
+    return "".join(c for c in str(value or "").upper() if c.isalnum()) or None
+
+
+def upgrade():
+    with op.batch_alter_table('purchase_requests', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('merchant_tracking_norm', sa.String(length=255), nullable=True))
+
+    bind = op.get_bind()
+    purchase_requests = sa.table(
+        'purchase_requests',
+        sa.column('id', sa.Integer),
+        sa.column('merchant_tracking_number', sa.String),
+        sa.column('merchant_tracking_norm', sa.String),
+    )
+
+    rows = bind.execute(
+        sa.select(purchase_requests.c.id, purchase_requests.c.merchant_tracking_number)
+        .where(purchase_requests.c.merchant_tracking_number.isnot(None))
+    ).all()
+
+    updates = [
+        {"pr_id": row.id, "norm": _norm(row.merchant_tracking_number)}
+        for row in rows
+    ]
+    if updates:
+        bind.execute(
+            purchase_requests.update()
+            .where(purchase_requests.c.id == sa.bindparam('pr_id'))
+            .values(merchant_tracking_norm=sa.bindparam('norm')),
+            updates,
+        )
+
+    with op.batch_alter_table('purchase_requests', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_purchase_requests_user_tracking_norm_status',
+            ['user_id', 'merchant_tracking_norm', 'status'],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('purchase_requests', schema=None) as batch_op:
+        batch_op.drop_index('ix_purchase_requests_user_tracking_norm_status')
+        batch_op.drop_column('merchant_tracking_norm')
@@ -0,0 +1,142 @@
+"""add broadcast notifications, receipts and watermarks
+
+Revision ID: 9b6e4d1f0a23
+Revises: 3f8a1c2d9b57
+Create Date: 2026-10-18 14:22:40.573910
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b6e4d1f0a23'
+down_revision = '3f8a1c2d9b57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('broadcast_notifications',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(length=120), nullable=False),
+    sa.Column('message', sa.String(length=255), nullable=False),
+    sa.Column('audience', sa.String(length=50), nullable=False, server_default='customer'),
+    sa.Column('created_by_id', sa.Integer(), nullable=True),
+    sa.Column('recipient_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('broadcast_notifications', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_broadcast_notifications_audience'), ['audience'], unique=False)
+        batch_op.create_index(batch_op.f('ix_broadcast_notifications_created_at'), ['created_at'], unique=False)
+
+    op.create_table('broadcast_receipts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('broadcast_id', sa.Integer(), nullable=False),
+    sa.Column('read_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['broadcast_id'], ['broadcast_notifications.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'broadcast_id', name='uq_broadcast_receipt_user_broadcast')
+    )
+    with op.batch_alter_table('broadcast_receipts', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_broadcast_receipts_broadcast_id'), ['broadcast_id'], unique=False)
+
+    op.create_table('notification_watermarks',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('last_read_broadcast_id', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_notifications_user_unread', ['user_id', 'is_read'], unique=False)
+
+    # ---- fold the per-customer broadcast copies into one row each ----
+    bind = op.get_bind()
+
+    bind.execute(sa.text("""
+        INSERT INTO broadcast_notifications (subject, message, audience, recipient_count, created_at)
+        SELECT subject, message, 'customer', COUNT(*), created_at
+        FROM notifications
+        WHERE is_broadcast = :yes
+        GROUP BY subject, message, created_at
+        ORDER BY created_at
+    """), {"yes": True})
+
+    # Each customer keeps exactly the broadcasts they hadn't read unread:
+    # the watermark stops just below their first unread copy (everything
+    # if none), and every broadcast above it without an unread copy (read,
+    # or never sent to them) gets a receipt.
+    bind.execute(sa.text("""
+        INSERT INTO notification_watermarks (user_id, last_read_broadcast_id, updated_at)
+        SELECT u.id,
+               COALESCE(
+                   (SELECT MIN(b.id) - 1
+                    FROM notifications n
+                    JOIN broadcast_notifications b
+                      ON b.subject = n.subject AND b.message = n.message AND b.created_at = n.created_at
+                    WHERE n.user_id = u.id AND n.is_broadcast = :yes AND n.is_read = :no),
+                   (SELECT COALESCE(MAX(id), 0) FROM broadcast_notifications)
+               ),
+               CURRENT_TIMESTAMP
+        FROM users u
+        WHERE u.role = 'customer'
+    """), {"yes": True, "no": False})
+
+    bind.execute(sa.text("""
+        INSERT INTO broadcast_receipts (user_id, broadcast_id, read_at)
+        SELECT w.user_id, b.id, CURRENT_TIMESTAMP
+        FROM notification_watermarks w
+        JOIN broadcast_notifications b ON b.id > w.last_read_broadcast_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM notifications n
+            WHERE n.user_id = w.user_id
+              AND n.is_broadcast = :yes
+              AND n.is_read = :no
+              AND n.subject = b.subject AND n.message = b.message AND n.created_at = b.created_at
+        )
+    """), {"yes": True, "no": False})
+
+    bind.execute(sa.text("DELETE FROM notifications WHERE is_broadcast = :yes"), {"yes": True})
+
+
+def downgrade():
+    # ---- give every customer their own copy again, with its read state ----
+    # (customers who joined after a broadcast never had one)
+    bind = op.get_bind()
+    bind.execute(sa.text("""
+        INSERT INTO notifications (user_id, subject, message, is_read, is_broadcast, created_at)
+        SELECT u.id, b.subject, b.message,
+               CASE WHEN b.id <= COALESCE(w.last_read_broadcast_id, 0)
+                      OR EXISTS (SELECT 1 FROM broadcast_receipts r
+                                 WHERE r.user_id = u.id AND r.broadcast_id = b.id)
+                    THEN :yes ELSE :no END,
+               :yes, b.created_at
+        FROM broadcast_notifications b
+        JOIN users u ON u.role = b.audience
+        LEFT JOIN notification_watermarks w ON w.user_id = u.id
+        WHERE u.created_at_dt IS NULL OR u.created_at_dt <= b.created_at
+           OR w.user_id IS NOT NULL
+        ORDER BY b.id, u.id
+    """), {"yes": True, "no": False})
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_user_unread')
+
+    op.drop_table('notification_watermarks')
+
+    with op.batch_alter_table('broadcast_receipts', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_broadcast_receipts_broadcast_id'))
+
+    op.drop_table('broadcast_receipts')
+
+    with op.batch_alter_table('broadcast_notifications', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_broadcast_notifications_created_at'))
+        batch_op.drop_index(batch_op.f('ix_broadcast_notifications_audience'))
+
+    op.drop_table('broadcast_notifications')
@@ -0,0 +1,84 @@
+"""add cold-storage archive tables and archive_checkpoints
+
+Revision ID: a4e8d1b6c953
+Revises: f1a7c3d9b264
+Create Date: 2026-10-19 17:58:20.411806
+
+Tables start empty; the cold_storage job (app/utils/cold_storage.py)
+fills them in throttled batches.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4e8d1b6c953'
+down_revision = 'f1a7c3d9b264'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('archive_checkpoints',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('moved_total', sa.BigInteger(), nullable=False),
+    sa.Column('passes', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    op.create_table('notifications_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(length=120), nullable=False),
+    sa.Column('message', sa.String(length=255), nullable=False),
+    sa.Column('is_read', sa.Boolean(), nullable=False),
+    sa.Column('is_broadcast', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('notifications_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_notifications_archive_user_created', ['user_id', 'created_at'], unique=False)
+
+    op.create_table('shipment_scan_logs_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('shipment_id', sa.Integer(), nullable=False),
+    sa.Column('package_id', sa.Integer(), nullable=True),
+    sa.Column('scanned_value', sa.String(length=255), nullable=False),
+    sa.Column('scan_result', sa.String(length=30), nullable=False),
+    sa.Column('scanned_by_id', sa.Integer(), nullable=True),
+    sa.Column('scanned_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('notes', sa.String(length=255), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('shipment_scan_logs_archive', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_shipment_scan_logs_archive_package_id'), ['package_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_shipment_scan_logs_archive_shipment_id'), ['shipment_id'], unique=False)
+
+
+def downgrade():
+    # archived rows go back to the live tables first
+    op.execute(
+        "INSERT INTO shipment_scan_logs (id, shipment_id, package_id, scanned_value, scan_result, "
+        "scanned_by_id, scanned_at, notes) "
+        "SELECT id, shipment_id, package_id, scanned_value, scan_result, scanned_by_id, scanned_at, notes "
+        "FROM shipment_scan_logs_archive"
+    )
+    op.execute(
+        "INSERT INTO notifications (id, user_id, subject, message, is_read, is_broadcast, created_at) "
+        "SELECT id, user_id, subject, message, is_read, is_broadcast, created_at "
+        "FROM notifications_archive"
+    )
+
+    with op.batch_alter_table('shipment_scan_logs_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_shipment_scan_logs_archive_shipment_id'))
+        batch_op.drop_index(batch_op.f('ix_shipment_scan_logs_archive_package_id'))
+
+    op.drop_table('shipment_scan_logs_archive')
+
+    with op.batch_alter_table('notifications_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_archive_user_created')
+
+    op.drop_table('notifications_archive')
+    op.drop_table('archive_checkpoints')
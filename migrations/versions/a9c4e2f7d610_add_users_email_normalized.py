@@ -0,0 +1,91 @@
+"""add users.email_normalized with a unique index
+
+Revision ID: a9c4e2f7d610
+Revises: f41b6d2c8e95
+Create Date: 2026-10-19 13:05:52.118404
+
+Existing accounts whose emails differ only by case/whitespace are
+reported in the migration log. The oldest account of each group keeps
+the normalized email; the others are left NULL (so the unique index can
+be built) until an admin merges or corrects them.
+"""
+import logging
+from collections import defaultdict
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c4e2f7d610'
+down_revision = 'f41b6d2c8e95'
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger("alembic.runtime.migration")
+
+
+def _norm(value):
+    return str(value or "").strip().lower() or None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('email_normalized', sa.String(length=255), nullable=True))
+
+    bind = op.get_bind()
+    users = sa.table(
+        'users',
+        sa.column('id', sa.Integer),
+        sa.column('email', sa.String),
+        sa.column('email_normalized', sa.String),
+    )
+
+    rows = bind.execute(
+        sa.select(users.c.id, users.c.email).order_by(users.c.id)
+    ).all()
+
+    groups = defaultdict(list)
+    for row in rows:
+        norm = _norm(row.email)
+        if norm:
+            groups[norm].append(row)
+
+    updates = []
+    duplicates = 0
+    for norm, members in groups.items():
+        # oldest account keeps the normalized email
+        updates.append({"user_id": members[0].id, "norm": norm})
+
+        if len(members) > 1:
+            duplicates += len(members) - 1
+            log.warning(
+                "users.email_normalized: duplicate %r -> kept user %s, left NULL for %s",
+                norm,
+                members[0].id,
+                ", ".join(f"{m.id} ({m.email!r})" for m in members[1:]),
+            )
+
+    if updates:
+        bind.execute(
+            users.update()
+            .where(users.c.id == sa.bindparam('user_id'))
+            .values(email_normalized=sa.bindparam('norm')),
+            updates,
+        )
+
+    if duplicates:
+        log.warning(
+            "users.email_normalized: %s account(s) share an email with an older account "
+            "and can't be found by email until merged or corrected",
+            duplicates,
+        )
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_email_normalized'), ['email_normalized'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_email_normalized'))
+        batch_op.drop_column('email_normalized')
@@ -0,0 +1,90 @@
+"""add prealerts.tracking_norm and prealert reconciliation reports
+
+Revision ID: b5e81f4c3a60
+Revises: 8c3d2f6a1e57
+Create Date: 2026-10-18 18:03:31.552190
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e81f4c3a60'
+down_revision = '8c3d2f6a1e57'
+branch_labels = None
+depends_on = None
+
+
+def _norm(value):
+    return re.sub(r"\s+", "", str(value or "").strip()).upper() or None
+
+
+def upgrade():
+    with op.batch_alter_table('prealerts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tracking_norm', sa.String(length=255), nullable=True))
+
+    bind = op.get_bind()
+    prealerts = sa.table(
+        'prealerts',
+        sa.column('id', sa.Integer),
+        sa.column('tracking_number', sa.String),
+        sa.column('tracking_norm', sa.String),
+    )
+
+    rows = bind.execute(
+        sa.select(prealerts.c.id, prealerts.c.tracking_number)
+        .where(prealerts.c.tracking_number.isnot(None))
+    ).all()
+
+    updates = [
+        {"pa_id": row.id, "norm": _norm(row.tracking_number)}
+        for row in rows
+    ]
+    if updates:
+        bind.execute(
+            prealerts.update()
+            .where(prealerts.c.id == sa.bindparam('pa_id'))
+            .values(tracking_norm=sa.bindparam('norm')),
+            updates,
+        )
+
+    with op.batch_alter_table('prealerts', schema=None) as batch_op:
+        batch_op.create_index('ix_prealerts_customer_tracking_norm', ['customer_id', 'tracking_norm'], unique=False)
+
+    op.create_table('prealert_reconciliations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('scope', sa.String(length=20), nullable=False),
+    sa.Column('scope_ref', sa.String(length=100), nullable=True),
+    sa.Column('actor_admin_id', sa.Integer(), nullable=True),
+    sa.Column('packages_seen', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('matched', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('linked', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('values_applied', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('attachments_created', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('shop_links', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('conflicts', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('unmatched', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('details', sa.JSON(), nullable=True),
+    sa.Column('duration_ms', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['actor_admin_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('prealert_reconciliations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_prealert_reconciliations_scope'), ['scope'], unique=False)
+        batch_op.create_index(batch_op.f('ix_prealert_reconciliations_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('prealert_reconciliations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_prealert_reconciliations_created_at'))
+        batch_op.drop_index(batch_op.f('ix_prealert_reconciliations_scope'))
+
+    op.drop_table('prealert_reconciliations')
+
+    with op.batch_alter_table('prealerts', schema=None) as batch_op:
+        batch_op.drop_index('ix_prealerts_customer_tracking_norm')
+        batch_op.drop_column('tracking_norm')
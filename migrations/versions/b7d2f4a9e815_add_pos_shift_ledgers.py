@@ -0,0 +1,46 @@
+"""add pos_shift_ledgers
+
+Revision ID: b7d2f4a9e815
+Revises: e3b9d05a7c21
+Create Date: 2026-10-19 16:34:02.518273
+
+Rows are built lazily from payments the first time a business date is
+viewed (app/utils/pos_ledger.py), so no backfill here.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2f4a9e815'
+down_revision = 'e3b9d05a7c21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('pos_shift_ledgers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('business_date', sa.Date(), nullable=False),
+    sa.Column('cash', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('card', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('transfer', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('wallet', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('other', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('gross_total', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('discount', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('total', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('payment_count', sa.Integer(), nullable=False),
+    sa.Column('revision', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('pos_shift_ledgers', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pos_shift_ledgers_business_date'), ['business_date'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('pos_shift_ledgers', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pos_shift_ledgers_business_date'))
+
+    op.drop_table('pos_shift_ledgers')
@@ -0,0 +1,64 @@
+"""add claims.house_awb_norm for unassigned-package matching
+
+Revision ID: c5f2b8e1d740
+Revises: a4e8d1b6c953
+Create Date: 2026-10-19 13:05:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5f2b8e1d740'
+down_revision = 'a4e8d1b6c953'
+branch_labels = None
+depends_on = None
+
+
+BACKFILL_CHUNK = 5000
+
+
+def _key(value):
+    return "".join(c for c in str(value or "").upper() if c.isalnum())
+
+
+def upgrade():
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('house_awb_norm', sa.String(length=64), nullable=True))
+
+    claims = sa.table(
+        'claims',
+        sa.column('id', sa.Integer),
+        sa.column('house_awb', sa.String),
+        sa.column('house_awb_norm', sa.String),
+    )
+
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(claims.c.id, claims.c.house_awb)
+            .where(claims.c.id > last_id)
+            .order_by(claims.c.id)
+            .limit(BACKFILL_CHUNK)
+        ).all()
+        if not rows:
+            break
+
+        bind.execute(
+            claims.update()
+            .where(claims.c.id == sa.bindparam('row_id'))
+            .values(house_awb_norm=sa.bindparam('norm')),
+            [{"row_id": row.id, "norm": _key(row.house_awb)[:64] or None} for row in rows],
+        )
+        last_id = rows[-1].id
+
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.create_index('ix_claims_house_awb_norm_status', ['house_awb_norm', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.drop_index('ix_claims_house_awb_norm_status')
+        batch_op.drop_column('house_awb_norm')
@@ -0,0 +1,40 @@
+"""add finance_daily_facts
+
+Revision ID: c6e8a1f3b47d
+Revises: a9c4e2f7d610
+Create Date: 2026-10-19 14:22:07.503918
+
+Populate it after upgrading with `flask finance backfill`
+(see app/utils/finance_facts.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e8a1f3b47d'
+down_revision = 'a9c4e2f7d610'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('finance_daily_facts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('business_date', sa.Date(), nullable=False),
+    sa.Column('metric', sa.String(length=30), nullable=False),
+    sa.Column('method', sa.String(length=120), nullable=False, server_default=''),
+    sa.Column('amount', sa.Float(), nullable=False, server_default='0'),
+    sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('business_date', 'metric', 'method', name='uq_finance_daily_facts_key')
+    )
+    with op.batch_alter_table('finance_daily_facts', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_finance_daily_facts_business_date'), ['business_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('finance_daily_facts', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_finance_daily_facts_business_date'))
+
+    op.drop_table('finance_daily_facts')
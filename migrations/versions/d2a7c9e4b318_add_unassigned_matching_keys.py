@@ -0,0 +1,124 @@
+"""add tracking suffix / awb keys for unassigned-package matching
+
+Revision ID: d2a7c9e4b318
+Revises: b5e81f4c3a60
+Create Date: 2026-10-19 09:12:44.301876
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7c9e4b318'
+down_revision = 'b5e81f4c3a60'
+branch_labels = None
+depends_on = None
+
+
+SUFFIX_LENGTH = 8
+BACKFILL_CHUNK = 5000
+
+
+def _key(value):
+    return "".join(c for c in str(value or "").upper() if c.isalnum())
+
+
+def _suffix(value):
+    return _key(value)[-SUFFIX_LENGTH:] or None
+
+
+def _backfill(bind, table_name, source_columns, derive):
+    table = sa.table(
+        table_name,
+        sa.column('id', sa.Integer),
+        *[sa.column(name, sa.String) for name in source_columns],
+        *[sa.column(name, sa.String) for name in derive],
+    )
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, *[table.c[name] for name in source_columns])
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(BACKFILL_CHUNK)
+        ).all()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            values = {"row_id": row.id}
+            for target, (source, fn) in derive.items():
+                values[target] = fn(getattr(row, source))
+            updates.append(values)
+
+        bind.execute(
+            table.update()
+            .where(table.c.id == sa.bindparam('row_id'))
+            .values({target: sa.bindparam(target) for target in derive}),
+            updates,
+        )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    with op.batch_alter_table('packages', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tracking_suffix', sa.String(length=16), nullable=True))
+        batch_op.add_column(sa.Column('awb_norm', sa.String(length=64), nullable=True))
+
+    with op.batch_alter_table('package_search_cases', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tracking_suffix', sa.String(length=16), nullable=True))
+
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tracking_suffix', sa.String(length=16), nullable=True))
+
+    bind = op.get_bind()
+    _backfill(
+        bind,
+        'packages',
+        ['tracking_number', 'house_awb'],
+        {
+            'tracking_suffix': ('tracking_number', _suffix),
+            'awb_norm': ('house_awb', lambda v: _key(v)[:64] or None),
+        },
+    )
+    _backfill(
+        bind,
+        'package_search_cases',
+        ['tracking_number'],
+        {'tracking_suffix': ('tracking_number', _suffix)},
+    )
+    _backfill(
+        bind,
+        'claims',
+        ['tracking_number'],
+        {'tracking_suffix': ('tracking_number', _suffix)},
+    )
+
+    with op.batch_alter_table('packages', schema=None) as batch_op:
+        batch_op.create_index('ix_packages_user_tracking_suffix', ['user_id', 'tracking_suffix'], unique=False)
+        batch_op.create_index('ix_packages_user_awb_norm', ['user_id', 'awb_norm'], unique=False)
+
+    with op.batch_alter_table('package_search_cases', schema=None) as batch_op:
+        batch_op.create_index('ix_package_search_cases_tracking_suffix_status', ['tracking_suffix', 'status'], unique=False)
+
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.create_index('ix_claims_tracking_suffix_status', ['tracking_suffix', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('claims', schema=None) as batch_op:
+        batch_op.drop_index('ix_claims_tracking_suffix_status')
+        batch_op.drop_column('tracking_suffix')
+
+    with op.batch_alter_table('package_search_cases', schema=None) as batch_op:
+        batch_op.drop_index('ix_package_search_cases_tracking_suffix_status')
+        batch_op.drop_column('tracking_suffix')
+
+    with op.batch_alter_table('packages', schema=None) as batch_op:
+        batch_op.drop_index('ix_packages_user_awb_norm')
+        batch_op.drop_index('ix_packages_user_tracking_suffix')
+        batch_op.drop_column('awb_norm')
+        batch_op.drop_column('tracking_suffix')
@@ -0,0 +1,133 @@
+"""add receivables_snapshot and a partial index on open invoices
+
+Revision ID: e3b9d05a7c21
+Revises: c6e8a1f3b47d
+Create Date: 2026-10-19 15:48:31.270664
+
+The snapshot is filled here; afterwards app/utils/receivables.py keeps
+it current.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b9d05a7c21'
+down_revision = 'c6e8a1f3b47d'
+branch_labels = None
+depends_on = None
+
+OPEN_INVOICE_WHERE = "lower(status) IN ('pending', 'issued', 'unpaid', 'partial')"
+
+
+def upgrade():
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_invoices_open',
+            ['user_id', 'id'],
+            unique=False,
+            postgresql_where=sa.text(OPEN_INVOICE_WHERE),
+            sqlite_where=sa.text(OPEN_INVOICE_WHERE),
+        )
+
+    op.create_table('receivables_snapshot',
+    sa.Column('invoice_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('issued_at', sa.DateTime(), nullable=True),
+    sa.Column('issued_on', sa.Date(), nullable=True),
+    sa.Column('billed', sa.Float(), nullable=False),
+    sa.Column('paid', sa.Float(), nullable=False),
+    sa.Column('amount_due', sa.Float(), nullable=False),
+    sa.Column('balance_due', sa.Float(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('invoice_id')
+    )
+    with op.batch_alter_table('receivables_snapshot', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_receivables_snapshot_issued_on'), ['issued_on'], unique=False)
+        batch_op.create_index(batch_op.f('ix_receivables_snapshot_user_id'), ['user_id'], unique=False)
+
+    # initial fill (same SELECT as app/utils/receivables.py)
+    invoices = sa.table(
+        'invoices',
+        sa.column('id', sa.Integer),
+        sa.column('user_id', sa.Integer),
+        sa.column('status', sa.String),
+        sa.column('grand_total', sa.Float),
+        sa.column('amount', sa.Float),
+        sa.column('amount_due', sa.Float),
+        sa.column('date_issued', sa.DateTime),
+        sa.column('date_submitted', sa.DateTime),
+        sa.column('created_at', sa.DateTime),
+    )
+    payments = sa.table(
+        'payments',
+        sa.column('invoice_id', sa.Integer),
+        sa.column('amount_jmd', sa.Float),
+        sa.column('status', sa.String),
+    )
+    snapshot = sa.table(
+        'receivables_snapshot',
+        sa.column('invoice_id'), sa.column('user_id'), sa.column('status'),
+        sa.column('issued_at'), sa.column('issued_on'), sa.column('billed'),
+        sa.column('paid'), sa.column('amount_due'), sa.column('balance_due'),
+        sa.column('refreshed_at'),
+    )
+
+    paid_sub = (
+        sa.select(
+            payments.c.invoice_id.label('invoice_id'),
+            sa.func.sum(payments.c.amount_jmd).label('paid'),
+        )
+        .where(payments.c.invoice_id.isnot(None))
+        .where(sa.func.lower(sa.func.coalesce(payments.c.status, 'completed')) == 'completed')
+        .group_by(payments.c.invoice_id)
+        .subquery()
+    )
+
+    billed = sa.func.coalesce(invoices.c.grand_total, invoices.c.amount_due, invoices.c.amount, 0.0)
+    paid = sa.func.coalesce(paid_sub.c.paid, 0.0)
+    balance = sa.case((billed - paid > 0, billed - paid), else_=0.0)
+    amount_due = sa.func.coalesce(invoices.c.amount_due, invoices.c.grand_total, invoices.c.amount, 0.0)
+    issued_at = sa.func.coalesce(invoices.c.date_issued, invoices.c.date_submitted, invoices.c.created_at)
+
+    select = (
+        sa.select(
+            invoices.c.id,
+            invoices.c.user_id,
+            sa.func.lower(invoices.c.status),
+            issued_at,
+            sa.func.date(issued_at),
+            billed,
+            paid,
+            amount_due,
+            balance,
+            sa.literal(datetime.utcnow(), sa.DateTime),
+        )
+        .select_from(invoices.outerjoin(paid_sub, paid_sub.c.invoice_id == invoices.c.id))
+        .where(sa.text(OPEN_INVOICE_WHERE))
+        .where(sa.or_(amount_due > 0, balance > 0))
+    )
+
+    op.get_bind().execute(
+        snapshot.insert().from_select(
+            [
+                'invoice_id', 'user_id', 'status', 'issued_at', 'issued_on',
+                'billed', 'paid', 'amount_due', 'balance_due', 'refreshed_at',
+            ],
+            select,
+        )
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('receivables_snapshot', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_receivables_snapshot_user_id'))
+        batch_op.drop_index(batch_op.f('ix_receivables_snapshot_issued_on'))
+
+    op.drop_table('receivables_snapshot')
+
+    with op.batch_alter_table('invoices', schema=None) as batch_op:
+        batch_op.drop_index('ix_invoices_open')
@@ -0,0 +1,203 @@
+"""keyset indexes on audit_logs, monthly partitions on Postgres, audit_logs_archive
+
+Revision ID: f1a7c3d9b264
+Revises: b7d2f4a9e815
+Create Date: 2026-10-19 17:12:45.903118
+
+Postgres: audit_logs is rebuilt as a table range-partitioned by month on
+created_at (primary key (id, created_at), same id sequence), with
+partitions from the oldest row to a few months ahead plus a DEFAULT
+partition. The audit_maintenance job adds later months.
+
+SQLite: only the new indexes; old rows are moved to audit_logs_archive
+by the same job.
+"""
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a7c3d9b264'
+down_revision = 'b7d2f4a9e815'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+COLUMNS = (
+    'id', 'module', 'action', 'reason', 'entity_type', 'entity_id',
+    'user_id', 'admin_id', 'description', 'old_value', 'new_value', 'created_at',
+)
+
+OLD_INDEXES = {
+    'ix_audit_logs_action': ['action'],
+    'ix_audit_logs_admin_id': ['admin_id'],
+    'ix_audit_logs_created_at': ['created_at'],
+    'ix_audit_logs_module': ['module'],
+    'ix_audit_logs_reason': ['reason'],
+    'ix_audit_logs_user_id': ['user_id'],
+}
+
+NEW_INDEXES = {
+    'ix_audit_logs_module_id': ['module', 'id'],
+    'ix_audit_logs_entity': ['entity_type', 'entity_id', 'id'],
+    'ix_audit_logs_admin_id_id': ['admin_id', 'id'],
+}
+
+
+def _month_start(d, offset=0):
+    month = d.month - 1 + offset
+    return date(d.year + month // 12, month % 12 + 1, 1)
+
+
+def _create_pg_table(name, sequence, partitioned):
+    op.execute(f"""
+        CREATE TABLE {name} (
+            id integer NOT NULL DEFAULT nextval('{sequence}'::regclass),
+            module varchar(50) NOT NULL,
+            action varchar(100) NOT NULL,
+            reason varchar(100),
+            entity_type varchar(50),
+            entity_id integer,
+            user_id integer REFERENCES users (id),
+            admin_id integer REFERENCES users (id),
+            description text,
+            old_value text,
+            new_value text,
+            created_at timestamp without time zone NOT NULL,
+            CONSTRAINT {name}_pkey PRIMARY KEY ({'id, created_at' if partitioned else 'id'})
+        ){' PARTITION BY RANGE (created_at)' if partitioned else ''}
+    """)
+
+
+def _create_pg_indexes(table):
+    for index_name, cols in {**OLD_INDEXES, **NEW_INDEXES}.items():
+        op.execute(f"CREATE INDEX {index_name} ON {table} ({', '.join(cols)})")
+
+
+def _copy(source, target):
+    cols = ', '.join(COLUMNS)
+    op.execute(f"INSERT INTO {target} ({cols}) SELECT {cols} FROM {source}")
+
+
+def _move_aside(bind, suffix):
+    """Rename audit_logs (and its index/pkey names) out of the way; returns its id sequence."""
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('audit_logs', 'id')")).scalar()
+
+    op.execute(f"ALTER TABLE audit_logs RENAME TO audit_logs_{suffix}")
+    op.execute(f"ALTER TABLE audit_logs_{suffix} RENAME CONSTRAINT audit_logs_pkey TO audit_logs_{suffix}_pkey")
+    for index_name in {**OLD_INDEXES, **NEW_INDEXES}:
+        op.execute(f"ALTER INDEX IF EXISTS {index_name} RENAME TO {index_name}_{suffix}")
+
+    if sequence is None:
+        sequence = 'audit_logs_id_seq'
+        op.execute(f"CREATE SEQUENCE IF NOT EXISTS {sequence}")
+        op.execute(f"SELECT setval('{sequence}', COALESCE((SELECT max(id) FROM audit_logs_{suffix}), 0) + 1, false)")
+    else:
+        # keep the sequence when the old table is dropped
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+
+    return sequence
+
+
+def _upgrade_postgresql(bind):
+    sequence = _move_aside(bind, 'legacy')
+
+    _create_pg_table('audit_logs', sequence, partitioned=True)
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY audit_logs.id")
+
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM audit_logs_legacy")).scalar()
+    today = datetime.utcnow().date()
+    month = _month_start((oldest or datetime.utcnow()).date())
+    last = _month_start(today, MONTHS_AHEAD)
+
+    while month <= last:
+        following = _month_start(month, 1)
+        op.execute(
+            f"CREATE TABLE audit_logs_y{month.year}m{month.month:02d} PARTITION OF audit_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+        )
+        month = following
+
+    # catches anything outside the monthly ranges (e.g. a missed job run)
+    op.execute("CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT")
+
+    _create_pg_indexes('audit_logs')
+    _copy('audit_logs_legacy', 'audit_logs')
+    op.execute("DROP TABLE audit_logs_legacy")
+
+
+def _downgrade_postgresql(bind):
+    sequence = _move_aside(bind, 'partitioned')
+
+    _create_pg_table('audit_logs', sequence, partitioned=False)
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY audit_logs.id")
+
+    for index_name, cols in OLD_INDEXES.items():
+        op.execute(f"CREATE INDEX {index_name} ON audit_logs ({', '.join(cols)})")
+
+    _copy('audit_logs_partitioned', 'audit_logs')
+    op.execute("DROP TABLE audit_logs_partitioned")
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    if bind.dialect.name == 'postgresql':
+        _upgrade_postgresql(bind)
+    else:
+        with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+            for index_name, cols in NEW_INDEXES.items():
+                batch_op.create_index(index_name, cols, unique=False)
+
+    op.create_table('audit_logs_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('module', sa.String(length=50), nullable=False),
+    sa.Column('action', sa.String(length=100), nullable=False),
+    sa.Column('reason', sa.String(length=100), nullable=True),
+    sa.Column('entity_type', sa.String(length=50), nullable=True),
+    sa.Column('entity_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('admin_id', sa.Integer(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('old_value', sa.Text(), nullable=True),
+    sa.Column('new_value', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['admin_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('audit_logs_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_audit_logs_archive_module_id', ['module', 'id'], unique=False)
+        batch_op.create_index('ix_audit_logs_archive_entity', ['entity_type', 'entity_id', 'id'], unique=False)
+        batch_op.create_index('ix_audit_logs_archive_admin_id_id', ['admin_id', 'id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_audit_logs_archive_user_id'), ['user_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_audit_logs_archive_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    # archived rows go back to the live table first
+    op.execute(
+        f"INSERT INTO audit_logs ({', '.join(COLUMNS)}) "
+        f"SELECT {', '.join(COLUMNS)} FROM audit_logs_archive"
+    )
+
+    with op.batch_alter_table('audit_logs_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_audit_logs_archive_created_at'))
+        batch_op.drop_index(batch_op.f('ix_audit_logs_archive_user_id'))
+        batch_op.drop_index('ix_audit_logs_archive_admin_id_id')
+        batch_op.drop_index('ix_audit_logs_archive_entity')
+        batch_op.drop_index('ix_audit_logs_archive_module_id')
+
+    op.drop_table('audit_logs_archive')
+
+    if bind.dialect.name == 'postgresql':
+        _downgrade_postgresql(bind)
+    else:
+        with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+            for index_name in reversed(list(NEW_INDEXES)):
+                batch_op.drop_index(index_name)
@@ -0,0 +1,132 @@
+"""
+Rate-limit storage stress test (see app/utils/ratelimit_storage.py).
+
+Several processes hammer the same limit at once, like gunicorn workers
+serving one client. Exactly LIMIT hits must be allowed in total; the
+per-hit time is the overhead each limited request pays.
+
+    python ratelimit_stress.py                                # temp SQLite file
+    python ratelimit_stress.py --url postgresql+psycopg://... # real database
+    python ratelimit_stress.py --storage memory://            # old behaviour:
+                                                              # allows LIMIT per process
+
+Exit status is 1 if enforcement was wrong.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+
+def _worker(storage_uri, limit_text, hits, key, start, results):
+    from limits import parse
+    from limits.storage import storage_from_string
+    from limits.strategies import FixedWindowRateLimiter
+
+    import app.utils.ratelimit_storage  # noqa: F401  (registers db+... schemes)
+
+    limiter = FixedWindowRateLimiter(storage_from_string(storage_uri))
+    item = parse(limit_text)
+
+    # one warm-up round trip so connection setup isn't timed
+    limiter.get_window_stats(item, key)
+
+    start.wait()
+
+    allowed = 0
+    timings = []
+    for _ in range(hits):
+        t0 = time.perf_counter()
+        if limiter.hit(item, key):
+            allowed += 1
+        timings.append(time.perf_counter() - t0)
+
+    results.put((allowed, timings))
+
+
+def _create_table(url):
+    from sqlalchemy import create_engine
+
+    from app.models import RateLimitCounter
+
+    engine = create_engine(url)
+    RateLimitCounter.__table__.create(engine, checkfirst=True)
+    engine.dispose()
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="SQLAlchemy URL for the counters table (default: temp SQLite file)")
+    parser.add_argument("--storage", help="limits storage URI, overrides --url (e.g. memory://)")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--hits", type=int, default=250, help="hits per process")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--window", default="1 minute")
+    args = parser.parse_args()
+
+    if args.storage:
+        storage_uri = args.storage
+    else:
+        url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "ratelimit_stress.db")
+        _create_table(url)
+        storage_uri = "db+" + url
+
+    limit_text = f"{args.limit} per {args.window}"
+    key = f"stress-{uuid.uuid4().hex[:8]}"
+
+    ctx = mp.get_context("spawn")
+    start = ctx.Event()
+    results = ctx.Queue()
+
+    procs = [
+        ctx.Process(
+            target=_worker,
+            args=(storage_uri, limit_text, args.hits, key, start, results),
+        )
+        for _ in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+
+    # let every process connect before the burst
+    time.sleep(2)
+    started = time.perf_counter()
+    start.set()
+
+    allowed = 0
+    timings = []
+    for _ in procs:
+        n, t = results.get()
+        allowed += n
+        timings.extend(t)
+    elapsed = time.perf_counter() - started
+
+    for p in procs:
+        p.join()
+
+    total = args.processes * args.hits
+    expected = min(args.limit, total)
+    timings.sort()
+
+    print(f"storage          {storage_uri}")
+    print(f"limit            {limit_text}")
+    print(f"hits             {args.processes} processes x {args.hits} = {total} in {elapsed:.2f}s "
+          f"({total / elapsed:.0f}/s)")
+    print(f"allowed          {allowed} (expected {expected}) {'OK' if allowed == expected else 'WRONG'}")
+    print(f"per-hit          mean {_ms(statistics.mean(timings))}  "
+          f"p50 {_ms(timings[len(timings) // 2])}  "
+          f"p95 {_ms(timings[int(len(timings) * 0.95)])}  "
+          f"p99 {_ms(timings[int(len(timings) * 0.99)])}")
+
+    return 0 if allowed == expected else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
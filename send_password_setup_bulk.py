@@ -196,7 +196,7 @@ def main():
             rows = (
                 User.query
                 .with_entities(User.id, User.email)
-                .filter(User.email.in_(test_list))
+                .filter(User.email_normalized.in_(test_list))
                 .all()
             )
             recipients_all = [(uid, (email or "").strip().lower()) for uid, email in rows if (email or "").strip()]
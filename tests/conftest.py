@@ -0,0 +1,44 @@
+"""
+Shared fixtures. app.config reads DATABASE_URL when it is first
+imported, so the test database is chosen here, before anything imports
+app (same as benchmarks.bench_app).
+
+    python -m pytest -q
+"""
+import os
+import tempfile
+
+import pytest
+
+
+_DB_DIR = tempfile.mkdtemp(prefix="fafl-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'primary.db')}"
+os.environ.pop("DATABASE_REPLICA_URL", None)
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import create_app
+    from app.extensions import db, limiter
+
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    limiter.enabled = False
+
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def db(app):
+    """The app's db with every table emptied afterwards."""
+    from app.extensions import db
+
+    with app.app_context():
+        yield db
+        db.session.rollback()
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        db.session.remove()
@@ -0,0 +1,31 @@
+"""
+Buffered calculator_logs writes (app/utils/calculator_log.py): a row the
+database rejects is dropped instead of failing every later flush.
+"""
+from app.utils import calculator_log
+
+
+def _log(invoice_usd):
+    calculator_log.log_calculation(
+        user_id=1, category="General", invoice_usd=invoice_usd, weight=1.0,
+        result={"duty": 1, "grand_total": 10},
+    )
+
+
+def test_bad_row_is_dropped_and_the_rest_written(app, db):
+    from app.models import CalculatorLog
+
+    app.config["CALCULATOR_LOG_BATCH_SIZE"] = 1000
+    try:
+        _log(25)
+        _log(None)  # value_usd is NOT NULL
+        _log(40)
+
+        assert calculator_log.flush_calculator_logs() == 2
+        assert calculator_log._buffer == []
+        assert sorted(r.value_usd for r in CalculatorLog.query.all()) == [25, 40]
+
+        _log(60)
+        assert calculator_log.flush_calculator_logs() == 1
+    finally:
+        app.config["CALCULATOR_LOG_BATCH_SIZE"] = calculator_log.CALCULATOR_LOG_BATCH_SIZE
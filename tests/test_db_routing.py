@@ -0,0 +1,128 @@
+"""
+Read-replica routing (app/utils/db_routing.py) with a second SQLite file
+as the replica: it starts as a copy of the primary and then gets a
+different counter value, so every read shows which database answered.
+"""
+import os
+import sqlite3
+
+import pytest
+from sqlalchemy import select, text
+
+from app.utils import db_routing
+
+
+def _counter(db):
+    from app.models import Counter
+
+    return db.session.execute(select(Counter.value).where(Counter.name == "routing")).scalar_one()
+
+
+@pytest.fixture
+def replica(app, db, tmp_path):
+    from app.models import Counter
+
+    db.session.add(Counter(name="routing", value=1))
+    db.session.commit()
+    db.session.remove()
+
+    path = tmp_path / "replica.db"
+    src, dst = sqlite3.connect(db.engine.url.database), sqlite3.connect(path)
+    src.backup(dst)
+    dst.execute("UPDATE counters SET value = 2 WHERE name = 'routing'")
+    dst.commit()
+    src.close()
+    dst.close()
+
+    app.config["DATABASE_REPLICA_URL"] = f"sqlite:///{path}"
+    yield path
+
+    app.config["DATABASE_REPLICA_URL"] = None
+    db.session.remove()
+    db_routing.dispose_after_fork(app)
+
+
+def _report_request(app):
+    ctx = app.test_request_context("/")
+    ctx.push()
+    db_routing.report_request()
+    return ctx
+
+
+def test_session_works_without_replica(db):
+    assert isinstance(db.session(), db_routing.RoutingSession)
+    assert db.session.execute(text("select 1")).scalar() == 1
+
+
+def test_plain_requests_read_the_primary(app, db, replica):
+    with app.test_request_context("/"):
+        assert _counter(db) == 1
+
+
+def test_report_requests_read_the_replica(app, db, replica):
+    ctx = _report_request(app)
+    try:
+        assert _counter(db) == 2
+        assert db.session.execute(text("SELECT value FROM counters")).scalar() == 2
+    finally:
+        ctx.pop()
+
+
+def test_for_update_goes_to_the_primary(app, db, replica):
+    from app.models import Counter
+
+    ctx = _report_request(app)
+    try:
+        stmt = select(Counter.value).where(Counter.name == "routing").with_for_update()
+        assert db.session.execute(stmt).scalar_one() == 1
+    finally:
+        ctx.pop()
+
+
+def test_reads_after_a_write_stay_on_the_primary(app, db, replica):
+    from app.models import Counter
+
+    ctx = _report_request(app)
+    try:
+        assert _counter(db) == 2
+        db.session.add(Counter(name="other", value=5))
+        db.session.flush()
+        # read-your-writes: the replica has neither the new row nor value 1
+        assert _counter(db) == 1
+        assert db.session.execute(select(Counter.value).where(Counter.name == "other")).scalar_one() == 5
+    finally:
+        db.session.rollback()
+        ctx.pop()
+
+
+def test_unreachable_replica_falls_back_to_the_primary(app, db, replica, tmp_path):
+    app.config["DATABASE_REPLICA_URL"] = f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"
+
+    ctx = _report_request(app)
+    try:
+        assert _counter(db) == 1
+        assert db_routing.replica_engine() is None
+    finally:
+        ctx.pop()
+
+
+def test_dispose_after_fork_resets_the_replica(app, db, replica):
+    ctx = _report_request(app)
+    try:
+        assert db_routing.replica_engine() is not None
+    finally:
+        ctx.pop()
+
+    db_routing.dispose_after_fork(app)
+    assert db_routing._replica_state["engine"] is None
+    assert os.path.exists(replica)
+
+
+def test_statement_timeout_only_limits_requests_by_default(app):
+    options = db_routing.engine_options("postgresql://u@h/db", app.config)
+    assert "connect_args" not in options
+
+    with app.app_context():
+        assert db_routing._default_timeout_ms() == 0
+    with app.test_request_context("/"):
+        assert db_routing._default_timeout_ms() == app.config["DB_STATEMENT_TIMEOUT_MS"]
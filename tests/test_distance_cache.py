@@ -0,0 +1,20 @@
+"""
+Distance lookups (app/utils/distance_cache.py) without a Google Maps key
+fall back to the offline estimate.
+"""
+from app.utils.distance_cache import clear_distance_memo, lookup_driving_distance
+
+
+def test_missing_api_key_uses_the_offline_estimate(app, db):
+    clear_distance_memo()
+    app.config["DISTANCE_LOOKUP_MODE"] = "google"
+
+    with app.test_request_context("/"):
+        result = lookup_driving_distance(
+            "Half Way Tree, Kingston 10", "12 Main St, Portmore", api_key=None, parish="St Catherine",
+        )
+
+    assert result["success"] is True
+    assert result["source"] == "offline"
+    assert result["estimated"] is True
+    assert result["distance_km"] > 0
@@ -0,0 +1,63 @@
+"""
+Notification feed read-through to cold storage (app/utils/notifications.py).
+"""
+from datetime import datetime, timedelta, timezone
+
+from app.utils.notifications import (
+    delete_personal_notification,
+    mark_personal_read,
+    notification_feed,
+)
+
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _user(db):
+    from app.models import User
+
+    user = User(email="feed@test", password=b"x", role="staff")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _seed(db, user):
+    """Live on even days, archived on odd days: interleaved in time."""
+    from app.models import Notification, NotificationArchive
+
+    for day in range(6):
+        at = T0 + timedelta(days=day)
+        if day % 2:
+            db.session.add(NotificationArchive(
+                id=1000 + day, user_id=user.id, subject=f"d{day}", message="m", is_read=True, created_at=at,
+            ))
+        else:
+            db.session.add(Notification(user_id=user.id, subject=f"d{day}", message="m", created_at=at))
+    db.session.commit()
+
+
+def test_feed_merges_live_and_archive_newest_first(db):
+    user = _user(db)
+    _seed(db, user)
+
+    assert [n["subject"] for n in notification_feed(user)] == ["d5", "d4", "d3", "d2", "d1", "d0"]
+
+    limited = notification_feed(user, limit=3)
+    assert [n["subject"] for n in limited] == ["d5", "d4", "d3"]
+    assert [n["is_archived"] for n in limited] == [True, False, True]
+
+
+def test_actions_accept_archived_ids(db):
+    from app.models import NotificationArchive
+
+    user = _user(db)
+    _seed(db, user)
+
+    assert mark_personal_read(1001, user.id)
+    assert not mark_personal_read(1001, user.id + 1)
+
+    assert delete_personal_notification(1001, user.id)
+    db.session.commit()
+    assert db.session.get(NotificationArchive, 1001) is None
+    assert "d1" not in [n["subject"] for n in notification_feed(user)]
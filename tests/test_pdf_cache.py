@@ -0,0 +1,43 @@
+"""
+PDF cache keys (app/utils/pdf_cache.py) change when anything the PDF
+shows changes, including the Settings row templates read.
+"""
+from app.utils.pdf_cache import pdf_cache_key
+
+
+def _key(app, inputs):
+    # its own app context, like a request: fresh g and session
+    with app.app_context(), app.test_request_context("/"):
+        return pdf_cache_key("invoice", inputs)
+
+
+def test_settings_change_rekeys_every_pdf(app, db):
+    from app.models import Settings
+
+    settings = Settings(id=1, company_name="Old Name Ltd")
+    db.session.add(settings)
+    db.session.commit()
+
+    before = _key(app, {"number": "INV-1"})
+    assert _key(app, {"number": "INV-1"}) == before
+
+    settings.company_name = "New Name Ltd"
+    db.session.commit()
+
+    assert _key(app, {"number": "INV-1"}) != before
+
+
+def test_rows_without_updated_at_are_keyed_by_their_columns(app, db):
+    from app.models import Counter
+
+    db.session.add(Counter(name="pdf", value=1))
+    db.session.commit()
+
+    def key():
+        return _key(app, {"counter": db.session.get(Counter, "pdf")})
+
+    before = key()
+    db.session.get(Counter, "pdf").value = 2
+    db.session.commit()
+
+    assert key() != before
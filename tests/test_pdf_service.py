@@ -0,0 +1,99 @@
+"""
+PDF render pool (app/utils/pdf_service.py): a crashed worker must not
+disable rendering for the life of the process, and timeouts surface as
+PdfRenderError.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from app.utils import pdf_service
+
+
+@pytest.fixture
+def pdf_app(app):
+    app.config["PDF_WORKERS"] = 1
+    with app.test_request_context("/"):
+        yield app
+    pdf_service.shutdown_pdf_pool()
+    app.config["PDF_RENDER_TIMEOUT_SECONDS"] = 120
+    app.config["PDF_WORKERS"] = 2
+
+
+def _broken_pool():
+    # every worker exits during startup -> BrokenProcessPool on first use
+    pool = ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=os._exit,
+        initargs=(1,),
+    )
+    pdf_service._pool = pool
+    pdf_service._pool_pid = os.getpid()
+    return pool
+
+
+def test_broken_pool_is_replaced(pdf_app):
+    broken = _broken_pool()
+
+    try:
+        pdf_service.render_pdf(html="<p>hello</p>")
+    except pdf_service.PdfRenderError:
+        # without WeasyPrint's system libraries the new pool can't render
+        # either; what matters is that it is a new pool
+        pass
+
+    assert pdf_service._pool is not broken
+
+
+def test_timeout_raises_pdf_render_error(pdf_app):
+    pdf_app.config["PDF_RENDER_TIMEOUT_SECONDS"] = 0.001
+
+    with pytest.raises(pdf_service.PdfRenderError, match="timed out"):
+        pdf_service.render_pdf(html="<p>slow</p>")
+
+
+class _FakeHTML:
+    """Stands in for WeasyPrint in the pool workers; "hang" never finishes."""
+
+    def __init__(self, string, **kwargs):
+        self.string = string
+
+    def write_pdf(self, *args, **kwargs):
+        if "hang" in self.string:
+            time.sleep(600)
+        return b"%PDF-fake"
+
+
+def _fake_init_worker(static_folder):
+    pdf_service._worker_state.update(
+        HTML=_FakeHTML, font_config=None, css={}, url_fetcher=None, static_folder=static_folder,
+    )
+
+
+@pytest.fixture
+def fake_weasyprint(pdf_app, monkeypatch):
+    monkeypatch.setattr(pdf_service, "_init_worker", _fake_init_worker)
+    return pdf_app
+
+
+def test_hung_render_does_not_block_the_next_one(fake_weasyprint):
+    fake_weasyprint.config["PDF_RENDER_TIMEOUT_SECONDS"] = 1
+    with pytest.raises(pdf_service.PdfRenderError, match="timed out"):
+        pdf_service.render_pdf(html="<p>hang</p>")
+
+    fake_weasyprint.config["PDF_RENDER_TIMEOUT_SECONDS"] = 30
+    assert pdf_service.render_pdf(html="<p>ok</p>") == b"%PDF-fake"
+
+
+def test_timeout_covers_the_whole_batch(fake_weasyprint):
+    fake_weasyprint.config.update(PDF_WORKERS=2, PDF_RENDER_TIMEOUT_SECONDS=1.5)
+
+    started = time.monotonic()
+    with pytest.raises(pdf_service.PdfRenderError, match="timed out"):
+        pdf_service.render_pdf_batch([{"html": "<p>hang</p>"}, {"html": "<p>hang</p>"}])
+    # one deadline: not 1.5s per chunk
+    assert time.monotonic() - started < 2.5
@@ -0,0 +1,146 @@
+"""
+POS shift ledger (app/utils/pos_ledger.py): the totals must always equal
+the day's completed POS payments.
+"""
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from app.utils.pos_ledger import (
+    ensure_pos_ledger,
+    pos_business_date,
+    pos_day_summary,
+    pos_payment_rows,
+)
+
+
+NOW = datetime.now(timezone.utc).replace(tzinfo=None)
+TODAY = pos_business_date(NOW)
+
+
+def _ledger():
+    from app.models import POSShiftLedger
+
+    return POSShiftLedger.query.filter_by(business_date=TODAY).populate_existing().first()
+
+
+def _invoice(db, number, discount=0):
+    from app.models import Invoice
+
+    invoice = Invoice(user_id=1, invoice_number=number, discount_total=Decimal(discount))
+    db.session.add(invoice)
+    db.session.flush()
+    return invoice
+
+
+def _payment(db, amount, method="Cash", invoice=None):
+    from app.models import Payment
+
+    payment = Payment(
+        user_id=1,
+        invoice_id=invoice.id if invoice else None,
+        method=method,
+        amount_jmd=amount,
+        transaction_type="invoice_payment",
+        status="completed",
+        source="pos",
+        created_at=NOW,
+    )
+    db.session.add(payment)
+    db.session.flush()
+    return payment
+
+
+def test_sales_are_added(db):
+    invoice = _invoice(db, "INV-1", discount=50)
+    _payment(db, 1000, "Cash", invoice)
+    _payment(db, 400, "Card")
+    db.session.commit()
+
+    ledger = _ledger()
+    assert ledger.cash == Decimal("1000.00")
+    assert ledger.card == Decimal("400.00")
+    assert ledger.discount == Decimal("50.00")
+    assert ledger.gross_total == Decimal("1450.00")
+    assert ledger.payment_count == 2
+
+
+def test_reversal_takes_the_payment_out(db):
+    keep = _payment(db, 300)
+    reverse = _payment(db, 700)
+    db.session.commit()
+
+    reverse.status = "reversed"
+    db.session.commit()
+
+    ledger = _ledger()
+    assert ledger.cash == Decimal("300.00")
+    assert ledger.total == Decimal("300.00")
+    assert ledger.payment_count == 1
+    assert [r.id for r in pos_payment_rows(TODAY)] == [keep.id]
+
+
+def test_deleted_payment_is_removed(db):
+    _payment(db, 300)
+    gone = _payment(db, 200)
+    db.session.commit()
+
+    db.session.delete(gone)
+    db.session.commit()
+
+    assert _ledger().total == Decimal("300.00")
+
+
+def test_first_sale_seeds_from_earlier_payments(db):
+    from app.models import Payment
+
+    # payments recorded before the ledger existed (no listeners)
+    db.session.execute(Payment.__table__.insert(), [
+        dict(user_id=1, method="Cash", amount_jmd=250, transaction_type="invoice_payment",
+             status="completed", source="pos", created_at=NOW),
+        dict(user_id=1, method="Card", amount_jmd=100, transaction_type="invoice_payment",
+             status="completed", source="pos", created_at=NOW),
+    ])
+    db.session.commit()
+    assert _ledger() is None
+
+    _payment(db, 50, "Cash")
+    db.session.commit()
+
+    ledger = _ledger()
+    assert ledger.cash == Decimal("300.00")
+    assert ledger.card == Decimal("100.00")
+    assert ledger.payment_count == 3
+
+
+def test_discount_change_recounts_the_payment(db):
+    invoice = _invoice(db, "INV-2", discount=0)
+    _payment(db, 500, "Cash", invoice)
+    db.session.commit()
+
+    invoice.discount_total = Decimal("20")
+    db.session.commit()
+
+    ledger = _ledger()
+    assert ledger.discount == Decimal("20.00")
+    assert ledger.gross_total == Decimal("520.00")
+    assert ledger.total == Decimal("500.00")
+
+
+def test_summary_is_read_only_and_closeout_seeds(db):
+    from app.models import Payment
+
+    db.session.execute(Payment.__table__.insert(), [
+        dict(user_id=1, method="Cash", amount_jmd=80, transaction_type="invoice_payment",
+             status="completed", source="pos", created_at=NOW),
+    ])
+    db.session.commit()
+
+    summary = pos_day_summary(TODAY)
+    assert summary["cash"] == Decimal("80.00")
+    assert summary["revision"] == 0
+    assert _ledger() is None
+
+    ensure_pos_ledger(TODAY)
+    db.session.commit()
+    assert _ledger().cash == Decimal("80.00")
+    assert _ledger().revision == 0
@@ -0,0 +1,23 @@
+"""
+Pre-alert reconciliation (app/utils/prealert_reconcile.py): the orphan
+sweep matches tracking numbers the way normalize_tracking() does.
+"""
+from app.utils.prealert_reconcile import _orphan_package_query
+
+
+def test_edited_tracking_number_still_matches_its_prealert(db):
+    from app.models import Package, Prealert, User
+
+    customer = User(email="sweep@test", password=b"x", role="customer")
+    db.session.add(customer)
+    db.session.flush()
+
+    package = Package(user_id=customer.id, tracking_number="1Z999")
+    db.session.add(package)
+    db.session.flush()
+    # the edit form only strips: case and inner spaces survive
+    package.tracking_number = "1z 999\tab"
+    db.session.add(Prealert(customer_id=customer.id, tracking_number="1Z999AB"))
+    db.session.commit()
+
+    assert [p.id for p in _orphan_package_query(30)] == [package.id]
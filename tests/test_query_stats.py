@@ -0,0 +1,41 @@
+"""
+Server-Timing (app/utils/query_stats.py): query counts and DB time must
+not reach anonymous visitors unless PERF_SERVER_TIMING is on.
+"""
+import pytest
+
+
+@pytest.fixture
+def timing_off(app):
+    app.config["PERF_SERVER_TIMING"] = False
+    yield app
+    app.config["PERF_SERVER_TIMING"] = True
+
+
+def test_public_response_has_no_server_timing(db, timing_off):
+    response = timing_off.test_client().get("/public-api/rates")
+    assert "Server-Timing" not in response.headers
+
+
+def test_flag_sends_it_to_everyone(db, app):
+    app.config["PERF_SERVER_TIMING"] = True
+    response = app.test_client().get("/public-api/rates")
+    assert "queries" in response.headers["Server-Timing"]
+
+
+def test_admins_always_get_it(db, timing_off):
+    from app.models import User
+
+    admin = User(email="perf-admin@test", password=b"x", role="admin", is_admin=True, is_superadmin=True)
+    db.session.add(admin)
+    db.session.commit()
+    admin_id = admin.id
+
+    client = timing_off.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(admin_id)
+        session["_fresh"] = True
+
+    response = client.get("/admin/dashboard")
+    assert response.status_code == 200
+    assert "queries" in response.headers["Server-Timing"]
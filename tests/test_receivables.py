@@ -0,0 +1,45 @@
+"""
+receivables_snapshot (app/utils/receivables.py) stays current when the
+package bulk delete removes invoices with a bulk DELETE.
+"""
+from decimal import Decimal
+
+from app.utils.receivables import refresh_receivables
+
+
+def _login(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+    return client
+
+
+def test_bulk_package_delete_drops_the_invoice_from_the_snapshot(app, db):
+    from app.models import Invoice, Package, ReceivableSnapshot, User
+
+    admin = User(email="ar-admin@test", password=b"x", role="admin", is_admin=True, is_superadmin=True)
+    customer = User(email="ar-customer@test", password=b"x", role="customer")
+    db.session.add_all([admin, customer])
+    db.session.flush()
+
+    invoice = Invoice(user_id=customer.id, invoice_number="INV-AR-1", status="unpaid",
+                      grand_total=Decimal("1500"), amount_due=Decimal("1500"))
+    db.session.add(invoice)
+    db.session.flush()
+    package = Package(user_id=customer.id, tracking_number="AR1", invoice_id=invoice.id)
+    db.session.add(package)
+    db.session.commit()
+    admin_id, package_id = admin.id, package.id
+
+    refresh_receivables()
+    assert ReceivableSnapshot.query.count() == 1
+
+    response = _login(app, admin_id).post(
+        "/admin/logistics/packages/bulk-action",
+        data={"action": "delete", "package_ids": [package_id]},
+    )
+    assert response.status_code == 302
+
+    assert Invoice.query.count() == 0
+    assert ReceivableSnapshot.query.count() == 0
@@ -0,0 +1,25 @@
+"""
+Bulk sort-code reset (app/utils/sorting_codes.py) matches the per-package
+apply_customer_default_to_package(), including packages with no customer.
+"""
+from app.utils.sorting_codes import bulk_apply_customer_default_sort_codes
+
+
+def test_reset_covers_owned_and_ownerless_packages(db):
+    from app.models import Package, User
+
+    customer = User(email="sort@test", password=b"x", role="customer", default_sort_code="UE")
+    db.session.add(customer)
+    db.session.flush()
+
+    owned = Package(user_id=customer.id, tracking_number="SORT1", sort_code="PRE", sort_code_source="manual")
+    ownerless = Package(user_id=None, tracking_number="SORT2", sort_code="PRE", sort_code_source="manual")
+    db.session.add_all([owned, ownerless])
+    db.session.commit()
+
+    result = bulk_apply_customer_default_sort_codes(package_ids=[owned.id, ownerless.id])
+    db.session.commit()
+
+    assert result["updated"] == 2
+    assert (owned.sort_code, owned.sort_code_source) == ("UE", "customer_default")
+    assert (ownerless.sort_code, ownerless.sort_code_source) == ("UNASSIGNED", "system")
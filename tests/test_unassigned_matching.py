@@ -0,0 +1,27 @@
+"""
+Unassigned-package matching (app/utils/unassigned_matching.py): AWBs are
+compared normalized on both sides.
+"""
+from app.utils.unassigned import get_unassigned_user_id
+from app.utils.unassigned_matching import matches_for_packages
+
+
+def test_claim_awb_matches_regardless_of_case_and_dashes(app, db):
+    from app.models import Claim, Package
+
+    with app.test_request_context("/"):
+        pkg = Package(user_id=get_unassigned_user_id(), tracking_number="1Z999000111", house_awb="FAF-1234-AB")
+        claim = Claim(
+            user_id=1,
+            house_awb="faf 1234ab",
+            item_value_jmd=1000,
+            invoice_url="https://example.test/invoice.pdf",
+            bank_statement_url="https://example.test/statement.pdf",
+        )
+        db.session.add_all([pkg, claim])
+        db.session.commit()
+
+        assert claim.house_awb_norm == "FAF1234AB"
+
+        found = matches_for_packages([pkg])[pkg.id]["claims"]
+        assert [(c["id"], c["kind"]) for c in found] == [(claim.id, "awb")]